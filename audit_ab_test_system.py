@@ -32,6 +32,8 @@ try:
 except ImportError:
     pass
 
+from data_pipeline.customer_flags_config import get_customer_ab_groups
+
 # Try importing Shopify sync (optional)
 try:
     from data_pipeline.sync_flags_to_shopify import ShopifyFlagSyncer
@@ -372,12 +374,20 @@ def audit_communications(s3_client, bucket):
             print_info(f"  • {flag_type}: {count}")
 
 
+def _flag_ab_group(flag_data):
+    """ab_group from a flag's JSON flag_data, or None."""
+    try:
+        return json.loads(flag_data).get('ab_group')
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
 def audit_ab_group_assignment(s3_client, bucket):
     """Verify AB group assignment is working correctly."""
     print_section("5. AB GROUP ASSIGNMENT VERIFICATION")
 
-    # Load customer data
-    df_customers = load_from_s3(s3_client, bucket, 'capitan/customers.csv')
+    # Load customer contacts (household hash per customer)
+    df_customers = load_from_s3(s3_client, bucket, 'customers/customer_contacts.csv')
 
     if df_customers.empty:
         print_error("Cannot load customer data")
@@ -434,6 +444,24 @@ def audit_ab_group_assignment(s3_client, bucket):
         print_error(f"\nFound {incorrect_assignments} incorrect group assignments!")
         print_info(f"Correct: {correct_assignments}")
 
+    # Check each flag's group against the customer's current household group
+    if 'household_hash' in df_customers.columns:
+        df_customers['customer_id'] = df_customers['customer_id'].astype(str)
+        df_customers['expected_group'] = get_customer_ab_groups(
+            df_customers['customer_id'], household_hashes=df_customers['household_hash']
+        )
+        flagged = ab_test_flags.assign(
+            customer_id=ab_test_flags['customer_id'].astype(str),
+            ab_group=ab_test_flags['flag_data'].map(_flag_ab_group),
+        ).merge(df_customers[['customer_id', 'expected_group']], on='customer_id', how='inner')
+        moved = flagged[flagged['ab_group'] != flagged['expected_group']]
+        if moved.empty:
+            print_success(f"All {len(flagged)} flagged customers are still in their household's group")
+        else:
+            print_warning(f"{len(moved)} flagged customers' household group has changed since they were flagged")
+            for _, flag in moved.head(10).iterrows():
+                print_info(f"  • {flag['customer_id']}: flagged as {flag['ab_group']}, now {flag['expected_group']}")
+
 
 def generate_action_plan(s3_client, bucket):
     """Generate action plan based on audit results."""
@@ -18,6 +18,7 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import boto3
 from io import StringIO
+import json
 import os
 
 # Page config
@@ -99,10 +100,21 @@ def load_data():
             st.warning(f"Could not load {key}: {str(e)}")
             return pd.DataFrame()
 
+    def load_partitioned(prefix, since):
+        """Helper to load the partitions of a manifest-based history from S3 since a day."""
+        try:
+            obj = s3_client.get_object(Bucket=bucket_name, Key=f"{prefix}/manifest.json")
+            manifest = json.loads(obj['Body'].read().decode('utf-8'))
+        except Exception as e:
+            st.warning(f"Could not load {prefix}: {str(e)}")
+            return pd.DataFrame()
+        frames = [load_csv(entry['key']) for entry in manifest['partitions'].values() if entry['end'] >= since]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
     # Load data
     df_memberships = load_csv('capitan/memberships.csv')
     df_members = load_csv('capitan/members.csv')
-    df_checkins = load_csv('capitan/checkins.csv')
+    df_checkins = load_partitioned('capitan/checkins', (datetime.now() - timedelta(days=31)).strftime('%Y-%m-%d'))
     df_transactions = load_csv('transactions/combined_transactions.csv')
 
     return df_memberships, df_members, df_checkins, df_transactions
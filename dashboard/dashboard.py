@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import plotly.graph_objects as go
 from data_pipeline import upload_data
 from data_pipeline import config
+from data_pipeline import transaction_store
 import os
 import plotly.io as pio
 from data_pipeline import pipeline_handler
@@ -24,7 +25,7 @@ def load_df_from_s3(bucket, key):
 
 def load_data():
     # Load all needed DataFrames from S3
-    df_transactions = load_df_from_s3(config.aws_bucket_name, config.s3_path_combined)
+    df_transactions = transaction_store.load_transactions()
     df_memberships = load_df_from_s3(
         config.aws_bucket_name, config.s3_path_capitan_memberships
     )
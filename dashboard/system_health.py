@@ -3,10 +3,11 @@ System Health Dashboard Tab
 Monitors automation flows, data freshness, and system errors
 """
 
-from dash import html, dash_table
+from dash import html, dcc, dash_table
+import plotly.express as px
 import pandas as pd
 from datetime import datetime, timedelta
-from data_pipeline import upload_data, config
+from data_pipeline import upload_data, config, pipeline_telemetry
 
 
 def load_system_health_data():
@@ -176,7 +177,7 @@ def get_data_freshness_metrics():
     uploader = upload_data.DataUploader()
 
     sources = [
-        {'name': 'Stripe Transactions', 's3_key': config.s3_path_combined},
+        {'name': 'Stripe Transactions', 's3_key': f'{config.s3_path_transaction_partitions}/manifest.json'},
         {'name': 'Customer Master', 's3_key': config.s3_path_customers_master},
         {'name': 'Customer Flags', 's3_key': config.s3_path_customer_flags},
         {'name': 'Birthday Parties', 's3_key': 'birthday_parties/birthday_parties.csv'},
@@ -229,6 +230,75 @@ def get_data_freshness_metrics():
     return pd.DataFrame(metrics)
 
 
+def get_pipeline_step_history(days=30):
+    """
+    Get per-step durations for the last N days of pipeline runs.
+
+    Only top-level steps are returned (nested handler calls are already
+    included in their parent's time).
+
+    Returns DataFrame with columns:
+    - run_id, run_date, name, status, wall_seconds, cpu_seconds,
+      process_peak_rss_mb (whole process, not per step), rows_out,
+      s3_bytes_read, s3_bytes_written
+    """
+    try:
+        df_runs = pipeline_telemetry.load_run_logs(days=days)
+    except Exception as e:
+        print(f"Error loading pipeline run logs: {e}")
+        return pd.DataFrame()
+
+    if df_runs.empty:
+        return df_runs
+
+    df_steps = df_runs[df_runs['parent'].isna()].copy()
+    df_steps['run_date'] = df_steps['started_at'].dt.date
+    return df_steps.sort_values('started_at')
+
+
+def get_step_regressions(df_steps, threshold=1.5, min_seconds=30):
+    """
+    Compare each step's latest duration to the median of its previous runs.
+
+    A step is flagged when it is at least `threshold` times slower than its
+    median and at least `min_seconds` slower in absolute terms.
+
+    Returns DataFrame with one row per step from the latest run.
+    """
+    if df_steps.empty:
+        return pd.DataFrame()
+
+    df_success = df_steps[df_steps['status'] == 'success']
+    latest_run = df_steps['run_id'].max()
+
+    rows = []
+    for name, group in df_steps[df_steps['run_id'] == latest_run].groupby('name'):
+        latest = group.iloc[-1]
+        previous = df_success[(df_success['name'] == name) & (df_success['run_id'] < latest_run)]
+        median = previous['wall_seconds'].median() if not previous.empty else None
+
+        if latest['status'] != 'success':
+            status = f"❌ {latest['status'].title()}"
+        elif median and latest['wall_seconds'] >= median * threshold and \
+                latest['wall_seconds'] - median >= min_seconds:
+            status = '⚠️ Slower'
+        else:
+            status = '✅ Normal'
+
+        rows.append({
+            'Step': name,
+            'Latest (s)': round(latest['wall_seconds'], 1),
+            'Median (s)': round(median, 1) if median else 'N/A',
+            'CPU (s)': round(latest['cpu_seconds'], 1),
+            'Process Peak RSS (MB)': latest['process_peak_rss_mb'],
+            'S3 Read (MB)': round(latest['s3_bytes_read'] / 1e6, 1),
+            'S3 Written (MB)': round(latest['s3_bytes_written'] / 1e6, 1),
+            'Status': status,
+        })
+
+    return pd.DataFrame(rows).sort_values('Latest (s)', ascending=False)
+
+
 def get_recent_errors():
     """
     Get recent errors and warnings from the system.
@@ -277,6 +347,21 @@ def create_system_health_layout():
     df_freshness = get_data_freshness_metrics()
     df_errors = get_recent_errors()
 
+    df_step_history = get_pipeline_step_history(days=30)
+    df_regressions = get_step_regressions(df_step_history)
+    if not df_step_history.empty:
+        step_duration_fig = px.line(
+            df_step_history,
+            x='started_at',
+            y='wall_seconds',
+            color='name',
+            markers=True,
+            title='Pipeline Step Durations (Last 30 Days)',
+            labels={'started_at': 'Run', 'wall_seconds': 'Seconds', 'name': 'Step'},
+        )
+    else:
+        step_duration_fig = px.line(title='No pipeline run telemetry yet')
+
     # Get current flag counts
     df_flags = data.get('flags', pd.DataFrame())
     active_flags_summary = []
@@ -412,6 +497,38 @@ def create_system_health_layout():
             ]
         ),
 
+        # Pipeline Performance Section
+        html.H2("Pipeline Step Performance", style={"color": "#213B3F", "marginTop": "40px"}),
+        html.P("Wall time per step for each daily run, from the pipeline run log", style={"color": "#666"}),
+        dcc.Graph(figure=step_duration_fig),
+        dash_table.DataTable(
+            data=df_regressions.to_dict('records') if not df_regressions.empty else [{'Message': 'No data available'}],
+            style_table={'overflowX': 'auto'},
+            style_cell={
+                'textAlign': 'left',
+                'padding': '10px',
+                'backgroundColor': '#f9f9f9',
+                'border': '1px solid #ddd'
+            },
+            style_header={
+                'backgroundColor': '#213B3F',
+                'color': 'white',
+                'fontWeight': 'bold',
+                'border': '1px solid #213B3F'
+            },
+            style_data_conditional=[
+                {
+                    'if': {'row_index': 'odd'},
+                    'backgroundColor': '#ffffff'
+                },
+                {
+                    'if': {'filter_query': '{Status} = "⚠️ Slower"'},
+                    'backgroundColor': '#fff3e0',
+                    'color': '#f57c00'
+                }
+            ]
+        ),
+
         # Recent Errors Section
         html.H2("Recent Notifications & Warnings", style={"color": "#213B3F", "marginTop": "40px"}),
         html.P("System messages from the last 24 hours", style={"color": "#666"}),
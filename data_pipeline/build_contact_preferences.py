@@ -15,10 +15,14 @@ import pandas as pd
 import boto3
 import os
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Tuple
 import json
 
+from data_pipeline import pipeline_telemetry
+from data_pipeline.customer_matching import normalize_phones
+
 
 class ContactPreferencesBuilder:
     """
@@ -37,6 +41,7 @@ class ContactPreferencesBuilder:
         )
 
         self.opt_in_events = []
+        self.source_events = {}  # source -> opt-in events, filled by each processor
 
     def _load_s3_csv(self, key: str) -> pd.DataFrame:
         """Load CSV from S3."""
@@ -73,68 +78,54 @@ class ContactPreferencesBuilder:
         if df.empty:
             return pd.DataFrame()
 
-        records = []
-        for _, row in df.iterrows():
-            customer_id = str(row['customer_id'])
-            email = row.get('email', '')
-            phone = row.get('phone', '')
-            opted_in = row.get('has_opted_in_to_marketing', False)
-            created_at = row.get('created_at', '')
-
-            # Only create records for customers with contact info
-            if opted_in and (pd.notna(email) and email != ''):
-                records.append({
-                    'identifier': str(email).lower().strip(),
-                    'identifier_type': 'email',
-                    'channel': 'email',
-                    'opt_in_status': 'opted_in',
-                    'opt_in_date': created_at,  # Use created_at as proxy
-                    'source': 'capitan',
-                    'source_status': 'has_opted_in_to_marketing=True',
-                    'customer_id': customer_id
-                })
-
-                # Add event
-                self.opt_in_events.append({
-                    'customer_id': customer_id,
-                    'event_type': 'email_opt_in',
-                    'event_date': created_at,
-                    'event_source': 'capitan',
-                    'source_confidence': 'direct',
-                    'event_details': json.dumps({
-                        'channel': 'email',
-                        'method': 'capitan_marketing_opt_in',
-                        'email': str(email).lower().strip()
-                    })
-                })
-
-            if opted_in and (pd.notna(phone) and phone != ''):
-                records.append({
-                    'identifier': self._normalize_phone(str(phone)),
-                    'identifier_type': 'phone',
-                    'channel': 'sms',
-                    'opt_in_status': 'opted_in',
-                    'opt_in_date': created_at,
-                    'source': 'capitan',
-                    'source_status': 'has_opted_in_to_marketing=True',
-                    'customer_id': customer_id
-                })
-
-                # Add event
-                self.opt_in_events.append({
-                    'customer_id': customer_id,
-                    'event_type': 'sms_opt_in',
-                    'event_date': created_at,
-                    'event_source': 'capitan',
-                    'source_confidence': 'direct',
-                    'event_details': json.dumps({
-                        'channel': 'sms',
-                        'method': 'capitan_marketing_opt_in',
-                        'phone': self._normalize_phone(str(phone))
-                    })
-                })
+        if 'has_opted_in_to_marketing' not in df:
+            return pd.DataFrame()
+        opted_in = df[df['has_opted_in_to_marketing'] == True]
+        customer_id = opted_in['customer_id'].astype(str)
+        created_at = opted_in['created_at'] if 'created_at' in opted_in else pd.Series('', index=opted_in.index)
+
+        email = opted_in['email'] if 'email' in opted_in else pd.Series(dtype=object, index=opted_in.index)
+        has_email = email.notna() & (email != '')
+        email = email[has_email].astype(str).str.lower().str.strip()
+
+        phone = opted_in['phone'] if 'phone' in opted_in else pd.Series(dtype=object, index=opted_in.index)
+        has_phone = phone.notna() & (phone != '')
+        phone = normalize_phones(phone[has_phone]).fillna('')
+
+        email_records = pd.DataFrame({
+            'identifier': email,
+            'identifier_type': 'email',
+            'channel': 'email',
+            'opt_in_status': 'opted_in',
+            'opt_in_date': created_at[has_email],  # Use created_at as proxy
+            'source': 'capitan',
+            'source_status': 'has_opted_in_to_marketing=True',
+            'customer_id': customer_id[has_email]
+        })
+        phone_records = pd.DataFrame({
+            'identifier': phone,
+            'identifier_type': 'phone',
+            'channel': 'sms',
+            'opt_in_status': 'opted_in',
+            'opt_in_date': created_at[has_phone],
+            'source': 'capitan',
+            'source_status': 'has_opted_in_to_marketing=True',
+            'customer_id': customer_id[has_phone]
+        })
+
+        # Keep each customer's email record next to their phone record
+        df_records = pd.concat([email_records, phone_records]).sort_index(kind='stable').reset_index(drop=True)
+
+        # Add events
+        self.source_events['capitan'] = [
+            self._opt_in_event(record.customer_id, f'{record.channel}_opt_in', record.opt_in_date, 'capitan', {
+                'channel': record.channel,
+                'method': 'capitan_marketing_opt_in',
+                record.identifier_type: record.identifier
+            })
+            for record in df_records.itertuples(index=False)
+        ]
 
-        df_records = pd.DataFrame(records)
         print(f"   Found {len(df_records)} Capitan opt-in records")
         return df_records
 
@@ -157,53 +148,45 @@ class ContactPreferencesBuilder:
         if df.empty:
             return pd.DataFrame()
 
-        records = []
-        for _, row in df.iterrows():
-            email = str(row.get('email_address', '')).lower().strip()
-            status = row.get('status', '')
-            opt_in_date = row.get('timestamp_opt_in', row.get('timestamp_signup', ''))
-
-            if not email:
-                continue
-
-            # Map Mailchimp status to our opt-in status
-            if status == 'subscribed':
-                opt_in_status = 'opted_in'
-                event_type = 'email_opt_in'
-            elif status in ['unsubscribed', 'cleaned']:
-                opt_in_status = 'opted_out'
-                event_type = 'email_opt_out'
-            else:
-                # transactional or other - skip for marketing purposes
-                continue
-
-            records.append({
-                'identifier': email,
-                'identifier_type': 'email',
-                'channel': 'email',
-                'opt_in_status': opt_in_status,
-                'opt_in_date': opt_in_date,
-                'source': 'mailchimp',
-                'source_status': status,
-                'customer_id': ''  # Will be joined later
-            })
-
-            # Add event (need to look up customer_id by email)
-            self.opt_in_events.append({
-                'customer_id': '',  # Will be populated later
-                'event_type': event_type,
-                'event_date': opt_in_date,
-                'event_source': 'mailchimp',
-                'source_confidence': 'direct',
-                'event_details': json.dumps({
+        # Map Mailchimp status to our opt-in status;
+        # transactional or other - skip for marketing purposes
+        status = df['status'] if 'status' in df else pd.Series('', index=df.index)
+        opt_in_status = status.map({'subscribed': 'opted_in', 'unsubscribed': 'opted_out', 'cleaned': 'opted_out'})
+        email = df['email_address'].astype('string').str.lower().str.strip()
+        keep = opt_in_status.notna() & email.notna() & (email != '')
+
+        if 'timestamp_opt_in' in df:
+            opt_in_date = df['timestamp_opt_in']
+        elif 'timestamp_signup' in df:
+            opt_in_date = df['timestamp_signup']
+        else:
+            opt_in_date = pd.Series('', index=df.index)
+
+        df_records = pd.DataFrame({
+            'identifier': email[keep].astype(object),
+            'identifier_type': 'email',
+            'channel': 'email',
+            'opt_in_status': opt_in_status[keep],
+            'opt_in_date': opt_in_date[keep],
+            'source': 'mailchimp',
+            'source_status': status[keep],
+            'customer_id': ''  # Will be joined later
+        }).reset_index(drop=True)
+
+        # Add events (need to look up customer_id by email)
+        self.source_events['mailchimp'] = [
+            self._opt_in_event(
+                '',  # Will be populated later
+                'email_opt_in' if record.opt_in_status == 'opted_in' else 'email_opt_out',
+                record.opt_in_date, 'mailchimp', {
                     'channel': 'email',
-                    'method': f'mailchimp_{status}',
-                    'email': email,
-                    'mailchimp_status': status
+                    'method': f'mailchimp_{record.source_status}',
+                    'email': record.identifier,
+                    'mailchimp_status': record.source_status
                 })
-            })
+            for record in df_records.itertuples(index=False)
+        ]
 
-        df_records = pd.DataFrame(records)
         print(f"   Found {len(df_records)} Mailchimp records")
         print(f"   - Opted in: {len(df_records[df_records['opt_in_status'] == 'opted_in'])}")
         print(f"   - Opted out: {len(df_records[df_records['opt_in_status'] == 'opted_out'])}")
@@ -220,48 +203,42 @@ class ContactPreferencesBuilder:
         """
         print("\n📱 Processing Twilio SMS opt-ins...")
 
-        records = []
+        frames = []
+        events = []
 
         # 1. Load explicit SMS consents
         df_consents = self._load_s3_csv('twilio/sms_consents.csv')
         if not df_consents.empty:
-            for _, row in df_consents.iterrows():
-                phone = row.get('phone_number', '')
-                status = row.get('status', 'active')
-                timestamp = row.get('timestamp', '')
-                method = row.get('opt_in_method', '')
-                customer_id = row.get('customer_id', '')
-
-                if not phone:
-                    continue
-
-                opt_in_status = 'opted_in' if status == 'active' else 'opted_out'
-                event_type = 'sms_opt_in' if status == 'active' else 'sms_opt_out'
-
-                records.append({
-                    'identifier': self._normalize_phone(phone),
-                    'identifier_type': 'phone',
-                    'channel': 'sms',
-                    'opt_in_status': opt_in_status,
-                    'opt_in_date': timestamp,
-                    'source': 'twilio_consent',
-                    'source_status': status,
-                    'customer_id': str(customer_id) if customer_id else ''
-                })
-
-                self.opt_in_events.append({
-                    'customer_id': str(customer_id) if customer_id else '',
-                    'event_type': event_type,
-                    'event_date': timestamp,
-                    'event_source': 'twilio',
-                    'source_confidence': 'direct',
-                    'event_details': json.dumps({
+            df_consents = df_consents[df_consents['phone_number'].notna() & (df_consents['phone_number'] != '')]
+            status = df_consents['status'].fillna('active') if 'status' in df_consents else pd.Series('active', index=df_consents.index)
+            active = status == 'active'
+            customer_id = (
+                df_consents['customer_id'].where(df_consents['customer_id'].notna() & (df_consents['customer_id'] != ''))
+                if 'customer_id' in df_consents else pd.Series(None, index=df_consents.index, dtype=object)
+            )
+            consents = pd.DataFrame({
+                'identifier': normalize_phones(df_consents['phone_number']).fillna(''),
+                'identifier_type': 'phone',
+                'channel': 'sms',
+                'opt_in_status': active.map({True: 'opted_in', False: 'opted_out'}),
+                'opt_in_date': df_consents.get('timestamp', ''),
+                'source': 'twilio_consent',
+                'source_status': status,
+                'customer_id': customer_id.astype(str).where(customer_id.notna(), '')
+            })
+            frames.append(consents)
+
+            methods = df_consents['opt_in_method'] if 'opt_in_method' in df_consents else pd.Series('', index=df_consents.index)
+            for record, method in zip(consents.itertuples(index=False), methods):
+                events.append(self._opt_in_event(
+                    record.customer_id,
+                    'sms_opt_in' if record.opt_in_status == 'opted_in' else 'sms_opt_out',
+                    record.opt_in_date, 'twilio', {
                         'channel': 'sms',
                         'method': method,
-                        'phone': self._normalize_phone(phone),
-                        'consent_status': status
-                    })
-                })
+                        'phone': record.identifier,
+                        'consent_status': record.source_status
+                    }))
 
             print(f"   Found {len(df_consents)} explicit SMS consent records")
 
@@ -269,50 +246,32 @@ class ContactPreferencesBuilder:
         df_messages = self._load_s3_csv('twilio/messages.csv')
         if not df_messages.empty:
             # Filter to inbound messages with opt-in/opt-out
-            inbound = df_messages[df_messages['direction'] == 'inbound'].copy()
+            inbound = df_messages[df_messages['direction'] == 'inbound']
+            inbound = inbound[inbound['from_number'].notna() & (inbound['from_number'] != '')]
 
             opt_in_msgs = inbound[inbound.get('is_opt_in', False) == True]
             opt_out_msgs = inbound[inbound.get('is_opt_out', False) == True]
 
-            for _, row in opt_in_msgs.iterrows():
-                phone = row.get('from_number', '')
-                timestamp = row.get('date_sent', '')
-
-                if not phone:
-                    continue
-
-                records.append({
-                    'identifier': self._normalize_phone(phone),
-                    'identifier_type': 'phone',
-                    'channel': 'sms',
-                    'opt_in_status': 'opted_in',
-                    'opt_in_date': timestamp,
-                    'source': 'twilio_keyword',
-                    'source_status': 'keyword_opt_in',
-                    'customer_id': ''
-                })
-
-            for _, row in opt_out_msgs.iterrows():
-                phone = row.get('from_number', '')
-                timestamp = row.get('date_sent', '')
-
-                if not phone:
-                    continue
-
-                records.append({
-                    'identifier': self._normalize_phone(phone),
+            for msgs, opt_in_status, source_status in [
+                (opt_in_msgs, 'opted_in', 'keyword_opt_in'),
+                (opt_out_msgs, 'opted_out', 'keyword_opt_out'),
+            ]:
+                frames.append(pd.DataFrame({
+                    'identifier': normalize_phones(msgs['from_number']).fillna(''),
                     'identifier_type': 'phone',
                     'channel': 'sms',
-                    'opt_in_status': 'opted_out',
-                    'opt_in_date': timestamp,
+                    'opt_in_status': opt_in_status,
+                    'opt_in_date': msgs['date_sent'],
                     'source': 'twilio_keyword',
-                    'source_status': 'keyword_opt_out',
+                    'source_status': source_status,
                     'customer_id': ''
-                })
+                }))
 
             print(f"   Found {len(opt_in_msgs)} keyword opt-ins, {len(opt_out_msgs)} keyword opt-outs")
 
-        df_records = pd.DataFrame(records)
+        self.source_events['twilio'] = events
+
+        df_records = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         print(f"   Total Twilio records: {len(df_records)}")
         return df_records
 
@@ -339,25 +298,29 @@ class ContactPreferencesBuilder:
 
         # Take most recent record per identifier + channel
         current = all_records.groupby(['identifier', 'channel']).first().reset_index()
+        current['opt_in'] = current['opt_in_status'] == 'opted_in'
 
         # Pivot to get one row per identifier with email and sms columns
-        preferences = []
-        for identifier, group in current.groupby('identifier'):
-            record = {
-                'identifier': identifier,
-                'identifier_type': group['identifier_type'].iloc[0],
-                'customer_id': group['customer_id'].iloc[0] if group['customer_id'].iloc[0] else ''
-            }
-
-            for _, row in group.iterrows():
-                channel = row['channel']
-                record[f'{channel}_opt_in'] = row['opt_in_status'] == 'opted_in'
-                record[f'{channel}_opt_in_date'] = row['opt_in_date']
-                record[f'{channel}_source'] = row['source']
-
-            preferences.append(record)
+        by_channel = current.pivot_table(
+            index='identifier',
+            columns='channel',
+            values=['opt_in', 'opt_in_date', 'source'],
+            aggfunc='first',
+            dropna=False
+        )
+        channels = sorted(current['channel'].unique())
+        by_channel = by_channel.reindex(columns=[
+            (value, channel) for channel in channels for value in ['opt_in', 'opt_in_date', 'source']
+        ])
+        by_channel.columns = [f'{channel}_{value}' for value, channel in by_channel.columns]
+
+        # Identifier type and customer ID come from the identifier's first channel
+        first_channel = current.groupby('identifier')[['identifier_type', 'customer_id']].first()
+        first_channel['customer_id'] = first_channel['customer_id'].where(
+            first_channel['customer_id'].fillna('').astype(bool), ''
+        )
 
-        df_prefs = pd.DataFrame(preferences)
+        df_prefs = first_channel.join(by_channel).reset_index()
 
         # Fill missing columns
         for col in ['email_opt_in', 'sms_opt_in']:
@@ -370,20 +333,17 @@ class ContactPreferencesBuilder:
 
         return df_prefs
 
-    def _normalize_phone(self, phone: str) -> str:
-        """Normalize phone to E.164 format."""
-        if not phone or pd.isna(phone):
-            return ''
-
-        digits = ''.join(filter(str.isdigit, str(phone)))
-
-        if len(digits) == 10:
-            return f"+1{digits}"
-        elif len(digits) == 11 and digits[0] == '1':
-            return f"+{digits}"
-        elif len(digits) > 0:
-            return f"+{digits}"
-        return ''
+    @staticmethod
+    def _opt_in_event(customer_id, event_type: str, event_date, event_source: str, details: Dict) -> Dict:
+        """Opt-in/opt-out event row for customer_events."""
+        return {
+            'customer_id': customer_id,
+            'event_type': event_type,
+            'event_date': event_date,
+            'event_source': event_source,
+            'source_confidence': 'direct',
+            'event_details': json.dumps(details)
+        }
 
     def run(self, save_to_s3: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
@@ -399,10 +359,14 @@ class ContactPreferencesBuilder:
         print("Building Contact Preferences")
         print("=" * 60)
 
-        # Process all sources
-        capitan_records = self.process_capitan_opt_ins()
-        mailchimp_records = self.process_mailchimp_opt_ins()
-        twilio_records = self.process_twilio_opt_ins()
+        # Process all sources (each is its own S3 load, so read them concurrently)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            capitan_future = pool.submit(pipeline_telemetry.in_current_context(self.process_capitan_opt_ins))
+            mailchimp_future = pool.submit(pipeline_telemetry.in_current_context(self.process_mailchimp_opt_ins))
+            twilio_future = pool.submit(pipeline_telemetry.in_current_context(self.process_twilio_opt_ins))
+        capitan_records = capitan_future.result()
+        mailchimp_records = mailchimp_future.result()
+        twilio_records = twilio_future.result()
 
         # Combine all records
         all_records = pd.concat([
@@ -417,6 +381,10 @@ class ContactPreferencesBuilder:
         preferences = self.build_current_preferences(all_records)
 
         # Build events DataFrame
+        self.opt_in_events = [
+            event for source in ['capitan', 'mailchimp', 'twilio']
+            for event in self.source_events.get(source, [])
+        ]
         events_df = pd.DataFrame(self.opt_in_events)
 
         if save_to_s3 and not preferences.empty:
@@ -17,7 +17,7 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data_pipeline import upload_data, config
+from data_pipeline import upload_data, config, checkin_store
 
 
 def build_day_pass_engagement_table():
@@ -35,8 +35,7 @@ def build_day_pass_engagement_table():
 
     # Load check-ins
     print("\n📥 Loading check-in data...")
-    csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
-    df_checkins = uploader.convert_csv_to_df(csv_content)
+    df_checkins = checkin_store.load_checkins()
     print(f"   Loaded {len(df_checkins):,} check-ins")
 
     # Load memberships
@@ -171,8 +170,7 @@ def build_day_pass_checkin_recency_table():
 
     # Load check-ins
     print("\n📥 Loading check-in data...")
-    csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
-    df_checkins = uploader.convert_csv_to_df(csv_content)
+    df_checkins = checkin_store.load_checkins()
     print(f"   Loaded {len(df_checkins):,} check-ins")
 
     # Load memberships
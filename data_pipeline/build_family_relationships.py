@@ -10,23 +10,48 @@ Combines:
 Output: family_relationships.csv with parent→child links
 """
 
+import numpy as np
 import pandas as pd
 import os
 from datetime import datetime
 
 
-def calculate_age(birthday):
-    """Calculate age from birthday."""
-    if pd.isna(birthday):
-        return None
+YOUTH_MEMBERSHIP_TERMS = ['youth', 'team dues', 'junior', 'kid']
 
-    try:
-        birthday = pd.to_datetime(birthday)
-        today = pd.Timestamp.now()
-        age = (today - birthday).days / 365.25
-        return int(age)
-    except:
-        return None
+LINK_COLUMNS = [
+    'parent_customer_id',
+    'child_customer_id',
+    'relationship_type',
+    'confidence',
+    'source'
+]
+
+
+def calculate_age(birthdays: pd.Series, today: pd.Timestamp = None) -> pd.Series:
+    """
+    Calculate ages from a column of birthdays.
+
+    Args:
+        birthdays: Series of birthdays (strings or datetimes)
+        today: Reference date (default: now)
+
+    Returns:
+        Series of whole-year ages (float, NaN where the birthday is missing or unparseable)
+    """
+    today = pd.Timestamp.now() if today is None else pd.Timestamp(today)
+    parsed = pd.to_datetime(birthdays, errors='coerce', utc=True, format='mixed').dt.tz_localize(None)
+    return np.trunc((today - parsed).dt.days / 365.25)
+
+
+def _links(parents, children, confidence: str, sources) -> pd.DataFrame:
+    """Parent-child link rows in the output layout."""
+    return pd.DataFrame({
+        'parent_customer_id': list(parents),
+        'child_customer_id': list(children),
+        'relationship_type': 'parent_child',
+        'confidence': confidence,
+        'source': list(sources)
+    }, columns=LINK_COLUMNS)
 
 
 def build_family_relationships(
@@ -58,9 +83,17 @@ def build_family_relationships(
     family_links = []
 
     # Calculate ages for all customers
-    customers_df['age'] = customers_df['birthday'].apply(calculate_age)
+    customers_df['age'] = calculate_age(customers_df['birthday'])
     customers_df['is_minor'] = customers_df['age'] < 18
 
+    # customer_id -> age, in customer order (the first matching row wins below)
+    age_index = pd.DataFrame({
+        'customer_id': customers_df['customer_id'].values,
+        'age': customers_df['age'].values,
+        'email': customers_df['email'].astype(object).values if 'email' in customers_df else None,
+        'row': np.arange(len(customers_df))
+    })
+
     # =================================================================
     # SOURCE 1: Relations API (highest confidence)
     # =================================================================
@@ -69,28 +102,22 @@ def build_family_relationships(
     if not relations_df.empty:
         # CHI = Child relationship (parent → child)
         parent_child_relations = relations_df[relations_df['relationship'] == 'CHI']
-
-        for _, relation in parent_child_relations.iterrows():
-            family_links.append({
-                'parent_customer_id': relation['customer_id'],
-                'child_customer_id': relation['related_customer_id'],
-                'relationship_type': 'parent_child',
-                'confidence': 'high',
-                'source': 'relations_api_CHI'
-            })
+        family_links.append(_links(
+            parent_child_relations['customer_id'],
+            parent_child_relations['related_customer_id'],
+            'high',
+            ['relations_api_CHI'] * len(parent_child_relations)
+        ))
 
         # PRE = Parent relationship (child → parent)
         # This is the reverse direction, so we flip it
         child_parent_relations = relations_df[relations_df['relationship'] == 'PRE']
-
-        for _, relation in child_parent_relations.iterrows():
-            family_links.append({
-                'parent_customer_id': relation['related_customer_id'],  # Flipped
-                'child_customer_id': relation['customer_id'],           # Flipped
-                'relationship_type': 'parent_child',
-                'confidence': 'high',
-                'source': 'relations_api_PRE'
-            })
+        family_links.append(_links(
+            child_parent_relations['related_customer_id'],  # Flipped
+            child_parent_relations['customer_id'],          # Flipped
+            'high',
+            ['relations_api_PRE'] * len(child_parent_relations)
+        ))
 
         print(f"   ✅ Found {len(parent_child_relations)} CHI relations")
         print(f"   ✅ Found {len(child_parent_relations)} PRE relations")
@@ -102,42 +129,32 @@ def build_family_relationships(
     # =================================================================
     print("\n2. Processing shared membership rosters...")
 
-    membership_links = 0
-
-    for membership in memberships_raw:
-        all_customers = membership.get('all_customers', [])
-
-        if len(all_customers) <= 1:
-            continue  # Solo membership, no family
-
-        # Get customer IDs on this membership
-        member_ids = [m['id'] for m in all_customers]
-
-        # Get their ages
-        members_data = customers_df[customers_df['customer_id'].isin(member_ids)].copy()
-
-        if members_data.empty:
-            continue
-
-        # Find adults and minors on this membership
-        adults = members_data[members_data['age'] >= 18]
-        minors = members_data[members_data['age'] < 18]
-
-        # If we have both adults and minors, link them
-        if len(adults) > 0 and len(minors) > 0:
-            # Assume first adult is parent (usually membership owner)
-            # In reality, could be multiple parents, but we'll link to first
-            parent_id = adults.iloc[0]['customer_id']
-
-            for _, child in minors.iterrows():
-                family_links.append({
-                    'parent_customer_id': parent_id,
-                    'child_customer_id': child['customer_id'],
-                    'relationship_type': 'parent_child',
-                    'confidence': 'medium',
-                    'source': f"shared_membership_{membership.get('id')}"
-                })
-                membership_links += 1
+    # One (membership, customer) edge per person on a multi-person membership
+    edges = pd.DataFrame(
+        [
+            (position, membership.get('id'), member['id'])
+            for position, membership in enumerate(memberships_raw)
+            if len(membership.get('all_customers', [])) > 1
+            for member in membership['all_customers']
+        ],
+        columns=['position', 'membership_id', 'customer_id']
+    ).drop_duplicates(['position', 'customer_id'])
+
+    members = edges.astype({'customer_id': age_index['customer_id'].dtype}) if len(edges) else edges
+    members = members.merge(age_index, on='customer_id').sort_values(['position', 'row'], kind='stable')
+
+    # Assume first adult is parent (usually membership owner)
+    # In reality, could be multiple parents, but we'll link to first
+    parents = members[members['age'] >= 18].groupby('position')['customer_id'].first().rename('parent_customer_id')
+    minors = members[members['age'] < 18].join(parents, on='position', how='inner')
+
+    family_links.append(_links(
+        minors['parent_customer_id'],
+        minors['customer_id'],
+        'medium',
+        'shared_membership_' + minors['membership_id'].astype(str)
+    ))
+    membership_links = len(minors)
 
     print(f"   ✅ Found {membership_links} parent-child links from shared memberships")
 
@@ -148,51 +165,35 @@ def build_family_relationships(
 
     # Youth memberships have owner_email from parent but membership owned by child
     # We need the raw membership data to get owner_email
-
-    youth_links = 0
-
-    for membership in memberships_raw:
-        # Check if this is a youth membership (team dues)
-        membership_name = membership.get('name', '').lower()
-        is_youth_membership = any(term in membership_name for term in [
-            'youth', 'team dues', 'junior', 'kid'
-        ])
-
-        if not is_youth_membership:
-            continue
-
-        owner_id = membership.get('owner_id')
-        owner_email = membership.get('owner_email')
-
-        if not owner_id or not owner_email:
-            continue
-
-        # Check if owner is a minor
-        owner_data = customers_df[customers_df['customer_id'] == owner_id]
-
-        if owner_data.empty:
-            continue
-
-        owner_age = owner_data.iloc[0].get('age')
-
-        if owner_age and owner_age < 18:
-            # This is a youth-owned membership
-            # Find parent by matching email to an adult
-            parent = customers_df[
-                (customers_df['email'] == owner_email) &
-                (customers_df['customer_id'] != owner_id) &
-                (customers_df['age'] >= 18)
-            ]
-
-            if len(parent) > 0:
-                family_links.append({
-                    'parent_customer_id': parent.iloc[0]['customer_id'],
-                    'child_customer_id': owner_id,
-                    'relationship_type': 'parent_child',
-                    'confidence': 'medium',
-                    'source': f"youth_membership_email_{membership.get('id')}"
-                })
-                youth_links += 1
+    youth = pd.DataFrame(
+        [
+            (position, membership.get('id'), membership.get('owner_id'), membership.get('owner_email'))
+            for position, membership in enumerate(memberships_raw)
+            # Check if this is a youth membership (team dues)
+            if any(term in (membership.get('name') or '').lower() for term in YOUTH_MEMBERSHIP_TERMS)
+            and membership.get('owner_id') and membership.get('owner_email')
+        ],
+        columns=['position', 'membership_id', 'owner_id', 'owner_email']
+    ).astype({'owner_email': object})
+
+    # This is a youth-owned membership when the owner is a minor
+    owner_ages = age_index.drop_duplicates('customer_id').set_index('customer_id')['age']
+    youth['owner_age'] = youth['owner_id'].map(owner_ages)
+    youth = youth[(youth['owner_age'] > 0) & (youth['owner_age'] < 18)]
+
+    # Find parent by matching email to an adult
+    adults = age_index[age_index['age'] >= 18]
+    candidates = youth.merge(adults, left_on='owner_email', right_on='email')
+    candidates = candidates[candidates['customer_id'] != candidates['owner_id']]
+    youth_parents = candidates.sort_values(['position', 'row'], kind='stable').groupby('position').first()
+
+    family_links.append(_links(
+        youth_parents['customer_id'],
+        youth_parents['owner_id'],
+        'medium',
+        'youth_membership_email_' + youth_parents['membership_id'].astype(str)
+    ))
+    youth_links = len(youth_parents)
 
     print(f"   ✅ Found {youth_links} parent-child links from youth memberships")
 
@@ -201,17 +202,13 @@ def build_family_relationships(
     # =================================================================
     print("\n4. Deduplicating and finalizing...")
 
+    family_links = [links for links in family_links if not links.empty]
+
     if not family_links:
         print("   ⚠️  No family relationships found")
-        return pd.DataFrame(columns=[
-            'parent_customer_id',
-            'child_customer_id',
-            'relationship_type',
-            'confidence',
-            'source'
-        ])
-
-    df = pd.DataFrame(family_links)
+        return pd.DataFrame(columns=LINK_COLUMNS)
+
+    df = pd.concat(family_links, ignore_index=True)
 
     # Count before dedup
     print(f"   Total links before dedup: {len(df)}")
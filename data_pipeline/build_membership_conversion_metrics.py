@@ -19,7 +19,7 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data_pipeline import upload_data, config
+from data_pipeline import upload_data, config, checkin_store
 
 
 def build_membership_conversion_metrics():
@@ -43,8 +43,7 @@ def build_membership_conversion_metrics():
 
     # Load check-ins
     print("\n📥 Loading check-in data...")
-    csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
-    df_checkins = uploader.convert_csv_to_df(csv_content)
+    df_checkins = checkin_store.load_checkins()
     print(f"   Loaded {len(df_checkins):,} check-ins")
 
     # Prepare data
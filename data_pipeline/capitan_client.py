@@ -0,0 +1,197 @@
+"""
+Capitan API Client
+
+One pooled HTTP session for all Capitan fetchers, with pagination that reads
+the total count from page 1 and then fetches the remaining pages concurrently
+under a shared rate limit. Transient failures (429, 5xx, timeouts, dropped
+connections) are retried with exponential backoff, and pages are reassembled
+in their original order.
+
+Usage:
+    client = CapitanClient(config.capitan_token)
+    checkins = client.paginate("check-ins", {"ordering": "-check_in_datetime"}, page_size=1000)
+
+    # Newest-first listings that stop once results get too old
+    for results in client.iter_pages("events", {"ordering": "-created_at"}):
+        ...
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import pipeline_telemetry
+from .rate_limiter import RateLimiter
+
+CAPITAN_BASE_URL = "https://api.hellocapitan.com/api/"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CapitanAPIError(Exception):
+    """A Capitan request failed after all retries."""
+
+    def __init__(self, message: str, partial_results: Optional[List[Dict]] = None,
+                 status_code: Optional[int] = None):
+        super().__init__(message)
+        self.partial_results = partial_results or []
+        self.status_code = status_code
+
+
+class CapitanClient:
+    """Pooled, rate-limited, retrying client for the Capitan REST API."""
+
+    def __init__(
+        self,
+        capitan_token: str,
+        base_url: str = CAPITAN_BASE_URL,
+        max_workers: int = 4,
+        requests_per_second: float = 9,
+        max_retries: int = 4,
+        backoff_seconds: float = 1.0,
+        timeout: float = 30,
+    ):
+        """
+        Args:
+            capitan_token: Capitan API token
+            base_url: API root (overridden in tests)
+            max_workers: Pages fetched concurrently
+            requests_per_second: Shared rate limit across all threads
+                (Capitan allows ~10/second)
+            max_retries: Retries per request for transient failures
+            backoff_seconds: First retry delay, doubled on each retry
+            timeout: Per-request timeout in seconds
+        """
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self._rate_limiter = RateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"token {capitan_token}"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path: str) -> str:
+        """Full URL for an endpoint path like "check-ins" (full URLs pass through)."""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}{path.strip('/')}/"
+
+    def get(self, path: str, params: Dict = None) -> Dict:
+        """
+        GET an endpoint and return its JSON, retrying transient failures.
+
+        Raises:
+            CapitanAPIError: If the request still fails after all retries,
+                or fails with a non-retryable status
+        """
+        url = self.url(path)
+        for attempt in range(self.max_retries + 1):
+            self._rate_limiter.wait()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error, retry_after = f"{type(e).__name__}: {e}", None
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise CapitanAPIError(
+                        f"{url} returned {response.status_code}: {response.text[:200]}",
+                        status_code=response.status_code)
+                error, retry_after = f"status {response.status_code}", response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise CapitanAPIError(f"{url} failed after {self.max_retries + 1} attempts ({error})")
+            delay = self.backoff_seconds * (2 ** attempt)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            print(f"   ⚠️  Capitan {error} for {url} (page {(params or {}).get('page', '-')}), "
+                  f"retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def paginate(self, path: str, params: Dict = None, page_size: int = 100) -> List[Dict]:
+        """
+        Fetch every page of a listing and return all results in page order.
+
+        Page 1 gives the total count; the remaining pages are then fetched
+        concurrently. If the response has no count, pages are followed one
+        at a time via `next`.
+
+        Args:
+            path: Endpoint path (e.g. "customers")
+            params: Query parameters besides page/page_size
+            page_size: Results per page (the customers endpoints 502 above ~100)
+
+        Returns:
+            List of result dictionaries
+
+        Raises:
+            CapitanAPIError: If a page fails after retries; partial_results
+                holds the pages before the first failed one, in order
+        """
+        params = dict(params or {})
+
+        def fetch(page: int) -> Dict:
+            return self.get(path, {**params, "page": page, "page_size": page_size})
+
+        first = fetch(1)
+        results = list(first.get("results", []))
+        count = first.get("count")
+        if not first.get("next"):
+            return results
+        if count is None:
+            return results + self._follow_next(path, params, page_size, start_page=2)
+
+        total_pages = math.ceil(count / page_size)
+        print(f"   {self.url(path)}: {count:,} records in {total_pages} pages")
+
+        pages = {1: first.get("results", [])}
+        failure = None
+        fetch_page = pipeline_telemetry.in_current_context(fetch)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {page: executor.submit(fetch_page, page) for page in range(2, total_pages + 1)}
+            for page, future in futures.items():
+                try:
+                    pages[page] = future.result().get("results", [])
+                except CapitanAPIError as e:
+                    failure = failure or (page, e)
+
+        if failure:
+            page, error = failure
+            partial = [r for p in range(1, page) for r in pages[p]]
+            raise CapitanAPIError(f"Page {page} of {path} failed: {error}", partial_results=partial)
+        return [r for page in range(1, total_pages + 1) for r in pages[page]]
+
+    def _follow_next(self, path: str, params: Dict, page_size: int, start_page: int) -> List[Dict]:
+        results = []
+        for page_results in self.iter_pages(path, params, page_size, start_page=start_page):
+            results.extend(page_results)
+        return results
+
+    def iter_pages(self, path: str, params: Dict = None, page_size: int = 1000,
+                   start_page: int = 1) -> Iterator[List[Dict]]:
+        """
+        Yield each page's results in order, one request at a time.
+
+        For newest-first listings the caller can stop early (break) once
+        results fall outside the wanted date range.
+
+        Raises:
+            CapitanAPIError: If a page fails after retries
+        """
+        params = dict(params or {})
+        page = start_page
+        while True:
+            data = self.get(path, {**params, "page": page, "page_size": page_size})
+            yield data.get("results", [])
+            if not data.get("next"):
+                return
+            page += 1
@@ -0,0 +1,258 @@
+"""
+Incremental Capitan Customer Sync
+
+Keeps capitan/customers.csv current without pulling the whole customer list
+every day. Each run asks Capitan only for customers updated since the stored
+cursor (the latest updated_at seen) and merges them into the stored table.
+Every `config.capitan_customers_full_sync_days` days a full listing is pulled
+instead, which also catches customers deleted in Capitan.
+
+The IDs of customers that were added, changed or deleted are published in
+capitan/customers_sync_state.json so downstream steps (identity resolution,
+relations fetch) can work on the delta. Changes are kept per consumer until
+that consumer acknowledges them, so a step that fails one day picks up both
+days' changes the next:
+
+    sync = sync_capitan_customers()
+    changes = sync["pending"]["relations"]
+    if changes["mode"] == "incremental":
+        ...only changes["changed_customer_ids"] / changes["deleted_customer_ids"]
+    acknowledge_customer_changes("relations")
+
+Listings are ordered by customer ID, not updated_at: pages are fetched
+concurrently, and a customer updated mid-fetch would otherwise move to the
+end of an updated_at ordering and shift another customer off its page. The
+cursor never passes the fetch start (less CURSOR_CLOCK_SKEW), so customers
+updated while the fetch ran are read again next time.
+
+If Capitan ignores the updated_at filter (records older than the cursor, or
+without updated_at, come back), the filtered response can't be trusted to be
+the full listing, so the full listing is requested and handled as a full sync.
+"""
+
+import datetime
+import io
+import json
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline import pipeline_telemetry
+from data_pipeline import upload_data
+from data_pipeline.fetch_capitan_membership_data import CapitanDataFetcher
+from data_pipeline.pipeline_scheduler import run_once
+
+# Downstream steps that consume the published customer changes
+CONSUMERS = ("customer_master", "relations")
+
+# Capitan's clock and ours can disagree; the cursor stays this far behind the fetch start
+CURSOR_CLOCK_SKEW = datetime.timedelta(minutes=5)
+
+_state_lock = threading.Lock()
+
+
+def _as_text(csv_content) -> pd.DataFrame:
+    """
+    Read a customers CSV keeping every value as its CSV text, so fresh and
+    stored rows compare equal and merging never turns IDs or phone numbers
+    into floats.
+    """
+    if isinstance(csv_content, bytes):
+        csv_content = csv_content.decode("utf-8")
+    return pd.read_csv(io.StringIO(csv_content), dtype=str)
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    """customer_id -> hash of the row's contents."""
+    hashes = pd.util.hash_pandas_object(df.fillna(""), index=False)
+    return pd.Series(hashes.values, index=df["customer_id"].values)
+
+
+class CapitanCustomerSync:
+    """Cursor-based sync of Capitan customers into capitan/customers.csv."""
+
+    def __init__(self, fetcher: CapitanDataFetcher = None, uploader: upload_data.DataUploader = None,
+                 bucket: str = None):
+        """
+        Args:
+            fetcher: CapitanDataFetcher to use (one for config.capitan_token by default)
+            uploader: DataUploader to use (a new one by default)
+            bucket: S3 bucket (config.aws_bucket_name by default)
+        """
+        self.fetcher = fetcher or CapitanDataFetcher(config.capitan_token)
+        self.uploader = uploader or upload_data.DataUploader()
+        self.bucket = bucket or config.aws_bucket_name
+
+    # ------------------------------------------------------------------
+    # Stored state
+    # ------------------------------------------------------------------
+
+    def load_state(self) -> Optional[Dict]:
+        """Last sync's cursor and published changes, or None before the first sync."""
+        try:
+            content = self.uploader.download_from_s3(self.bucket, config.s3_path_capitan_customers_sync_state)
+        except self.uploader.s3.exceptions.NoSuchKey:
+            return None
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        return json.loads(content)
+
+    def load_stored_customers(self) -> pd.DataFrame:
+        try:
+            content = self.uploader.download_from_s3(self.bucket, config.s3_path_capitan_customers)
+        except self.uploader.s3.exceptions.NoSuchKey:
+            return pd.DataFrame()
+        return _as_text(content)
+
+    def _save_state(self, state: Dict):
+        body = json.dumps(state, indent=2).encode("utf-8")
+        self.uploader.s3.put_object(Bucket=self.bucket, Key=config.s3_path_capitan_customers_sync_state, Body=body)
+        pipeline_telemetry.record_s3_write(len(body))
+
+    @staticmethod
+    def _pending(previous: Optional[Dict], mode: str, changed_ids: list, deleted_ids: list) -> Dict:
+        """Each consumer's unacknowledged changes, with this sync's changes added."""
+        pending = {}
+        for consumer in CONSUMERS:
+            before = (previous or {}).get(consumer)
+            if mode == "full" or before is None or before["mode"] == "full":
+                pending[consumer] = {"mode": "full", "changed_customer_ids": [], "deleted_customer_ids": []}
+                continue
+            deleted = set(before["deleted_customer_ids"]) | set(deleted_ids)
+            changed = (set(before["changed_customer_ids"]) | set(changed_ids)) - deleted
+            pending[consumer] = {
+                "mode": "incremental",
+                "changed_customer_ids": sorted(changed),
+                "deleted_customer_ids": sorted(deleted),
+            }
+        return pending
+
+    def acknowledge(self, consumer: str):
+        """
+        Mark a consumer's pending changes as processed.
+
+        Args:
+            consumer: One of CONSUMERS
+        """
+        with _state_lock:
+            state = self.load_state()
+            if not state:
+                return
+            state["pending"][consumer] = {
+                "mode": "incremental", "changed_customer_ids": [], "deleted_customer_ids": []}
+            self._save_state(state)
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _full_sync_due(self, state: Optional[Dict], stored: pd.DataFrame, today: datetime.date) -> bool:
+        if not state or not state.get("cursor") or stored.empty or "updated_at" not in stored.columns:
+            return True
+        last_full = datetime.date.fromisoformat(state["last_full_sync"])
+        return (today - last_full).days >= config.capitan_customers_full_sync_days
+
+    def _fetch(self, params: Dict = None) -> pd.DataFrame:
+        customers = self.fetcher.client.paginate("customers", params, page_size=100)
+        return _as_text(self.fetcher.customers_to_dataframe(customers).to_csv(index=False))
+
+    def sync(self, full: bool = False, today: datetime.date = None) -> Dict:
+        """
+        Bring capitan/customers.csv up to date and publish what changed.
+
+        Args:
+            full: Force a full listing (reconciliation) even if not due
+            today: Date used to decide whether a full sync is due (today by default)
+
+        Returns:
+            Dict with the merged `customers` DataFrame, `mode` ("full" or
+            "incremental"), this sync's `changed_customer_ids` and
+            `deleted_customer_ids`, and `pending` (each consumer's
+            unacknowledged changes, in the same shape)
+
+        Raises:
+            CapitanAPIError: If Capitan could not be read (nothing is saved)
+        """
+        today = today or datetime.date.today()
+        with _state_lock:
+            return self._sync(full, today)
+
+    def _sync(self, full: bool, today: datetime.date) -> Dict:
+        state = self.load_state()
+        stored = self.load_stored_customers()
+        mode = "full" if full or self._full_sync_due(state, stored, today) else "incremental"
+
+        fetch_started = pd.Timestamp.now(tz="UTC")
+        if mode == "incremental":
+            cursor = state["cursor"]
+            print(f"\n📇 Syncing Capitan customers updated since {cursor}...")
+            fetched = self._fetch({"updated_at__gte": cursor, "ordering": "id"})
+            updated_at = pd.to_datetime(fetched["updated_at"], errors="coerce", utc=True, format="ISO8601")
+            if (updated_at.isna() | (updated_at < pd.Timestamp(cursor))).any():
+                print("⚠️  Capitan ignored the updated_at filter; fetching the full listing instead")
+                mode = "full"
+                fetched = self._fetch({"ordering": "id"})
+        else:
+            print("\n📇 Full Capitan customer sync (reconciliation)...")
+            fetched = self._fetch({"ordering": "id"})
+        # A customer on two pages (the listing shifted between page reads) is kept once
+        fetched = fetched.drop_duplicates("customer_id", keep="last")
+
+        if stored.empty:
+            stored = fetched.iloc[0:0]
+        fetched_hashes = _row_hashes(fetched)
+        stored_hashes = _row_hashes(stored.reindex(columns=fetched.columns))
+        changed_ids = [int(cid) for cid, h in fetched_hashes.items() if stored_hashes.get(cid) != h]
+
+        if mode == "full":
+            merged = fetched
+            deleted_ids = sorted(int(cid) for cid in set(stored["customer_id"]) - set(fetched["customer_id"]))
+        else:
+            merged = pd.concat([stored[~stored["customer_id"].isin(fetched["customer_id"])], fetched],
+                               ignore_index=True)
+            deleted_ids = []
+
+        merged = merged.sort_values("customer_id", key=lambda ids: ids.astype(int)).reset_index(drop=True)
+        cursor = min(pd.to_datetime(merged["updated_at"], errors="coerce", utc=True, format="ISO8601").max(),
+                     fetch_started - CURSOR_CLOCK_SKEW)
+        state = {
+            "synced_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "mode": mode,
+            "cursor": cursor.isoformat() if pd.notna(cursor) else None,
+            "last_full_sync": today.isoformat() if mode == "full" else state["last_full_sync"],
+            "total_customers": len(merged),
+            "changed_customer_ids": sorted(changed_ids),
+            "deleted_customer_ids": deleted_ids,
+            "pending": self._pending((state or {}).get("pending"), mode, changed_ids, deleted_ids),
+        }
+        self.uploader.upload_to_s3(merged, self.bucket, config.s3_path_capitan_customers)
+        self._save_state(state)
+
+        print(f"✅ Capitan customers ({mode}): {len(fetched):,} fetched, {len(changed_ids):,} new/changed, "
+              f"{len(deleted_ids):,} deleted, {len(merged):,} total")
+
+        customers = pd.read_csv(io.StringIO(merged.to_csv(index=False)))
+        customers["created_at"] = pd.to_datetime(customers["created_at"], errors="coerce")
+        return {
+            "customers": customers,
+            "mode": mode,
+            "changed_customer_ids": state["changed_customer_ids"],
+            "deleted_customer_ids": deleted_ids,
+            "pending": state["pending"],
+        }
+
+
+@run_once
+def sync_capitan_customers(full: bool = False) -> Dict:
+    """
+    Run the customer sync once per pipeline run (see CapitanCustomerSync.sync);
+    the customers step and update_customer_master share the result.
+    """
+    return CapitanCustomerSync().sync(full=full)
+
+
+def acknowledge_customer_changes(consumer: str):
+    """Mark a consumer's pending customer changes as processed (see CapitanCustomerSync.acknowledge)."""
+    CapitanCustomerSync().acknowledge(consumer)
@@ -0,0 +1,218 @@
+"""
+Partitioned Check-in Store
+
+Stores the Capitan check-in history as one partition per month in S3, so the
+daily refresh (the last 7 days of check-ins) only reads and rewrites the one
+or two months it touches instead of downloading and re-uploading every
+check-in since opening, and readers that only need recent check-ins (pass
+transfers, customer interactions, at-risk members) only download those
+months.
+
+Layout:
+    capitan/checkins/manifest.json
+    capitan/checkins/month=2025-06/<sha256[:16]>.csv
+    capitan/checkins/latest_by_customer.csv   (each customer's most recent check-in)
+
+Months come from the local date in checkin_datetime. Partition files are
+content-addressed and swapped in through the manifest (see partitioned_store).
+
+Usage:
+    CheckinStore().merge(new_checkins_df)           # daily refresh
+    df = load_checkins(since=today - 7 days)        # recent check-ins only
+    df = load_checkins()                            # full history
+"""
+
+import io
+from typing import Dict
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline import pipeline_telemetry
+from data_pipeline.partitioned_store import PartitionedStore, row_days
+
+FALLBACK_DEDUP_COLUMNS = ["customer_id", "checkin_datetime"]
+
+
+def _dedup_columns(df: pd.DataFrame):
+    return ["checkin_id"] if "checkin_id" in df.columns else FALLBACK_DEDUP_COLUMNS
+
+
+class CheckinStore(PartitionedStore):
+    """Month-partitioned check-in history with a manifest."""
+
+    date_column = "checkin_datetime"
+    default_prefix = config.s3_path_checkin_partitions
+    snapshot_key = config.s3_path_capitan_checkins
+    label = "check-in"
+
+    @property
+    def latest_key(self) -> str:
+        return f"{self.prefix}/latest_by_customer.csv"
+
+    def _auxiliary_keys(self) -> set:
+        return {self.latest_key}
+
+    @staticmethod
+    def _month_names(df: pd.DataFrame) -> pd.Series:
+        return "month=" + row_days(df["checkin_datetime"]).str[:7]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def read_since(self, since, with_latest_per_customer: bool = False, manifest: Dict = None) -> pd.DataFrame:
+        """
+        Check-ins on or after a date, reading only the months that overlap it.
+
+        Args:
+            since: Earliest day to include
+            with_latest_per_customer: Also include each customer's most recent
+                check-in, even if it is older than since (for "last visit" lookups)
+            manifest: Manifest to read from (the current one by default)
+
+        Returns:
+            DataFrame of check-ins
+        """
+        df = self.read(start_date=since, manifest=manifest)
+        if with_latest_per_customer:
+            latest = self.read_latest_by_customer()
+            if not latest.empty:
+                df = pd.concat([latest, df], ignore_index=True).drop_duplicates(
+                    subset=_dedup_columns(latest), keep="last").reset_index(drop=True)
+        return df
+
+    def read_latest_by_customer(self) -> pd.DataFrame:
+        """Each customer's most recent check-in (empty if not built yet)."""
+        try:
+            content = self.uploader.download_from_s3(self.bucket, self.latest_key)
+        except self.uploader.s3.exceptions.NoSuchKey:
+            return pd.DataFrame()
+        return self.uploader.convert_csv_to_df(content)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def merge(self, new_checkins: pd.DataFrame) -> Dict:
+        """
+        Merge fetched check-ins into the months they fall in.
+
+        Only months that receive new rows are read and rewritten. Duplicates
+        keep the newly fetched row (by checkin_id, or customer_id +
+        checkin_datetime if there is no checkin_id), as the old full-file
+        concat + drop_duplicates(keep='last') did.
+
+        Args:
+            new_checkins: Check-ins from CapitanCheckinFetcher
+
+        Returns:
+            The new manifest
+        """
+        manifest = self.load_manifest()
+        if manifest is None:
+            manifest = self.migrate_from_legacy()
+        partitions = dict(manifest["partitions"])
+
+        names = self._month_names(new_checkins)
+        dropped = names.isna().sum()
+        if dropped:
+            print(f"⚠️  Skipping {dropped} check-ins without a valid checkin_datetime")
+        new_by_partition = dict(tuple(new_checkins[names.notna()].groupby(names[names.notna()], sort=False)))
+
+        def rebuild(item):
+            name, new_rows = item
+            existing = self._read_partition(partitions[name]) if name in partitions else pd.DataFrame()
+            merged = pd.concat([existing, new_rows], ignore_index=True)
+            merged = merged.drop_duplicates(subset=_dedup_columns(merged), keep="last")
+            return name, self._write_partition(name, merged)
+
+        for name, entry in self._map(rebuild, sorted(new_by_partition.items())):
+            partitions[name] = entry
+
+        manifest = self._save_manifest(partitions, previous=manifest)
+        self._update_latest_by_customer(new_checkins[names.notna()])
+        print(f"✅ Rewrote {len(new_by_partition)} of {len(partitions)} check-in partitions "
+              f"({manifest['total_rows']:,} check-ins total)")
+        self.delete_unreferenced(manifest)
+        return manifest
+
+    def _write_latest_by_customer(self, latest: pd.DataFrame):
+        buffer = io.StringIO()
+        latest.to_csv(buffer, index=False)
+        body = buffer.getvalue().encode("utf-8")
+        self.uploader.s3.put_object(Bucket=self.bucket, Key=self.latest_key, Body=body)
+        pipeline_telemetry.record_s3_write(len(body), rows=len(latest))
+
+    @staticmethod
+    def _latest_rows(df: pd.DataFrame) -> pd.DataFrame:
+        order = pd.to_datetime(df["checkin_datetime"], errors="coerce", utc=True)
+        return (df.assign(_order=order)
+                .sort_values("_order", kind="stable")
+                .drop_duplicates(subset=["customer_id"], keep="last")
+                .drop(columns="_order")
+                .reset_index(drop=True))
+
+    def _update_latest_by_customer(self, new_checkins: pd.DataFrame):
+        if new_checkins.empty or "customer_id" not in new_checkins.columns:
+            return
+        latest = self.read_latest_by_customer()
+        combined = pd.concat([latest, new_checkins], ignore_index=True)
+        self._write_latest_by_customer(self._latest_rows(combined.dropna(subset=["customer_id"])))
+
+    def migrate_from_legacy(self) -> Dict:
+        """
+        One-off bootstrap: split the legacy single-file history into month partitions.
+
+        Returns:
+            The new manifest
+        """
+        print(f"Creating check-in partitions from {config.s3_path_capitan_checkins}")
+        try:
+            content = self.uploader.download_from_s3(self.bucket, config.s3_path_capitan_checkins)
+            df = self.uploader.convert_csv_to_df(content)
+        except self.uploader.s3.exceptions.NoSuchKey:
+            return self._save_manifest({})
+
+        df = df.drop_duplicates(subset=_dedup_columns(df), keep="last")
+        names = self._month_names(df)
+        groups = list(df[names.notna()].groupby(names[names.notna()], sort=False))
+        entries = self._map(lambda group: (group[0], self._write_partition(*group)), groups)
+        if "customer_id" in df.columns:
+            self._write_latest_by_customer(self._latest_rows(df.dropna(subset=["customer_id"])))
+        return self._save_manifest(dict(entries))
+
+
+def load_checkins(since=None, with_latest_per_customer: bool = False) -> pd.DataFrame:
+    """
+    Load Capitan check-ins from the partitioned store.
+
+    Falls back to the legacy single-file history if the store has not been
+    created yet.
+
+    Args:
+        since: Earliest day to include (None = full history)
+        with_latest_per_customer: Also include each customer's most recent
+            check-in before since (see CheckinStore.read_since)
+
+    Returns:
+        DataFrame of check-ins
+    """
+    store = CheckinStore()
+    manifest = store.load_manifest()
+    if manifest is None:
+        uploader = store.uploader
+        df = uploader.convert_csv_to_df(
+            uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
+        )
+        if since is not None:
+            days = row_days(df["checkin_datetime"])
+            recent = df[days >= pd.Timestamp(since).strftime("%Y-%m-%d")]
+            if with_latest_per_customer:
+                recent = pd.concat([CheckinStore._latest_rows(df.dropna(subset=["customer_id"])), recent],
+                                   ignore_index=True).drop_duplicates(subset=_dedup_columns(df), keep="last")
+            df = recent.reset_index(drop=True)
+        return df
+    if since is None:
+        return store.read(manifest=manifest)
+    return store.read_since(since, with_latest_per_customer, manifest=manifest)
@@ -30,7 +30,12 @@ df_path_recent_days = "data/outputs/stripe_and_square_combined_data_recent_days.
 df_path_combined = "data/outputs/stripe_and_square_combined_data.csv"
 aws_bucket_name = "basin-climbing-data-prod"
 s3_path_recent_days = "transactions/recent_days_combined_transaction_data.csv"
-s3_path_combined = "transactions/combined_transaction_data.csv"
+s3_path_combined = "transactions/combined_transaction_data.csv"  # legacy single-file history
+s3_path_transaction_partitions = "transactions/partitions"
+s3_path_checkin_partitions = "capitan/checkins"  # month-partitioned check-in history
+# Superseded partition files stay this long so readers of the previous manifest can finish
+partition_delete_grace_hours = 24
+s3_path_snapshots = "snapshots"  # content-addressed monthly snapshots
 s3_path_capitan_memberships = "capitan/memberships.csv"
 s3_path_capitan_members = "capitan/members.csv"
 s3_path_capitan_membership_revenue_projection = (
@@ -76,6 +81,7 @@ s3_path_new_members = "capitan/new_members.csv"
 s3_path_new_members_snapshot = "capitan/snapshots/new_members.csv"
 s3_path_failed_payments = "stripe/failed_membership_payments.csv"
 s3_path_failed_payments_snapshot = "stripe/snapshots/failed_membership_payments.csv"
+s3_path_stripe_cache = "stripe/cache"
 s3_path_quickbooks_expenses = "quickbooks/expenses.csv"
 s3_path_quickbooks_revenue = "quickbooks/revenue.csv"
 s3_path_quickbooks_expense_accounts = "quickbooks/expense_accounts.csv"
@@ -87,8 +93,10 @@ s3_path_customers_master_snapshot = "customers/snapshots/customers_master.csv"
 s3_path_customer_identifiers_snapshot = "customers/snapshots/customer_identifiers.csv"
 s3_path_capitan_customers = "capitan/customers.csv"
 s3_path_capitan_customers_snapshot = "capitan/snapshots/customers.csv"
+s3_path_capitan_customers_sync_state = "capitan/customers_sync_state.json"  # updated_at cursor + changed IDs
 s3_path_capitan_relations = "capitan/relations.csv"
 s3_path_family_relationships = "customers/family_relationships.csv"
+s3_path_customer_contacts = "customers/customer_contacts.csv"  # resolved email/phone + household hash per customer
 s3_path_customer_events = "customers/customer_events.csv"
 s3_path_customer_events_snapshot = "customers/snapshots/customer_events.csv"
 s3_path_customer_flags = "customers/customer_flags.csv"
@@ -114,6 +122,13 @@ s3_path_experiment_entries = "experiments/customer_experiment_entries.csv"  # AB
 # Twilio paths
 s3_path_twilio_messages = "twilio/messages.csv"
 s3_path_twilio_messages_snapshot = "twilio/snapshots/messages.csv"
+s3_path_twilio_messages_sync_state = "twilio/messages_sync_state.json"  # date_sent cursor for the message archive
+s3_path_twilio_opt_ins_sync_state = "twilio/opt_ins_sync_state.json"  # date_sent cursor for opt-in tracking
+s3_path_twilio_sms_ledgers = "twilio/sms_ledgers"  # Per-campaign bulk send ledgers ({campaign_id}.csv)
+twilio_message_refresh_days = 7  # Message archive re-reads this window so status/error_code/price updates land
+twilio_messages_per_second = float(os.getenv("TWILIO_MESSAGES_PER_SECOND", "1"))  # Messaging Service throughput
+twilio_send_workers = 4
+twilio_ledger_upload_every = 100  # Mirror the SMS ledger to S3 every N messages during a send
 
 # Klaviyo paths
 s3_path_klaviyo_profiles = "klaviyo/profiles.csv"
@@ -129,6 +144,9 @@ s3_path_klaviyo_sync_log = "klaviyo/sync_log.csv"  # Tracks what was synced to K
 s3_path_capitan_referrals = "capitan/referrals.csv"
 s3_path_capitan_referral_leaderboard = "capitan/referral_leaderboard.csv"
 
+# Pipeline run telemetry (per-step timing and resource usage, JSONL per run)
+s3_path_pipeline_run_logs = "telemetry/pipeline_runs"
+
 snapshot_day_of_month = 1
 s3_path_text_and_metadata = "agent/text_and_metadata"
 
@@ -138,6 +156,12 @@ s3_path_text_and_metadata = "agent/text_and_metadata"
 # See PRE_OPENING_REVENUE_CONTEXT.md for details
 basin_opening_date = "2024-10-01"
 
+# Incremental Capitan customer sync: full listing (catches deletions) every N days
+capitan_customers_full_sync_days = 7
+
+# Flag engine: worker processes to shard customers across (1 = evaluate in-process)
+flag_engine_workers = int(os.getenv("FLAG_ENGINE_WORKERS", "1"))
+
 ## Dictionaries for processing string in decripitions
 revenue_category_keywords = {
     "day pass": "Day Pass",
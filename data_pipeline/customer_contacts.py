@@ -0,0 +1,154 @@
+"""
+Customer Contacts Table
+
+One row per customer with the email and phone we'd actually reach them on.
+Kids without their own email or phone borrow a parent's from the family
+graph, and every row carries the household hash behind its AB group, so
+the flag engine and the Shopify/Mailchimp syncers all read the same
+resolved contacts instead of each rebuilding them.
+
+Built once per pipeline run, after the customer master and family graph:
+
+    contacts = build_customer_contacts(df_master, df_capitan, df_family)
+
+Consumers read back only the columns they need:
+
+    contacts = load_customer_contacts(s3_client, bucket, columns=['customer_id', 'email'])
+"""
+
+from io import StringIO
+from typing import List, Optional
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline.customer_flags_config import get_household_hashes
+
+CONTACT_COLUMNS = [
+    'customer_id', 'email', 'phone', 'first_name', 'last_name',
+    'is_using_parent_contact', 'household_hash',
+]
+
+# Read as text so IDs and phone numbers come back exactly as they were hashed
+TEXT_COLUMNS = {column: str for column in ['customer_id', 'email', 'phone', 'first_name', 'last_name', 'household_hash']}
+
+
+def _has_value(values: pd.Series) -> pd.Series:
+    """True where a contact value is present and non-empty."""
+    return values.notna() & (values != '')
+
+
+def _split_names(names: pd.Series):
+    """Split full names into first name and the rest."""
+    parts = names.where(names.notna()).astype('string').str.strip().str.partition(' ').reindex(columns=[0, 1, 2])
+    first, last = (parts[i].astype(object).where(parts[i].notna() & (parts[i] != '')) for i in (0, 2))
+    return first, last
+
+
+def _first_parent_value(links: pd.DataFrame, own_values: pd.Series) -> pd.Series:
+    """
+    Each child's first parent (in family graph order) with a value of their own.
+
+    Args:
+        links: child_customer_id/parent_customer_id pairs, as strings
+        own_values: Customers' own contact values indexed by customer_id
+
+    Returns:
+        Series of parent values indexed by child_customer_id
+    """
+    parent_values = links['parent_customer_id'].map(own_values.where(_has_value(own_values)))
+    found = links.assign(value=parent_values).dropna(subset=['value'])
+    return found.drop_duplicates('child_customer_id').set_index('child_customer_id')['value']
+
+
+def build_customer_contacts(
+    df_master: pd.DataFrame,
+    df_capitan: pd.DataFrame,
+    df_family: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Resolve one email and phone per customer.
+
+    customers_master (UUID customer_ids, as used in customer_events.csv) takes
+    precedence over capitan/customers.csv (numeric Capitan IDs, as used by
+    check-ins loaded directly). Customers missing an email or phone take their
+    first parent's (in family graph order) that has one, following the graph
+    up through parents who are themselves using a parent's contact.
+
+    Args:
+        df_master: customers_master with customer_id, primary_email, primary_phone, primary_name
+        df_capitan: Capitan customers with customer_id, email, phone, first_name, last_name
+        df_family: Family graph with parent_customer_id, child_customer_id (optional)
+
+    Returns:
+        DataFrame with CONTACT_COLUMNS, customer_id as strings
+    """
+    first_name, last_name = _split_names(df_master.get('primary_name', pd.Series(index=df_master.index, dtype=object)))
+    master = pd.DataFrame({
+        'customer_id': df_master['customer_id'].astype(str),
+        'email': df_master.get('primary_email'),
+        'phone': df_master.get('primary_phone'),
+        'first_name': first_name,
+        'last_name': last_name,
+    }).drop_duplicates('customer_id', keep='last')
+
+    capitan = pd.DataFrame({
+        column: df_capitan.get(column) for column in ['email', 'phone', 'first_name', 'last_name']
+    }, index=df_capitan.index)
+    capitan.insert(0, 'customer_id', df_capitan['customer_id'].astype(str))
+    # Only customers not already in customers_master
+    capitan = capitan[~capitan['customer_id'].isin(master['customer_id'])].drop_duplicates('customer_id')
+
+    frames = [frame for frame in (master, capitan) if not frame.empty]
+    contacts = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CONTACT_COLUMNS[:5])
+    contacts = contacts.astype({'email': object, 'phone': object}).set_index('customer_id')
+
+    own_email = _has_value(contacts['email'])
+    own_phone = _has_value(contacts['phone'])
+    use_parent_email = pd.Series(False, index=contacts.index)
+    use_parent_phone = pd.Series(False, index=contacts.index)
+    if df_family is not None and not df_family.empty:
+        links = df_family[['child_customer_id', 'parent_customer_id']].astype(str)
+        # Children we only know from the family graph still get a row
+        new_children = links['child_customer_id'].drop_duplicates()
+        new_children = new_children[~new_children.isin(contacts.index)]
+        contacts = contacts.reindex(contacts.index.append(pd.Index(new_children)))
+        own_email = own_email.reindex(contacts.index, fill_value=False)
+        own_phone = own_phone.reindex(contacts.index, fill_value=False)
+
+        # Each pass reaches one generation further (a parent who is using
+        # their own parent's contact passes it on), until nothing changes
+        email, phone = contacts['email'], contacts['phone']
+        for _ in range(len(links) + 1):
+            parent_email = _first_parent_value(links, email).reindex(contacts.index)
+            parent_phone = _first_parent_value(links, phone).reindex(contacts.index)
+            use_parent_email = ~own_email & parent_email.notna()
+            use_parent_phone = ~own_phone & parent_phone.notna()
+            next_email = contacts['email'].mask(use_parent_email, parent_email)
+            next_phone = contacts['phone'].mask(use_parent_phone, parent_phone)
+            if next_email.equals(email) and next_phone.equals(phone):
+                break
+            email, phone = next_email, next_phone
+        contacts['email'], contacts['phone'] = email, phone
+
+    contacts['is_using_parent_contact'] = use_parent_email | use_parent_phone
+
+    contacts = contacts.rename_axis('customer_id').reset_index()
+    contacts['household_hash'] = get_household_hashes(contacts['customer_id'], contacts['email'], contacts['phone'])
+    return contacts[CONTACT_COLUMNS]
+
+
+def load_customer_contacts(s3_client, bucket_name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read the customer contacts table from S3.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket_name: Pipeline bucket
+        columns: Columns to read (default: all)
+
+    Returns:
+        DataFrame of customer contacts with text IDs, emails and phones
+    """
+    obj = s3_client.get_object(Bucket=bucket_name, Key=config.s3_path_customer_contacts)
+    return pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')), usecols=columns, dtype=TEXT_COLUMNS)
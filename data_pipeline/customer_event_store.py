@@ -0,0 +1,197 @@
+"""
+Customer Event Details
+
+customer_events.csv keeps each event's details as a JSON blob - event_details
+from the event builder, event_data from the flag engine and the Shopify
+syncer. The details the flag rules filter on most are also stored as typed
+columns next to the blobs, so reading them is a column read rather than
+parsing every row:
+
+    entry_method_description, flag_type, campaign_id   (text)
+    amount                                             (float)
+
+Every writer passes its frame through normalize_events() before saving. Rows
+that already carry the current details_version are left alone; older rows
+(including ones written with str(dict) instead of json.dumps) are parsed
+once, their blobs rewritten as JSON, and their detail columns filled in.
+
+One-time migration of the stored table:
+    python -m data_pipeline.customer_event_store
+"""
+
+import ast
+import io
+import json
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from data_pipeline import config
+
+DETAILS_VERSION = 1
+BLOB_COLUMNS = ['event_data', 'event_details']
+TEXT_DETAIL_COLUMNS = ['entry_method_description', 'flag_type', 'campaign_id']
+NUMERIC_DETAIL_COLUMNS = ['amount']
+DETAIL_COLUMNS = TEXT_DETAIL_COLUMNS + NUMERIC_DETAIL_COLUMNS
+READ_DTYPES = {
+    **{column: str for column in BLOB_COLUMNS + TEXT_DETAIL_COLUMNS},
+    **{column: float for column in NUMERIC_DETAIL_COLUMNS},
+}
+
+
+def parse_details(value) -> Dict[str, Any]:
+    """
+    Parse a details blob that could be JSON or a Python dict repr.
+
+    Args:
+        value: Blob from event_data/event_details (or an already-parsed dict)
+
+    Returns:
+        Dict of details, empty if the value is missing or can't be parsed
+    """
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str):
+        return {}
+    # Try JSON first (proper format)
+    try:
+        parsed = json.loads(value)
+    except (json.JSONDecodeError, ValueError):
+        # Fallback: try Python literal (for old data saved with str() instead of json.dumps())
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _to_json(value):
+    """Rewrite a legacy blob as JSON, leaving JSON and unparseable text as is."""
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    if not isinstance(value, str):
+        return value
+    try:
+        json.loads(value)
+        return value
+    except (json.JSONDecodeError, ValueError):
+        parsed = parse_details(value)
+        return json.dumps(parsed, default=str) if parsed else value
+
+
+def normalize_events(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring events up to the current details_version.
+
+    Only rows without the current version are parsed: their blobs are
+    rewritten as JSON and their typed detail columns filled from the
+    details (event_data when it has any, else event_details).
+
+    Args:
+        df: Customer events
+
+    Returns:
+        Copy of df with JSON blobs, DETAIL_COLUMNS and details_version
+    """
+    df = df.copy()
+    for column in BLOB_COLUMNS + TEXT_DETAIL_COLUMNS:
+        df[column] = df[column].astype(object) if column in df.columns else None
+    for column in NUMERIC_DETAIL_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce') if column in df.columns else float('nan')
+    if 'details_version' not in df.columns:
+        df['details_version'] = float('nan')
+
+    stale = df['details_version'].ne(DETAILS_VERSION).to_numpy()
+    if stale.any():
+        rows = df.loc[stale, BLOB_COLUMNS]
+        details = [
+            parse_details(data) or parse_details(event_details)
+            for data, event_details in zip(rows['event_data'], rows['event_details'])
+        ]
+        for column in BLOB_COLUMNS:
+            df.loc[stale, column] = rows[column].map(_to_json)
+        for column in TEXT_DETAIL_COLUMNS:
+            values = [d.get(column) for d in details]
+            df.loc[stale, column] = [None if v is None or v == '' or v != v else str(v) for v in values]
+        for column in NUMERIC_DETAIL_COLUMNS:
+            values = pd.to_numeric(pd.Series([d.get(column) for d in details], dtype=object), errors='coerce')
+            df.loc[stale, column] = values.to_numpy()
+        df.loc[stale, 'details_version'] = DETAILS_VERSION
+
+    df['details_version'] = df['details_version'].astype(int)
+    return df
+
+
+def read_events(csv_content) -> pd.DataFrame:
+    """
+    Read customer_events.csv with typed detail columns.
+
+    Args:
+        csv_content: CSV text (or bytes)
+
+    Returns:
+        DataFrame of events, normalized if the stored rows predate DETAILS_VERSION
+    """
+    if isinstance(csv_content, bytes):
+        csv_content = csv_content.decode('utf-8')
+    df = pd.read_csv(io.StringIO(csv_content), dtype=READ_DTYPES)
+    if 'details_version' not in df.columns or df['details_version'].ne(DETAILS_VERSION).any():
+        print("   ⚠️  customer_events.csv has rows without parsed details, parsing them now")
+        df = normalize_events(df)
+    return df
+
+
+def event_data_dicts(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Details dict for each normalized event (event_data when it has any, else event_details).
+
+    Args:
+        df: Normalized customer events
+
+    Returns:
+        List of dicts aligned with df's rows
+    """
+    def loads(value):
+        if not isinstance(value, str):
+            return {}
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    columns = [df[column] if column in df.columns else [None] * len(df) for column in BLOB_COLUMNS]
+    return [loads(data) or loads(event_details) for data, event_details in zip(*columns)]
+
+
+def migrate_customer_events(uploader=None) -> pd.DataFrame:
+    """
+    One-time rewrite of the stored customer_events.csv at the current details_version.
+
+    Args:
+        uploader: DataUploader (default: a new one)
+
+    Returns:
+        The migrated events
+    """
+    from data_pipeline import upload_data
+
+    uploader = uploader or upload_data.DataUploader()
+    csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_customer_events)
+    if isinstance(csv_content, bytes):
+        csv_content = csv_content.decode('utf-8')
+    df = pd.read_csv(io.StringIO(csv_content), dtype=READ_DTYPES)
+    stale = len(df) if 'details_version' not in df.columns else int(df['details_version'].ne(DETAILS_VERSION).sum())
+    print(f"📥 Loaded {len(df)} customer events ({stale} to migrate)")
+    if not stale:
+        print("✅ customer_events.csv is already up to date")
+        return df
+
+    df = normalize_events(df)
+    uploader.upload_to_s3(df, config.aws_bucket_name, config.s3_path_customer_events)
+    print(f"✅ Migrated {stale} events to details_version {DETAILS_VERSION}")
+    return df
+
+
+if __name__ == "__main__":
+    migrate_customer_events()
@@ -721,7 +721,7 @@ def build_customer_events(
 
 if __name__ == "__main__":
     # Test the event builder
-    from data_pipeline import upload_data, config
+    from data_pipeline import upload_data, config, checkin_store
     import pandas as pd
 
     print("Testing Customer Events Builder")
@@ -741,8 +741,7 @@ if __name__ == "__main__":
 
     # Load check-ins
     print("\nLoading check-in data from S3...")
-    csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
-    df_checkins = uploader.convert_csv_to_df(csv_content)
+    df_checkins = checkin_store.load_checkins()
     print(f"Loaded {len(df_checkins)} check-ins")
 
     # Build events
@@ -24,6 +24,8 @@ from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Set
 
+from data_pipeline import checkin_store
+
 try:
     from data_pipeline import customer_flag_rules
 except ImportError:
@@ -85,8 +87,7 @@ class CustomerFlagEngine:
 
         # Capitan check-ins
         try:
-            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key="capitan/checkins.csv")
-            data['checkins'] = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            data['checkins'] = checkin_store.load_checkins()
             print(f"   ✅ Check-ins: {len(data['checkins'])}")
         except Exception as e:
             print(f"   ⚠️  Check-ins: Error - {e}")
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Literal, Optional, List
 import hashlib
 import json
+import numpy as np
 import pandas as pd
 import boto3
 from io import StringIO
@@ -29,6 +30,46 @@ def is_persistent_flag(flag_type: str) -> bool:
     return flag_type in PERSISTENT_FLAGS
 
 
+# Override for testing: Hardcoded customer IDs can be manually assigned
+# Add your customer_id here to force a specific group for testing
+AB_GROUP_OVERRIDES = {
+    '1378427': 'B',  # Steel Ferguson - testing Group B flow
+}
+
+# Group for each possible last hex digit of a household hash: int(digit, 16) % 10 <= 4 is A
+HASH_DIGIT_GROUPS = {digit: ("A" if int(digit, 16) % 10 <= 4 else "B") for digit in '0123456789abcdef'}
+
+
+def get_household_hash(customer_id: str, email: Optional[str] = None, phone: Optional[str] = None) -> str:
+    """
+    MD5 hex digest of the key that groups a customer with their household.
+
+    The key is the email if there is one, else the phone digits, else the
+    customer_id - so kids without their own email hash with their parents.
+
+    Args:
+        customer_id: Capitan customer ID (string or int)
+        email: Customer email address (optional, priority 1)
+        phone: Customer phone number (optional, priority 2)
+
+    Returns:
+        32-character hex digest
+    """
+    # Priority 1: Use email hash if available
+    if email and str(email).strip() and str(email).lower() not in ['nan', 'none', '']:
+        return hashlib.md5(str(email).lower().strip().encode()).hexdigest()
+
+    # Priority 2: Use phone hash if email not available (for kids → same group as parents)
+    if phone and str(phone).strip() and str(phone).lower() not in ['nan', 'none', '']:
+        # Normalize phone (remove non-digits)
+        phone_digits = ''.join(filter(str.isdigit, str(phone)))
+        if phone_digits:
+            return hashlib.md5(phone_digits.encode()).hexdigest()
+
+    # Priority 3: Fall back to customer_id hash (numeric IDs and UUIDs alike)
+    return hashlib.md5(str(customer_id).encode()).hexdigest()
+
+
 def get_customer_ab_group(customer_id: str, email: Optional[str] = None, phone: Optional[str] = None) -> Literal["A", "B"]:
     """
     Assign customer to AB test group based on email or phone (for household consistency).
@@ -57,47 +98,12 @@ def get_customer_ab_group(customer_id: str, email: Optional[str] = None, phone:
         >>> get_customer_ab_group("2466865")  # Falls back to customer_id
         'B'
     """
-    # Override for testing: Hardcoded customer IDs can be manually assigned
-    # Add your customer_id here to force a specific group for testing
-    AB_GROUP_OVERRIDES = {
-        '1378427': 'B',  # Steel Ferguson - testing Group B flow
-    }
-
     # Check for override first
     if str(customer_id) in AB_GROUP_OVERRIDES:
         return AB_GROUP_OVERRIDES[str(customer_id)]
-    # Priority 1: Use email hash if available
-    if email and str(email).strip() and str(email).lower() not in ['nan', 'none', '']:
-        # Hash the email to get a deterministic number
-        email_hash = hashlib.md5(email.lower().strip().encode()).hexdigest()
-        # Use last character of hash (hex digit 0-9, a-f)
-        last_char = email_hash[-1]
-        # Convert hex to int (0-15), then mod 10 to get 0-9
-        last_digit = int(last_char, 16) % 10
-
-    # Priority 2: Use phone hash if email not available (for kids → same group as parents)
-    elif phone and str(phone).strip() and str(phone).lower() not in ['nan', 'none', '']:
-        # Normalize phone (remove non-digits)
-        phone_digits = ''.join(filter(str.isdigit, str(phone)))
-        if phone_digits:
-            # Hash the phone to get a deterministic number
-            phone_hash = hashlib.md5(phone_digits.encode()).hexdigest()
-            # Use last character of hash
-            last_char = phone_hash[-1]
-            # Convert hex to int (0-15), then mod 10 to get 0-9
-            last_digit = int(last_char, 16) % 10
-        else:
-            # Phone has no digits, fall back to customer_id hash
-            customer_id_hash = hashlib.md5(str(customer_id).encode()).hexdigest()
-            last_char = customer_id_hash[-1]
-            last_digit = int(last_char, 16) % 10
-
-    # Priority 3: Fall back to customer_id hash
-    else:
-        # Use hash for both numeric IDs and UUIDs
-        customer_id_hash = hashlib.md5(str(customer_id).encode()).hexdigest()
-        last_char = customer_id_hash[-1]
-        last_digit = int(last_char, 16) % 10
+    # Use last character of the household hash (hex digit 0-9, a-f),
+    # converted to int (0-15), then mod 10 to get 0-9
+    last_digit = int(get_household_hash(customer_id, email, phone)[-1], 16) % 10
 
     # Split into groups based on last digit
     if last_digit <= 4:
@@ -106,8 +112,189 @@ def get_customer_ab_group(customer_id: str, email: Optional[str] = None, phone:
         return "B"
 
 
+def _usable_contact(values: pd.Series) -> pd.Series:
+    """Vectorized `value and str(value).strip() and str(value).lower() not in ['nan', 'none', '']`."""
+    text = values.astype(str)
+    return values.astype(bool) & (text.str.strip() != '') & ~text.str.lower().isin(['nan', 'none', ''])
+
+
+def get_household_hashes(customer_ids, emails=None, phones=None) -> pd.Series:
+    """
+    get_household_hash for a whole frame of customers at once.
+
+    Args:
+        customer_ids: Series (or list) of customer IDs
+        emails: Matching emails (optional)
+        phones: Matching phones (optional)
+
+    Returns:
+        Series of 32-character hex digests, aligned with customer_ids
+    """
+    ids = pd.Series(list(customer_ids), dtype=object)
+    emails = pd.Series(list(emails) if emails is not None else None, index=ids.index, dtype=object)
+    phones = pd.Series(list(phones) if phones is not None else None, index=ids.index, dtype=object)
+
+    # Priority 3 → 1, each overwriting the last where it applies
+    keys = ids.astype(str)
+    use_phone = ~_usable_contact(emails) & _usable_contact(phones)
+    digits = phones[use_phone].astype(str).map(lambda phone: ''.join(filter(str.isdigit, phone)))
+    digits = digits[digits != '']
+    keys[digits.index] = digits
+    use_email = _usable_contact(emails)
+    keys[use_email] = emails[use_email].astype(str).str.lower().str.strip()
+
+    key_array = keys.to_numpy(dtype=object)
+    hashes = np.fromiter((hashlib.md5(key.encode()).hexdigest() for key in key_array),
+                         dtype=object, count=len(key_array))
+    index = customer_ids.index if isinstance(customer_ids, pd.Series) else None
+    return pd.Series(hashes, index=index, dtype=object)
+
+
+def get_customer_ab_groups(customer_ids, emails=None, phones=None, household_hashes=None) -> pd.Series:
+    """
+    get_customer_ab_group for a whole frame of customers at once.
+
+    Pass household_hashes (e.g. the customer_contacts household_hash column)
+    to skip hashing; otherwise they're computed from the emails and phones.
+
+    Args:
+        customer_ids: Series (or list) of customer IDs
+        emails: Matching emails (optional)
+        phones: Matching phones (optional)
+        household_hashes: Precomputed get_household_hash values (optional)
+
+    Returns:
+        Series of "A"/"B", aligned with customer_ids
+    """
+    if household_hashes is None:
+        household_hashes = get_household_hashes(customer_ids, emails, phones)
+    ids = pd.Series(list(customer_ids), dtype=object).astype(str)
+    hashes = pd.Series(list(household_hashes), dtype=object)
+
+    groups = hashes.str[-1].map(HASH_DIGIT_GROUPS)
+    overrides = ids.map(AB_GROUP_OVERRIDES)
+    index = customer_ids.index if isinstance(customer_ids, pd.Series) else None
+    return pd.Series(np.where(overrides.notna(), overrides, groups), index=index, dtype=object)
+
+
+def event_detail(event: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """
+    Read a detail from an event: the typed column customer_events stores for
+    the common ones (see customer_event_store.DETAIL_COLUMNS), else the key
+    from the event_data dict.
+
+    Args:
+        event: Event dict
+        key: Detail name (e.g. 'flag_type')
+        default: Value when the event doesn't have it
+
+    Returns:
+        The detail value, or default
+    """
+    value = event.get(key)
+    if value is not None and not (isinstance(value, float) and pd.isna(value)):
+        return value
+    event_data = event.get('event_data')
+    if isinstance(event_data, dict):
+        value = event_data.get(key, default)
+        return default if value is None or (isinstance(value, float) and pd.isna(value)) else value
+    return default
+
+
+def event_detail_values(events: pd.DataFrame, key: str) -> pd.Series:
+    """
+    event_detail() for a whole frame of events.
+
+    Args:
+        events: Events with optional typed detail columns and event_data dicts
+        key: Detail name (e.g. 'entry_method_description')
+
+    Returns:
+        Series aligned with events, NaN where an event doesn't have the detail
+    """
+    values = events[key] if key in events.columns else pd.Series(np.nan, index=events.index, dtype=object)
+    if 'event_data' in events.columns:
+        from_data = events['event_data'].map(lambda d: d.get(key) if isinstance(d, dict) else None)
+        values = values.where(values.notna(), from_data)
+    return values
+
+
+def _customers_with_event_since(events: pd.DataFrame, event_type: str, since: datetime,
+                                until: Optional[datetime] = None, mask: Optional[pd.Series] = None) -> np.ndarray:
+    """Customers with an event of this type dated on/after since (and on/before until)."""
+    matches = (events['event_type'] == event_type) & (events['event_date'] >= since)
+    if until is not None:
+        matches &= events['event_date'] <= until
+    if mask is not None:
+        matches &= mask
+    return events.loc[matches, 'customer_id'].unique()
+
+
+def _recent_day_pass_checkin_customers(events: pd.DataFrame, today: datetime) -> np.ndarray:
+    """Customers whose most recent day pass checkin is within the last 3 days."""
+    is_day_pass = event_detail_values(events, 'entry_method_description').astype(str).str.lower().str.contains(
+        'day pass', regex=False)
+    return _customers_with_event_since(events, 'checkin', today - timedelta(days=3), mask=is_day_pass)
+
+
+def _birthday_party_customers(events: pd.DataFrame, customer_emails: Optional[Dict[str, str]],
+                              query: str, target_date: datetime) -> List:
+    """
+    Customers whose email is on a birthday party list for the target date, in one query.
+
+    The query must select the matching addresses as `email` and take
+    @target_date (YYYY-MM-DD).
+    """
+    from google.cloud import bigquery
+
+    client = bigquery.Client()
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("target_date", "STRING", target_date.strftime('%Y-%m-%d')),
+        ]
+    )
+    party_emails = {
+        row.email.lower() for row in client.query(query, job_config=job_config).result()
+        if isinstance(row.email, str)
+    }
+    customer_emails = customer_emails or {}
+    return [
+        customer_id for customer_id in events['customer_id'].unique()
+        if isinstance(customer_emails.get(customer_id), str)
+        and customer_emails[customer_id].lower() in party_emails
+    ]
+
+
 class FlagRule:
-    """Base class for customer flag rules."""
+    """
+    Base class for customer flag rules.
+
+    Rules can narrow down which customers the engine evaluates them for:
+    required_event_types lists event types a customer must have at least one
+    of each to possibly trigger the rule, and prefilter() does a cheap
+    whole-frame check over those events. Both must only ever rule out
+    customers evaluate() would return None for.
+    """
+
+    # None = the rule doesn't depend on any particular event type
+    required_event_types: Optional[List[str]] = None
+
+    def prefilter(self, events: pd.DataFrame, today: datetime,
+                  customer_emails: Optional[Dict[str, str]] = None) -> Optional[List]:
+        """
+        Cheap whole-frame check for which customers could trigger this rule.
+
+        Args:
+            events: Events (event_date as datetime) of customers with every
+                required event type, only of those types (all events if the
+                rule has no required_event_types)
+            today: Current date for reference
+            customer_emails: Email per customer_id, for rules matched on email
+
+        Returns:
+            Customer IDs worth evaluating, or None to evaluate them all
+        """
+        return None
 
     def __init__(self, flag_type: str, description: str, priority: str = "medium"):
         """
@@ -152,6 +339,8 @@ class ReadyForMembershipFlag(FlagRule):
     but has never purchased a membership (new or renewal).
     """
 
+    required_event_types = ['day_pass_purchase']
+
     def __init__(self):
         super().__init__(
             flag_type="ready_for_membership",
@@ -159,6 +348,10 @@ class ReadyForMembershipFlag(FlagRule):
             priority="high"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers with a day pass purchase in the last 14 days."""
+        return _customers_with_event_since(events, 'day_pass_purchase', today - timedelta(days=14), until=today)
+
     def evaluate(self, customer_id: str, events: list, today: datetime) -> Dict[str, Any]:
         """
         Check if customer has recent day passes but no membership.
@@ -216,6 +409,8 @@ class FirstTimeDayPass2WeekOfferFlag(FlagRule):
     - Hasn't been flagged for this offer in the last 180 days
     """
 
+    required_event_types = ['checkin']
+
     def __init__(self):
         super().__init__(
             flag_type="first_time_day_pass_2wk_offer",
@@ -223,12 +418,21 @@ class FirstTimeDayPass2WeekOfferFlag(FlagRule):
             priority="high"
         )
 
-    def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers with a day pass checkin in the last 3 days."""
+        return _recent_day_pass_checkin_customers(events, today)
+
+    def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None,
+                 ab_group: str = None) -> Dict[str, Any]:
         """
         Check if customer is eligible for direct 2-week membership offer.
+
+        ab_group can be passed in when it's already known (the engine assigns
+        groups for every customer in one batch); otherwise it's computed here.
         """
         # Criteria 0: Must be in Group A (email/phone hash last digit 0-4)
-        ab_group = get_customer_ab_group(customer_id, email=email, phone=phone)
+        if ab_group is None:
+            ab_group = get_customer_ab_group(customer_id, email=email, phone=phone)
         if ab_group != "A":
             return None  # Group B customers use different flag
 
@@ -236,8 +440,7 @@ class FirstTimeDayPass2WeekOfferFlag(FlagRule):
         day_pass_checkins = [
             e for e in events
             if e['event_type'] == 'checkin'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('entry_method_description', '').lower().find('day pass') >= 0
+            and event_detail(e, 'entry_method_description', '').lower().find('day pass') >= 0
         ]
 
         # Criteria 1: Must have at least one day pass checkin
@@ -287,8 +490,7 @@ class FirstTimeDayPass2WeekOfferFlag(FlagRule):
         recent_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= lookback_start
             and e['event_date'] <= today
         ]
@@ -302,8 +504,7 @@ class FirstTimeDayPass2WeekOfferFlag(FlagRule):
         recent_syncs = [
             e for e in events
             if e['event_type'] == 'flag_synced_to_shopify'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= sync_lookback_start
             and e['event_date'] <= today
         ]
@@ -350,6 +551,8 @@ class SecondVisitOfferEligibleFlag(FlagRule):
     - Hasn't been flagged for this offer in the last 180 days
     """
 
+    required_event_types = ['checkin']
+
     def __init__(self):
         super().__init__(
             flag_type="second_visit_offer_eligible",
@@ -357,12 +560,21 @@ class SecondVisitOfferEligibleFlag(FlagRule):
             priority="high"
         )
 
-    def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers with a day pass checkin in the last 3 days."""
+        return _recent_day_pass_checkin_customers(events, today)
+
+    def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None,
+                 ab_group: str = None) -> Dict[str, Any]:
         """
         Check if customer is eligible for second visit offer.
+
+        ab_group can be passed in when it's already known (the engine assigns
+        groups for every customer in one batch); otherwise it's computed here.
         """
         # Criteria 0: Must be in Group B (email/phone hash last digit 5-9)
-        ab_group = get_customer_ab_group(customer_id, email=email, phone=phone)
+        if ab_group is None:
+            ab_group = get_customer_ab_group(customer_id, email=email, phone=phone)
         if ab_group != "B":
             return None  # Group A customers use different flag
 
@@ -370,8 +582,7 @@ class SecondVisitOfferEligibleFlag(FlagRule):
         day_pass_checkins = [
             e for e in events
             if e['event_type'] == 'checkin'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('entry_method_description', '').lower().find('day pass') >= 0
+            and event_detail(e, 'entry_method_description', '').lower().find('day pass') >= 0
         ]
 
         # Criteria 1: Must have at least one day pass checkin
@@ -421,8 +632,7 @@ class SecondVisitOfferEligibleFlag(FlagRule):
         recent_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= lookback_start
             and e['event_date'] <= today
         ]
@@ -436,8 +646,7 @@ class SecondVisitOfferEligibleFlag(FlagRule):
         recent_syncs = [
             e for e in events
             if e['event_type'] == 'flag_synced_to_shopify'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= sync_lookback_start
             and e['event_date'] <= today
         ]
@@ -483,6 +692,8 @@ class SecondVisit2WeekOfferFlag(FlagRule):
     - Hasn't been flagged for 2-week offer in the last 180 days
     """
 
+    required_event_types = ['flag_set', 'checkin']
+
     def __init__(self):
         super().__init__(
             flag_type="second_visit_2wk_offer",
@@ -490,6 +701,15 @@ class SecondVisit2WeekOfferFlag(FlagRule):
             priority="high"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers who checked in after their latest second_visit_offer_eligible flag."""
+        is_offer_flag = (events['event_type'] == 'flag_set') & (
+            event_detail_values(events, 'flag_type') == 'second_visit_offer_eligible')
+        flag_dates = events[is_offer_flag].groupby('customer_id')['event_date'].max()
+        checkin_dates = events[events['event_type'] == 'checkin'].groupby('customer_id')['event_date'].max()
+        returned = checkin_dates.reindex(flag_dates.index) > flag_dates
+        return flag_dates.index[returned].tolist()
+
     def evaluate(self, customer_id: str, events: list, today: datetime) -> Dict[str, Any]:
         """
         Check if Group B customer has returned and is eligible for 2-week offer.
@@ -498,8 +718,7 @@ class SecondVisit2WeekOfferFlag(FlagRule):
         second_pass_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == 'second_visit_offer_eligible'
+            and event_detail(e, 'flag_type') == 'second_visit_offer_eligible'
         ]
 
         if not second_pass_flags:
@@ -542,8 +761,7 @@ class SecondVisit2WeekOfferFlag(FlagRule):
         recent_2wk_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= lookback_start
             and e['event_date'] <= today
         ]
@@ -556,8 +774,7 @@ class SecondVisit2WeekOfferFlag(FlagRule):
         recent_syncs = [
             e for e in events
             if e['event_type'] == 'flag_synced_to_shopify'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= sync_lookback_start
             and e['event_date'] <= today
         ]
@@ -593,6 +810,8 @@ class TwoWeekPassUserFlag(FlagRule):
     - Hasn't been flagged for this in the last 14 days (prevent duplicate flags)
     """
 
+    required_event_types = ['membership_started']
+
     def __init__(self):
         super().__init__(
             flag_type="2_week_pass_purchase",
@@ -600,6 +819,15 @@ class TwoWeekPassUserFlag(FlagRule):
             priority="medium"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers with a membership_started event for a 2-week pass."""
+        if 'event_data' not in events.columns:
+            return []
+        names = events['event_data'].map(
+            lambda d: str(d.get('membership_name', '')).lower() if isinstance(d, dict) else '')
+        is_two_week = names.str.contains('2-week|2 week|two week', regex=True)
+        return events.loc[is_two_week, 'customer_id'].unique()
+
     def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
         """
         Check if customer has a 2-week pass membership.
@@ -634,8 +862,7 @@ class TwoWeekPassUserFlag(FlagRule):
         recent_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= lookback_start
             and e['event_date'] <= today
         ]
@@ -680,6 +907,14 @@ class BirthdayPartyHostOneWeekOutFlag(FlagRule):
             priority="high"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers whose email hosts a party in 7 days (one query for all hosts)."""
+        return _birthday_party_customers(events, customer_emails, """
+                SELECT DISTINCT host_email AS email
+                FROM `basin_data.birthday_parties`
+                WHERE party_date = @target_date
+            """, today + timedelta(days=7))
+
     def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
         """
         Check if customer is hosting a party in 7 days.
@@ -737,9 +972,8 @@ class BirthdayPartyHostOneWeekOutFlag(FlagRule):
             recent_flags = [
                 e for e in events
                 if e['event_type'] == 'flag_set'
-                and isinstance(e.get('event_data'), dict)
-                and e.get('event_data', {}).get('flag_type') == self.flag_type
-                and e.get('event_data', {}).get('party_id') == party_row.party_id
+                and event_detail(e, 'flag_type') == self.flag_type
+                and event_detail(e, 'party_id') == party_row.party_id
                 and e['event_date'] >= lookback_start
                 and e['event_date'] <= today
             ]
@@ -789,6 +1023,16 @@ class BirthdayPartyAttendeeOneWeekOutFlag(FlagRule):
             priority="medium"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers whose email RSVP'd yes to a party in 7 days (one query for all RSVPs)."""
+        return _birthday_party_customers(events, customer_emails, """
+                SELECT DISTINCT r.email AS email
+                FROM `basin_data.birthday_party_rsvps` r
+                JOIN `basin_data.birthday_parties` p ON r.party_id = p.party_id
+                WHERE r.attending = 'yes'
+                  AND p.party_date = @target_date
+            """, today + timedelta(days=7))
+
     def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
         """
         Check if customer RSVP'd yes to a party in 7 days.
@@ -849,9 +1093,8 @@ class BirthdayPartyAttendeeOneWeekOutFlag(FlagRule):
             recent_flags = [
                 e for e in events
                 if e['event_type'] == 'flag_set'
-                and isinstance(e.get('event_data'), dict)
-                and e.get('event_data', {}).get('flag_type') == self.flag_type
-                and e.get('event_data', {}).get('party_id') == rsvp_row.party_id
+                and event_detail(e, 'flag_type') == self.flag_type
+                and event_detail(e, 'party_id') == rsvp_row.party_id
                 and e['event_date'] >= lookback_start
                 and e['event_date'] <= today
             ]
@@ -902,6 +1145,14 @@ class BirthdayPartyHostSixDaysOutFlag(FlagRule):
             priority="high"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers whose email hosts a party in 6 days (one query for all hosts)."""
+        return _birthday_party_customers(events, customer_emails, """
+                SELECT DISTINCT host_email AS email
+                FROM `basin_data.birthday_parties`
+                WHERE party_date = @target_date
+            """, today + timedelta(days=6))
+
     def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
         """
         Check if customer is hosting a party in 6 days.
@@ -979,9 +1230,8 @@ class BirthdayPartyHostSixDaysOutFlag(FlagRule):
             recent_flags = [
                 e for e in events
                 if e['event_type'] == 'flag_set'
-                and isinstance(e.get('event_data'), dict)
-                and e.get('event_data', {}).get('flag_type') == self.flag_type
-                and e.get('event_data', {}).get('party_id') == party_row.party_id
+                and event_detail(e, 'flag_type') == self.flag_type
+                and event_detail(e, 'party_id') == party_row.party_id
                 and e['event_date'] >= lookback_start
                 and e['event_date'] <= today
             ]
@@ -1033,6 +1283,8 @@ class FiftyPercentOfferSentFlag(FlagRule):
     - Sync to Mailchimp/Shopify for exclusion lists
     """
 
+    required_event_types = ['email_sent']
+
     def __init__(self):
         super().__init__(
             flag_type="fifty_percent_offer_sent",
@@ -1040,6 +1292,10 @@ class FiftyPercentOfferSentFlag(FlagRule):
             priority="medium"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers sent an email in the last 3 days."""
+        return _customers_with_event_since(events, 'email_sent', today - timedelta(days=3), until=today)
+
     def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
         """
         Check if customer received an email with 50% offer recently.
@@ -1075,8 +1331,7 @@ class FiftyPercentOfferSentFlag(FlagRule):
         recent_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= thirty_days_ago
             and e['event_date'] <= today
         ]
@@ -1128,6 +1383,8 @@ class MembershipCancelledWinbackFlag(FlagRule):
     Klaviyo List: Membership Cancellation - Win Back (VbbZSy)
     """
 
+    required_event_types = ['membership_cancelled']
+
     def __init__(self):
         super().__init__(
             flag_type="membership_cancelled_winback",
@@ -1135,6 +1392,10 @@ class MembershipCancelledWinbackFlag(FlagRule):
             priority="high"
         )
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers with a cancellation in the last 7 days."""
+        return _customers_with_event_since(events, 'membership_cancelled', today - timedelta(days=7))
+
     def evaluate(self, customer_id: str, events: list, today: datetime, email: str = None, phone: str = None) -> Dict[str, Any]:
         """
         Check if customer recently cancelled with no other active membership.
@@ -1186,8 +1447,7 @@ class MembershipCancelledWinbackFlag(FlagRule):
         recent_flags = [
             e for e in events
             if e['event_type'] == 'flag_set'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= lookback_start
             and e['event_date'] <= today
         ]
@@ -1200,8 +1460,7 @@ class MembershipCancelledWinbackFlag(FlagRule):
         recent_syncs = [
             e for e in events
             if e['event_type'] == 'flag_synced_to_shopify'
-            and isinstance(e.get('event_data'), dict)
-            and e.get('event_data', {}).get('flag_type') == self.flag_type
+            and event_detail(e, 'flag_type') == self.flag_type
             and e['event_date'] >= sync_lookback_start
             and e['event_date'] <= today
         ]
@@ -1312,6 +1571,18 @@ class ActiveMembershipFlag(FlagRule):
 
         self._data_loaded = True
 
+    def prefilter(self, events, today, customer_emails=None):
+        """Customers whose Capitan ID owns an active membership."""
+        self._load_data()
+        if self._memberships_df is None or self._memberships_df.empty:
+            return []
+        memberships = self._memberships_df
+        active_owners = set(memberships.loc[memberships['status'] == 'ACT', 'owner_id'].astype(str))
+        customer_ids = pd.Series(events['customer_id'].unique(), dtype=object)
+        ids = customer_ids.astype(str)
+        capitan_ids = ids.where(~ids.str.contains('-', regex=False), ids.map(self._uuid_to_capitan_id))
+        return customer_ids[capitan_ids.isin(active_owners)].tolist()
+
     def evaluate(self, customer_id: str, events: list, today: datetime, **kwargs) -> Dict[str, Any]:
         """
         Check if customer has an active membership.
@@ -3,45 +3,134 @@ Customer flagging engine.
 
 Evaluates business rules against customer event timelines to identify
 customers who need outreach or automated actions.
+
+With workers > 1 (or FLAG_ENGINE_WORKERS set), customers are sharded by a
+hash of their ID across a process pool. Each worker gets the rules and the
+contact lookups once, reads its own shard of events from a file, and the
+flags are merged back in the same customer order as an in-process run.
 """
 
 import pandas as pd
+import hashlib
+import inspect
 import json
 import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from data_pipeline import config
 from data_pipeline import customer_flags_config
 from data_pipeline import experiment_tracking
+from data_pipeline import checkin_store
+from data_pipeline import customer_contacts
+from data_pipeline import customer_event_store
 import boto3
 from io import StringIO
 
 
+def shard_customers(customer_ids: pd.Series, shards: int) -> pd.Series:
+    """
+    Assign customers to shards by a stable hash of their ID.
+
+    Args:
+        customer_ids: Series of customer IDs (one per event is fine)
+        shards: Number of shards
+
+    Returns:
+        Series of shard numbers (0 to shards - 1), aligned with customer_ids
+    """
+    shard_of = {
+        customer_id: int(hashlib.md5(str(customer_id).encode()).hexdigest(), 16) % shards
+        for customer_id in customer_ids.unique()
+    }
+    return customer_ids.map(shard_of)
+
+
+def _evaluate_customers(engine, df_events: pd.DataFrame, rule_customers: Dict[str, set],
+                        today: datetime) -> List[Tuple]:
+    """(customer_id, flags) for each customer in df_events, in customer_id order."""
+    results = []
+    for customer_id, customer_events in df_events.groupby('customer_id'):
+        # Convert to list of dicts
+        events_list = customer_events.to_dict('records')
+
+        # Evaluate only the rules this customer is a candidate for
+        rules = [rule for rule in engine.rules if customer_id in rule_customers[rule.flag_type]]
+        results.append((customer_id, engine.evaluate_customer(customer_id, events_list, today, rules=rules)))
+    return results
+
+
+# Set once per worker process by _init_worker
+_worker_state = {}
+
+
+def _init_worker(state: Dict, today: datetime):
+    """Rebuild the engine in a worker from the rules and contact lookups."""
+    engine = CustomerFlagsEngine(rules=state['rules'], workers=1)
+    engine.customer_emails = state['customer_emails']
+    engine.customer_phones = state['customer_phones']
+    engine.is_using_parent_contact = state['is_using_parent_contact']
+    engine.customer_ab_groups = state['customer_ab_groups']
+    _worker_state.update(engine=engine, today=today)
+
+
+def _evaluate_shard(shard: Tuple[str, Dict[str, set]]) -> Tuple[List[Tuple], Dict]:
+    """
+    Evaluate one shard in a worker.
+
+    Args:
+        shard: Path to the shard's events and the shard's candidate customers per rule
+
+    Returns:
+        The shard's (customer_id, flags) and rule counters
+    """
+    path, rule_customers = shard
+    engine = _worker_state['engine']
+    engine.rule_stats = {}
+    results = _evaluate_customers(engine, pd.read_pickle(path), rule_customers, _worker_state['today'])
+    return results, engine.rule_stats
+
+
 class CustomerFlagsEngine:
     """Engine for evaluating customer flagging rules."""
 
-    def __init__(self, rules: List = None):
+    def __init__(self, rules: List = None, workers: int = None):
         """
         Initialize the flagging engine.
 
         Args:
             rules: List of FlagRule objects. If None, uses all active rules from config.
+            workers: Processes to shard customers across (default: config.flag_engine_workers)
         """
         self.rules = rules if rules is not None else customer_flags_config.get_active_rules()
+        self.workers = workers if workers is not None else config.flag_engine_workers
         self.customer_emails = {}  # Cache for customer emails
         self.customer_phones = {}  # Cache for customer phones
         self.is_using_parent_contact = {}  # Track which customers are using parent contact
+        self.customer_ab_groups = {}  # AB group per customer, assigned in one batch
+        # Rules that take a precomputed ab_group instead of hashing per customer
+        self.ab_group_rules = {
+            rule.flag_type for rule in self.rules
+            if 'ab_group' in inspect.signature(rule.evaluate).parameters
+        }
+        # Per-rule counters for the evaluation summary:
+        # {flag_type: {'candidates', 'evaluated', 'flagged', 'seconds'}}
+        self.rule_stats = {}
 
     def load_customer_contact_info(self):
         """
-        Load customer emails and phones from S3 for AB group assignment.
-
-        Loads from TWO sources to handle both ID types in the system:
-        1. customers_master.csv - has UUID-based customer_ids (from customer_events.csv)
-        2. capitan/customers.csv - has Capitan numeric IDs (from direct checkin loading)
-
-        For customers without their own contact info, looks up parent contact
-        from the family relationship graph.
+        Load customer emails and phones for AB group assignment.
+
+        Reads the precomputed customer_contacts table, which covers both ID
+        types in the system (customers_master UUIDs from customer_events.csv and
+        Capitan numeric IDs from direct checkin loading) and already has parent
+        contact filled in from the family graph for customers without their own.
+        If the table isn't there yet, it's built in memory from the same sources.
+        AB groups for every customer come from its household_hash column.
         """
+        columns = ['customer_id', 'email', 'phone', 'is_using_parent_contact', 'household_hash']
         try:
             # Try S3 first
             aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
@@ -53,36 +142,21 @@ class CustomerFlagsEngine:
                     aws_access_key_id=aws_access_key_id,
                     aws_secret_access_key=aws_secret_access_key
                 )
-
-                # Load customers_master (has UUID customer_ids that match customer_events.csv)
-                obj = s3_client.get_object(
-                    Bucket='basin-climbing-data-prod',
-                    Key='customers/customers_master.csv'
-                )
-                df_customers_master = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
-                print(f"   Loaded {len(df_customers_master)} customers from customers_master.csv (UUIDs)")
-
-                # Also load capitan/customers.csv (has Capitan numeric IDs for direct checkin events)
-                obj_capitan = s3_client.get_object(
-                    Bucket='basin-climbing-data-prod',
-                    Key='capitan/customers.csv'
-                )
-                df_customers_capitan = pd.read_csv(StringIO(obj_capitan['Body'].read().decode('utf-8')))
-                print(f"   Loaded {len(df_customers_capitan)} customers from capitan/customers.csv (Capitan IDs)")
-
-                # Load family relationships graph
                 try:
-                    obj_family = s3_client.get_object(
-                        Bucket='basin-climbing-data-prod',
-                        Key='customers/family_relationships.csv'
+                    df_contacts = customer_contacts.load_customer_contacts(
+                        s3_client, 'basin-climbing-data-prod', columns=columns
                     )
-                    df_family = pd.read_csv(StringIO(obj_family['Body'].read().decode('utf-8')))
-                    print(f"   Loaded {len(df_family)} family relationships")
+                    print(f"   Loaded {len(df_contacts)} customers from customer_contacts.csv")
                 except Exception as e:
-                    print(f"   ⚠️  Could not load family relationships: {e}")
-                    df_family = pd.DataFrame()
-            else:
+                    print(f"   ⚠️  Could not load customer contacts table, building it: {e}")
+                    df_contacts = self._build_contacts_from_s3(s3_client)
+            elif os.path.exists('data/outputs/customer_contacts.csv'):
                 # Fall back to local files
+                df_contacts = pd.read_csv(
+                    'data/outputs/customer_contacts.csv',
+                    usecols=columns, dtype=customer_contacts.TEXT_COLUMNS
+                )
+            else:
                 df_customers_master = pd.read_csv('data/outputs/customers_master.csv')
                 df_customers_capitan = pd.read_csv('data/outputs/capitan_customers.csv')
                 try:
@@ -91,93 +165,199 @@ class CustomerFlagsEngine:
                 except FileNotFoundError:
                     print(f"   ⚠️  No family relationships file found locally")
                     df_family = pd.DataFrame()
+                df_contacts = customer_contacts.build_customer_contacts(
+                    df_customers_master, df_customers_capitan, df_family
+                )
 
-            # Build initial email and phone lookup dicts from BOTH sources
-            self.customer_emails = {}
-            self.customer_phones = {}
-            self.is_using_parent_contact = {}
+            self.customer_emails = dict(zip(df_contacts['customer_id'], df_contacts['email']))
+            self.customer_phones = dict(zip(df_contacts['customer_id'], df_contacts['phone']))
+            self.is_using_parent_contact = dict(zip(
+                df_contacts['customer_id'], df_contacts['is_using_parent_contact'].astype(bool)
+            ))
+            self.customer_ab_groups = dict(zip(
+                df_contacts['customer_id'],
+                customer_flags_config.get_customer_ab_groups(
+                    df_contacts['customer_id'], household_hashes=df_contacts['household_hash']
+                )
+            ))
 
-            # First, add customers_master (UUID customer_ids, 'primary_email'/'primary_phone')
-            df_customers_master['customer_id'] = df_customers_master['customer_id'].astype(str)
-            for _, row in df_customers_master.iterrows():
-                cid = row['customer_id']
-                self.customer_emails[cid] = row.get('primary_email')
-                self.customer_phones[cid] = row.get('primary_phone')
-                self.is_using_parent_contact[cid] = False
-
-            # Then, add capitan customers (numeric IDs, 'email'/'phone')
-            # This handles events loaded directly from capitan/checkins.csv
-            df_customers_capitan['customer_id'] = df_customers_capitan['customer_id'].astype(str)
-            for _, row in df_customers_capitan.iterrows():
-                cid = row['customer_id']
-                # Only add if not already present (prefer customers_master)
-                if cid not in self.customer_emails:
-                    self.customer_emails[cid] = row.get('email')
-                    self.customer_phones[cid] = row.get('phone')
-                    self.is_using_parent_contact[cid] = False
-
-            initial_with_email = sum(1 for e in self.customer_emails.values() if pd.notna(e) and e != '')
-            initial_with_phone = sum(1 for p in self.customer_phones.values() if pd.notna(p) and p != '')
-
-            # Enrich with parent contact info for customers without their own
-            parent_contact_added = 0
-            if not df_family.empty:
-                # Convert family relationship IDs to string to match dictionary keys
-                df_family['child_customer_id'] = df_family['child_customer_id'].astype(str)
-                df_family['parent_customer_id'] = df_family['parent_customer_id'].astype(str)
-
-                for _, row in df_family.iterrows():
-                    child_id = row['child_customer_id']
-                    parent_id = row['parent_customer_id']
-
-                    # Check if child lacks contact info
-                    child_email = self.customer_emails.get(child_id)
-                    child_phone = self.customer_phones.get(child_id)
-                    has_own_email = pd.notna(child_email) and child_email != ''
-                    has_own_phone = pd.notna(child_phone) and child_phone != ''
-
-                    if not (has_own_email and has_own_phone):
-                        # Look up parent contact
-                        parent_email = self.customer_emails.get(parent_id)
-                        parent_phone = self.customer_phones.get(parent_id)
-
-                        # Use parent contact if available
-                        if not has_own_email and pd.notna(parent_email) and parent_email != '':
-                            self.customer_emails[child_id] = parent_email
-                            self.is_using_parent_contact[child_id] = True
-                            parent_contact_added += 1
-
-                        if not has_own_phone and pd.notna(parent_phone) and parent_phone != '':
-                            self.customer_phones[child_id] = parent_phone
-                            self.is_using_parent_contact[child_id] = True
-
-            final_with_email = sum(1 for e in self.customer_emails.values() if pd.notna(e) and e != '')
-            final_with_phone = sum(1 for p in self.customer_phones.values() if pd.notna(p) and p != '')
-
-            print(f"   Loaded contact info for {len(self.customer_emails)} customers")
-            print(f"   - {initial_with_email} with own emails → {final_with_email} after parent lookup (+{final_with_email - initial_with_email})")
-            print(f"   - {initial_with_phone} with own phones → {final_with_phone} after parent lookup (+{final_with_phone - initial_with_phone})")
-            print(f"   - {parent_contact_added} customers now reachable via parent contact")
+            with_email = (df_contacts['email'].notna() & (df_contacts['email'] != '')).sum()
+            with_phone = (df_contacts['phone'].notna() & (df_contacts['phone'] != '')).sum()
+            print(f"   Loaded contact info for {len(df_contacts)} customers")
+            print(f"   - {with_email} with emails, {with_phone} with phones")
+            print(f"   - {df_contacts['is_using_parent_contact'].astype(bool).sum()} customers reachable via parent contact")
 
         except Exception as e:
             print(f"   ⚠️  Could not load customer contact info: {e}")
             self.customer_emails = {}
             self.customer_phones = {}
             self.is_using_parent_contact = {}
+            self.customer_ab_groups = {}
+
+    def _build_contacts_from_s3(self, s3_client) -> pd.DataFrame:
+        """
+        Build the customer contacts table from its sources in S3.
+
+        Args:
+            s3_client: boto3 S3 client
+
+        Returns:
+            DataFrame of customer contacts
+        """
+        def read_csv(key):
+            obj = s3_client.get_object(Bucket='basin-climbing-data-prod', Key=key)
+            return pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+
+        df_customers_master = read_csv('customers/customers_master.csv')
+        print(f"   Loaded {len(df_customers_master)} customers from customers_master.csv (UUIDs)")
+        df_customers_capitan = read_csv('capitan/customers.csv')
+        print(f"   Loaded {len(df_customers_capitan)} customers from capitan/customers.csv (Capitan IDs)")
+        try:
+            df_family = read_csv('customers/family_relationships.csv')
+            print(f"   Loaded {len(df_family)} family relationships")
+        except Exception as e:
+            print(f"   ⚠️  Could not load family relationships: {e}")
+            df_family = pd.DataFrame()
+
+        return customer_contacts.build_customer_contacts(df_customers_master, df_customers_capitan, df_family)
+
+    def _rule_stats(self, flag_type: str) -> Dict:
+        """Counters for a rule, started at zero the first time it's seen."""
+        return self.rule_stats.setdefault(
+            flag_type, {'candidates': 0, 'evaluated': 0, 'flagged': 0, 'seconds': 0.0})
+
+    def select_rule_customers(self, df_events: pd.DataFrame, today: datetime) -> Dict[str, set]:
+        """
+        Find the customers each rule could possibly trigger for.
+
+        The customers with each event type are collected once; a rule's
+        candidates are the customers with all its required_event_types, then
+        narrowed by its prefilter() (rules without required_event_types start
+        from every customer). A prefilter that fails keeps all candidates.
+
+        Args:
+            df_events: Customer events with event_date as datetime
+            today: Reference date
+
+        Returns:
+            Dict of flag_type -> set of customer_ids to evaluate the rule for
+        """
+        customers_by_type = {
+            event_type: set(customer_ids)
+            for event_type, customer_ids in df_events.groupby('event_type')['customer_id'].unique().items()
+        }
+        all_customers = set(df_events['customer_id'].dropna().unique())
+
+        rule_customers = {}
+        for rule in self.rules:
+            start = time.perf_counter()
+            required = getattr(rule, 'required_event_types', None)
+            if required:
+                candidates = set.intersection(*(customers_by_type.get(event_type, set()) for event_type in required))
+                rule_events = df_events[
+                    df_events['event_type'].isin(required) & df_events['customer_id'].isin(candidates)
+                ]
+            else:
+                candidates = all_customers
+                rule_events = df_events
+
+            if candidates and hasattr(rule, 'prefilter'):
+                try:
+                    kept = rule.prefilter(rule_events, today, customer_emails=self.customer_emails)
+                    if kept is not None:
+                        candidates = candidates & set(kept)
+                except Exception as e:
+                    print(f"   ⚠️  Pre-filter for {rule.flag_type} failed, evaluating all candidates: {e}")
+
+            rule_customers[rule.flag_type] = candidates
+            stats = self._rule_stats(rule.flag_type)
+            stats['candidates'] += len(candidates)
+            stats['seconds'] += time.perf_counter() - start
+
+        return rule_customers
+
+    def print_rule_stats(self):
+        """Print per-rule candidates, hit rate and time spent."""
+        print("\n⏱️  Rule timing:")
+        print(f"  {'flag_type':40} {'candidates':>10} {'flagged':>8} {'hit rate':>9} {'seconds':>8}")
+        for flag_type, stats in self.rule_stats.items():
+            hit_rate = stats['flagged'] / stats['evaluated'] if stats['evaluated'] else 0.0
+            print(f"  {flag_type:40} {stats['candidates']:10} {stats['flagged']:8} "
+                  f"{hit_rate:9.1%} {stats['seconds']:8.2f}")
+
+    def _evaluate_sharded(self, df_events: pd.DataFrame, rule_customers: Dict[str, set],
+                          today: datetime) -> List[Tuple]:
+        """
+        Evaluate customers across a process pool, one shard of customers per worker.
+
+        Each shard's events are written to their own file, so workers read
+        only their shard instead of the events being pickled into every task.
+        Each task carries just its shard's customers from the candidate sets.
+
+        Args:
+            df_events: Events of the customers to evaluate
+            rule_customers: Candidate customers per rule (from select_rule_customers)
+            today: Reference date
+
+        Returns:
+            (customer_id, flags) for each customer, in customer_id order
+        """
+        customer_ids = set(df_events['customer_id'].unique())
+
+        def for_customers(lookup):
+            return {customer_id: lookup[customer_id] for customer_id in customer_ids if customer_id in lookup}
+
+        state = {
+            'rules': self.rules,
+            'customer_emails': for_customers(self.customer_emails),
+            'customer_phones': for_customers(self.customer_phones),
+            'is_using_parent_contact': for_customers(self.is_using_parent_contact),
+            'customer_ab_groups': for_customers(self.customer_ab_groups),
+        }
+
+        with tempfile.TemporaryDirectory(prefix='customer_flags_') as shard_dir:
+            shards = []
+            for shard, df_shard in df_events.groupby(shard_customers(df_events['customer_id'], self.workers)):
+                path = os.path.join(shard_dir, f"events_{shard}.pkl")
+                df_shard.to_pickle(path)
+                shard_customer_ids = set(df_shard['customer_id'].unique())
+                shards.append((path, {
+                    flag_type: candidates & shard_customer_ids
+                    for flag_type, candidates in rule_customers.items()
+                }))
+
+            print(f"   Sharding {len(customer_ids)} customers across {len(shards)} worker processes")
+            with ProcessPoolExecutor(max_workers=len(shards), initializer=_init_worker,
+                                     initargs=(state, today)) as pool:
+                shard_results = list(pool.map(_evaluate_shard, shards))
+
+        flags_by_customer = {}
+        for results, shard_stats in shard_results:
+            flags_by_customer.update(results)
+            for flag_type, worker_stats in shard_stats.items():
+                stats = self._rule_stats(flag_type)
+                for counter in ['evaluated', 'flagged', 'seconds']:
+                    stats[counter] += worker_stats[counter]
+
+        # Same customer order as evaluating in-process
+        customer_order = df_events.groupby('customer_id').size().index
+        return [(customer_id, flags_by_customer[customer_id]) for customer_id in customer_order]
 
     def evaluate_customer(
         self,
         customer_id: str,
         events: List[Dict],
-        today: datetime = None
+        today: datetime = None,
+        rules: List = None
     ) -> List[Dict]:
         """
-        Evaluate all rules for a single customer.
+        Evaluate rules for a single customer.
 
         Args:
             customer_id: Customer UUID
             events: List of event dicts for this customer
             today: Reference date (defaults to now)
+            rules: Rules to evaluate (defaults to all of self.rules)
 
         Returns:
             List of flag dicts for any rules that triggered
@@ -196,13 +376,19 @@ class CustomerFlagsEngine:
         # Get customer email and phone for AB group assignment
         email = self.customer_emails.get(customer_id)
         phone = self.customer_phones.get(customer_id)
+        ab_group = self.customer_ab_groups.get(customer_id)
 
         # Evaluate each rule
         flags = []
-        for rule in self.rules:
+        for rule in (rules if rules is not None else self.rules):
+            start = time.perf_counter()
             # Pass email and phone if the rule accepts them (AB test flags)
             try:
-                flag = rule.evaluate(customer_id, events_sorted, today, email=email, phone=phone)
+                if ab_group and rule.flag_type in self.ab_group_rules:
+                    flag = rule.evaluate(customer_id, events_sorted, today, email=email, phone=phone,
+                                         ab_group=ab_group)
+                else:
+                    flag = rule.evaluate(customer_id, events_sorted, today, email=email, phone=phone)
             except TypeError:
                 # Rule doesn't accept email/phone parameters (older flags)
                 try:
@@ -210,7 +396,12 @@ class CustomerFlagsEngine:
                 except TypeError:
                     flag = rule.evaluate(customer_id, events_sorted, today)
 
+            stats = self._rule_stats(rule.flag_type)
+            stats['evaluated'] += 1
+            stats['seconds'] += time.perf_counter() - start
+
             if flag:
+                stats['flagged'] += 1
                 # If customer is using parent contact, add "_child" suffix to flag_type
                 # This enables campaigns to target parents with "Your child..." messaging
                 if self.is_using_parent_contact.get(customer_id, False):
@@ -264,22 +455,30 @@ class CustomerFlagsEngine:
         # Convert event_date to datetime
         df_events['event_date'] = pd.to_datetime(df_events['event_date'])
 
+        # Narrow each rule down to the customers that could trigger it
+        self.rule_stats = {}
+        rule_customers = self.select_rule_customers(df_events, today)
+        eligible_customers = set().union(*rule_customers.values())
+
         # Group events by customer
-        print(f"\n📊 Processing {df_events['customer_id'].nunique()} customers...")
+        customers_processed = df_events['customer_id'].nunique()
+        print(f"\n📊 Processing {customers_processed} customers "
+              f"({len(eligible_customers)} could trigger at least one rule)...")
 
         all_flags = []
-        customers_processed = 0
         customers_flagged = 0
 
-        for customer_id, customer_events in df_events.groupby('customer_id'):
-            customers_processed += 1
-
-            # Convert to list of dicts
-            events_list = customer_events.to_dict('records')
-
-            # Evaluate rules
-            flags = self.evaluate_customer(customer_id, events_list, today)
+        df_eligible = df_events[df_events['customer_id'].isin(eligible_customers)]
+        results = None
+        if self.workers > 1 and not df_eligible.empty:
+            try:
+                results = self._evaluate_sharded(df_eligible, rule_customers, today)
+            except Exception as e:
+                print(f"   ⚠️  Parallel evaluation failed, evaluating in this process: {e}")
+        if results is None:
+            results = _evaluate_customers(self, df_eligible, rule_customers, today)
 
+        for customer_id, flags in results:
             if flags:
                 all_flags.extend(flags)
                 customers_flagged += 1
@@ -308,6 +507,7 @@ class CustomerFlagsEngine:
         if not all_flags:
             print(f"\n✅ Evaluated {customers_processed} customers")
             print("   No customers matched any rules")
+            self.print_rule_stats()
             return pd.DataFrame(columns=[
                 'customer_id', 'flag_type', 'triggered_date',
                 'flag_data', 'priority', 'flag_added_date'
@@ -339,6 +539,7 @@ class CustomerFlagsEngine:
         for flag_type, count in df_flags['flag_type'].value_counts().items():
             priority = df_flags[df_flags['flag_type'] == flag_type]['priority'].iloc[0]
             print(f"  {flag_type:30} {count:4} customers ({priority} priority)")
+        self.print_rule_stats()
 
         # Remove expired flags (older than 14 days)
         print(f"\n🗑️  Removing expired flags (older than 14 days)...")
@@ -420,44 +621,12 @@ class CustomerFlagsEngine:
         print("\n📂 Loading customer events...")
         try:
             obj = s3_client.get_object(Bucket=bucket_name, Key='customers/customer_events.csv')
-            df_events = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            df_events = customer_event_store.read_events(obj['Body'].read())
             df_events['event_date'] = pd.to_datetime(df_events['event_date'])
 
-            # Parse event_details JSON into event_data for purchase events
-            # This makes purchase descriptions available to flag rules
-            def parse_event_details(row):
-                import ast
-
-                def parse_string_value(val):
-                    """Parse a string value that could be JSON or Python dict repr."""
-                    if not isinstance(val, str):
-                        return val
-                    # Try JSON first (proper format)
-                    try:
-                        return json.loads(val)
-                    except (json.JSONDecodeError, ValueError):
-                        pass
-                    # Fallback: try Python literal (for old data saved with str() instead of json.dumps())
-                    try:
-                        return ast.literal_eval(val)
-                    except (ValueError, SyntaxError):
-                        pass
-                    return {}
-
-                # If event_data is already populated, use it
-                if pd.notna(row.get('event_data')):
-                    result = parse_string_value(row['event_data'])
-                    if result:
-                        return result
-
-                # Otherwise, parse event_details JSON
-                if pd.notna(row.get('event_details')):
-                    result = parse_string_value(row['event_details'])
-                    if result:
-                        return result
-                return {}
-
-            df_events['event_data'] = df_events.apply(parse_event_details, axis=1)
+            # Details dicts for the rules; the blobs are stored as JSON and the
+            # fields rules filter on most are already typed columns
+            df_events['event_data'] = customer_event_store.event_data_dicts(df_events)
             print(f"   ✅ Loaded {len(df_events)} customer events")
         except Exception as e:
             print(f"   ❌ Error loading customer events: {e}")
@@ -466,8 +635,7 @@ class CustomerFlagsEngine:
         # 2. Load checkins.csv and add checkin events with entry_method_description
         print("\n📂 Loading checkins with entry methods...")
         try:
-            obj = s3_client.get_object(Bucket=bucket_name, Key='capitan/checkins.csv')
-            df_checkins = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            df_checkins = checkin_store.load_checkins()
             df_checkins['checkin_datetime'] = pd.to_datetime(df_checkins['checkin_datetime'])
             print(f"   ✅ Loaded {len(df_checkins)} checkins")
 
@@ -478,6 +646,7 @@ class CustomerFlagsEngine:
                     'customer_id': row['customer_id'],
                     'event_type': 'checkin',
                     'event_date': row['checkin_datetime'],
+                    'entry_method_description': row.get('entry_method_description', ''),
                     'event_data': {
                         'entry_method_description': row.get('entry_method_description', ''),
                         'entry_method': row.get('entry_method', ''),
@@ -507,7 +676,7 @@ class CustomerFlagsEngine:
         try:
             # Load existing customer events
             obj = s3_client.get_object(Bucket=bucket_name, Key='customers/customer_events.csv')
-            df_existing_events = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            df_existing_events = customer_event_store.read_events(obj['Body'].read())
             df_existing_events['event_date'] = pd.to_datetime(df_existing_events['event_date'])
 
             # Create flag_set events for each new flag
@@ -537,6 +706,7 @@ class CustomerFlagsEngine:
                     keep='last'
                 )
                 df_all_events_updated = df_all_events_updated.sort_values(['customer_id', 'event_date'])
+                df_all_events_updated = customer_event_store.normalize_events(df_all_events_updated)
 
                 # Save back to S3
                 csv_buffer = StringIO()
@@ -644,7 +814,7 @@ def build_customer_flags(df_events: pd.DataFrame, today: datetime = None) -> pd.
 
 if __name__ == "__main__":
     # Test the flagging engine
-    from data_pipeline import upload_data, config
+    from data_pipeline import upload_data
     import pandas as pd
 
     print("Testing Customer Flagging Engine")
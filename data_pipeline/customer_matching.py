@@ -57,8 +57,8 @@ def normalize_phone(phone: str) -> Optional[str]:
     if pd.isna(phone) or not phone:
         return None
 
-    # Remove all non-digit characters
-    digits_only = re.sub(r'\D', '', str(phone))
+    # Remove all non-digit characters (and the ".0" of numbers read back as floats)
+    digits_only = re.sub(r'\D', '', re.sub(r'\.0$', '', str(phone)))
 
     if not digits_only:
         return None
@@ -75,6 +75,46 @@ def normalize_phone(phone: str) -> Optional[str]:
     return f"+{digits_only}" if not digits_only.startswith('+') else digits_only
 
 
+def normalize_phones(phones: pd.Series, strict: bool = False) -> pd.Series:
+    """
+    Vectorized normalize_phone for a whole column.
+
+    Same rules and results as normalize_phone, applied with string
+    operations instead of a Python call per value.
+
+    strict=True is for numbers we're about to text: values are stripped
+    first, and only numbers Twilio can deliver to are kept - 10 digits
+    (US, +1 added), 11 digits starting with 1, or written with a leading +
+    and 8-15 digits. Anything else is None instead of "+<digits>".
+
+    Args:
+        phones: Series of raw phone numbers
+        strict: Drop numbers that aren't deliverable (see above)
+
+    Returns:
+        Series of E.164 phone numbers, None where there are no (usable) digits
+    """
+    text = phones.astype('string')
+    if strict:
+        text = text.str.strip()
+    digits = text.str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+    length = digits.str.len()
+    us_local = (length == 10).fillna(False)
+    if strict:
+        keep = (
+            us_local
+            | (length.eq(11) & digits.str.startswith('1'))
+            | (text.str.startswith('+') & length.between(8, 15))
+        ).fillna(False)
+    else:
+        keep = (length > 0).fillna(False)
+
+    normalized = pd.Series(None, index=phones.index, dtype=object)
+    normalized[keep] = '+' + digits[keep]
+    normalized[us_local] = '+1' + digits[us_local]
+    return normalized.astype(object).where(normalized.notna(), None)
+
+
 def normalize_name(name: str) -> Optional[str]:
     """
     Normalize name for fuzzy matching.
@@ -175,6 +215,64 @@ class CustomerMatcher:
 
         return df_master, df_identifiers
 
+    def seed(
+        self,
+        df_master: pd.DataFrame,
+        df_identifiers: pd.DataFrame,
+        exclude_source_ids: set
+    ) -> set:
+        """
+        Restore the previous run's Capitan matches, so only changed customers
+        need to be matched again (see capitan_customer_sync).
+
+        Any customer cluster that contains an excluded source ID is dropped
+        entirely and must be re-processed, so cluster primaries and match
+        reasons are rebuilt as a full match would. Only Capitan identifiers
+        are restored; other sources are processed on every run.
+
+        Args:
+            df_master: Previous customers_master (primary_* read as strings)
+            df_identifiers: Previous customer_identifiers (normalized_value read as strings)
+            exclude_source_ids: Source IDs ("customer:<capitan id>") that changed
+                or were deleted since the previous run
+
+        Returns:
+            Source IDs of the dropped clusters, including the excluded ones,
+            which the caller should pass back through match_customers()
+        """
+        identifiers = df_identifiers[df_identifiers['source'] == 'capitan']
+        touched = set(identifiers.loc[identifiers['source_id'].isin(exclude_source_ids), 'customer_id'])
+        reprocess = set(identifiers.loc[identifiers['customer_id'].isin(touched), 'source_id'])
+        reprocess |= set(exclude_source_ids)
+
+        keep = identifiers[~identifiers['customer_id'].isin(touched)].copy()
+        keep = keep[keep['customer_id'].isin(df_master['customer_id'])]
+        keep['added_date'] = pd.to_datetime(keep['added_date'], errors='coerce')
+
+        master = df_master[df_master['customer_id'].isin(keep['customer_id'])]
+        first_seen = pd.to_datetime(master['first_seen'], errors='coerce')
+        last_seen = pd.to_datetime(master['last_seen'], errors='coerce')
+        for row, first, last in zip(master.itertuples(index=False), first_seen, last_seen):
+            self.customers[row.customer_id] = {
+                'customer_id': row.customer_id,
+                'primary_email': None if pd.isna(row.primary_email) else row.primary_email,
+                'primary_phone': None if pd.isna(row.primary_phone) else row.primary_phone,
+                'primary_name': None if pd.isna(row.primary_name) else row.primary_name,
+                'first_seen': first,
+                'last_seen': last,
+                'sources': ['capitan']
+            }
+
+        for identifier_type, index in [('email', self.email_index), ('phone', self.phone_index)]:
+            rows = keep[keep['identifier_type'] == identifier_type]
+            for value, customer_id in zip(rows['normalized_value'], rows['customer_id']):
+                index.setdefault(value, customer_id)
+
+        self.identifiers = keep.to_dict('records')
+        print(f"♻️  Restored {len(self.customers)} customers from the previous match "
+              f"({len(touched)} clusters to re-match)")
+        return reprocess
+
     def _process_capitan_members(self, df: pd.DataFrame):
         """Process Capitan customer data."""
         print(f"\n📋 Processing Capitan customers ({len(df)} records)...")
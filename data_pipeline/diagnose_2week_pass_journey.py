@@ -19,7 +19,7 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data_pipeline import upload_data, config
+from data_pipeline import upload_data, config, checkin_store
 from data_pipeline.sync_flags_to_shopify import ShopifyFlagSyncer
 
 
@@ -43,8 +43,7 @@ def diagnose_2week_pass_journey():
 
     # 1. Load 2-week pass check-ins to identify purchasers
     print("\n📥 Loading 2-week pass check-ins...")
-    csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
-    df_checkins = uploader.convert_csv_to_df(csv_content)
+    df_checkins = checkin_store.load_checkins()
     df_checkins['checkin_datetime'] = pd.to_datetime(df_checkins['checkin_datetime'], errors='coerce', utc=True)
     df_checkins['checkin_datetime'] = df_checkins['checkin_datetime'].dt.tz_localize(None)
 
@@ -7,6 +7,27 @@ from datetime import datetime
 import os
 from data_pipeline import config
 
+PARTIES_KEY = 'birthday/parties.csv'
+RSVPS_KEY = 'birthday/rsvps.csv'
+SYNC_STATE_KEY = 'birthday/firestore_sync_state.json'
+
+# Refetch every RSVP this often (edits to RSVPs without updatedAt are only seen then)
+RSVP_FULL_SYNC_DAYS = 7
+# BulkWriter failure code for a document that doesn't exist (not worth retrying)
+GRPC_NOT_FOUND = 5
+# Waiver stats are only refreshed for parties from this many days ago onwards
+ENRICH_LOOKBACK_DAYS = 7
+
+PARTY_FIELDS = ['hostEmail', 'hostPhone', 'childName', 'childAge', 'partyDate', 'partyTime',
+                'customMessage', 'createdAt', 'createdBy']
+RSVP_FIELDS = ['guestName', 'attending', 'numAdults', 'numKids', 'dietary', 'email', 'phone',
+               'notes', 'updatedAt']
+PARTY_COLUMNS = ['party_id', 'host_email', 'host_phone', 'child_name', 'child_age', 'party_date',
+                 'party_time', 'custom_message', 'created_at', 'created_by']
+PARTY_TOTAL_COLUMNS = ['total_yes', 'total_no', 'total_maybe', 'total_guests']
+RSVP_COLUMNS = ['party_id', 'rsvp_id', 'guest_name', 'attending', 'num_adults', 'num_kids',
+                'dietary', 'email', 'phone', 'notes', 'updated_at']
+
 class BirthdayPartyFetcher:
     """Fetch birthday party data from Firebase Cloud Functions API"""
 
@@ -179,17 +200,19 @@ class BirthdayPartyFetcher:
         print(f"✓ Uploaded {len(rsvps_df)} RSVPs to {rsvps_table_id}")
 
 
-def fetch_birthday_party_data_from_firestore():
+def _get_firestore_client():
     """
-    Alternative: Fetch birthday party data directly from Firestore using Admin SDK
-    This avoids needing to call the API for each party
+    Firestore client for the birthday RSVP project (initializes Firebase Admin once).
+
+    Returns:
+        firestore.Client, or None if firebase-admin or the credentials are missing
     """
     try:
         import firebase_admin
         from firebase_admin import credentials, firestore
     except ImportError:
         print("ERROR: firebase-admin not installed. Run: pip install firebase-admin")
-        return None, None
+        return None
 
     # Initialize Firebase Admin if not already done
     if not firebase_admin._apps:
@@ -201,86 +224,259 @@ def fetch_birthday_party_data_from_firestore():
         if not os.path.exists(cred_path):
             print(f"ERROR: Firebase credentials not found at {cred_path}")
             print("Download from: https://console.firebase.google.com/project/basin-birthday-rsvp/settings/serviceaccounts/adminsdk")
-            return None, None
+            return None
 
         cred = credentials.Certificate(cred_path)
         firebase_admin.initialize_app(cred)
 
-    db = firestore.client()
+    return firestore.client()
+
+
+def _party_id(rsvp_doc):
+    """ID of the party an RSVP belongs to, or None if it isn't under parties/."""
+    party_ref = rsvp_doc.reference.parent.parent
+    if party_ref is None or party_ref.parent.id != 'parties':
+        return None
+    return party_ref.id
+
+
+def _party_row(party_doc):
+    party = party_doc.to_dict()
+    return {
+        'party_id': party_doc.id,
+        'host_email': party.get('hostEmail'),
+        'host_phone': party.get('hostPhone'),
+        'child_name': party.get('childName'),
+        'child_age': party.get('childAge'),
+        'party_date': party.get('partyDate'),
+        'party_time': party.get('partyTime'),
+        'custom_message': party.get('customMessage'),
+        'created_at': party.get('createdAt'),
+        'created_by': party.get('createdBy'),
+    }
 
-    # Fetch all parties
-    parties_ref = db.collection('parties')
-    parties = parties_ref.stream()
 
-    all_parties = []
-    all_rsvps = []
+def _rsvp_row(party_id, rsvp_doc):
+    rsvp = rsvp_doc.to_dict()
+    return {
+        'party_id': party_id,
+        'rsvp_id': rsvp_doc.id,
+        'guest_name': rsvp.get('guestName'),
+        'attending': rsvp.get('attending'),
+        'num_adults': rsvp.get('numAdults', 0),
+        'num_kids': rsvp.get('numKids', 0),
+        'dietary': rsvp.get('dietary'),
+        'email': rsvp.get('email'),
+        'phone': rsvp.get('phone'),
+        'notes': rsvp.get('notes'),
+        'updated_at': rsvp.get('updatedAt')
+    }
 
-    for party_doc in parties:
-        party = party_doc.to_dict()
-        party_id = party_doc.id
-
-        # Get RSVPs for this party
-        rsvps_ref = db.collection('parties').document(party_id).collection('rsvps')
-        rsvps = rsvps_ref.stream()
-
-        # Count stats
-        total_yes = 0
-        total_no = 0
-        total_maybe = 0
-        total_guests = 0
-
-        for rsvp_doc in rsvps:
-            rsvp = rsvp_doc.to_dict()
-
-            # Add to stats
-            attending = rsvp.get('attending')
-            if attending == 'yes':
-                total_yes += 1
-                total_guests += rsvp.get('numAdults', 0) + rsvp.get('numKids', 0)
-            elif attending == 'no':
-                total_no += 1
-            elif attending == 'maybe':
-                total_maybe += 1
-
-            # Add RSVP row
-            rsvp_row = {
-                'party_id': party_id,
-                'rsvp_id': rsvp_doc.id,
-                'guest_name': rsvp.get('guestName'),
-                'attending': rsvp.get('attending'),
-                'num_adults': rsvp.get('numAdults', 0),
-                'num_kids': rsvp.get('numKids', 0),
-                'dietary': rsvp.get('dietary'),
-                'email': rsvp.get('email'),
-                'phone': rsvp.get('phone'),
-                'notes': rsvp.get('notes'),
-                'updated_at': rsvp.get('updatedAt')
-            }
-            all_rsvps.append(rsvp_row)
-
-        # Add party row
-        party_row = {
-            'party_id': party_id,
-            'host_email': party.get('hostEmail'),
-            'host_phone': party.get('hostPhone'),
-            'child_name': party.get('childName'),
-            'child_age': party.get('childAge'),
-            'party_date': party.get('partyDate'),
-            'party_time': party.get('partyTime'),
-            'custom_message': party.get('customMessage'),
-            'created_at': party.get('createdAt'),
-            'created_by': party.get('createdBy'),
-            'total_yes': total_yes,
-            'total_no': total_no,
-            'total_maybe': total_maybe,
-            'total_guests': total_guests
-        }
-        all_parties.append(party_row)
 
-        print(f"✓ Fetched party for {party.get('childName')} - {total_yes} attending, {total_guests} total guests")
+def _add_party_totals(parties_df, rsvps_df):
+    """Add total_yes/no/maybe/guests per party, counted from its RSVPs."""
+    totals = pd.DataFrame(0, index=parties_df['party_id'], columns=PARTY_TOTAL_COLUMNS)
+    if not rsvps_df.empty:
+        attending = rsvps_df['attending']
+        guests = rsvps_df['num_adults'].fillna(0) + rsvps_df['num_kids'].fillna(0)
+        counted = pd.DataFrame({
+            'total_yes': attending == 'yes',
+            'total_no': attending == 'no',
+            'total_maybe': attending == 'maybe',
+            'total_guests': guests.where(attending == 'yes', 0),
+        }).groupby(rsvps_df['party_id']).sum()
+        totals = totals.add(counted, fill_value=0).loc[totals.index]
+    return parties_df.merge(totals.astype(int), left_on='party_id', right_index=True, how='left')
+
+
+def fetch_birthday_party_data_from_firestore(db=None, rsvps_updated_since=None):
+    """
+    Fetch birthday party data directly from Firestore using Admin SDK.
+
+    Reads the parties collection once and every RSVP with a single
+    collection_group('rsvps') query, joined in memory by parent party.
+
+    Args:
+        db: Firestore client (the Firebase Admin client by default)
+        rsvps_updated_since: List of lower bounds; only RSVPs with updatedAt >=
+            one of them are fetched, with one range query per bound. A range
+            query only matches values of its own type, so pass one bound per
+            updatedAt type (Firestore timestamp, string). Party totals then
+            only count the RSVPs returned.
+
+    Returns:
+        tuple: (parties_df, rsvps_df), or (None, None) if Firestore is unavailable
+    """
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    if db is None:
+        db = _get_firestore_client()
+    if db is None:
+        return None, None
+
+    # Field masks keep the enrichment blobs (waiverStats, communicationHistory) out
+    parties_df = pd.DataFrame(
+        [_party_row(doc) for doc in db.collection('parties').select(PARTY_FIELDS).stream()],
+        columns=PARTY_COLUMNS,
+    )
+
+    rsvps_query = db.collection_group('rsvps').select(RSVP_FIELDS)
+    if rsvps_updated_since is None:
+        rsvps_queries = [rsvps_query]
+    else:
+        rsvps_queries = [rsvps_query.where(filter=FieldFilter('updatedAt', '>=', since))
+                         for since in rsvps_updated_since]
+    # RSVPs left behind by deleted parties (sub-collections outlive their parent) are skipped
+    party_ids = set(parties_df['party_id'])
+    rsvp_rows = {}
+    for query in rsvps_queries:
+        for rsvp_doc in query.stream():
+            party_id = _party_id(rsvp_doc)
+            if party_id in party_ids:
+                rsvp_rows[(party_id, rsvp_doc.id)] = _rsvp_row(party_id, rsvp_doc)
+    rsvps_df = pd.DataFrame(list(rsvp_rows.values()), columns=RSVP_COLUMNS)
+
+    parties_df = _add_party_totals(parties_df, rsvps_df)
+    print(f"✓ Fetched {len(parties_df)} parties and {len(rsvps_df)} RSVPs from Firestore")
+
+    return parties_df, rsvps_df
+
+
+def _rsvp_cursors(updated_at, previous=None):
+    """
+    Latest RSVP updatedAt per type as JSON-safe cursors: {'timestamp': iso, 'string': value}.
+
+    Firestore timestamps and string timestamps are kept apart because a range
+    query only matches values of its own type; each type advances on its own.
+    """
+    cursors = dict(previous or {})
+    timestamps = [v for v in updated_at if isinstance(v, datetime)]
+    if 'timestamp' in cursors:
+        timestamps.append(datetime.fromisoformat(cursors['timestamp']))
+    if timestamps:
+        cursors['timestamp'] = max(timestamps).isoformat()
+    strings = [v for v in updated_at if isinstance(v, str)]
+    if strings:
+        cursors['string'] = max(strings + [cursors.get('string', '')])
+    return cursors
+
+
+def _cursor_query_value(kind, value):
+    if kind == 'timestamp':
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _stored_rsvp_cursors(state):
+    """RSVP cursors from the sync state, including the older single-cursor format."""
+    if 'rsvp_cursors' in state:
+        return state['rsvp_cursors']
+    cursor = state.get('rsvp_cursor')
+    return {cursor['kind']: cursor['value']} if cursor else None
+
+
+def _rsvp_refs(db):
+    """Document reference of every RSVP under parties/, keyed party_id/rsvp_id (no fields read)."""
+    refs = {}
+    for rsvp_doc in db.collection_group('rsvps').select([]).stream():
+        party_id = _party_id(rsvp_doc)
+        if party_id is not None:
+            refs[f"{party_id}/{rsvp_doc.id}"] = rsvp_doc.reference
+    return refs
+
+
+def sync_birthday_parties_from_firestore(uploader=None, db=None, full=False, today=None):
+    """
+    Incrementally refresh birthday/parties.csv and birthday/rsvps.csv from Firestore.
+
+    Daily runs fetch only RSVPs updated since the last sync (one range query
+    per updatedAt type) and merge them into the stored RSVPs; party totals
+    are recounted from the merged RSVPs. A keys-only listing of every RSVP
+    finds the ones the range queries can't see - no updatedAt, or a type
+    with no cursor yet - which are fetched one by one, and drops RSVPs
+    deleted in Firestore. Every RSVP_FULL_SYNC_DAYS days (or with no stored
+    state) all RSVPs are refetched.
+
+    Args:
+        uploader: DataUploader (a new one by default)
+        db: Firestore client (the Firebase Admin client by default)
+        full: Force a full refetch
+        today: Date used to decide whether a full refetch is due
+
+    Returns:
+        tuple: (parties_df, rsvps_df), or (None, None) if Firestore is unavailable
+    """
+    import json
+    from io import StringIO
+    from data_pipeline import upload_data
+
+    if db is None:
+        db = _get_firestore_client()
+    if db is None:
+        return None, None
+    uploader = uploader or upload_data.DataUploader()
+    today = today or datetime.now().date()
+
+    try:
+        state = json.loads(uploader.download_from_s3(config.aws_bucket_name, SYNC_STATE_KEY))
+        content = uploader.download_from_s3(config.aws_bucket_name, RSVPS_KEY)
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        stored_rsvps = pd.read_csv(StringIO(content), dtype={'party_id': str, 'rsvp_id': str})
+    except Exception:
+        state, stored_rsvps = None, None
+
+    cursors = _stored_rsvp_cursors(state) if state is not None else None
+    incremental = (
+        not full and cursors is not None
+        and (today - datetime.fromisoformat(state['last_full_sync']).date()).days < RSVP_FULL_SYNC_DAYS
+    )
+
+    if incremental:
+        print(f"Fetching RSVPs updated since {cursors or 'never'}...")
+        parties_df, new_rsvps = fetch_birthday_party_data_from_firestore(
+            db, [_cursor_query_value(kind, value) for kind, value in cursors.items()])
+
+        # RSVPs the range queries can't see, and RSVPs deleted since the last sync
+        refs = _rsvp_refs(db)
+        party_ids = set(parties_df['party_id'])
+        stored_keys = stored_rsvps['party_id'] + '/' + stored_rsvps['rsvp_id']
+        seen = set(stored_keys) | set(new_rsvps['party_id'] + '/' + new_rsvps['rsvp_id'])
+        unseen = [(key.split('/')[0], ref) for key, ref in refs.items()
+                  if key not in seen and key.split('/')[0] in party_ids]
+        if unseen:
+            print(f"Fetching {len(unseen)} RSVPs without a matching updatedAt...")
+            unseen_rows = pd.DataFrame([_rsvp_row(party_id, ref.get()) for party_id, ref in unseen],
+                                       columns=RSVP_COLUMNS)
+            new_rsvps = pd.concat([new_rsvps, unseen_rows], ignore_index=True)
+
+        keys = new_rsvps['party_id'] + '/' + new_rsvps['rsvp_id']
+        rsvps_df = pd.concat([stored_rsvps[~stored_keys.isin(set(keys))], new_rsvps], ignore_index=True)
+        # Deleted RSVPs, and stored RSVPs of parties deleted since, are dropped
+        rsvp_keys = rsvps_df['party_id'] + '/' + rsvps_df['rsvp_id']
+        rsvps_df = rsvps_df[rsvp_keys.isin(refs.keys()) & rsvps_df['party_id'].isin(party_ids)].reset_index(drop=True)
+        parties_df = _add_party_totals(parties_df.drop(columns=PARTY_TOTAL_COLUMNS), rsvps_df)
+        last_full_sync = state['last_full_sync']
+    else:
+        print("Fetching all RSVPs (full sync)...")
+        parties_df, new_rsvps = fetch_birthday_party_data_from_firestore(db)
+        rsvps_df = new_rsvps
+        cursors = None
+        last_full_sync = today.isoformat()
+
+    state = {
+        'synced_at': datetime.now().isoformat(timespec='seconds'),
+        'mode': 'incremental' if incremental else 'full',
+        'last_full_sync': last_full_sync,
+        'rsvp_cursors': _rsvp_cursors(new_rsvps['updated_at'], previous=cursors),
+        'rsvps_fetched': len(new_rsvps),
+    }
 
-    parties_df = pd.DataFrame(all_parties)
-    rsvps_df = pd.DataFrame(all_rsvps)
+    uploader.upload_to_s3(parties_df, config.aws_bucket_name, PARTIES_KEY)
+    uploader.upload_to_s3(rsvps_df, config.aws_bucket_name, RSVPS_KEY)
+    uploader.s3.put_object(Bucket=config.aws_bucket_name, Key=SYNC_STATE_KEY, Body=json.dumps(state, indent=2))
+    print(f"✓ {state['mode'].title()} sync: {len(new_rsvps)} RSVPs fetched, "
+          f"{len(rsvps_df)} RSVPs across {len(parties_df)} parties")
 
     return parties_df, rsvps_df
 
@@ -302,9 +498,16 @@ def fetch_and_save_birthday_parties(save_to_s3=True, save_local=False):
     print("BIRTHDAY PARTY DATA SYNC")
     print("=" * 60)
 
-    # Fetch via API
-    fetcher = BirthdayPartyFetcher()
-    parties_df, rsvps_df = fetcher.fetch_all_parties_to_dataframe()
+    # Incremental Firestore sync when Firebase credentials are available
+    # (it uploads as it goes), otherwise the full Cloud Functions API export
+    db = _get_firestore_client() if save_to_s3 else None
+    if db is not None:
+        parties_df, rsvps_df = sync_birthday_parties_from_firestore(db=db)
+    else:
+        if save_to_s3:
+            print("Falling back to the Cloud Functions API")
+        fetcher = BirthdayPartyFetcher()
+        parties_df, rsvps_df = fetcher.fetch_all_parties_to_dataframe()
 
     if parties_df.empty:
         print("\n⚠️  No parties found")
@@ -318,15 +521,15 @@ def fetch_and_save_birthday_parties(save_to_s3=True, save_local=False):
         print(parties_df[['child_name', 'party_date', 'total_yes', 'total_guests']].to_string())
 
     # Save to S3
-    if save_to_s3:
+    if save_to_s3 and db is None:
         print("\n💾 Uploading to S3...")
         uploader = upload_data.DataUploader()
 
-        uploader.upload_to_s3(parties_df, config.aws_bucket_name, 'birthday/parties.csv')
-        print(f"  ✓ Uploaded parties to s3://{config.aws_bucket_name}/birthday/parties.csv")
+        uploader.upload_to_s3(parties_df, config.aws_bucket_name, PARTIES_KEY)
+        print(f"  ✓ Uploaded parties to s3://{config.aws_bucket_name}/{PARTIES_KEY}")
 
-        uploader.upload_to_s3(rsvps_df, config.aws_bucket_name, 'birthday/rsvps.csv')
-        print(f"  ✓ Uploaded RSVPs to s3://{config.aws_bucket_name}/birthday/rsvps.csv")
+        uploader.upload_to_s3(rsvps_df, config.aws_bucket_name, RSVPS_KEY)
+        print(f"  ✓ Uploaded RSVPs to s3://{config.aws_bucket_name}/{RSVPS_KEY}")
 
     # Save local copies
     if save_local:
@@ -341,51 +544,76 @@ def fetch_and_save_birthday_parties(save_to_s3=True, save_local=False):
     return parties_df, rsvps_df
 
 
-def enrich_parties_with_communication_history():
+def _bulk_update_parties(db, updates, max_attempts=5):
+    """
+    Apply field updates to party documents through a Firestore BulkWriter.
+
+    Args:
+        db: Firestore client
+        updates: dict of party_id -> field updates
+        max_attempts: Attempts per document before giving up on it (parties
+            that no longer exist are not retried)
+
+    Returns:
+        tuple: (updated party IDs, {party_id: error message} for failed ones)
+    """
+    updated, failed = [], {}
+
+    def on_result(reference, result, bulk_writer):
+        updated.append(reference.id)
+
+    def on_error(error, bulk_writer):
+        if error.code != GRPC_NOT_FOUND and error.attempts < max_attempts:
+            return True
+        failed[error.operation.reference.id] = error.message
+        return False
+
+    writer = db.bulk_writer()
+    writer.on_write_result(on_result)
+    writer.on_write_error(on_error)
+    for party_id, fields in updates.items():
+        writer.update(db.collection('parties').document(party_id), fields)
+    writer.close()
+
+    for party_id, message in failed.items():
+        print(f"   ✗ Error updating party {party_id}: {message}")
+    return updated, failed
+
+
+def enrich_parties_with_communication_history(db=None, reminders_df=None):
     """
     Load sent_reminders.csv from S3 and add communication history to each party in Firebase.
 
+    Args:
+        db: Firestore client (the Firebase Admin client by default)
+        reminders_df: Sent reminders (loaded from S3 by default)
+
     Returns:
         dict: Summary of enrichment results
     """
     import boto3
     import io
 
-    try:
-        import firebase_admin
-        from firebase_admin import credentials, firestore
-    except ImportError:
-        print("ERROR: firebase-admin not installed. Run: pip install firebase-admin")
-        return None
-
     print("=" * 60)
     print("COMMUNICATION HISTORY ENRICHMENT")
     print("=" * 60)
 
-    # Initialize Firebase Admin if not already done
-    if not firebase_admin._apps:
-        cred_path = os.getenv('FIREBASE_CREDENTIALS_PATH',
-                              './basin-birthday-rsvp-firebase-adminsdk.json')
-
-        if not os.path.exists(cred_path):
-            print(f"ERROR: Firebase credentials not found at {cred_path}")
-            return None
-
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-
-    db = firestore.client()
+    if db is None:
+        db = _get_firestore_client()
+    if db is None:
+        return None
 
     # Load reminders from S3
-    print("\n1. Loading sent reminders from S3...")
-    try:
-        s3 = boto3.client('s3')
-        obj = s3.get_object(Bucket=config.aws_bucket_name, Key='birthday/sent_reminders.csv')
-        reminders_df = pd.read_csv(io.BytesIO(obj['Body'].read()))
-        print(f"   Loaded {len(reminders_df)} reminder records")
-    except Exception as e:
-        print(f"   No reminders found or error: {e}")
-        reminders_df = pd.DataFrame()
+    if reminders_df is None:
+        print("\n1. Loading sent reminders from S3...")
+        try:
+            s3 = boto3.client('s3')
+            obj = s3.get_object(Bucket=config.aws_bucket_name, Key='birthday/sent_reminders.csv')
+            reminders_df = pd.read_csv(io.BytesIO(obj['Body'].read()))
+            print(f"   Loaded {len(reminders_df)} reminder records")
+        except Exception as e:
+            print(f"   No reminders found or error: {e}")
+            reminders_df = pd.DataFrame()
 
     if reminders_df.empty:
         print("   No reminders to process")
@@ -402,97 +630,98 @@ def enrich_parties_with_communication_history():
         }
     print(f"   Found reminders for {len(party_reminders)} parties")
 
-    # Update Firebase documents
+    # Update Firebase documents in bulk
     print("\n3. Updating Firebase with communication history...")
-    updated = 0
-    for party_id, comm_data in party_reminders.items():
-        try:
-            db.collection('parties').document(party_id).update({
-                'communicationHistory': comm_data
-            })
-            updated += 1
-            print(f"   ✓ Updated party {party_id}: {comm_data['count']} reminders sent")
-        except Exception as e:
-            print(f"   ✗ Error updating party {party_id}: {e}")
+    updated, failed = _bulk_update_parties(
+        db, {party_id: {'communicationHistory': comm_data} for party_id, comm_data in party_reminders.items()}
+    )
 
     print("\n" + "=" * 60)
     print("✅ COMMUNICATION ENRICHMENT COMPLETE")
-    print(f"   Parties updated: {updated}")
+    print(f"   Parties updated: {len(updated)}")
+    if failed:
+        print(f"   Parties failed: {len(failed)}")
     print("=" * 60)
 
-    return {'parties_updated': updated}
+    return {'parties_updated': len(updated)}
 
 
-def enrich_parties_with_waiver_status():
+def enrich_parties_with_waiver_status(db=None, customers_df=None, today=None):
     """
     Cross-reference RSVP emails with Capitan customers to get waiver status.
     Updates Firebase party documents with waiver counts for each party.
 
+    Only parties from ENRICH_LOOKBACK_DAYS ago onwards (and parties whose date
+    can't be parsed) are updated; waiver counts for past parties don't change
+    anything.
+
+    Args:
+        db: Firestore client (the Firebase Admin client by default)
+        customers_df: Capitan customers (loaded from S3 by default)
+        today: Date the lookback window is measured from (today by default)
+
     Returns:
         dict: Summary of waiver enrichment results
     """
     import boto3
     import io
-
-    try:
-        import firebase_admin
-        from firebase_admin import credentials, firestore
-    except ImportError:
-        print("ERROR: firebase-admin not installed. Run: pip install firebase-admin")
-        return None
+    from datetime import timedelta
+    from google.cloud.firestore_v1.base_query import FieldFilter
+    from data_pipeline.generate_birthday_party_flags import parse_party_date
 
     print("=" * 60)
     print("WAIVER STATUS ENRICHMENT")
     print("=" * 60)
 
-    # Initialize Firebase Admin if not already done
-    if not firebase_admin._apps:
-        cred_path = os.getenv('FIREBASE_CREDENTIALS_PATH',
-                              './basin-birthday-rsvp-firebase-adminsdk.json')
-
-        if not os.path.exists(cred_path):
-            print(f"ERROR: Firebase credentials not found at {cred_path}")
-            return None
-
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-
-    db = firestore.client()
-
-    # Load Capitan customers from S3
-    print("\n1. Loading Capitan customers from S3...")
-    try:
-        s3 = boto3.client('s3')
-        obj = s3.get_object(Bucket=config.aws_bucket_name, Key='capitan/customers.csv')
-        customers_df = pd.read_csv(io.BytesIO(obj['Body'].read()))
-        print(f"   Loaded {len(customers_df)} customers")
-    except Exception as e:
-        print(f"ERROR loading customers from S3: {e}")
+    if db is None:
+        db = _get_firestore_client()
+    if db is None:
         return None
 
-    # Normalize emails for matching
-    customers_df['email_normalized'] = customers_df['email'].str.lower().str.strip()
+    # Load Capitan customers from S3
+    if customers_df is None:
+        print("\n1. Loading Capitan customers from S3...")
+        try:
+            s3 = boto3.client('s3')
+            obj = s3.get_object(Bucket=config.aws_bucket_name, Key='capitan/customers.csv')
+            customers_df = pd.read_csv(io.BytesIO(obj['Body'].read()))
+            print(f"   Loaded {len(customers_df)} customers")
+        except Exception as e:
+            print(f"ERROR loading customers from S3: {e}")
+            return None
 
     # Build email -> waiver status lookup
+    customers_df = customers_df.assign(email_normalized=customers_df['email'].str.lower().str.strip())
+    customers_df = customers_df[customers_df['email_normalized'].fillna('') != '']
     waiver_lookup = {}
-    for _, row in customers_df.iterrows():
-        email = row.get('email_normalized')
-        if pd.notna(email) and email:
-            waiver_lookup[email] = {
-                'active_waiver': row.get('active_waiver_exists', False),
-                'waiver_expiration': row.get('latest_waiver_expiration_date'),
-                'customer_id': row.get('customer_id'),
-                'first_name': row.get('first_name'),
-                'last_name': row.get('last_name')
-            }
+    for row in customers_df.to_dict('records'):
+        waiver_lookup[row['email_normalized']] = {
+            'active_waiver': row.get('active_waiver_exists', False),
+            'waiver_expiration': row.get('latest_waiver_expiration_date'),
+        }
 
     print(f"   Built lookup for {len(waiver_lookup)} customers with emails")
 
-    # Fetch all parties
+    # Fetch parties in the window
     print("\n2. Fetching parties from Firebase...")
-    parties_ref = db.collection('parties')
-    parties = list(parties_ref.stream())
-    print(f"   Found {len(parties)} parties")
+    window_start = (today or datetime.now().date()) - timedelta(days=ENRICH_LOOKBACK_DAYS)
+    parties = {}
+    for party_doc in db.collection('parties').select(['childName', 'partyDate']).stream():
+        party = party_doc.to_dict()
+        party_date = parse_party_date(str(party['partyDate'])) if party.get('partyDate') else None
+        if party_date is None or party_date >= window_start:
+            parties[party_doc.id] = party
+    print(f"   Found {len(parties)} parties from {window_start} onwards")
+
+    # All "yes" RSVPs in one collection-group query, grouped by party
+    yes_rsvps = {party_id: [] for party_id in parties}
+    rsvps_query = (db.collection_group('rsvps')
+                   .where(filter=FieldFilter('attending', '==', 'yes'))
+                   .select(['guestName', 'email', 'numAdults', 'numKids']))
+    for rsvp_doc in rsvps_query.stream():
+        party_id = _party_id(rsvp_doc)
+        if party_id in yes_rsvps:
+            yes_rsvps[party_id].append(rsvp_doc.to_dict())
 
     # Process each party
     print("\n3. Processing waiver status for each party...")
@@ -503,64 +732,44 @@ def enrich_parties_with_waiver_status():
         'waivers_found': 0
     }
 
-    for party_doc in parties:
-        party_id = party_doc.id
-        party_data = party_doc.to_dict()
-
-        # Get RSVPs for this party
-        rsvps_ref = db.collection('parties').document(party_id).collection('rsvps')
-        rsvps = list(rsvps_ref.stream())
-
-        # Count waiver status for "yes" RSVPs
-        yes_rsvps = []
+    updates = {}
+    for party_id, rsvps in yes_rsvps.items():
         waivers_signed = 0
         waivers_needed = 0
         rsvp_waiver_details = []
 
-        for rsvp_doc in rsvps:
-            rsvp = rsvp_doc.to_dict()
-
-            if rsvp.get('attending') == 'yes':
-                rsvp_email = (rsvp.get('email') or '').lower().strip()
-                guest_name = rsvp.get('guestName', 'Unknown')
-                num_kids = rsvp.get('numKids', 0)
-                num_adults = rsvp.get('numAdults', 0)
-
-                # Each RSVP represents a family - count total people needing waivers
-                total_people = num_kids + num_adults
-                waivers_needed += max(total_people, 1)  # At least 1 person per RSVP
-
-                # Check if RSVP email matches a Capitan customer with waiver
-                waiver_info = waiver_lookup.get(rsvp_email)
-                if waiver_info:
-                    results['rsvps_matched'] += 1
-                    if waiver_info.get('active_waiver'):
-                        waivers_signed += 1
-                        results['waivers_found'] += 1
-                        rsvp_waiver_details.append({
-                            'guest': guest_name,
-                            'email': rsvp_email,
-                            'has_waiver': True,
-                            'expiration': waiver_info.get('waiver_expiration')
-                        })
-                    else:
-                        rsvp_waiver_details.append({
-                            'guest': guest_name,
-                            'email': rsvp_email,
-                            'has_waiver': False,
-                            'expiration': None
-                        })
-                else:
-                    # Email not found in Capitan
-                    rsvp_waiver_details.append({
-                        'guest': guest_name,
-                        'email': rsvp_email,
-                        'has_waiver': None,  # Unknown - not in Capitan
-                        'expiration': None
-                    })
-
-        # Update party document with waiver stats
-        waiver_stats = {
+        for rsvp in rsvps:
+            rsvp_email = (rsvp.get('email') or '').lower().strip()
+            guest_name = rsvp.get('guestName', 'Unknown')
+
+            # Each RSVP represents a family - count total people needing waivers
+            total_people = rsvp.get('numKids', 0) + rsvp.get('numAdults', 0)
+            waivers_needed += max(total_people, 1)  # At least 1 person per RSVP
+
+            # Check if RSVP email matches a Capitan customer with waiver
+            waiver_info = waiver_lookup.get(rsvp_email)
+            if waiver_info:
+                results['rsvps_matched'] += 1
+                has_waiver = bool(waiver_info.get('active_waiver'))
+                if has_waiver:
+                    waivers_signed += 1
+                    results['waivers_found'] += 1
+                rsvp_waiver_details.append({
+                    'guest': guest_name,
+                    'email': rsvp_email,
+                    'has_waiver': has_waiver,
+                    'expiration': waiver_info.get('waiver_expiration') if has_waiver else None
+                })
+            else:
+                # Email not found in Capitan
+                rsvp_waiver_details.append({
+                    'guest': guest_name,
+                    'email': rsvp_email,
+                    'has_waiver': None,  # Unknown - not in Capitan
+                    'expiration': None
+                })
+
+        updates[party_id] = {
             'waiverStats': {
                 'signed': waivers_signed,
                 'needed': waivers_needed,
@@ -568,17 +777,15 @@ def enrich_parties_with_waiver_status():
                 'lastUpdated': datetime.now().isoformat()
             }
         }
-
-        try:
-            db.collection('parties').document(party_id).update(waiver_stats)
-            results['parties_updated'] += 1
-            child_name = party_data.get('childName', 'Unknown')
-            print(f"   ✓ {child_name}: {waivers_signed}/{waivers_needed} waivers signed")
-        except Exception as e:
-            print(f"   ✗ Error updating party {party_id}: {e}")
-
         results['parties_processed'] += 1
 
+    updated, failed = _bulk_update_parties(db, updates)
+    results['parties_updated'] = len(updated)
+    for party_id in updated:
+        stats = updates[party_id]['waiverStats']
+        child_name = parties[party_id].get('childName', 'Unknown')
+        print(f"   ✓ {child_name}: {stats['signed']}/{stats['needed']} waivers signed")
+
     print("\n" + "=" * 60)
     print("✅ WAIVER ENRICHMENT COMPLETE")
     print(f"   Parties processed: {results['parties_processed']}")
@@ -6,10 +6,11 @@ This enables segmentation analysis and event participation tracking.
 """
 
 import pandas as pd
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 
+from data_pipeline.capitan_client import CapitanClient, CapitanAPIError
+
 
 class CapitanAssociationsEventsFetcher:
     """
@@ -33,19 +34,24 @@ class CapitanAssociationsEventsFetcher:
         self.capitan_token = capitan_token
         self.base_url = "https://api.hellocapitan.com/api/"
         self.headers = {"Authorization": f"token {self.capitan_token}"}
+        self.client = CapitanClient(capitan_token, base_url=self.base_url)
 
     def _make_api_request(self, url: str, params: Dict = None) -> Optional[Dict]:
         """Make a request to the Capitan API with error handling."""
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self.client.get(url, params)
+        except CapitanAPIError as e:
             print(f"API request failed for {url}: {e}")
-            if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                print(f"Response: {e.response.text[:200]}")
             return None
 
+    def _paginate(self, path: str, params: Dict = None, page_size: int = 1000) -> List[Dict]:
+        """All pages of a listing; on failure, the pages fetched before it."""
+        try:
+            return self.client.paginate(path, params, page_size=page_size)
+        except CapitanAPIError as e:
+            print(f"API request failed for {path}: {e}")
+            return e.partial_results
+
     def get_all_associations(self) -> List[Dict]:
         """
         Fetch all associations (groups/categories).
@@ -55,32 +61,7 @@ class CapitanAssociationsEventsFetcher:
         """
         print("Fetching all associations...")
 
-        url = f"{self.base_url}associations/"
-        all_associations = []
-        page = 1
-        page_size = 100
-
-        while True:
-            params = {
-                'page': page,
-                'page_size': page_size
-            }
-
-            data = self._make_api_request(url, params)
-
-            if not data or 'results' not in data:
-                print("No data returned or error occurred")
-                break
-
-            results = data['results']
-            all_associations.extend(results)
-            print(f"  Page {page}: Retrieved {len(results)} associations (Total: {len(all_associations)})")
-
-            # Check if there's a next page
-            if not data.get('next'):
-                break
-
-            page += 1
+        all_associations = self._paginate("associations", page_size=100)
 
         print(f"✓ Fetched {len(all_associations)} total associations")
         return all_associations
@@ -132,33 +113,11 @@ class CapitanAssociationsEventsFetcher:
         """
         print("Fetching all association-members...")
 
-        url = f"{self.base_url}association-members/"
-        all_members = []
-        page = 1
-        page_size = 1000  # Fetch 1000 at a time
-
-        while True:
-            params = {
-                'page': page,
-                'page_size': page_size,
-                'ordering': '-created_at'  # Newest first
-            }
-
-            data = self._make_api_request(url, params)
-
-            if not data or 'results' not in data:
-                print("No data returned or error occurred")
-                break
-
-            results = data['results']
-            all_members.extend(results)
-            print(f"  Page {page}: Retrieved {len(results)} members (Total: {len(all_members)})")
-
-            # Check if there's a next page
-            if not data.get('next'):
-                break
-
-            page += 1
+        all_members = self._paginate(
+            "association-members",
+            {'ordering': '-created_at'},  # Newest first
+            page_size=1000,
+        )
 
         print(f"✓ Fetched {len(all_members)} total association-members")
         return all_members
@@ -216,74 +175,53 @@ class CapitanAssociationsEventsFetcher:
         """
         Fetch all events.
 
+        Without days_back, pages are fetched concurrently; with it, pages are
+        read newest first until they fall outside the range.
+
         Args:
             days_back: Number of days to look back (None = fetch all events, recommended)
 
         Returns:
             List of event dictionaries
         """
-        if days_back:
-            print(f"Fetching events from the last {days_back} days...")
-        else:
-            print(f"Fetching all events...")
-
-        url = f"{self.base_url}events/"
-        all_events = []
-        page = 1
-        page_size = 1000
-
-        # Calculate date filter if specified
-        start_date = None
-        if days_back:
-            from datetime import timezone
-            end_date = datetime.now(timezone.utc)
-            start_date = end_date - timedelta(days=days_back)
-
-        while True:
-            params = {
-                'page': page,
-                'page_size': page_size,
-                'ordering': '-created_at'  # Newest first
-            }
-
-            data = self._make_api_request(url, params)
+        params = {'ordering': '-created_at'}  # Newest first
 
-            if not data or 'results' not in data:
-                print("No data returned or error occurred")
-                break
-
-            results = data['results']
+        if not days_back:
+            print(f"Fetching all events...")
+            all_events = self._paginate("events", params, page_size=1000)
+            print(f"✓ Fetched {len(all_events)} total events")
+            return all_events
 
-            # Filter by date if specified
-            if start_date:
-                filtered_results = []
-                for event in results:
-                    created_at = event.get('created_at')
-                    if created_at:
-                        event_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        if event_date >= start_date:
-                            filtered_results.append(event)
+        print(f"Fetching events from the last {days_back} days...")
+        start_date = datetime.now(timezone.utc) - timedelta(days=days_back)
+        all_events = self._collect_since("events", params, start_date, "events")
 
-                all_events.extend(filtered_results)
-                print(f"  Page {page}: Retrieved {len(filtered_results)} events (Total: {len(all_events)})")
+        print(f"✓ Fetched {len(all_events)} total events")
+        return all_events
 
-                # If we're getting old events, stop
+    def _collect_since(self, path: str, params: Dict, start_date: datetime, label: str) -> List[Dict]:
+        """
+        Read a newest-first listing page by page, keeping entries created on or
+        after start_date and stopping at the first page with none.
+        """
+        collected = []
+        try:
+            for page, results in enumerate(self.client.iter_pages(path, params, page_size=1000), start=1):
+                filtered_results = [
+                    entry for entry in results
+                    if entry.get('created_at')
+                    and datetime.fromisoformat(entry['created_at'].replace('Z', '+00:00')) >= start_date
+                ]
+                collected.extend(filtered_results)
+                print(f"  Page {page}: Retrieved {len(filtered_results)} {label} (Total: {len(collected)})")
+
+                # If we're getting old entries, stop
                 if len(filtered_results) == 0 and len(results) > 0:
-                    print("  Reached events older than requested date range, stopping")
+                    print(f"  Reached {label} older than requested date range, stopping")
                     break
-            else:
-                # No filtering, take all results
-                all_events.extend(results)
-                print(f"  Page {page}: Retrieved {len(results)} events (Total: {len(all_events)})")
-
-            # Check if there's a next page
-            if not data.get('next'):
-                break
-
-            page += 1
-
-        print(f"✓ Fetched {len(all_events)} total events")
-        return all_events
+        except CapitanAPIError as e:
+            print(f"API request failed for {path}: {e}")
+        return collected
 
     def events_to_dataframe(self, events: List[Dict]) -> pd.DataFrame:
         """Convert events list to pandas DataFrame."""
@@ -346,56 +284,12 @@ class CapitanAssociationsEventsFetcher:
         """
         print(f"Fetching activity log (last {days_back} days)...")
 
-        # Calculate date filter (timezone-aware)
-        from datetime import timezone
-        end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=days_back)
-
-        url = f"{self.base_url}activity-log/"
-        all_logs = []
-        page = 1
-        page_size = 1000
-
-        while True:
-            params = {
-                'page': page,
-                'page_size': page_size,
-                'ordering': '-created_at'  # Newest first
-            }
-
-            if category:
-                params['category'] = category
-
-            data = self._make_api_request(url, params)
-
-            if not data or 'results' not in data:
-                print("No data returned or error occurred")
-                break
-
-            results = data['results']
-
-            # Filter by date
-            filtered_results = []
-            for log in results:
-                created_at = log.get('created_at')
-                if created_at:
-                    log_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    if log_date >= start_date:
-                        filtered_results.append(log)
-
-            all_logs.extend(filtered_results)
-            print(f"  Page {page}: Retrieved {len(filtered_results)} log entries (Total: {len(all_logs)})")
-
-            # Check if there's a next page
-            if not data.get('next'):
-                break
-
-            # If we're getting old logs, stop
-            if len(filtered_results) == 0 and len(results) > 0:
-                print("  Reached logs older than requested date range, stopping")
-                break
+        start_date = datetime.now(timezone.utc) - timedelta(days=days_back)
+        params = {'ordering': '-created_at'}  # Newest first
+        if category:
+            params['category'] = category
 
-            page += 1
+        all_logs = self._collect_since("activity-log", params, start_date, "log entries")
 
         print(f"✓ Fetched {len(all_logs)} total activity log entries")
         return all_logs
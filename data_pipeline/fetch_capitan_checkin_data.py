@@ -6,10 +6,11 @@ Includes customer info, check-in times, entry methods, and visit counts.
 """
 
 import pandas as pd
-import requests
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from data_pipeline.capitan_client import CapitanClient, CapitanAPIError
+
 
 class CapitanCheckinFetcher:
     """
@@ -26,23 +27,22 @@ class CapitanCheckinFetcher:
         self.capitan_token = capitan_token
         self.base_url = "https://api.hellocapitan.com/api/"
         self.headers = {"Authorization": f"token {self.capitan_token}"}
+        self.client = CapitanClient(capitan_token, base_url=self.base_url)
 
     def _make_api_request(self, url: str, params: Dict = None) -> Optional[Dict]:
         """Make a request to the Capitan API with error handling."""
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self.client.get(url, params)
+        except CapitanAPIError as e:
             print(f"API request failed: {e}")
-            if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                print(f"Response: {e.response.text[:200]}")
             return None
 
     def get_all_checkins(self, days_back: int = 90) -> List[Dict]:
         """
         Fetch all check-ins from the last N days.
 
+        Pages after the first are fetched concurrently (see CapitanClient.paginate).
+
         Args:
             days_back: Number of days to look back (default 90)
 
@@ -56,35 +56,16 @@ class CapitanCheckinFetcher:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days_back)
 
-        url = f"{self.base_url}check-ins/"
-        all_checkins = []
-        page = 1
-        page_size = 1000  # Fetch 1000 at a time
-
-        while True:
-            print(f"Fetching page {page}...")
-            params = {
-                'page': page,
-                'page_size': page_size,
-                'check_in_datetime__gte': start_date.strftime('%Y-%m-%d'),
-                'ordering': '-check_in_datetime'  # Newest first
-            }
-
-            data = self._make_api_request(url, params)
-
-            if not data or 'results' not in data:
-                print("No data returned or error occurred")
-                break
+        params = {
+            'check_in_datetime__gte': start_date.strftime('%Y-%m-%d'),
+            'ordering': '-check_in_datetime'  # Newest first
+        }
 
-            results = data['results']
-            all_checkins.extend(results)
-            print(f"  Retrieved {len(results)} check-ins (Total so far: {len(all_checkins)})")
-
-            # Check if there's a next page
-            if not data.get('next'):
-                break
-
-            page += 1
+        try:
+            all_checkins = self.client.paginate("check-ins", params, page_size=1000)
+        except CapitanAPIError as e:
+            print(f"API request failed: {e}")
+            all_checkins = e.partial_results
 
         print(f"✓ Fetched {len(all_checkins)} total check-ins")
         return all_checkins
@@ -1,9 +1,16 @@
 import pandas as pd
-import requests
 import json
 from datetime import timedelta, datetime
 import os
 from . import config
+from .capitan_client import CapitanClient, CapitanAPIError
+
+CUSTOMER_COLUMNS = [
+    'customer_id', 'email', 'phone', 'first_name', 'last_name', 'preferred_name', 'birthday',
+    'has_opted_in_to_marketing', 'has_active_membership', 'active_waiver_exists',
+    'latest_waiver_expiration_date', 'relations_url', 'emergency_contacts_url',
+    'created_at', 'updated_at',
+]
 
 
 class CapitanDataFetcher:
@@ -15,6 +22,7 @@ class CapitanDataFetcher:
         self.capitan_token = capitan_token
         self.base_url = "https://api.hellocapitan.com/api/"
         self.headers = {"Authorization": f"token {self.capitan_token}"}
+        self.client = CapitanClient(capitan_token, base_url=self.base_url)
 
     def save_raw_response(self, data: dict, filename: str):
         """Save raw API response to a JSON file."""
@@ -31,51 +39,21 @@ class CapitanDataFetcher:
     def get_results_from_api(self, url: str) -> dict:
         """
         Make API request and handle response with pagination.
-        Fetches all pages and combines results.
+        Fetches all pages (concurrently after the first, see CapitanClient.paginate)
+        and combines results.
         """
-        all_results = []
-        page = 1
-        page_size = 100  # API can't handle larger page sizes (502/timeout)
-
         print(f"Fetching data from {self.base_url}{url}")
 
-        while True:
-            paginated_url = f"{self.base_url}{url}/?page={page}&page_size={page_size}"
-
-            try:
-                response = requests.get(paginated_url, headers=self.headers, timeout=30)
-
-                if response.status_code != 200:
-                    print(f"Failed to retrieve data. Status code: {response.status_code}")
-                    if page == 1:
-                        # First page failed, return None
-                        return None
-                    else:
-                        # Subsequent page failed, return what we have
-                        break
-
-                json_data = response.json()
-                results = json_data.get('results', [])
-
-                if not results:
-                    # No more results
-                    break
-
-                all_results.extend(results)
-                print(f"  Page {page}: Retrieved {len(results)} records (total so far: {len(all_results)})")
-
-                # Check if there are more pages
-                if not json_data.get('next'):
-                    break
-
-                page += 1
-
-            except requests.exceptions.RequestException as e:
-                print(f"Error making API request: {e}")
-                if page == 1:
-                    return None
-                else:
-                    break
+        try:
+            # API can't handle larger page sizes (502/timeout)
+            all_results = self.client.paginate(url, page_size=100)
+        except CapitanAPIError as e:
+            print(f"Error making API request: {e}")
+            if not e.partial_results:
+                # First page failed, return None
+                return None
+            # Later page failed, return what we have
+            all_results = e.partial_results
 
         print(f"Successfully fetched {len(all_results)} total records from {url}")
 
@@ -405,7 +383,16 @@ class CapitanDataFetcher:
         customers = json_response['results']
         print(f"Retrieved {len(customers)} customers")
 
-        # Extract customer contact data
+        df = self.customers_to_dataframe(customers)
+
+        print(f"✅ Processed {len(df)} customer records")
+        print(f"   Customers with email: {df['email'].notna().sum()}")
+        print(f"   Customers with phone: {df['phone'].notna().sum()}")
+
+        return df
+
+    def customers_to_dataframe(self, customers: list) -> pd.DataFrame:
+        """Extract the customer contact/profile columns from raw API customers."""
         customer_data = []
         for customer in customers:
             customer_data.append({
@@ -423,18 +410,15 @@ class CapitanDataFetcher:
                 'relations_url': customer.get('relations_url'),
                 'emergency_contacts_url': customer.get('emergency_contacts_url'),
                 'created_at': customer.get('created_at'),
+                'updated_at': customer.get('updated_at'),
             })
 
-        df = pd.DataFrame(customer_data)
+        df = pd.DataFrame(customer_data, columns=CUSTOMER_COLUMNS)
 
         # Convert dates
         if not df.empty and 'created_at' in df.columns:
             df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
 
-        print(f"✅ Processed {len(df)} customer records")
-        print(f"   Customers with email: {df['email'].notna().sum()}")
-        print(f"   Customers with phone: {df['phone'].notna().sum()}")
-
         return df
 
     def fetch_all_relations(self, customers_df: pd.DataFrame) -> pd.DataFrame:
@@ -456,8 +440,6 @@ class CapitanDataFetcher:
             - related_customer_last_name: Last name of related person
             - created_at: When relationship was created
         """
-        import time
-
         print("\n👨‍👩‍👧‍👦 Fetching customer relations...")
         print(f"   Processing {len(customers_df)} customers...")
 
@@ -478,42 +460,27 @@ class CapitanDataFetcher:
             if pd.isna(relations_url) or not relations_url:
                 continue
 
+            # Goes through the client's rate limiter and retries like the listings
             try:
-                response = requests.get(relations_url, headers=self.headers, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    for relation in data.get('results', []):
-                        all_relations.append({
-                            'customer_id': customer_id,
-                            'related_customer_id': relation.get('related_customer_id'),
-                            'relationship': relation.get('relation'),  # "CHI", "SIB", "PAR", etc.
-                            'related_customer_first_name': relation.get('related_customer_first_name'),
-                            'related_customer_last_name': relation.get('related_customer_last_name'),
-                            'created_at': relation.get('created_at')
-                        })
-                        relations_found += 1
-
-                elif response.status_code != 404:  # 404 is expected for customers with no relations
+                data = self.client.get(relations_url)
+            except CapitanAPIError as e:
+                if e.status_code != 404:  # 404 is expected for customers with no relations
                     errors += 1
                     if errors < 5:  # Only print first few errors
-                        print(f"   ⚠️  Status {response.status_code} for customer {customer_id}")
-
-                # Rate limiting: Capitan allows ~10 requests/second, use 9/sec to be safe
-                time.sleep(0.11)
-
-            except requests.exceptions.Timeout:
-                errors += 1
-                if errors < 5:
-                    print(f"   ⚠️  Timeout for customer {customer_id}")
-                continue
-            except Exception as e:
-                errors += 1
-                if errors < 5:
-                    print(f"   ⚠️  Error for customer {customer_id}: {e}")
+                        print(f"   ⚠️  Error for customer {customer_id}: {e}")
                 continue
 
+            for relation in data.get('results', []):
+                all_relations.append({
+                    'customer_id': customer_id,
+                    'related_customer_id': relation.get('related_customer_id'),
+                    'relationship': relation.get('relation'),  # "CHI", "SIB", "PAR", etc.
+                    'related_customer_first_name': relation.get('related_customer_first_name'),
+                    'related_customer_last_name': relation.get('related_customer_last_name'),
+                    'created_at': relation.get('created_at')
+                })
+                relations_found += 1
+
         print(f"\n✅ Relations fetch complete!")
         print(f"   Total relations found: {len(all_relations)}")
         print(f"   Unique customers with relations: {len(set(r['customer_id'] for r in all_relations))}")
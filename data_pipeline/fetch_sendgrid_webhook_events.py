@@ -12,27 +12,58 @@ Each event contains:
 - received_at: When webhook was received
 - source: "sendgrid"
 - raw_event: The actual SendGrid event data (delivered, open, click, etc.)
+
+Object keys that have already been folded into recipient_activity.csv are
+tracked in sendgrid/processed_event_keys.csv, so re-runs only read new files.
+Empty files count as processed; files that can't be read or parsed are
+retried on later runs and given up on after MAX_READ_ATTEMPTS failures.
 """
 
 import boto3
 import json
 import os
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional, Set
+
+from data_pipeline import pipeline_telemetry
+
+
+# SendGrid event type -> recipient activity column
+ACTIVITY_FLAG_COLUMNS = {
+    'delivered': 'delivered',
+    'open': 'opened',
+    'click': 'clicked',
+    'bounce': 'bounced',
+    'dropped': 'dropped',
+    'deferred': 'deferred',
+    'unsubscribe': 'unsubscribed',
+    'spamreport': 'spam_report',
+}
+
+# Failed reads of an event file before it is recorded as processed anyway
+MAX_READ_ATTEMPTS = 3
 
 
 class SendGridWebhookProcessor:
     """Process SendGrid webhook events from S3."""
 
-    def __init__(self):
-        """Initialize S3 client and configuration."""
+    def __init__(self, max_workers: int = 8):
+        """
+        Initialize S3 client and configuration.
+
+        Args:
+            max_workers: Number of event files downloaded concurrently
+        """
         self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
         self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
         self.bucket_name = "basin-climbing-data-prod"
         self.events_prefix = "sendgrid/events/date="
         self.output_key = "sendgrid/recipient_activity.csv"
+        self.processed_keys_key = "sendgrid/processed_event_keys.csv"
+        self.max_workers = max_workers
 
         if not self.aws_access_key_id or not self.aws_secret_access_key:
             raise ValueError("AWS credentials not set")
@@ -57,17 +88,19 @@ class SendGridWebhookProcessor:
             List of date strings (YYYY-MM-DD format)
         """
         # List all date prefixes
-        response = self.s3_client.list_objects_v2(
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
             Bucket=self.bucket_name,
             Prefix=self.events_prefix,
             Delimiter='/'
         )
 
         dates = []
-        for prefix in response.get('CommonPrefixes', []):
-            # Extract date from prefix: sendgrid/events/date=YYYY-MM-DD/
-            date_str = prefix['Prefix'].replace(self.events_prefix, '').rstrip('/')
-            dates.append(date_str)
+        for page in pages:
+            for prefix in page.get('CommonPrefixes', []):
+                # Extract date from prefix: sendgrid/events/date=YYYY-MM-DD/
+                date_str = prefix['Prefix'].replace(self.events_prefix, '').rstrip('/')
+                dates.append(date_str)
 
         # Filter to last N days
         cutoff_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
@@ -76,43 +109,131 @@ class SendGridWebhookProcessor:
 
         return dates
 
-    def fetch_events_for_date(self, date: str) -> List[Dict]:
+    def list_event_keys(self, date: str) -> List[str]:
         """
-        Fetch all webhook events for a specific date.
+        List every webhook event file for a date (paginated past 1,000 keys).
 
         Args:
             date: Date string in YYYY-MM-DD format
 
         Returns:
-            List of event dictionaries
+            Sorted list of S3 object keys
         """
         prefix = f"{self.events_prefix}{date}/"
+        paginator = self.s3_client.get_paginator('list_objects_v2')
 
-        # List all files for this date
-        response = self.s3_client.list_objects_v2(
-            Bucket=self.bucket_name,
-            Prefix=prefix
-        )
+        keys = []
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                keys.append(obj['Key'])
+
+        keys.sort()
+        return keys
+
+    def read_event_file(self, key: str) -> Optional[List[Dict]]:
+        """
+        Stream one NDJSON event file and parse it line by line.
+
+        Args:
+            key: S3 object key
+
+        Returns:
+            List of event dictionaries, or None if the file could not be read
+        """
+        events = []
+        try:
+            data = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            for line in data['Body'].iter_lines():
+                line = line.strip()
+                if line:
+                    events.append(json.loads(line))
+        except Exception as e:
+            print(f"   ⚠️  Error reading {key}: {e}")
+            return None
+
+        return events
+
+    def read_event_files(self, keys: Iterable[str]) -> Dict[str, List[Dict]]:
+        """
+        Download and parse event files concurrently with a bounded thread pool.
+
+        Args:
+            keys: S3 object keys to read
+
+        Returns:
+            Dict of key -> events (None for files that failed), in the same
+            order as ``keys``
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(pipeline_telemetry.in_current_context(self.read_event_file), keys))
+
+        return dict(zip(keys, results))
+
+    def fetch_events_for_date(self, date: str, skip_keys: Optional[Set[str]] = None) -> List[Dict]:
+        """
+        Fetch all webhook events for a specific date.
+
+        Args:
+            date: Date string in YYYY-MM-DD format
+            skip_keys: Object keys that have already been processed
+
+        Returns:
+            List of event dictionaries
+        """
+        skip_keys = skip_keys or set()
+        keys = [k for k in self.list_event_keys(date) if k not in skip_keys]
 
         events = []
-        for obj in response.get('Contents', []):
-            try:
-                # Read file
-                data = self.s3_client.get_object(Bucket=self.bucket_name, Key=obj['Key'])
-                content = data['Body'].read().decode('utf-8')
-
-                # Parse NDJSON (each line is a JSON object)
-                for line in content.strip().split('\n'):
-                    if line:
-                        event = json.loads(line)
-                        events.append(event)
-
-            except Exception as e:
-                print(f"   ⚠️  Error reading {obj['Key']}: {e}")
-                continue
+        for file_events in self.read_event_files(keys).values():
+            events.extend(file_events or [])
 
         return events
 
+    def load_processed_keys(self) -> Dict[str, int]:
+        """
+        Load the event file keys already seen, with their failed read counts.
+
+        Returns:
+            Dict of S3 object key -> failed reads so far (0 once the file has
+            been folded into recipient activity); empty on first run
+        """
+        try:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.processed_keys_key)
+            df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            df = df.dropna(subset=['key'])
+            failures = df['failures'] if 'failures' in df.columns else pd.Series(0, index=df.index)
+            return dict(zip(df['key'], failures.fillna(0).astype(int)))
+        except self.s3_client.exceptions.NoSuchKey:
+            return {}
+        except Exception as e:
+            print(f"   ⚠️  Error loading processed keys: {e}")
+            return {}
+
+    @staticmethod
+    def is_done(failures: int) -> bool:
+        """Whether a key with this failed read count should be skipped."""
+        return failures == 0 or failures >= MAX_READ_ATTEMPTS
+
+    def save_processed_keys(self, keys: Dict[str, int]):
+        """
+        Save the event file keys and their failed read counts back to S3.
+
+        Args:
+            keys: S3 object key -> failed reads (0 = processed)
+        """
+        df = pd.DataFrame(sorted(keys.items()), columns=['key', 'failures'])
+        csv_buffer = StringIO()
+        df.to_csv(csv_buffer, index=False)
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=self.processed_keys_key,
+            Body=csv_buffer.getvalue()
+        )
+
     def process_events_to_dataframe(self, events: List[Dict]) -> pd.DataFrame:
         """
         Convert webhook events to structured DataFrame.
@@ -173,40 +294,61 @@ class SendGridWebhookProcessor:
         if df_events.empty:
             return pd.DataFrame()
 
-        # Group by message and recipient
-        activity = []
-
-        for (msg_id, email), group in df_events.groupby(['sg_message_id', 'email']):
-            # Get event types
-            event_types = set(group['event_type'].dropna())
-
-            # Get earliest timestamp (sent time)
-            sent_time = group['event_datetime'].min()
-
-            activity.append({
-                'sg_message_id': msg_id,
-                'email': email,
-                'sent_datetime': sent_time,
-                'delivered': 'delivered' in event_types,
-                'opened': 'open' in event_types,
-                'clicked': 'click' in event_types,
-                'bounced': 'bounce' in event_types,
-                'dropped': 'dropped' in event_types,
-                'deferred': 'deferred' in event_types,
-                'unsubscribed': 'unsubscribe' in event_types,
-                'spam_report': 'spamreport' in event_types,
-            })
-
-        df_activity = pd.DataFrame(activity)
+        keys = ['sg_message_id', 'email']
+
+        # Earliest timestamp (sent time) per message/recipient
+        sent = df_events.groupby(keys)['event_datetime'].min().rename('sent_datetime')
+
+        # One boolean column per event type seen for the message/recipient
+        flags = pd.crosstab(
+            [df_events['sg_message_id'], df_events['email']],
+            df_events['event_type']
+        ).gt(0)
+        flags = (
+            flags.reindex(columns=list(ACTIVITY_FLAG_COLUMNS), fill_value=False)
+            .rename(columns=ACTIVITY_FLAG_COLUMNS)
+            .reindex(sent.index, fill_value=False)
+        )
+        flags.columns.name = None
+
+        df_activity = pd.concat([sent, flags], axis=1).reset_index()
         return df_activity
 
-    def fetch_and_save(self, days_back: int = 7, save_local: bool = True):
+    def merge_recipient_activity(self, existing_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Merge newly aggregated activity into the existing activity table.
+
+        Events for the same message/recipient can arrive in different files
+        (and therefore different runs), so flags are OR-ed together and the
+        earliest sent time wins instead of the newest row replacing the old one.
+
+        Args:
+            existing_df: Activity table loaded from S3
+            new_df: Activity aggregated from newly read events
+
+        Returns:
+            Combined DataFrame with one row per recipient per message
+        """
+        flag_cols = list(ACTIVITY_FLAG_COLUMNS.values())
+        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+        for col in flag_cols:
+            combined_df[col] = combined_df[col].fillna(False).astype(bool)
+
+        agg = {'sent_datetime': 'min', **{col: 'max' for col in flag_cols}}
+        combined_df = combined_df.groupby(['sg_message_id', 'email'], as_index=False).agg(agg)
+        return combined_df.sort_values('sent_datetime', ascending=False)
+
+    def fetch_and_save(self, days_back: int = 7, save_local: bool = True, reprocess: bool = False):
         """
         Fetch webhook events, process, and save to S3.
 
+        Only event files that have not been processed by a previous run are
+        read, unless ``reprocess`` is set.
+
         Args:
             days_back: Number of days to fetch (default 7)
             save_local: Whether to save a local copy
+            reprocess: Re-read every file in the window, ignoring processed keys
         """
         print("\n" + "="*80)
         print("SENDGRID WEBHOOK EVENTS PROCESSING")
@@ -222,16 +364,29 @@ class SendGridWebhookProcessor:
 
         print(f"   ✅ Found {len(dates)} dates with events: {dates[0]} to {dates[-1]}")
 
-        # Fetch events for all dates
-        print(f"\n📥 Fetching events...")
+        # List files for all dates and skip the ones already processed (or given up on)
+        processed_keys = {} if reprocess else self.load_processed_keys()
+        keys_by_date = {date: self.list_event_keys(date) for date in dates}
+        window_keys = [k for keys in keys_by_date.values() for k in keys]
+        new_keys = [k for k in window_keys if not self.is_done(processed_keys.get(k, -1))]
+        print(f"   ✅ {len(window_keys)} event files, {len(new_keys)} not yet processed")
+
+        if not new_keys:
+            print("\n   ℹ️  No new event files since last run")
+            return
+
+        # Fetch new files concurrently
+        print(f"\n📥 Fetching events ({self.max_workers} workers)...")
+        events_by_key = self.read_event_files(new_keys)
         all_events = []
-        for date in dates:
-            events = self.fetch_events_for_date(date)
-            all_events.extend(events)
-            print(f"   {date}: {len(events)} events")
+        for date, keys in keys_by_date.items():
+            date_events = [e for k in keys for e in events_by_key.get(k) or []]
+            all_events.extend(date_events)
+            print(f"   {date}: {len(date_events)} events")
 
         if not all_events:
             print("\n   ⚠️  No events found")
+            self._record_processed_keys(processed_keys, window_keys, events_by_key)
             return
 
         print(f"\n   ✅ Total: {len(all_events)} webhook events")
@@ -270,9 +425,7 @@ class SendGridWebhookProcessor:
             print(f"   ✅ Loaded {len(existing_df)} existing records")
 
             # Merge with new data
-            combined_df = pd.concat([existing_df, df_activity], ignore_index=True)
-            combined_df = combined_df.drop_duplicates(subset=['sg_message_id', 'email'], keep='last')
-            combined_df = combined_df.sort_values('sent_datetime', ascending=False)
+            combined_df = self.merge_recipient_activity(existing_df, df_activity)
 
             print(f"   ✅ Combined: {len(combined_df)} total records")
             df_activity = combined_df
@@ -303,11 +456,38 @@ class SendGridWebhookProcessor:
             print(f"   ✅ Uploaded to s3://{self.bucket_name}/{self.output_key}")
         except Exception as e:
             print(f"   ❌ Error uploading to S3: {e}")
+            return
+
+        self._record_processed_keys(processed_keys, window_keys, events_by_key)
 
         print("\n" + "="*80)
         print("SENDGRID WEBHOOK EVENTS PROCESSING COMPLETE")
         print("="*80)
 
+    def _record_processed_keys(self, processed_keys: Dict[str, int], window_keys: List[str],
+                               events_by_key: Dict[str, Optional[List[Dict]]]):
+        """
+        Record the files read this run (only keys still inside the listing window).
+
+        Files that were read, even empty ones, are marked processed; failed
+        reads add one to the key's failure count.
+        """
+        keys = {k: processed_keys[k] for k in window_keys if k in processed_keys}
+        read_count = 0
+        for key, events in events_by_key.items():
+            if events is None:
+                keys[key] = keys.get(key, 0) + 1
+                if keys[key] >= MAX_READ_ATTEMPTS:
+                    print(f"   ⚠️  Giving up on {key} after {keys[key]} failed reads")
+            else:
+                keys[key] = 0
+                read_count += 1
+        try:
+            self.save_processed_keys(keys)
+            print(f"   ✅ Recorded {read_count} newly processed event files")
+        except Exception as e:
+            print(f"   ⚠️  Error saving processed keys: {e}")
+
 
 def main():
     """Run SendGrid webhook event processing."""
@@ -2,10 +2,15 @@ from square.client import Client
 from square.http.auth.o_auth_2 import BearerAuthCredentials
 import os
 import datetime
+import numpy as np
 import pandas as pd
 import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from data_pipeline import config
+from data_pipeline import pipeline_telemetry
 from utils.stripe_and_square_helpers import (
     extract_event_and_programming_subcategory,
     get_unique_event_and_programming_subcategories,
@@ -15,6 +20,9 @@ from utils.stripe_and_square_helpers import (
     transform_payments_data,
 )
 
+# batch_retrieve_orders accepts at most 100 order IDs per call
+SQUARE_BATCH_RETRIEVE_LIMIT = 100
+
 
 class SquareFetcher:
     """
@@ -502,109 +510,202 @@ class SquareFetcher:
             orders_list = data.get("orders", [])
             return SquareFetcher.create_orders_dataframe(orders_list)
 
-    def create_enhanced_payments_dataframe(self, payments_list, orders_list):
+    @staticmethod
+    def _money_amount(obj, field):
+        """Amount in dollars of a money field on a dict or SDK object (0 if missing)."""
+        if isinstance(obj, dict):
+            return obj.get(field, {}).get('amount', 0) / 100
+        money = getattr(obj, field, None)
+        return money.amount / 100 if money else 0
+
+    @classmethod
+    def normalize_payments(cls, payments_list):
         """
-        Enhanced version that handles amount splitting and categorization.
-        Now handles both dict and object formats.
+        Flatten payments (dict or SDK object) into a columnar DataFrame.
+
+        Returns:
+            DataFrame with payment_id, order_id, created_at, payment_amount,
+            payment_status, payment_type - one row per payment, in input order
+        """
+        columns = {name: [] for name in (
+            "payment_id", "order_id", "created_at", "payment_amount",
+            "payment_status", "payment_type")}
+        for payment in payments_list:
+            if isinstance(payment, dict):
+                amount_money = payment.get('amount_money', {})
+                columns["payment_id"].append(payment.get('id'))
+                columns["order_id"].append(payment.get('order_id'))
+                columns["created_at"].append(payment.get('created_at'))
+                columns["payment_amount"].append(amount_money.get('amount', 0) / 100 if amount_money else 0)
+                columns["payment_status"].append(payment.get('status'))
+                columns["payment_type"].append(payment.get('source_type'))
+            else:
+                columns["payment_id"].append(payment.id)
+                columns["order_id"].append(payment.order_id)
+                columns["created_at"].append(payment.created_at)
+                columns["payment_amount"].append(cls._money_amount(payment, 'amount_money'))
+                columns["payment_status"].append(payment.status)
+                columns["payment_type"].append(payment.source_type)
+        return pd.DataFrame(columns)
+
+    @classmethod
+    def normalize_line_items(cls, orders_list):
         """
-        # Build orders lookup - handle both dict and object formats
+        Flatten the line items of orders (dict or SDK object) into a columnar DataFrame.
+
+        Returns:
+            DataFrame with one row per line item: order_id, item_number (1-based),
+            name, description, pre_tax, tax, discount, quantity, item_total, order_state
+        """
+        columns = {name: [] for name in (
+            "order_id", "item_number", "name", "description", "pre_tax", "tax",
+            "discount", "quantity", "item_total", "order_state")}
+        # Build orders lookup first so a repeated order ID keeps its last version
         orders_lookup = {}
         for order in orders_list:
             order_id = order.get('id') if isinstance(order, dict) else order.id
             orders_lookup[order_id] = order
 
-        data = []
-        for payment in payments_list:
-            # Handle both dict and object formats for payment
-            if isinstance(payment, dict):
-                payment_id = payment.get('id')
-                order_id = payment.get('order_id')
-                created_at = payment.get('created_at')
-                amount_money = payment.get('amount_money', {})
-                payment_amount = amount_money.get('amount', 0) / 100 if amount_money else 0
-                payment_status = payment.get('status')
-                payment_type = payment.get('source_type')
+        for order_id, order in orders_lookup.items():
+            if isinstance(order, dict):
+                line_items = order.get('line_items', [])
+                order_state = order.get('state')
             else:
-                payment_id = payment.id
-                order_id = payment.order_id
-                created_at = payment.created_at
-                payment_amount = payment.amount_money.amount / 100 if payment.amount_money else 0
-                payment_status = payment.status
-                payment_type = payment.source_type
+                line_items = order.line_items or []
+                order_state = order.state
 
-            order = orders_lookup.get(order_id) if order_id else None
+            for number, item in enumerate(line_items, start=1):
+                if isinstance(item, dict):
+                    name = item.get('name', 'No Name')
+                    description = item.get('variation_name', 'No Description')
+                    quantity = int(item.get('quantity', '1'))
+                else:
+                    name = item.name or "No Name"
+                    description = item.variation_name or "No Description"
+                    quantity = int(item.quantity if hasattr(item, 'quantity') and item.quantity else 1)
+                columns["order_id"].append(order_id)
+                columns["item_number"].append(number)
+                columns["name"].append(name)
+                columns["description"].append(description)
+                columns["pre_tax"].append(cls._money_amount(item, 'base_price_money'))
+                columns["tax"].append(cls._money_amount(item, 'total_tax_money'))
+                columns["discount"].append(cls._money_amount(item, 'total_discount_money'))
+                columns["quantity"].append(quantity)
+                columns["item_total"].append(cls._money_amount(item, 'total_money'))
+                columns["order_state"].append(order_state)
+        return pd.DataFrame(columns)
 
-            # Handle both dict and object formats for order
-            if order:
-                line_items = order.get('line_items', []) if isinstance(order, dict) else (order.line_items or [])
-                order_state = order.get('state') if isinstance(order, dict) else order.state
-            else:
-                line_items = []
-                order_state = None
-
-            if line_items:
-                # Use actual line item amounts, but split payment amount if there are discrepancies
-                split_amounts = self.split_payment_amount_dict(payment_amount, line_items)
-
-                for i, (item, split_amount) in enumerate(zip(line_items, split_amounts)):
-                    # Handle both dict and object formats for line items
-                    if isinstance(item, dict):
-                        name = item.get('name', 'No Name')
-                        description = item.get('variation_name', 'No Description')
-                        item_pre_tax_money = item.get('base_price_money', {}).get('amount', 0) / 100
-                        item_tax_money = item.get('total_tax_money', {}).get('amount', 0) / 100
-                        item_discount_money = item.get('total_discount_money', {}).get('amount', 0) / 100
-                        quantity = int(item.get('quantity', '1'))
-                    else:
-                        name = item.name or "No Name"
-                        description = item.variation_name or "No Description"
-                        item_pre_tax_money = item.base_price_money.amount / 100 if item.base_price_money else 0
-                        item_tax_money = item.total_tax_money.amount / 100 if item.total_tax_money else 0
-                        item_discount_money = item.total_discount_money.amount / 100 if item.total_discount_money else 0
-                        quantity = int(item.quantity if hasattr(item, 'quantity') and item.quantity else 1)
-
-                    # Use actual line item amounts for individual fields
-                    # Use split amount for Total Amount to account for any payment-level adjustments
-                    data.append({
-                        "transaction_id": f"{payment_id}_item_{i+1}",
-                        "Description": description,
-                        "Pre-Tax Amount": item_pre_tax_money,
-                        "Tax Amount": item_tax_money,
-                        "Discount Amount": item_discount_money,
-                        "Name": name,
-                        "Total Amount": split_amount,  # Always use the split amount here!
-                        "Date": created_at,
-                        "base_price_amount": item_pre_tax_money,
-                        "status": order_state,
-                        "payment_id": payment_id,
-                        "order_id": order_id,
-                        "payment_status": payment_status,
-                        "payment_type": payment_type,
-                        "quantity": quantity,  # Store quantity for later use
-                    })
-            else:
-                # Categorize payment without order
-                category, subcategory = self.categorize_payment_without_order(payment)
-                data.append({
-                    "transaction_id": payment_id,
-                    "Description": "Payment without order details",
-                    "Pre-Tax Amount": payment_amount / 1.0825,  # Estimate pre-tax
-                    "Tax Amount": payment_amount - (payment_amount / 1.0825),
-                    "Discount Amount": 0,
-                    "Name": "Payment",
-                    "Total Amount": payment_amount,
-                    "Date": created_at,
-                    "base_price_amount": payment_amount / 1.0825,
-                    "status": "PAID",
-                    "payment_id": payment_id,
-                    "order_id": order_id,
-                    "payment_status": payment_status,
-                    "payment_type": payment_type,
-                })
+    @staticmethod
+    def split_amounts_by_group(df, group_col, amount_col, weight_col):
+        """
+        Vectorized version of split_payment_amount_dict over many payments at once.
+
+        Splits each group's amount across its rows in proportion to weight_col
+        (equal split when the group's weights sum to 0), then puts any rounding
+        difference over 1 cent on the group's last row.
+
+        Returns:
+            Series of split amounts aligned with df
+        """
+        if df.empty:
+            return pd.Series(dtype=float, index=df.index)
+
+        groups = df.groupby(group_col, sort=False)
+        weight_total = groups[weight_col].transform('sum')
+        group_size = groups[weight_col].transform('size')
+        amount = df[amount_col]
+
+        splits = np.where(
+            weight_total == 0,
+            amount / group_size,
+            amount * (df[weight_col] / weight_total.where(weight_total != 0, 1)),
+        )
+        splits = pd.Series(splits, index=df.index)
+
+        mismatched = (weight_total != 0) & ((weight_total - amount).abs() > 0.01)
+        if mismatched.any():
+            print(f"{df.loc[mismatched, group_col].nunique()} payment amounts don't match their "
+                  f"line items total (discounts, fees, or other adjustments)")
+
+        # Adjust for rounding errors
+        residual = amount - splits.groupby(df[group_col], sort=False).transform('sum')
+        is_last = ~df[group_col].duplicated(keep='last')
+        adjust = is_last & (residual.abs() > 0.01)
+        splits[adjust] += residual[adjust]
+        return splits
+
+    def create_enhanced_payments_dataframe(self, payments_list, orders_list):
+        """
+        Enhanced version that handles amount splitting and categorization.
+        Now handles both dict and object formats.
+
+        Payments and line items are normalized once into flat frames and the
+        per-payment amount split is done as one grouped operation over all
+        line items, instead of building a dict per line item.
+        """
+        payments = self.normalize_payments(payments_list)
+        items = self.normalize_line_items(orders_list)
+        payments["payment_position"] = np.arange(len(payments))
+
+        # Payments with order line items -> one row per line item
+        payments["order_id"] = payments["order_id"].astype(object)
+        items["order_id"] = items["order_id"].astype(object)
+        with_items = payments[payments["order_id"].notna()].merge(
+            items, on="order_id", how="inner", sort=False
+        ).sort_values(["payment_position", "item_number"], kind="stable")
+
+        item_rows = pd.DataFrame({
+            "transaction_id": with_items["payment_id"].astype(str) + "_item_" + with_items["item_number"].astype(str),
+            "Description": with_items["description"],
+            "Pre-Tax Amount": with_items["pre_tax"],
+            "Tax Amount": with_items["tax"],
+            "Discount Amount": with_items["discount"],
+            "Name": with_items["name"],
+            "Total Amount": self.split_amounts_by_group(
+                with_items, "payment_position", "payment_amount", "item_total"
+            ),  # Always use the split amount here!
+            "Date": with_items["created_at"],
+            "base_price_amount": with_items["pre_tax"],
+            "status": with_items["order_state"],
+            "payment_id": with_items["payment_id"],
+            "order_id": with_items["order_id"],
+            "payment_status": with_items["payment_status"],
+            "payment_type": with_items["payment_type"],
+            "quantity": with_items["quantity"],
+            "payment_position": with_items["payment_position"],
+            "item_number": with_items["item_number"],
+        })
+
+        # Payments without an order (or with an empty order) -> one estimated row
+        no_items = payments[~payments["payment_position"].isin(with_items["payment_position"])]
+        amount = no_items["payment_amount"]
+        no_item_rows = pd.DataFrame({
+            "transaction_id": no_items["payment_id"],
+            "Description": "Payment without order details",
+            "Pre-Tax Amount": amount / 1.0825,  # Estimate pre-tax
+            "Tax Amount": amount - (amount / 1.0825),
+            "Discount Amount": 0,
+            "Name": "Payment",
+            "Total Amount": amount,
+            "Date": no_items["created_at"],
+            "base_price_amount": amount / 1.0825,
+            "status": "PAID",
+            "payment_id": no_items["payment_id"],
+            "order_id": no_items["order_id"],
+            "payment_status": no_items["payment_status"],
+            "payment_type": no_items["payment_type"],
+            "payment_position": no_items["payment_position"],
+            "item_number": 0,
+        })
+
+        frames = [f for f in (item_rows, no_item_rows) if not f.empty]
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+            df = df.sort_values(["payment_position", "item_number"], kind="stable", ignore_index=True)
+            df = df.drop(columns=["payment_position", "item_number"])
+        else:
+            df = pd.DataFrame()
 
-        # Create DataFrame
-        df = pd.DataFrame(data)
-        
         # Ensure all expected columns exist
         expected_cols = [
             "transaction_id", "Description", "Pre-Tax Amount", "Tax Amount", 
@@ -720,42 +821,62 @@ class SquareFetcher:
         else:
             return "unknown", "unknown"
 
-    def pull_and_transform_square_payment_data_strict(
-        self,
-        start_date: datetime.datetime,
-        end_date: datetime.datetime,
-        save_json: bool = False,
-        save_csv: bool = False,
-    ) -> pd.DataFrame:
-        """
-        Strict validation method: Only include transactions where BOTH payment is COMPLETED
-        AND associated order is COMPLETED. This ensures only fully completed transactions.
-        """
-        # Initialize the Square Client
-        client = Client(
+    def _create_client(self):
+        return Client(
             bearer_auth_credentials=BearerAuthCredentials(
                 access_token=self.square_token
             ),
             environment='production'
         )
 
-        # Format the dates in ISO 8601 format
-        end_time = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-        begin_time = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+    def _get_client(self):
+        """Return a Square client for the current thread (clients are not shared across workers)."""
+        local = self.__dict__.setdefault("_client_local", threading.local())
+        if not hasattr(local, "client"):
+            local.client = self._create_client()
+        return local.client
+
+    @staticmethod
+    def split_date_range(start_date, end_date, window_days):
+        """
+        Split [start_date, end_date) into consecutive windows of window_days.
 
-        print(f"Pulling STRICT Square data from {begin_time} to {end_time}")
+        Returns:
+            List of (window_start, window_end) datetimes in chronological order.
+            A window_days of None or 0 returns the whole range as one window.
+        """
+        if not window_days:
+            return [(start_date, end_date)]
+        windows = []
+        window_start = start_date
+        step = datetime.timedelta(days=window_days)
+        while window_start < end_date:
+            window_end = min(window_start + step, end_date)
+            windows.append((window_start, window_end))
+            window_start = window_end
+        return windows
+
+    def list_completed_payments(self, begin_time: str, end_time: str):
+        """
+        Page through list_payments for one window, newest first.
 
-        # Step 1: Pull all payments with COMPLETED status (with pagination)
+        Returns:
+            Tuple of (COMPLETED payments, number of pages fetched)
+
+        Raises:
+            RuntimeError: If Square returns an error for any page
+        """
+        client = self._get_client()
         payments = []
         cursor = None
         page_count = 0
 
         while True:
             page_count += 1
-            # Build parameters for list_payments
             params = {
                 'begin_time': begin_time,
                 'end_time': end_time,
+                'sort_order': 'DESC',  # Newest first, like the single-request fetch
                 'limit': 100  # Max per page
             }
             if cursor:
@@ -764,131 +885,73 @@ class SquareFetcher:
             result = client.payments.list_payments(**params)
             if result.is_success():
                 batch_payments = result.body.get('payments', [])
-                print(f"  Page {page_count}: Retrieved {len(batch_payments)} payments")
-
-                for payment in batch_payments:
-                    # Filter for only completed payments
-                    if payment.get('status') == 'COMPLETED':
-                        payments.append(payment)
+                payments.extend(p for p in batch_payments if p.get('status') == 'COMPLETED')
 
-                # Check for more pages
                 cursor = result.body.get('cursor')
                 if not cursor:
                     break
             elif result.is_error():
-                print("Error fetching payments:", result.errors)
-                break
-
-        print(f"Total COMPLETED payments retrieved: {len(payments)} (from {page_count} pages)")
-
-        # Step 2: Batch fetch all orders using search_orders (much faster than individual retrieve calls)
-        print(f"Batch fetching orders for validation...")
-
-        # Get unique order IDs from payments
-        order_ids = set()
-        for payment in payments:
-            order_id = payment.get('order_id') if isinstance(payment, dict) else payment.order_id
-            if order_id:
-                order_ids.add(order_id)
+                raise RuntimeError(f"Error fetching payments for {begin_time} to {end_time} "
+                                   f"(page {page_count}): {result.errors}")
 
-        print(f"Found {len(order_ids)} unique orders to validate")
-
-        # Fetch all orders in batches using search_orders
-        orders_dict = {}
-        cursor = None
-        orders_page_count = 0
-
-        while True:
-            orders_page_count += 1
-            body = {
-                "location_ids": [self.location_id],
-                "query": {
-                    "filter": {
-                        "date_time_filter": {
-                            "created_at": {"start_at": begin_time, "end_at": end_time}
-                        }
-                    }
-                },
-                "limit": 1000
-            }
-            if cursor:
-                body["cursor"] = cursor
+        return payments, page_count
 
-            result = client.orders.search_orders(body=body)
-            if hasattr(result, 'is_success') and result.is_success():
-                batch_orders = result.body.get('orders', [])
-            elif hasattr(result, 'orders'):
-                batch_orders = result.orders or []
-            else:
-                batch_orders = result.get('orders', []) if isinstance(result, dict) else []
-
-            # Build lookup dictionary
-            for order in batch_orders:
-                order_id = order.get('id') if isinstance(order, dict) else order.id
-                if order_id in order_ids:  # Only store orders we need
-                    orders_dict[order_id] = order
-
-            print(f"  Orders page {orders_page_count}: Retrieved {len(batch_orders)} orders, {len([o for o in batch_orders if (o.get('id') if isinstance(o, dict) else o.id) in order_ids])} relevant")
-
-            # Check for more pages
-            if hasattr(result, 'cursor'):
-                cursor = result.cursor
-            elif hasattr(result, 'body'):
-                cursor = result.body.get('cursor')
-            else:
-                cursor = result.get('cursor') if isinstance(result, dict) else None
+    def batch_retrieve_orders(self, order_ids):
+        """
+        Look up up to SQUARE_BATCH_RETRIEVE_LIMIT orders in one batch_retrieve_orders call.
 
-            if not cursor:
-                break
+        Returns:
+            Dict of order_id -> order
 
-        print(f"Loaded {len(orders_dict)} orders for validation")
+        Raises:
+            RuntimeError: If Square returns an error for the batch
+        """
+        client = self._get_client()
+        result = client.orders.batch_retrieve_orders(
+            body={"location_id": self.location_id, "order_ids": list(order_ids)}
+        )
+        if result.is_success():
+            return {order.get('id'): order for order in result.body.get('orders', [])}
+        raise RuntimeError(f"Error retrieving {len(order_ids)} orders: {result.errors}")
 
-        # Step 3: Validate payments against orders in memory (no more API calls!)
-        validated_transactions = []
-        orders_checked = 0
-        orders_completed = 0
-        payments_without_orders = 0
+    def _build_strict_rows(self, payments, orders_dict, stats):
+        """
+        Validate payments against their orders and build one row per line item.
 
+        Only payments whose order is COMPLETED produce rows. Counts are
+        accumulated into stats for the validation report.
+        """
+        data = []
         for payment in payments:
+            stats["payments"] += 1
             # Handle dict format
             order_id = payment.get('order_id') if isinstance(payment, dict) else payment.order_id
             payment_id = payment.get('id') if isinstance(payment, dict) else payment.id
 
-            if order_id:
-                orders_checked += 1
-                order = orders_dict.get(order_id)
+            if not order_id:
+                stats["payments_without_orders"] += 1
+                continue
 
-                if order:
-                    order_state = order.get('state') if isinstance(order, dict) else order.state
+            stats["orders_checked"] += 1
+            order = orders_dict.get(order_id)
+            if not order:
+                print(f"Payment {payment_id} order {order_id} not found - FILTERED OUT")
+                continue
 
-                    if order_state == "COMPLETED":
-                        orders_completed += 1
-                        validated_transactions.append((payment, order))
-                    else:
-                        print(f"Payment {payment_id} has order {order_id} with state '{order_state}' - FILTERED OUT")
-                else:
-                    print(f"Payment {payment_id} order {order_id} not found in search results - FILTERED OUT")
-            else:
-                payments_without_orders += 1
+            order_state = order.get('state') if isinstance(order, dict) else order.state
+            if order_state != "COMPLETED":
+                print(f"Payment {payment_id} has order {order_id} with state '{order_state}' - FILTERED OUT")
+                continue
 
-        print(f"STRICT validation results:")
-        print(f"  Orders checked: {orders_checked}")
-        print(f"  Orders with COMPLETED state: {orders_completed}")
-        print(f"  Payments without orders: {payments_without_orders}")
-        print(f"  Final validated transactions: {len(validated_transactions)}")
-        print(f"  Filtered out: {len(payments) - len(validated_transactions)} transactions")
+            stats["orders_completed"] += 1
+            stats["validated"] += 1
 
-        # Step 3: Create DataFrame from validated transactions only
-        data = []
-        for payment, order in validated_transactions:
             # Handle dict format for payment
             if isinstance(payment, dict):
-                payment_id = payment.get('id')
                 created_at = payment.get('created_at')
                 amount_money = payment.get('amount_money', {})
                 payment_amount = amount_money.get('amount', 0) / 100 if amount_money else 0
             else:
-                payment_id = payment.id
                 created_at = payment.created_at
                 payment_amount = payment.amount_money.amount / 100 if payment.amount_money else 0
 
@@ -900,44 +963,173 @@ class SquareFetcher:
                 line_items = order.line_items or []
                 order_id = order.id
 
-            if line_items:
-                # Use dict-compatible split method
-                split_amounts = self.split_payment_amount_dict(payment_amount, line_items)
-
-                for i, (item, split_amount) in enumerate(zip(line_items, split_amounts)):
-                    # Handle dict format for line items
-                    if isinstance(item, dict):
-                        name = item.get('name', 'No Name')
-                        description = item.get('variation_name', 'No Description')
-                        item_pre_tax_money = item.get('base_price_money', {}).get('amount', 0) / 100
-                        item_tax_money = item.get('total_tax_money', {}).get('amount', 0) / 100
-                        item_discount_money = item.get('total_discount_money', {}).get('amount', 0) / 100
-                        quantity = int(item.get('quantity', '1'))
-                    else:
-                        name = item.name or "No Name"
-                        description = item.variation_name or "No Description"
-                        item_pre_tax_money = item.base_price_money.amount / 100 if item.base_price_money else 0
-                        item_tax_money = item.total_tax_money.amount / 100 if item.total_tax_money else 0
-                        item_discount_money = item.total_discount_money.amount / 100 if item.total_discount_money else 0
-                        quantity = int(item.quantity if hasattr(item, 'quantity') and item.quantity else 1)
-
-                    data.append({
-                        "transaction_id": f"{payment_id}_item_{i+1}",
-                        "Description": description,
-                        "Pre-Tax Amount": item_pre_tax_money,
-                        "Tax Amount": item_tax_money,
-                        "Discount Amount": item_discount_money,
-                        "Name": name,
-                        "Total Amount": split_amount,
-                        "Date": created_at,
-                        "base_price_amount": item_pre_tax_money,
-                        "status": "VALIDATED_COMPLETED",  # Mark as validated
-                        "payment_id": payment_id,
-                        "order_id": order_id,
-                        "quantity": quantity,  # Store quantity for later use
-                    })
-
-        # Create DataFrame
+            if not line_items:
+                continue
+
+            # Use dict-compatible split method
+            split_amounts = self.split_payment_amount_dict(payment_amount, line_items)
+
+            for i, (item, split_amount) in enumerate(zip(line_items, split_amounts)):
+                # Handle dict format for line items
+                if isinstance(item, dict):
+                    name = item.get('name', 'No Name')
+                    description = item.get('variation_name', 'No Description')
+                    item_pre_tax_money = item.get('base_price_money', {}).get('amount', 0) / 100
+                    item_tax_money = item.get('total_tax_money', {}).get('amount', 0) / 100
+                    item_discount_money = item.get('total_discount_money', {}).get('amount', 0) / 100
+                    quantity = int(item.get('quantity', '1'))
+                else:
+                    name = item.name or "No Name"
+                    description = item.variation_name or "No Description"
+                    item_pre_tax_money = item.base_price_money.amount / 100 if item.base_price_money else 0
+                    item_tax_money = item.total_tax_money.amount / 100 if item.total_tax_money else 0
+                    item_discount_money = item.total_discount_money.amount / 100 if item.total_discount_money else 0
+                    quantity = int(item.quantity if hasattr(item, 'quantity') and item.quantity else 1)
+
+                data.append({
+                    "transaction_id": f"{payment_id}_item_{i+1}",
+                    "Description": description,
+                    "Pre-Tax Amount": item_pre_tax_money,
+                    "Tax Amount": item_tax_money,
+                    "Discount Amount": item_discount_money,
+                    "Name": name,
+                    "Total Amount": split_amount,
+                    "Date": created_at,
+                    "base_price_amount": item_pre_tax_money,
+                    "status": "VALIDATED_COMPLETED",  # Mark as validated
+                    "payment_id": payment_id,
+                    "order_id": order_id,
+                    "quantity": quantity,  # Store quantity for later use
+                })
+        return data
+
+    def pull_and_transform_square_payment_data_strict(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        save_json: bool = False,
+        save_csv: bool = False,
+        window_days: int = 7,
+        max_workers: int = 8,
+    ) -> pd.DataFrame:
+        """
+        Strict validation method: Only include transactions where BOTH payment is COMPLETED
+        AND associated order is COMPLETED. This ensures only fully completed transactions.
+
+        The date range is split into windows of window_days whose payments are
+        listed concurrently. As each window arrives its orders are looked up with
+        batch_retrieve_orders (chunks of 100, also concurrent), and rows are built
+        window by window, newest first, so the output is the same for any
+        window_days / max_workers (max_workers=1, window_days=None is the fully
+        sequential path).
+
+        Raises:
+            RuntimeError: If any window's payments or any order batch could not
+                be fetched; a partial result would silently drop transactions
+        """
+        end_time = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+        begin_time = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        windows = self.split_date_range(start_date, end_date, window_days)
+        print(f"Pulling STRICT Square data from {begin_time} to {end_time} "
+              f"({len(windows)} windows, {max_workers} workers)")
+
+        fetch_start = time.monotonic()
+        window_payments = {}
+        order_futures = {}  # order_id -> future of the batch that fetches it
+        api_calls = 0
+        failures = []
+        list_payments = pipeline_telemetry.in_current_context(self.list_completed_payments)
+        retrieve_orders = pipeline_telemetry.in_current_context(self.batch_retrieve_orders)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as payments_pool, \
+                ThreadPoolExecutor(max_workers=max_workers) as orders_pool:
+            payment_futures = {
+                payments_pool.submit(
+                    list_payments,
+                    w_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    w_end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                ): i
+                for i, (w_start, w_end) in enumerate(windows)
+            }
+
+            # Step 1: As each window's payments arrive, queue its order lookups
+            for done_count, future in enumerate(as_completed(payment_futures), start=1):
+                i = payment_futures[future]
+                w_start, w_end = windows[i]
+                try:
+                    payments, pages = future.result()
+                except Exception as e:
+                    print(f"  ❌ Window {w_start.strftime('%Y-%m-%d')} to {w_end.strftime('%Y-%m-%d')} failed: {e}")
+                    failures.append(str(e))
+                    continue
+                window_payments[i] = payments
+                api_calls += pages
+
+                new_order_ids = []
+                for payment in payments:
+                    order_id = payment.get('order_id')
+                    if order_id and order_id not in order_futures:
+                        order_futures[order_id] = None
+                        new_order_ids.append(order_id)
+                for j in range(0, len(new_order_ids), SQUARE_BATCH_RETRIEVE_LIMIT):
+                    chunk = new_order_ids[j:j + SQUARE_BATCH_RETRIEVE_LIMIT]
+                    order_future = orders_pool.submit(retrieve_orders, chunk)
+                    order_futures.update(dict.fromkeys(chunk, order_future))
+                    api_calls += 1
+
+                elapsed = time.monotonic() - fetch_start
+                print(f"  Window {done_count}/{len(windows)} "
+                      f"({w_start.strftime('%Y-%m-%d')} to {w_end.strftime('%Y-%m-%d')}): "
+                      f"{len(payments)} COMPLETED payments from {pages} pages, "
+                      f"{len(new_order_ids)} orders queued [{elapsed:.1f}s]")
+
+            if failures:
+                raise RuntimeError(f"Square fetch failed for {len(failures)} of {len(windows)} windows: "
+                                   + "; ".join(failures))
+
+            # Step 2: Validate and build rows window by window, newest first
+            orders_dict = {}
+            merged_futures = set()
+            seen_payment_ids = set()
+            data = []
+            stats = {"payments": 0, "orders_checked": 0, "orders_completed": 0,
+                     "payments_without_orders": 0, "validated": 0}
+
+            for i in reversed(range(len(windows))):
+                payments = []
+                for payment in window_payments[i]:
+                    if payment.get('id') in seen_payment_ids:
+                        continue  # Boundary duplicate from the previous window
+                    seen_payment_ids.add(payment.get('id'))
+                    payments.append(payment)
+
+                    order_future = order_futures.get(payment.get('order_id'))
+                    if order_future is not None and order_future not in merged_futures:
+                        merged_futures.add(order_future)
+                        try:
+                            orders_dict.update(order_future.result())
+                        except Exception as e:
+                            failures.append(str(e))
+
+                if failures:
+                    raise RuntimeError("Square order lookup failed: " + "; ".join(failures))
+
+                data.extend(self._build_strict_rows(payments, orders_dict, stats))
+
+        fetch_seconds = time.monotonic() - fetch_start
+        print(f"Fetched {stats['payments']} COMPLETED payments and {len(orders_dict)} orders "
+              f"in {fetch_seconds:.1f}s ({api_calls} API calls, "
+              f"{stats['payments'] / max(fetch_seconds, 0.001):.0f} payments/s)")
+
+        print(f"STRICT validation results:")
+        print(f"  Orders checked: {stats['orders_checked']}")
+        print(f"  Orders with COMPLETED state: {stats['orders_completed']}")
+        print(f"  Payments without orders: {stats['payments_without_orders']}")
+        print(f"  Final validated transactions: {stats['validated']}")
+        print(f"  Filtered out: {stats['payments'] - stats['validated']} transactions")
+
+        # Step 3: Create DataFrame from validated transactions only
         df = pd.DataFrame(data)
         
         # Apply transformations if data exists
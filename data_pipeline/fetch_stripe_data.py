@@ -18,10 +18,17 @@ from utils.stripe_and_square_helpers import (
 class StripeFetcher:
     """
     A class for fetching and processing Stripe payment data.
+
+    If a synced StripeObjectCache is passed, Payment Intent and refund reads
+    for windows it covers are served from the cache instead of the API.
     """
 
-    def __init__(self, stripe_key: str):
+    def __init__(self, stripe_key: str, cache=None):
         self.stripe_key = stripe_key
+        self.cache = cache
+
+    def _use_cache(self, start_date: datetime.datetime) -> bool:
+        return self.cache is not None and self.cache.covers(start_date)
 
     def save_data(self, df: pd.DataFrame, file_name: str):
         df.to_csv("data/outputs/" + file_name + ".csv", index=False)
@@ -132,21 +139,28 @@ class StripeFetcher:
         """
         print(f"Pulling Stripe Payment Intents data from {start_date} to {end_date}")
         stripe.api_key = stripe_key
-        
-        payment_intents = stripe.PaymentIntent.list(
-            created={
-                "gte": int(start_date.timestamp()),
-                "lte": int(end_date.timestamp()),
-            },
-            limit=1000000,
-        )
 
-        # Collect all Payment Intents first
-        all_payment_intents = []
-        for payment_intent in payment_intents.auto_paging_iter():
-            all_payment_intents.append(payment_intent)
+        if self._use_cache(start_date):
+            all_payment_intents = self.cache.get_payment_intents(start_date, end_date)
+            print(f"Retrieved {len(all_payment_intents)} total Payment Intents from Stripe cache")
+        else:
+            # Expand latest_charge so billing name/emails come back with each page
+            # instead of one Charge.retrieve per Payment Intent
+            payment_intents = stripe.PaymentIntent.list(
+                created={
+                    "gte": int(start_date.timestamp()),
+                    "lte": int(end_date.timestamp()),
+                },
+                limit=1000000,
+                expand=["data.latest_charge"],
+            )
+
+            # Collect all Payment Intents first
+            all_payment_intents = []
+            for payment_intent in payment_intents.auto_paging_iter():
+                all_payment_intents.append(payment_intent)
 
-        print(f"Retrieved {len(all_payment_intents)} total Payment Intents from Stripe API")
+            print(f"Retrieved {len(all_payment_intents)} total Payment Intents from Stripe API")
         
         # Filter for only successfully completed payments AND live mode (no test transactions)
         completed_payment_intents = [
@@ -217,13 +231,69 @@ class StripeFetcher:
         df = pd.DataFrame(data)
         return df
 
+    def get_charges_by_id(self, charge_ids: set, created_gte: int, created_lte: int) -> dict:
+        """
+        Fetch charges for the given IDs with one paged Charge.list over their
+        creation window, falling back to Charge.retrieve only for any that
+        the listing did not return.
+
+        Args:
+            charge_ids: Charge IDs to look up
+            created_gte: Unix timestamp lower bound for the listing
+            created_lte: Unix timestamp upper bound for the listing
+
+        Returns:
+            dict of charge_id -> charge
+        """
+        charges = {}
+        if not charge_ids:
+            return charges
+
+        try:
+            listed = stripe.Charge.list(
+                created={"gte": created_gte, "lte": created_lte},
+                limit=100,
+            )
+            for charge in listed.auto_paging_iter():
+                if charge.id in charge_ids:
+                    charges[charge.id] = charge
+        except Exception as e:
+            print(f"Error listing charges: {e}")
+
+        missing = charge_ids - charges.keys()
+        if missing:
+            print(f"Retrieving {len(missing)} charges outside the listed window individually")
+        for charge_id in missing:
+            try:
+                charges[charge_id] = stripe.Charge.retrieve(charge_id)
+            except Exception:
+                pass  # Keep defaults if charge retrieval fails
+        return charges
+
     def create_stripe_payment_intents_df(self, payment_intents: list) -> pd.DataFrame:
         """
         Create a DataFrame from Payment Intents data (new method).
+
+        Billing details come from each Payment Intent's latest_charge, which
+        pull_stripe_payment_intents_data_raw expands in the listing. Any
+        latest_charge still given as an ID is resolved in bulk with
+        get_charges_by_id rather than one request per Payment Intent.
         """
         data = []
         transaction_count = 0
-        
+
+        unexpanded = {
+            pi["latest_charge"] for pi in payment_intents
+            if isinstance(pi.get("latest_charge"), str)
+        }
+        charges_by_id = {}
+        if unexpanded:
+            created = [pi["created"] for pi in payment_intents]
+            # Charges are created at or shortly after their Payment Intent
+            charges_by_id = self.get_charges_by_id(
+                unexpanded, min(created), max(created) + 7 * 24 * 3600
+            )
+
         for payment_intent in payment_intents:
             # Only process succeeded payment intents (already filtered)
             transaction_count += 1
@@ -238,15 +308,15 @@ class StripeFetcher:
             name = "No Name"
             receipt_email = None
             billing_email = None
-            if payment_intent.get("latest_charge"):
-                try:
-                    charge = stripe.Charge.retrieve(payment_intent["latest_charge"])
-                    if charge.get("billing_details", {}).get("name"):
-                        name = charge["billing_details"]["name"]
-                    receipt_email = charge.get("receipt_email")
-                    billing_email = charge.get("billing_details", {}).get("email")
-                except:
-                    pass  # Keep defaults if charge retrieval fails
+            charge = payment_intent.get("latest_charge")
+            if isinstance(charge, str):
+                charge = charges_by_id.get(charge)
+            if charge:
+                billing_details = charge.get("billing_details") or {}
+                if billing_details.get("name"):
+                    name = billing_details["name"]
+                receipt_email = charge.get("receipt_email")
+                billing_email = billing_details.get("email")
 
             stripe_customer_id = payment_intent.get("customer")
 
@@ -391,7 +461,10 @@ class StripeFetcher:
         """
         import stripe
         stripe.api_key = stripe_key
-        
+
+        if self._use_cache(start_date):
+            return self.cache.get_refunds(start_date, end_date)
+
         start_timestamp = int(start_date.timestamp())
         end_timestamp = int(end_date.timestamp())
         
@@ -463,15 +536,17 @@ class StripeFetcher:
         stripe.api_key = stripe_key
 
         # Fetch all payment intents (including failed ones)
-        payment_intents = stripe.PaymentIntent.list(
-            created={
-                "gte": int(start_date.timestamp()),
-                "lte": int(end_date.timestamp()),
-            },
-            limit=1000,
-        )
-
-        all_pis = list(payment_intents.auto_paging_iter())
+        if self._use_cache(start_date):
+            all_pis = self.cache.get_payment_intents(start_date, end_date)
+        else:
+            payment_intents = stripe.PaymentIntent.list(
+                created={
+                    "gte": int(start_date.timestamp()),
+                    "lte": int(end_date.timestamp()),
+                },
+                limit=1000,
+            )
+            all_pis = list(payment_intents.auto_paging_iter())
         print(f"Retrieved {len(all_pis)} total Payment Intents")
 
         # Filter to failed/incomplete statuses
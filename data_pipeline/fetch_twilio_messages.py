@@ -1,8 +1,11 @@
 """
 Fetch and Store Twilio Message History
 
-Fetches all Twilio SMS messages and stores them for analysis.
-Tracks all inbound and outbound messages with full details.
+Fetches Twilio SMS messages and stores them for analysis.
+Tracks all inbound and outbound messages with full details. Each run reads
+messages sent since the last run (see twilio_message_sync), plus the last
+few days again so delivery status, error codes and prices that Twilio
+updates after sending replace the stored values.
 
 Storage:
 - s3://basin-climbing-data-prod/twilio/messages.csv (all messages)
@@ -17,6 +20,9 @@ import boto3
 from io import StringIO
 from typing import Optional
 
+from data_pipeline import config
+from data_pipeline.twilio_message_sync import IncrementalMessageReader
+
 
 class TwilioMessageFetcher:
     """
@@ -45,36 +51,30 @@ class TwilioMessageFetcher:
             aws_secret_access_key=self.aws_secret_access_key
         )
 
+        self.reader = IncrementalMessageReader(
+            self.twilio_client, self.s3_client, self.bucket_name, config.s3_path_twilio_messages_sync_state,
+            overlap=timedelta(days=config.twilio_message_refresh_days),
+        )
+
         print("✅ Twilio Message Fetcher initialized")
 
-    def fetch_messages(self, days_back: Optional[int] = None, limit: int = 5000):
+    def fetch_messages(self, days_back: Optional[int] = None):
         """
-        Fetch Twilio messages.
+        Fetch Twilio messages sent since the last sync.
 
         Args:
-            days_back: Only fetch messages from last N days (default: all via limit)
-            limit: Maximum messages to fetch (default: 5000)
+            days_back: How far back to start when there's no cursor yet
+                (default: all history)
 
         Returns:
             DataFrame with messages
         """
         print(f"\nFetching Twilio messages...")
-        if days_back:
-            date_sent_after = datetime.utcnow() - timedelta(days=days_back)
-            print(f"  Date range: last {days_back} days (since {date_sent_after.date()})")
-            messages = self.twilio_client.messages.list(
-                date_sent_after=date_sent_after,
-                limit=limit
-            )
-        else:
-            print(f"  Fetching up to {limit} messages")
-            messages = self.twilio_client.messages.list(limit=limit)
-
-        print(f"✅ Fetched {len(messages)} messages from Twilio")
+        start = datetime.utcnow() - timedelta(days=days_back) if days_back else None
 
-        # Convert to DataFrame
+        # Convert to rows as the pages stream in
         message_data = []
-        for msg in messages:
+        for msg in self.reader.messages(start=start):
             message_data.append({
                 'message_sid': msg.sid,
                 'date_sent': msg.date_sent.isoformat() if msg.date_sent else None,
@@ -91,6 +91,8 @@ class TwilioMessageFetcher:
                 'price_unit': msg.price_unit
             })
 
+        print(f"✅ Fetched {len(message_data)} messages from Twilio")
+
         df = pd.DataFrame(message_data)
 
         # Add parsed fields
@@ -151,20 +153,21 @@ class TwilioMessageFetcher:
         if len(existing) > 0 and len(new_messages) > 0:
             all_messages = pd.concat([existing, new_messages], ignore_index=True)
 
-            # Deduplicate by message_sid
+            # Deduplicate by message_sid; re-read messages replace the stored copy
             before_count = len(all_messages)
             all_messages = all_messages.drop_duplicates(subset=['message_sid'], keep='last')
             after_count = len(all_messages)
 
             if before_count > after_count:
-                print(f"   Removed {before_count - after_count} duplicate messages")
+                print(f"   Refreshed {before_count - after_count} already stored messages")
 
             # Sort by date
             all_messages = all_messages.sort_values('date_sent', ascending=False)
         elif len(new_messages) > 0:
             all_messages = new_messages
         else:
-            all_messages = existing
+            print("ℹ️  No new messages since last sync")
+            return existing
 
         # Save to S3 (keep phone numbers as strings with dtype)
         csv_buffer = StringIO()
@@ -196,13 +199,12 @@ class TwilioMessageFetcher:
 
         return all_messages
 
-    def fetch_and_save(self, days_back: Optional[int] = None, limit: int = 5000, save_local: bool = False):
+    def fetch_and_save(self, days_back: Optional[int] = None, save_local: bool = False):
         """
-        Convenience method: Fetch messages and save to S3.
+        Convenience method: Fetch new messages and save to S3.
 
         Args:
-            days_back: Only fetch messages from last N days
-            limit: Maximum messages to fetch
+            days_back: How far back to start when there's no cursor yet
             save_local: Whether to save local copy
 
         Returns:
@@ -213,10 +215,11 @@ class TwilioMessageFetcher:
         print("="*80)
 
         # Fetch new messages
-        new_messages = self.fetch_messages(days_back=days_back, limit=limit)
+        new_messages = self.fetch_messages(days_back=days_back)
 
-        # Merge and save
+        # Merge and save, then advance the cursor past what was stored
         all_messages = self.merge_and_save(new_messages, save_local=save_local)
+        self.reader.commit()
 
         print("\n" + "="*80)
         print("✅ SYNC COMPLETE")
@@ -254,8 +257,8 @@ def main():
 
     fetcher = TwilioMessageFetcher()
 
-    # Fetch last 30 days of messages (or up to 5000)
-    messages = fetcher.fetch_and_save(days_back=30, limit=5000, save_local=True)
+    # Fetch messages since the last sync (last 30 days on the first run)
+    messages = fetcher.fetch_and_save(days_back=30, save_local=True)
 
     # Show sample
     if len(messages) > 0:
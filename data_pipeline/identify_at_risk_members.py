@@ -11,6 +11,11 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import os
 
+from data_pipeline import checkin_store
+
+# Check-in history the identifier looks at (2 months, with a little margin)
+CHECKIN_LOOKBACK_DAYS = 62
+
 
 class AtRiskMemberIdentifier:
     """
@@ -287,10 +292,11 @@ def load_data_from_s3(aws_access_key_id: str, aws_secret_access_key: str,
 
     data = {}
 
-    # Load check-ins
+    # Load check-ins: the last two months, plus each member's most recent
+    # check-in so "last visit" is still known for members who stopped coming
     print("  Loading check-ins...")
-    checkins_obj = s3.get_object(Bucket=bucket_name, Key='capitan/checkins.csv')
-    data['checkins'] = pd.read_csv(checkins_obj['Body'])
+    since = datetime.now() - timedelta(days=CHECKIN_LOOKBACK_DAYS)
+    data['checkins'] = checkin_store.load_checkins(since=since, with_latest_per_customer=True)
     data['checkins']['checkin_datetime'] = pd.to_datetime(data['checkins']['checkin_datetime'])
 
     # Load members
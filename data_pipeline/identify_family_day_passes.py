@@ -6,11 +6,12 @@ Useful for targeted marketing to convert frequent day pass users to memberships.
 """
 
 import pandas as pd
-import boto3
 from datetime import datetime
 from typing import Dict
 import os
 
+from data_pipeline import checkin_store
+
 
 class FamilyDayPassIdentifier:
     """
@@ -100,29 +101,16 @@ class FamilyDayPassIdentifier:
         return df_result
 
 
-def load_checkins_from_s3(aws_access_key_id: str, aws_secret_access_key: str,
-                          bucket_name: str) -> pd.DataFrame:
+def load_checkins_from_s3() -> pd.DataFrame:
     """
-    Load check-in data from S3.
-
-    Args:
-        aws_access_key_id: AWS access key
-        aws_secret_access_key: AWS secret key
-        bucket_name: S3 bucket name
+    Load check-in data from the partitioned check-in store in S3.
 
     Returns:
         DataFrame with check-in data
     """
     print("Loading check-ins from S3...")
 
-    s3 = boto3.client(
-        's3',
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key
-    )
-
-    checkins_obj = s3.get_object(Bucket=bucket_name, Key='capitan/checkins.csv')
-    df_checkins = pd.read_csv(checkins_obj['Body'])
+    df_checkins = checkin_store.load_checkins()
     df_checkins['checkin_datetime'] = pd.to_datetime(df_checkins['checkin_datetime'])
 
     print(f"✓ Loaded {len(df_checkins):,} check-in records")
@@ -137,7 +125,6 @@ def main():
     # Get credentials from environment
     aws_access_key_id = os.getenv('AWS_ACCESS_KEY_ID')
     aws_secret_access_key = os.getenv('AWS_SECRET_ACCESS_KEY')
-    bucket_name = 'basin-climbing-data-prod'
 
     if not aws_access_key_id or not aws_secret_access_key:
         print("Error: AWS credentials not set in environment variables")
@@ -148,7 +135,7 @@ def main():
     print(f"{'='*60}\n")
 
     # Load check-ins from S3
-    df_checkins = load_checkins_from_s3(aws_access_key_id, aws_secret_access_key, bucket_name)
+    df_checkins = load_checkins_from_s3()
 
     # Initialize identifier
     identifier = FamilyDayPassIdentifier(df_checkins=df_checkins)
@@ -12,6 +12,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional
 import os
 
+from data_pipeline import checkin_store
+
 
 class NewMemberIdentifier:
     """
@@ -201,8 +203,7 @@ def load_data_from_s3(aws_access_key_id: str, aws_secret_access_key: str,
 
     # Load check-ins
     print("  Loading check-ins...")
-    checkins_obj = s3.get_object(Bucket=bucket_name, Key='capitan/checkins.csv')
-    data['checkins'] = pd.read_csv(checkins_obj['Body'])
+    data['checkins'] = checkin_store.load_checkins()
     data['checkins']['checkin_datetime'] = pd.to_datetime(data['checkins']['checkin_datetime'])
 
     # Load members
@@ -5,6 +5,7 @@ This module provides functionality to match Stripe refunds to their original cha
 and apply the same revenue_category, allowing for accurate net revenue by category.
 """
 
+import numpy as np
 import pandas as pd
 from typing import Tuple
 
@@ -30,15 +31,70 @@ def extract_charge_id_from_refund_description(description: str) -> str:
         return ''
 
 
+def _amount_cents(amounts: pd.Series) -> pd.Series:
+    """Absolute amount in whole cents, used as the matching key."""
+    return (amounts.abs() * 100).round().astype('Int64')
+
+
+def _resolve_original_categories(stripe_transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapse original transactions to one row per (amount, date).
+
+    Where several transactions share an amount and date, the most common
+    category wins (ties go to the category seen first).
+
+    Returns:
+        DataFrame sorted by date with amount_cents, date, category, match_count
+    """
+    originals = pd.DataFrame({
+        'amount_cents': _amount_cents(stripe_transactions['Total Amount']),
+        'date': pd.to_datetime(stripe_transactions['Date'], errors='coerce').dt.normalize(),
+        'category': stripe_transactions['revenue_category'].values,
+        'position': np.arange(len(stripe_transactions)),
+    }).dropna(subset=['amount_cents', 'date'])
+
+    per_category = (
+        originals.groupby(['amount_cents', 'date', 'category'], sort=False)
+        .agg(count=('position', 'size'), first_position=('position', 'min'))
+        .reset_index()
+        .sort_values(['count', 'first_position'], ascending=[False, True])
+    )
+    resolved = per_category.drop_duplicates(['amount_cents', 'date']).set_index(['amount_cents', 'date'])
+    resolved['match_count'] = per_category.groupby(['amount_cents', 'date'])['count'].sum()
+
+    return resolved.reset_index()[['amount_cents', 'date', 'category', 'match_count']].sort_values('date')
+
+
+def _distribute(n: int, category_proportions: dict) -> np.ndarray:
+    """
+    Assign n rows to categories in proportion, walking the categories in
+    sorted order (row i goes to the first category whose cumulative share
+    exceeds i/n). Rows past the last bucket due to rounding get None.
+    """
+    categories = sorted(category_proportions)
+    cumulative = np.cumsum([category_proportions[c] for c in categories])
+    positions = np.arange(n) / n
+    buckets = np.searchsorted(cumulative, positions, side='right')
+    lookup = np.array(categories + [None], dtype=object)
+    return lookup[buckets]
+
+
+def _count_categories(stats: dict, categories) -> None:
+    for category, count in pd.Series(categories, dtype=object).dropna().value_counts(sort=False).items():
+        stats['refund_categories'][category] = stats['refund_categories'].get(category, 0) + int(count)
+
+
 def link_refunds_to_original_categories(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
     """
     Link refunds back to their original transaction categories.
 
     This function:
     1. Identifies refund transactions (revenue_category == 'Refund')
-    2. Extracts the original charge ID from the description
-    3. Finds the original transaction in the dataframe
-    4. Updates the refund's revenue_category to match the original
+    2. Matches each refund to positive Stripe transactions with the same
+       amount on the refund date or up to 7 days before (closest date wins,
+       via merge_asof)
+    3. Updates the refund's revenue_category to match the original
+    4. Distributes any unmatched refunds proportionally across categories
 
     Args:
         df: Combined transactions dataframe with refunds
@@ -58,7 +114,7 @@ def link_refunds_to_original_categories(df: pd.DataFrame) -> Tuple[pd.DataFrame,
 
     # Find all refund transactions
     refund_mask = df['revenue_category'] == 'Refund'
-    refunds = df[refund_mask].copy()
+    refunds = df[refund_mask]
     stats['total_refunds'] = len(refunds)
 
     if stats['total_refunds'] == 0:
@@ -67,137 +123,79 @@ def link_refunds_to_original_categories(df: pd.DataFrame) -> Tuple[pd.DataFrame,
 
     print(f"Processing {stats['total_refunds']} refunds...")
 
-    # Create a mapping of charge IDs to revenue categories from original transactions
-    # Use payment_id or transaction_id to match
-    charge_to_category = {}
-
-    # Build mapping from non-refund Stripe transactions
     # Since transactions use Payment Intent IDs (pi_) but refunds reference Charge IDs (ch_),
-    # we'll use amount + date proximity matching as a fallback
+    # match on amount + date proximity
     stripe_transactions = df[
         (df['Data Source'] == 'Stripe') &
         (df['revenue_category'] != 'Refund') &
         (df['Total Amount'] > 0)  # Only positive amounts
-    ].copy()
-
-    # Create a lookup by (amount, date) for fuzzy matching
-    amount_date_lookup = {}
-    for idx, row in stripe_transactions.iterrows():
-        key = (abs(round(row['Total Amount'], 2)), row['Date'])
-        if key not in amount_date_lookup:
-            amount_date_lookup[key] = []
-        amount_date_lookup[key].append({
-            'category': row['revenue_category'],
-            'idx': idx,
-            'description': row.get('Description', '')
-        })
-
-    print(f"Built mapping of {len(amount_date_lookup)} unique (amount, date) combinations")
-
-    # Process each refund
-    for idx, refund in refunds.iterrows():
-        # Try to match by (refund amount, date within +/- 7 days)
-        refund_amount = abs(round(refund['Total Amount'], 2))
-        refund_date = pd.to_datetime(refund['Date'])
-
-        matched = False
-
-        # Look for matches within 7 days before the refund
-        for days_back in range(0, 8):
-            check_date = (refund_date - pd.Timedelta(days=days_back)).strftime('%Y-%m-%d')
-            lookup_key = (refund_amount, check_date)
-
-            if lookup_key in amount_date_lookup:
-                matches = amount_date_lookup[lookup_key]
-                if len(matches) == 1:
-                    # Unique match - use it
-                    original_category = matches[0]['category']
-                    df.at[idx, 'revenue_category'] = original_category
-                    df.at[idx, 'sub_category'] = f'Refund - {original_category}'
-
-                    stats['linked_refunds'] += 1
-                    stats['refund_categories'][original_category] = stats['refund_categories'].get(original_category, 0) + 1
-                    matched = True
-                    break
-                elif len(matches) > 1:
-                    # Multiple matches - use most common category among them
-                    categories = [m['category'] for m in matches]
-                    from collections import Counter
-                    most_common = Counter(categories).most_common(1)[0][0]
-
-                    df.at[idx, 'revenue_category'] = most_common
-                    df.at[idx, 'sub_category'] = f'Refund - {most_common} (fuzzy match)'
-
-                    stats['linked_refunds'] += 1
-                    stats['refund_categories'][most_common] = stats['refund_categories'].get(most_common, 0) + 1
-                    matched = True
-                    break
-
-        if not matched:
-            # Could not find original transaction
-            stats['unlinked_refunds'] += 1
-            # Keep as 'Refund' category temporarily - will be distributed later
-            df.at[idx, 'sub_category'] = 'Refund - Unmatched'
+    ]
+    originals = _resolve_original_categories(stripe_transactions)
+    print(f"Built mapping of {len(originals)} unique (amount, date) combinations")
+
+    refund_keys = pd.DataFrame({
+        'row': refunds.index,
+        'amount_cents': _amount_cents(refunds['Total Amount']).values,
+        'date': pd.to_datetime(refunds['Date'], errors='coerce').dt.normalize().values,
+    })
+    matchable = refund_keys.dropna(subset=['amount_cents', 'date']).sort_values('date')
+    matched = pd.merge_asof(
+        matchable, originals, on='date', by='amount_cents',
+        direction='backward', tolerance=pd.Timedelta(days=7),
+    )
+    matched = refund_keys[['row']].merge(
+        matched[['row', 'category', 'match_count']], on='row', how='left'
+    )
+
+    linked = matched[matched['category'].notna()]
+    fuzzy_suffix = np.where(linked['match_count'] > 1, ' (fuzzy match)', '')
+    df.loc[linked['row'], 'revenue_category'] = linked['category'].values
+    df.loc[linked['row'], 'sub_category'] = 'Refund - ' + linked['category'].values + fuzzy_suffix
+
+    stats['linked_refunds'] = len(linked)
+    _count_categories(stats, linked['category'].values)
+
+    # Could not find original transaction - keep as 'Refund' for now, distributed below
+    unlinked_rows = matched.loc[matched['category'].isna(), 'row']
+    df.loc[unlinked_rows, 'sub_category'] = 'Refund - Unmatched'
+    stats['unlinked_refunds'] = len(unlinked_rows)
 
     # Handle unlinked refunds
     if stats['unlinked_refunds'] > 0:
         unlinked_mask = (df['revenue_category'] == 'Refund') & (df['sub_category'] == 'Refund - Unmatched')
-        unlinked_indices = df[unlinked_mask].index.tolist()
+        unlinked_indices = df.index[unlinked_mask]
 
+        category_proportions = None
         if stats['linked_refunds'] > 0:
             # We have linked refunds - distribute unlinked ones proportionally
             print(f"\nDistributing {stats['unlinked_refunds']} unlinked refunds proportionally...")
-
-            # Calculate proportion of each category in linked refunds
             total_linked = sum(stats['refund_categories'].values())
             category_proportions = {
                 cat: count / total_linked
                 for cat, count in stats['refund_categories'].items()
             }
-
-            # Distribute unlinked refunds based on proportions
-            for idx, unlinked_idx in enumerate(unlinked_indices):
-                # Assign category based on round-robin through proportional buckets
-                cumulative = 0
-                position = idx / len(unlinked_indices)
-
-                for category, proportion in sorted(category_proportions.items()):
-                    cumulative += proportion
-                    if position < cumulative:
-                        df.at[unlinked_idx, 'revenue_category'] = category
-                        df.at[unlinked_idx, 'sub_category'] = f'Refund - {category} (estimated)'
-                        stats['refund_categories'][category] = stats['refund_categories'].get(category, 0) + 1
-                        break
-
-            stats['distributed_refunds'] = len(unlinked_indices)
-            stats['unlinked_refunds'] = 0  # All have been distributed
-
+            label = 'estimated'
         else:
             # No linked refunds in this batch - distribute based on overall revenue distribution
             print(f"\nNo linked refunds found. Distributing {stats['unlinked_refunds']} refunds by revenue proportion...")
-
-            # Calculate revenue proportions from positive Stripe transactions
             stripe_revenue = df[(df['Data Source'] == 'Stripe') & (df['Total Amount'] > 0)]
             if len(stripe_revenue) > 0:
                 revenue_by_cat = stripe_revenue.groupby('revenue_category')['Total Amount'].sum()
                 total_revenue = revenue_by_cat.sum()
                 category_proportions = {cat: amt / total_revenue for cat, amt in revenue_by_cat.items()}
+            label = 'revenue-based'
 
-                # Distribute refunds
-                for idx, unlinked_idx in enumerate(unlinked_indices):
-                    cumulative = 0
-                    position = idx / len(unlinked_indices)
+        if category_proportions is not None:
+            assigned = _distribute(len(unlinked_indices), category_proportions)
+            has_bucket = pd.notna(assigned)
+            rows = unlinked_indices[has_bucket]
+            categories = assigned[has_bucket].astype(str)
+            df.loc[rows, 'revenue_category'] = categories
+            df.loc[rows, 'sub_category'] = 'Refund - ' + categories + f' ({label})'
+            _count_categories(stats, categories)
 
-                    for category, proportion in sorted(category_proportions.items()):
-                        cumulative += proportion
-                        if position < cumulative:
-                            df.at[unlinked_idx, 'revenue_category'] = category
-                            df.at[unlinked_idx, 'sub_category'] = f'Refund - {category} (revenue-based)'
-                            stats['refund_categories'][category] = stats['refund_categories'].get(category, 0) + 1
-                            break
-
-                stats['distributed_refunds'] = len(unlinked_indices)
-                stats['unlinked_refunds'] = 0
+            stats['distributed_refunds'] = len(unlinked_indices)
+            stats['unlinked_refunds'] = 0  # All have been distributed
 
     # Print summary
     print(f"\nRefund Linking Summary:")
@@ -271,16 +269,11 @@ def get_net_revenue_by_category(df: pd.DataFrame) -> pd.DataFrame:
 
 if __name__ == "__main__":
     # Test the linking logic
-    from data_pipeline.upload_data import DataUploader
-    from data_pipeline import config
+    from data_pipeline.transaction_store import TransactionStore
 
     print("Loading transactions from S3...")
-    uploader = DataUploader()
-    transactions_csv = uploader.download_from_s3(
-        config.aws_bucket_name,
-        config.s3_path_combined
-    )
-    df = uploader.convert_csv_to_df(transactions_csv)
+    store = TransactionStore()
+    df = store.read_all()
 
     print(f"\nBefore linking:")
     print(df['revenue_category'].value_counts())
@@ -299,7 +292,7 @@ if __name__ == "__main__":
     # Ask user if they want to upload
     response = input("\nUpload linked data to S3? (yes/no): ")
     if response.lower() == 'yes':
-        uploader.upload_to_s3(df_linked, config.aws_bucket_name, config.s3_path_combined)
+        store.write(df_linked, replace_all=True)
         print("✅ Updated data uploaded to S3")
     else:
         print("Skipped upload")
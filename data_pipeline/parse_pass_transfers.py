@@ -454,29 +454,15 @@ def get_top_sharers(transfers_df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame
 
 if __name__ == "__main__":
     # Test with sample data
-    import boto3
-    import os
-    from io import StringIO
+    from data_pipeline import checkin_store
 
     print("\n" + "="*80)
     print("TESTING PASS TRANSFER PARSER")
     print("="*80)
 
     # Load check-ins from S3
-    AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-    AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-    AWS_BUCKET_NAME = "basin-climbing-data-prod"
-
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-
     print("\nLoading check-ins from S3...")
-    response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="capitan/checkins.csv")
-    csv_content = response['Body'].read().decode('utf-8')
-    checkins_df = pd.read_csv(StringIO(csv_content))
+    checkins_df = checkin_store.load_checkins()
 
     print(f"Total check-ins: {len(checkins_df)}")
 
@@ -0,0 +1,266 @@
+"""
+Partitioned S3 Store Base
+
+Shared plumbing for the append-mostly histories the pipeline keeps as
+date-partitioned CSV files in S3 (transactions, check-ins):
+
+    <prefix>/manifest.json
+    <prefix>/date=YYYY-MM-DD/<sha256[:16]>.csv
+    <prefix>/month=YYYY-MM/<sha256[:16]>.csv
+
+Each partition file is named by the hash of its contents and never modified
+in place; a rewrite uploads a new file and then swaps the manifest entry.
+The manifest lists every live partition with its date range, row count and
+sha256, and is written last, so readers never see a half-applied refresh.
+Files a rewrite replaces are listed under "superseded" with the time they
+dropped out, and only deleted after config.partition_delete_grace_hours,
+so a reader still working from the previous manifest can finish.
+
+Subclasses set `date_column` (whose first 10 characters are the row's day),
+`default_prefix` and `snapshot_key` (the artifact whose monthly snapshots may
+still reference old partition files), and add their own write logic.
+"""
+
+import datetime
+import hashlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline import pipeline_telemetry
+from data_pipeline import upload_data
+
+
+def _checksum(body) -> str:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+def _day_bounds(name: str):
+    """Inclusive (start, end) day strings for a partition name."""
+    kind, value = name.split("=", 1)
+    if kind == "date":
+        return value, value
+    month = pd.Period(value, freq="M")
+    return month.start_time.strftime("%Y-%m-%d"), month.end_time.strftime("%Y-%m-%d")
+
+
+def row_days(values: pd.Series) -> pd.Series:
+    """
+    Day string (YYYY-MM-DD) of each value, taken from its text so that
+    timezone-aware timestamps keep their local date. Missing values give NaN.
+    """
+    days = values.astype(str).str[:10]
+    return days.where(values.notna() & days.str.match(r"^\d{4}-\d{2}-\d{2}$"))
+
+
+class PartitionedStore:
+    """Manifest, partition I/O and range reads shared by the partitioned stores."""
+
+    date_column = None
+    default_prefix = None
+    snapshot_key = None
+    label = "partition"
+
+    def __init__(
+        self,
+        uploader: upload_data.DataUploader = None,
+        bucket: str = None,
+        prefix: str = None,
+        max_workers: int = 8,
+    ):
+        """
+        Args:
+            uploader: DataUploader to use (a new one by default)
+            bucket: S3 bucket (config.aws_bucket_name by default)
+            prefix: S3 prefix for partitions and manifest
+            max_workers: Concurrent partition reads/writes
+        """
+        self.uploader = uploader or upload_data.DataUploader()
+        self.bucket = bucket or config.aws_bucket_name
+        self.prefix = prefix or self.default_prefix
+        self.max_workers = max_workers
+        self.manifest_key = f"{self.prefix}/manifest.json"
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def load_manifest(self) -> Optional[Dict]:
+        """Current manifest, or None if the store has not been created yet."""
+        try:
+            content = self.uploader.download_from_s3(self.bucket, self.manifest_key)
+        except self.uploader.s3.exceptions.NoSuchKey:
+            return None
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        return json.loads(content)
+
+    def _save_manifest(self, partitions: Dict[str, Dict], previous: Dict = None, superseded: Dict = None):
+        """
+        Write the manifest.
+
+        Args:
+            partitions: Live partitions by name
+            previous: Manifest being replaced; its files that are no longer
+                live are added to "superseded" as of now
+            superseded: Superseded file -> time it dropped out (replaces the
+                one carried over from previous)
+        """
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        if superseded is None:
+            superseded = dict((previous or {}).get("superseded", {}))
+            live = {entry["key"] for entry in partitions.values()}
+            for entry in (previous or {}).get("partitions", {}).values():
+                if entry["key"] not in live:
+                    superseded.setdefault(entry["key"], now)
+        manifest = {
+            "updated_at": now,
+            "total_rows": sum(p["rows"] for p in partitions.values()),
+            "partitions": dict(sorted(partitions.items(), key=lambda kv: _day_bounds(kv[0]))),
+            "superseded": dict(sorted(superseded.items())),
+        }
+        body = json.dumps(manifest, indent=2).encode("utf-8")
+        self.uploader.s3.put_object(Bucket=self.bucket, Key=self.manifest_key, Body=body)
+        pipeline_telemetry.record_s3_write(len(body))
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Partition I/O
+    # ------------------------------------------------------------------
+
+    def _read_partition(self, entry: Dict) -> pd.DataFrame:
+        content = self.uploader.download_from_s3(self.bucket, entry["key"])
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        if _checksum(content) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {entry['key']}")
+        return self.uploader.convert_csv_to_df(content)
+
+    def _write_partition(self, name: str, df: pd.DataFrame) -> Dict:
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False)
+        body = buffer.getvalue().encode("utf-8")
+        sha256 = _checksum(body)
+        key = f"{self.prefix}/{name}/{sha256[:16]}.csv"
+        self.uploader.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+        pipeline_telemetry.record_s3_write(len(body), rows=len(df))
+        start, end = _day_bounds(name)
+        return {"key": key, "start": start, "end": end, "rows": len(df), "sha256": sha256}
+
+    def _map(self, func, items) -> List:
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(pipeline_telemetry.in_current_context(func), items))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def read(self, start_date=None, end_date=None, manifest: Dict = None) -> pd.DataFrame:
+        """
+        Read rows, optionally limited to partitions overlapping a date range.
+
+        Args:
+            start_date: Earliest day to include (None = from the beginning)
+            end_date: Latest day to include (None = up to the latest)
+            manifest: Manifest to read from (the current one by default)
+
+        Returns:
+            DataFrame of rows in partition order (empty if the store is empty)
+        """
+        manifest = manifest if manifest is not None else self.load_manifest()
+        if not manifest:
+            return pd.DataFrame()
+
+        start = pd.Timestamp(start_date).strftime("%Y-%m-%d") if start_date is not None else None
+        end = pd.Timestamp(end_date).strftime("%Y-%m-%d") if end_date is not None else None
+        entries = [
+            entry for entry in manifest["partitions"].values()
+            if (start is None or entry["end"] >= start) and (end is None or entry["start"] <= end)
+        ]
+        frames = [df for df in self._map(self._read_partition, entries) if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+
+        if start is not None or end is not None:
+            days = row_days(df[self.date_column])
+            in_range = days.notna()
+            if start is not None:
+                in_range &= days >= start
+            if end is not None:
+                in_range &= days <= end
+            df = df[in_range].reset_index(drop=True)
+        return df
+
+    def read_all(self) -> pd.DataFrame:
+        """Full history."""
+        return self.read()
+
+    # ------------------------------------------------------------------
+    # Cleanup
+    # ------------------------------------------------------------------
+
+    def referenced_keys(self, manifest: Dict) -> set:
+        """Partition files a manifest points at."""
+        return {entry["key"] for entry in manifest["partitions"].values()}
+
+    def _auxiliary_keys(self) -> set:
+        """Non-partition files kept under the prefix besides the manifest."""
+        return set()
+
+    def delete_unreferenced(self, manifest: Dict, grace_hours: float = None,
+                            now: datetime.datetime = None) -> int:
+        """
+        Delete partition files that have not been referenced by the manifest
+        or by any monthly snapshot (see snapshot_store) for the grace period.
+
+        A reader that loaded the previous manifest may still be downloading
+        the files it pointed at, so unreferenced files are recorded in the
+        manifest's "superseded" map (from when they dropped out, or when they
+        were first seen unreferenced) and deleted only once that is older
+        than grace_hours.
+
+        Args:
+            manifest: Current manifest
+            grace_hours: Hours to keep superseded files (config.partition_delete_grace_hours by default)
+            now: Current time (datetime.now() by default)
+
+        Returns:
+            Number of files deleted
+        """
+        from data_pipeline.snapshot_store import SnapshotStore
+
+        grace = datetime.timedelta(
+            hours=grace_hours if grace_hours is not None else config.partition_delete_grace_hours)
+        now = now or datetime.datetime.now()
+
+        keep = self.referenced_keys(manifest) | {self.manifest_key} | self._auxiliary_keys()
+        if self.snapshot_key:
+            keep |= SnapshotStore(self.uploader, bucket=self.bucket).referenced_objects(self.snapshot_key)
+        unreferenced = [k for k in self.uploader.list_keys(self.bucket, self.prefix + "/") if k not in keep]
+
+        recorded = manifest.get("superseded", {})
+        superseded = {key: recorded.get(key, now.isoformat(timespec="seconds")) for key in unreferenced}
+        expired = [key for key in unreferenced
+                   if now - datetime.datetime.fromisoformat(superseded[key]) >= grace]
+        for key in expired:
+            self.uploader.s3.delete_object(Bucket=self.bucket, Key=key)
+            del superseded[key]
+
+        if superseded != recorded:
+            self._save_manifest(manifest["partitions"], superseded=superseded)
+        if expired:
+            print(f"Deleted {len(expired)} superseded {self.label} partition files")
+        if superseded:
+            print(f"Keeping {len(superseded)} superseded {self.label} partition files "
+                  f"until they are {grace.total_seconds() / 3600:g} hours old")
+        return len(expired)
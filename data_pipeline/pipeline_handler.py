@@ -6,6 +6,7 @@ except ImportError:
     pass
 
 from data_pipeline import fetch_stripe_data
+from data_pipeline import stripe_cache
 from data_pipeline import fetch_square_data
 from data_pipeline import fetch_capitan_membership_data
 from data_pipeline import fetch_instagram_data
@@ -18,12 +19,43 @@ from data_pipeline import identify_at_risk_members
 from data_pipeline import identify_new_members
 from data_pipeline import upload_data as upload_data
 from data_pipeline import upload_pass_transfers
+from data_pipeline import transaction_store
+from data_pipeline import checkin_store
+from data_pipeline import snapshot_store
+from data_pipeline.pipeline_telemetry import track_step
+from data_pipeline.pipeline_scheduler import run_once
 import datetime
+import io
 import os
 import pandas as pd
 from data_pipeline import config
 
 
+@run_once
+def load_stripe_cache():
+    """
+    Load, sync and save the Stripe object cache once per pipeline run; the
+    transactions, refunds and failed-payments readers all share it.
+    """
+    return stripe_cache.load_synced_cache(config.stripe_key)
+
+
+def get_stripe_fetcher(start_date):
+    """
+    Build a StripeFetcher, backed by the synced Stripe object cache when the
+    cache covers start_date (the daily windows). Longer backfills, or a cache
+    sync failure, fall back to listing straight from the Stripe API.
+    """
+    cache = None
+    if datetime.datetime.now() - start_date < datetime.timedelta(days=stripe_cache.DEFAULT_RETENTION_DAYS):
+        try:
+            cache = load_stripe_cache()
+        except Exception as e:
+            print(f"⚠️  Stripe cache sync failed, reading from the API instead: {e}")
+    return fetch_stripe_data.StripeFetcher(stripe_key=config.stripe_key, cache=cache)
+
+
+@track_step
 def fetch_stripe_and_square_and_combine(days=2, end_date=datetime.datetime.now()):
     """
     Fetches Stripe and Square data for the last X days and combines them into a single DataFrame.
@@ -36,7 +68,7 @@ def fetch_stripe_and_square_and_combine(days=2, end_date=datetime.datetime.now()
 
     # Fetch Stripe data using Payment Intents (only completed transactions)
     stripe_key = config.stripe_key
-    stripe_fetcher = fetch_stripe_data.StripeFetcher(stripe_key=stripe_key)
+    stripe_fetcher = get_stripe_fetcher(start_date)
 
     stripe_df = stripe_fetcher.pull_and_transform_stripe_payment_intents_data(
         stripe_key, start_date, end_date, save_json=False, save_csv=False
@@ -107,6 +139,7 @@ def fetch_stripe_and_square_and_combine(days=2, end_date=datetime.datetime.now()
     return df_combined
 
 
+@track_step
 def add_new_transactions_to_combined_df(
     days=2, end_date=datetime.datetime.now(), save_local=False
 ):
@@ -120,60 +153,46 @@ def add_new_transactions_to_combined_df(
     uploader = upload_data.DataUploader()
     uploader.upload_to_s3(df_today, config.aws_bucket_name, config.s3_path_recent_days)
 
-    print(
-        "downloading previous day's combined df from s3 from config path: ",
-        config.s3_path_combined,
-    )
-    csv_content_yesterday = uploader.download_from_s3(
-        config.aws_bucket_name, config.s3_path_combined
-    )
-    df_yesterday = uploader.convert_csv_to_df(csv_content_yesterday)
-    
-    # Ensure existing data from S3 has dates formatted as strings
-    df_yesterday["Date"] = pd.to_datetime(df_yesterday["Date"], errors="coerce")
-    if df_yesterday["Date"].dt.tz is not None:
-        df_yesterday["Date"] = df_yesterday["Date"].dt.tz_localize(None)
-    df_yesterday["Date"] = df_yesterday["Date"].dt.strftime("%Y-%m-%d")
-
-    print("combining with previous day's df")
-    df_combined = pd.concat([df_yesterday, df_today], ignore_index=True)
-
-    print("dropping duplicates")
-    df_combined = df_combined.drop_duplicates(subset=["transaction_id", "Date"])
+    print("adding new transactions to the partitioned transaction store")
+    store = transaction_store.TransactionStore(uploader)
+    store.write(df_today)
 
     if save_local:
         df_path = config.df_path_recent_days
         print("saving recent days locally at path: ", config.df_path_recent_days)
         df_today.to_csv(df_path, index=False)
         print("saving full file locally at path: ", config.df_path_combined)
-        df_combined.to_csv(config.df_path_combined, index=False)
+        store.read_all().to_csv(config.df_path_combined, index=False)
 
-    print("uploading to s3 at path: ", config.s3_path_combined)
-    uploader.upload_to_s3(df_combined, config.aws_bucket_name, config.s3_path_combined)
+    upload_transaction_snapshot(store)
+
+
+def upload_transaction_snapshot(store):
+    """
+    On the snapshot day of the month, record a snapshot of the transaction
+    store. Partitions are content-addressed, so this only writes a manifest.
+    """
     today = datetime.datetime.now()
     if today.day == config.snapshot_day_of_month:
-        print(
-            "uploading transaction data to s3 with date in the filename since it is the first day of the month"
-        )
-        print(
-            "If data is not corrupted, feel free to delete the old snapshot file from s3"
-        )
-        uploader.upload_to_s3(
-            df_combined,
-            config.aws_bucket_name,
-            config.s3_path_combined_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-        )
+        print("Recording monthly transaction snapshot")
+        try:
+            snapshot_store.SnapshotStore(store.uploader).snapshot_store_manifest(
+                config.s3_path_combined, store.load_manifest())
+        except Exception as e:
+            print(f"⚠️  Could not snapshot transactions: {e}")
 
 
+@track_step
 def replace_transaction_df_in_s3():
     """
-    Uploads a new transaction df to s3, replacing the existing one.
+    Rebuilds the whole transaction store from the last 2 years of API data.
     """
     df = fetch_stripe_and_square_and_combine(days=365 * 2)
-    uploader = upload_data.DataUploader()
-    uploader.upload_to_s3(df, config.aws_bucket_name, config.s3_path_combined)
+    store = transaction_store.TransactionStore()
+    store.write(df, replace_all=True)
 
 
+@track_step
 def replace_date_range_in_transaction_df_in_s3(start_date, end_date):
     """
     Replaces data for a specific date range in S3, preserving data outside that range.
@@ -188,56 +207,21 @@ def replace_date_range_in_transaction_df_in_s3(start_date, end_date):
     # Fetch fresh data for the specified range
     df_new = fetch_stripe_and_square_and_combine(days=days, end_date=end_date)
 
-    print("Downloading existing combined df from s3")
-    uploader = upload_data.DataUploader()
-    csv_content = uploader.download_from_s3(
-        config.aws_bucket_name, config.s3_path_combined
-    )
-    df_existing = uploader.convert_csv_to_df(csv_content)
-
-    # Convert dates for filtering
-    df_existing["Date"] = pd.to_datetime(
-        df_existing["Date"], errors="coerce"
-    ).dt.tz_localize(None)
-
-    # Keep data OUTSIDE the replacement range
-    df_before = df_existing[df_existing["Date"] < start_date]
-    df_after = df_existing[df_existing["Date"] > end_date]
-
-    print(f"Keeping {len(df_before)} transactions before {start_date.date()}")
-    print(f"Keeping {len(df_after)} transactions after {end_date.date()}")
     print(f"Replacing with {len(df_new)} new transactions in the range")
+    store = transaction_store.TransactionStore()
+    store.write(df_new, replace_from=start_date, replace_to=end_date)
 
-    # Format dates back to strings
-    df_before["Date"] = df_before["Date"].dt.strftime("%Y-%m-%d")
-    df_after["Date"] = df_after["Date"].dt.strftime("%Y-%m-%d")
-
-    # Combine: before + new data + after
-    df_combined = pd.concat([df_before, df_new, df_after], ignore_index=True)
-
-    print("Dropping duplicates")
-    df_combined = df_combined.drop_duplicates(subset=["transaction_id", "Date"])
-
-    print(f"Final dataset has {len(df_combined)} transactions")
-    print("Uploading to s3 at path:", config.s3_path_combined)
-    uploader.upload_to_s3(df_combined, config.aws_bucket_name, config.s3_path_combined)
-
-    today = datetime.datetime.now()
-    if today.day == config.snapshot_day_of_month:
-        print(
-            "Uploading transaction data to s3 with date in the filename since it is the first day of the month"
-        )
-        uploader.upload_to_s3(
-            df_combined,
-            config.aws_bucket_name,
-            config.s3_path_combined_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-        )
+    upload_transaction_snapshot(store)
 
 
+@track_step
 def replace_days_in_transaction_df_in_s3(days=2, end_date=datetime.datetime.now()):
     """
-    Uploads a new transaction df to s3, replacing the existing one.
-    Also updates Capitan membership data and Instagram data.
+    Refreshes the last `days` days of transactions, rewriting only those
+    day partitions of the transaction store.
+
+    Only handles transactions; Capitan memberships and Instagram are their
+    own pipeline steps (see run_daily_pipeline.PIPELINE_STEPS).
     """
     print(f"pulling last {days} days of data from APIs from {end_date}")
     df_today = fetch_stripe_and_square_and_combine(days=days, end_date=end_date)
@@ -247,67 +231,14 @@ def replace_days_in_transaction_df_in_s3(days=2, end_date=datetime.datetime.now(
     uploader = upload_data.DataUploader()
     uploader.upload_to_s3(df_today, config.aws_bucket_name, config.s3_path_recent_days)
 
-    print(
-        "downloading previous day's combined df from s3 from config path: ",
-        config.s3_path_combined,
-    )
-    csv_content_yesterday = uploader.download_from_s3(
-        config.aws_bucket_name, config.s3_path_combined
-    )
-    df_yesterday = uploader.convert_csv_to_df(csv_content_yesterday)
-    # Convert to datetime for filtering, then format back as string
-    df_yesterday["Date"] = pd.to_datetime(
-        df_yesterday["Date"], errors="coerce"
-    ).dt.tz_localize(None)
-    # filter to up to the start_date, and drop rows where Date is NaT
-    df_yesterday = df_yesterday[df_yesterday["Date"] < start_date]
-    # Format back as string in the expected format
-    df_yesterday["Date"] = df_yesterday["Date"].dt.strftime("%Y-%m-%d")
-
-    print("combining with previous day's df")
-    df_combined = pd.concat([df_yesterday, df_today], ignore_index=True)
-
-    print("dropping duplicates")
-    df_combined = df_combined.drop_duplicates(subset=["transaction_id", "Date"])
-
-    print("uploading to s3 at path: ", config.s3_path_combined)
-    uploader.upload_to_s3(df_combined, config.aws_bucket_name, config.s3_path_combined)
-    today = datetime.datetime.now()
-    if today.day == config.snapshot_day_of_month:
-        print(
-            "uploading transaction data to s3 with date in the filename since it is the first day of the month"
-        )
-        print(
-            "If data is not corrupted, feel free to delete the old snapshot file from s3"
-        )
-        uploader.upload_to_s3(
-            df_combined,
-            config.aws_bucket_name,
-            config.s3_path_combined_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-        )
-
-    # Update Capitan membership data
-    print("\n=== Updating Capitan Membership Data ===")
-    try:
-        upload_new_capitan_membership_data(save_local=False)
-        print("✅ Capitan data updated successfully")
-    except Exception as e:
-        print(f"❌ Error updating Capitan data: {e}")
+    print("replacing the refreshed days in the partitioned transaction store")
+    store = transaction_store.TransactionStore(uploader)
+    store.write(df_today, replace_from=start_date)
 
-    # Update Instagram data (last 30 days with AI vision analysis)
-    # AI vision uses Claude 3 Haiku and only runs once per post (skips if already analyzed)
-    print("\n=== Updating Instagram Data ===")
-    try:
-        upload_new_instagram_data(
-            save_local=False,
-            enable_vision_analysis=True,  # ✅ Enabled! Uses Claude 3 Haiku
-            days_to_fetch=30
-        )
-        print("✅ Instagram data updated successfully")
-    except Exception as e:
-        print(f"❌ Error updating Instagram data: {e}")
+    upload_transaction_snapshot(store)
 
 
+@track_step
 def upload_new_capitan_membership_data(save_local=False):
     """
     Fetches Capitan membership data from the Capitan API and saves it to a CSV file.
@@ -378,6 +309,7 @@ def upload_new_capitan_membership_data(save_local=False):
         )
 
 
+@track_step
 def upload_capitan_relations_and_family_graph(save_local=False):
     """
     Fetches customer relations from Capitan API and builds family relationship graph.
@@ -391,6 +323,7 @@ def upload_capitan_relations_and_family_graph(save_local=False):
     """
     from data_pipeline.fetch_capitan_membership_data import CapitanDataFetcher
     from data_pipeline.build_family_relationships import build_family_relationships
+    from data_pipeline import capitan_customer_sync
     import json
 
     print("\n" + "="*60)
@@ -406,36 +339,50 @@ def upload_capitan_relations_and_family_graph(save_local=False):
     capitan_fetcher = CapitanDataFetcher(capitan_token)
     uploader = upload_data.DataUploader()
 
-    # Load customers (need for relations fetch)
+    # Customers synced this run, with the changes since relations were last fetched
     try:
-        csv_content = uploader.download_from_s3(
-            config.aws_bucket_name,
-            config.s3_path_capitan_customers
-        )
-        if csv_content:
-            from io import StringIO
-            customers_df = pd.read_csv(StringIO(csv_content))
-            print(f"✅ Loaded {len(customers_df)} customers from S3")
-        else:
-            print("⚠️  No customers data found in S3")
-            return
+        sync = capitan_customer_sync.sync_capitan_customers()
+        customers_df = sync["customers"]
+        changes = sync["pending"]["relations"]
+        print(f"✅ Loaded {len(customers_df)} Capitan customers")
     except Exception as e:
-        print(f"❌ Error loading customers from S3: {e}")
+        print(f"❌ Error syncing Capitan customers: {e}")
         return
 
-    # Fetch relations for all customers
-    print(f"\nFetching relations for {len(customers_df)} customers...")
-    print("   (This takes ~21 minutes with rate limiting)")
-    relations_df = capitan_fetcher.fetch_all_relations(customers_df)
+    relations_columns = [
+        'customer_id', 'related_customer_id', 'relationship',
+        'related_customer_first_name', 'related_customer_last_name', 'created_at'
+    ]
+    previous_relations = None
+    if changes["mode"] == "incremental":
+        try:
+            previous_relations = _read_csv_from_s3(uploader, config.s3_path_capitan_relations)
+        except Exception as e:
+            print(f"⚠️  Could not load previous relations, fetching all: {e}")
+
+    if previous_relations is not None:
+        # Relation edits don't always bump a customer's updated_at; the weekly
+        # full sync refetches every customer's relations to catch those.
+        changed_ids = set(changes["changed_customer_ids"])
+        gone_ids = changed_ids | set(changes["deleted_customer_ids"])
+        fetch_df = customers_df[customers_df['customer_id'].isin(changed_ids)]
+        print(f"\nFetching relations for {len(fetch_df)} new/changed customers...")
+        fetched_df = capitan_fetcher.fetch_all_relations(fetch_df.reset_index(drop=True))
+        kept = previous_relations[
+            ~previous_relations['customer_id'].isin(gone_ids)
+            & ~previous_relations['related_customer_id'].isin(changes["deleted_customer_ids"])
+        ]
+        relations_df = pd.concat([kept, fetched_df.reindex(columns=relations_columns)], ignore_index=True)
+    else:
+        print(f"\nFetching relations for {len(customers_df)} customers...")
+        print("   (This takes ~21 minutes with rate limiting)")
+        relations_df = capitan_fetcher.fetch_all_relations(customers_df)
 
     if relations_df.empty:
         print("⚠️  No relations data found")
-        relations_df = pd.DataFrame(columns=[
-            'customer_id', 'related_customer_id', 'relationship',
-            'related_customer_first_name', 'related_customer_last_name', 'created_at'
-        ])
+        relations_df = pd.DataFrame(columns=relations_columns)
     else:
-        print(f"✅ Fetched {len(relations_df)} relations for {relations_df['customer_id'].nunique()} customers")
+        print(f"✅ {len(relations_df)} relations for {relations_df['customer_id'].nunique()} customers")
 
     # Load raw memberships (need for family graph)
     try:
@@ -456,7 +403,7 @@ def upload_capitan_relations_and_family_graph(save_local=False):
 
     # Build family relationship graph
     print(f"\nBuilding family relationship graph...")
-    family_df = build_family_relationships(relations_df, memberships_raw, customers_df)
+    family_df = build_family_relationships(relations_df, memberships_raw, customers_df.copy())
 
     # Save locally if requested
     if save_local:
@@ -480,12 +427,14 @@ def upload_capitan_relations_and_family_graph(save_local=False):
         config.s3_path_family_relationships
     )
     print(f"✅ Uploaded family graph to: {config.s3_path_family_relationships}")
+    capitan_customer_sync.acknowledge_customer_changes("relations")
 
     print("\n" + "="*60)
     print("Relations & Family Graph Upload Complete")
     print("="*60)
 
 
+@track_step
 def upload_failed_membership_payments(save_local=False, days_back=90):
     """
     Fetches failed membership payment data from Stripe and uploads to S3.
@@ -505,12 +454,12 @@ def upload_failed_membership_payments(save_local=False, days_back=90):
     print("=" * 60)
 
     # Initialize fetcher
-    stripe_fetcher = fetch_stripe_data.StripeFetcher(stripe_key=config.stripe_key)
     uploader = upload_data.DataUploader()
 
     # Calculate date range
     end_date = datetime.datetime.now()
     start_date = end_date - datetime.timedelta(days=days_back)
+    stripe_fetcher = get_stripe_fetcher(start_date)
 
     # Fetch failed payments
     df_failed_payments = stripe_fetcher.pull_failed_membership_payments(
@@ -555,6 +504,7 @@ def upload_failed_membership_payments(save_local=False, days_back=90):
     return df_failed_payments
 
 
+@track_step
 def upload_quickbooks_data(save_local=False, year=2025):
     """
     Fetches QuickBooks expense and revenue data and uploads to S3.
@@ -688,6 +638,15 @@ def upload_quickbooks_data(save_local=False, year=2025):
     return df_expenses, df_revenue, df_accounts
 
 
+def _read_csv_from_s3(uploader, key: str, dtype=None) -> pd.DataFrame:
+    """Read a CSV from the pipeline bucket, keeping the given columns as text."""
+    content = uploader.download_from_s3(config.aws_bucket_name, key)
+    if isinstance(content, bytes):
+        content = content.decode("utf-8")
+    return pd.read_csv(io.StringIO(content), dtype=dtype)
+
+
+@track_step
 def update_customer_master(save_local=False):
     """
     Fetch Capitan customer data, run identity resolution matching,
@@ -699,46 +658,62 @@ def update_customer_master(save_local=False):
     Returns:
         (df_customers_master, df_customer_identifiers)
     """
-    from data_pipeline.fetch_capitan_membership_data import CapitanDataFetcher
-    from data_pipeline import customer_matching, customer_events_builder
+    from data_pipeline import capitan_customer_sync, customer_matching, customer_events_builder, customer_event_store
 
     print("\n" + "=" * 60)
     print("Customer Identity Resolution & Event Aggregation")
     print("=" * 60)
 
-    # Fetch Capitan customer contact data
+    # Sync Capitan customer contact data (only customers updated since the last run)
     capitan_token = config.capitan_token
     if not capitan_token:
         print("⚠️  No Capitan token found")
         return pd.DataFrame(), pd.DataFrame()
 
-    fetcher = CapitanDataFetcher(capitan_token)
-    df_capitan_customers = fetcher.fetch_customers()
+    try:
+        sync = capitan_customer_sync.sync_capitan_customers()
+    except Exception as e:
+        print(f"❌ Error syncing Capitan customers: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+    df_capitan_customers = sync["customers"]
 
     if df_capitan_customers.empty:
         print("⚠️  No Capitan customers found")
         return pd.DataFrame(), pd.DataFrame()
 
-    # Save raw Capitan customer data to S3
     uploader = upload_data.DataUploader()
-    if not df_capitan_customers.empty:
-        uploader.upload_to_s3(
-            df_capitan_customers,
-            config.aws_bucket_name,
-            config.s3_path_capitan_customers,
-        )
-        print(f"✅ Uploaded Capitan customers to S3: {config.s3_path_capitan_customers}")
 
-    # Run customer matching
+    # Run customer matching: re-match only customers changed since the last
+    # successful run, everything after a full (reconciliation) sync
+    changes = sync["pending"]["customer_master"]
     matcher = customer_matching.CustomerMatcher()
+    df_capitan_to_match = df_capitan_customers
+    if changes["mode"] == "incremental":
+        try:
+            df_previous_master = _read_csv_from_s3(
+                uploader, config.s3_path_customers_master,
+                dtype={'primary_email': str, 'primary_phone': str, 'primary_name': str})
+            df_previous_identifiers = _read_csv_from_s3(
+                uploader, config.s3_path_customer_identifiers,
+                dtype={'normalized_value': str, 'source_id': str})
+            changed = {f"customer:{cid}"
+                       for cid in changes["changed_customer_ids"] + changes["deleted_customer_ids"]}
+            reprocess = matcher.seed(df_previous_master, df_previous_identifiers, changed)
+            source_ids = "customer:" + df_capitan_customers['customer_id'].astype(str)
+            df_capitan_to_match = df_capitan_customers[source_ids.isin(reprocess)]
+            print(f"📇 Re-matching {len(df_capitan_to_match)} changed Capitan customers")
+        except Exception as e:
+            print(f"⚠️  Could not reuse previous matches, matching all customers: {e}")
+            matcher = customer_matching.CustomerMatcher()
+            df_capitan_to_match = df_capitan_customers
+
     df_transactions_for_matching = pd.DataFrame()  # TODO: Add transaction customer data when available
-    df_master, df_identifiers = matcher.match_customers(df_capitan_customers, df_transactions_for_matching)
+    df_master, df_identifiers = matcher.match_customers(df_capitan_to_match, df_transactions_for_matching)
 
     # Load check-in data for event building
     df_checkins = pd.DataFrame()
     try:
-        csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_capitan_checkins)
-        df_checkins = uploader.convert_csv_to_df(csv_content)
+        df_checkins = checkin_store.load_checkins()
         print(f"📥 Loaded {len(df_checkins)} check-ins for event building")
     except Exception as e:
         print(f"⚠️  Could not load check-ins: {e}")
@@ -746,8 +721,7 @@ def update_customer_master(save_local=False):
     # Load transaction data for event building
     df_transactions = pd.DataFrame()
     try:
-        csv_content = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_combined)
-        df_transactions = uploader.convert_csv_to_df(csv_content)
+        df_transactions = transaction_store.TransactionStore(uploader).read_all()
         print(f"📥 Loaded {len(df_transactions)} transactions for event building")
     except Exception as e:
         print(f"⚠️  Could not load transactions: {e}")
@@ -806,6 +780,9 @@ def update_customer_master(save_local=False):
         mailchimp_fetcher=mailchimp_fetcher,
         anthropic_api_key=config.anthropic_api_key
     )
+    if not df_events.empty:
+        # Store the details rules filter on as typed columns next to the JSON
+        df_events = customer_event_store.normalize_events(df_events)
 
     # Save locally if requested
     if save_local:
@@ -844,48 +821,84 @@ def update_customer_master(save_local=False):
         )
         print(f"✅ Uploaded customer events to S3: {config.s3_path_customer_events}")
 
-    # Create snapshots on first of month
+    if not df_master.empty and not df_identifiers.empty:
+        capitan_customer_sync.acknowledge_customer_changes("customer_master")
+
+    # Create snapshots on first of month (only changed partitions are uploaded)
     today = datetime.datetime.now()
     if today.day == config.snapshot_day_of_month:
-        if not df_capitan_customers.empty:
-            uploader.upload_to_s3(
-                df_capitan_customers,
-                config.aws_bucket_name,
-                config.s3_path_capitan_customers_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-            )
-            print(f"📸 Created Capitan customers snapshot")
+        for key, df in [
+            (config.s3_path_capitan_customers, df_capitan_customers),
+            (config.s3_path_customers_master, df_master),
+            (config.s3_path_customer_identifiers, df_identifiers),
+            (config.s3_path_customer_events, df_events),
+        ]:
+            if not df.empty:
+                snapshot_store.take_snapshot(key, df, uploader)
 
-        if not df_master.empty:
-            uploader.upload_to_s3(
-                df_master,
-                config.aws_bucket_name,
-                config.s3_path_customers_master_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-            )
-            print(f"📸 Created customer master snapshot")
+    print("\n" + "=" * 60)
+    print("✅ Customer data upload complete!")
+    print("=" * 60)
 
-        if not df_identifiers.empty:
-            uploader.upload_to_s3(
-                df_identifiers,
-                config.aws_bucket_name,
-                config.s3_path_customer_identifiers_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-            )
-            print(f"📸 Created customer identifiers snapshot")
+    return df_master, df_identifiers, df_events
 
-        if not df_events.empty:
-            uploader.upload_to_s3(
-                df_events,
-                config.aws_bucket_name,
-                config.s3_path_customer_events_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-            )
-            print(f"📸 Created customer events snapshot")
+
+@track_step
+def update_customer_contacts(save_local=False):
+    """
+    Build the customer contacts table and upload it to S3.
+
+    Resolves one email and phone per customer from customers_master and
+    Capitan customers, fills in parent contact from the family graph, and
+    stores the household hash used for AB groups. The flag engine and the
+    Shopify/Mailchimp syncers read this instead of rebuilding it.
+
+    Args:
+        save_local: Whether to save CSV files locally
+
+    Returns:
+        DataFrame of customer contacts
+    """
+    from data_pipeline.customer_contacts import build_customer_contacts
 
     print("\n" + "=" * 60)
-    print("✅ Customer data upload complete!")
+    print("Customer Contacts")
     print("=" * 60)
 
-    return df_master, df_identifiers, df_events
+    uploader = upload_data.DataUploader()
+
+    try:
+        df_master = _read_csv_from_s3(uploader, config.s3_path_customers_master)
+        df_capitan = _read_csv_from_s3(uploader, config.s3_path_capitan_customers)
+    except Exception as e:
+        print(f"❌ Could not load customers: {e}")
+        return pd.DataFrame()
 
+    try:
+        df_family = _read_csv_from_s3(uploader, config.s3_path_family_relationships)
+    except Exception as e:
+        print(f"⚠️  Could not load family relationships: {e}")
+        df_family = pd.DataFrame()
 
+    df_contacts = build_customer_contacts(df_master, df_capitan, df_family)
+    print(f"✅ Resolved contacts for {len(df_contacts)} customers "
+          f"({df_contacts['is_using_parent_contact'].sum()} via parent contact)")
+
+    if save_local:
+        df_contacts.to_csv('data/outputs/customer_contacts.csv', index=False)
+        print("✅ Saved customer_contacts.csv locally")
+
+    uploader.upload_to_s3(
+        df_contacts,
+        config.aws_bucket_name,
+        config.s3_path_customer_contacts,
+    )
+    print(f"✅ Uploaded customer contacts to S3: {config.s3_path_customer_contacts}")
+
+    return df_contacts
+
+
+@track_step
 def update_customer_flags(save_local=False):
     """
     Evaluate customer flagging rules and upload flags to S3.
@@ -938,12 +951,7 @@ def update_customer_flags(save_local=False):
     # Create snapshot on first of month
     today = datetime.datetime.now()
     if today.day == config.snapshot_day_of_month and not df_flags.empty:
-        uploader.upload_to_s3(
-            df_flags,
-            config.aws_bucket_name,
-            config.s3_path_customer_flags_snapshot + f'_{today.strftime("%Y-%m-%d")}',
-        )
-        print(f"📸 Created customer flags snapshot")
+        snapshot_store.take_snapshot(config.s3_path_customer_flags, df_flags, uploader)
 
     print("\n" + "=" * 60)
     print("✅ Customer flagging complete!")
@@ -952,6 +960,7 @@ def update_customer_flags(save_local=False):
     return df_flags
 
 
+@track_step
 def upload_new_instagram_data(save_local=False, enable_vision_analysis=True, days_to_fetch=30):
     """
     Fetches Instagram posts and comments from the last N days, merges with existing data,
@@ -1081,6 +1090,7 @@ def upload_new_instagram_data(save_local=False, enable_vision_analysis=True, day
     print(f"Posts: {len(combined_posts_df)} | Comments: {len(combined_comments_df)}")
 
 
+@track_step
 def sync_twilio_opt_ins(save_local=False):
     """
     Sync Twilio SMS opt-ins and opt-outs from message history.
@@ -1099,7 +1109,7 @@ def sync_twilio_opt_ins(save_local=False):
 
     try:
         tracker = TwilioOptInTracker()
-        results = tracker.sync(message_limit=1000)
+        results = tracker.sync()
 
         status_df = results['status']
         history_df = results['history']
@@ -1130,6 +1140,7 @@ def sync_twilio_opt_ins(save_local=False):
 # See line 1965 for the actual main execution block
 
 
+@track_step
 def upload_new_facebook_ads_data(save_local=False, days_back=90):
     """
     Fetches Facebook/Instagram Ads data for the last N days and uploads to S3.
@@ -1192,12 +1203,15 @@ def upload_new_facebook_ads_data(save_local=False, days_back=90):
         raise
 
 
+@track_step
 def upload_new_capitan_checkins(save_local=False, days_back=7):
     """
     Fetches Capitan check-in data for the last N days and merges with existing data in S3.
 
     IMPORTANT: This function MERGES with existing data to preserve historical check-ins.
     Historical data is critical for "New Customer" analysis in the dashboard.
+    Check-ins are stored by month (see checkin_store), so only the months the
+    new check-ins fall in are read and rewritten.
 
     Args:
         save_local: Whether to save CSV files locally
@@ -1225,63 +1239,31 @@ def upload_new_capitan_checkins(save_local=False, days_back=7):
 
     print(f"Fetched {len(new_checkins_df)} new check-in records")
 
-    # Upload to S3
+    # Merge into the month partitions the new check-ins fall in
     uploader = upload_data.DataUploader()
+    store = checkin_store.CheckinStore(uploader)
 
     try:
-        # Download existing check-ins from S3
         print("\nMerging with existing check-in data...")
-        try:
-            csv_content = uploader.download_from_s3(
-                config.aws_bucket_name,
-                config.s3_path_capitan_checkins
-            )
-            existing_checkins_df = uploader.convert_csv_to_df(csv_content)
-            print(f"   Found {len(existing_checkins_df):,} existing check-ins in S3")
-
-            # Combine new and existing data
-            combined_df = pd.concat([existing_checkins_df, new_checkins_df], ignore_index=True)
-
-            # Deduplicate by checkin_id (keep most recent record in case of updates)
-            if 'checkin_id' in combined_df.columns:
-                combined_df = combined_df.drop_duplicates(subset=['checkin_id'], keep='last')
-                print(f"   Combined dataset has {len(combined_df):,} unique check-ins")
-            else:
-                print("   Warning: No checkin_id column found, deduplicating by customer_id + datetime")
-                combined_df = combined_df.drop_duplicates(
-                    subset=['customer_id', 'checkin_datetime'],
-                    keep='last'
-                )
-
-        except Exception as e:
-            print(f"   No existing check-ins found (first upload?): {e}")
-            combined_df = new_checkins_df
-
-        # Upload merged data to S3
-        uploader.upload_to_s3(
-            combined_df,
-            config.aws_bucket_name,
-            config.s3_path_capitan_checkins
-        )
-        print(f"✓ Uploaded {len(combined_df):,} check-ins to S3: {config.s3_path_capitan_checkins}")
+        manifest = store.merge(new_checkins_df)
+        print(f"✓ Merged check-ins into S3: {store.prefix} ({manifest['total_rows']:,} total)")
 
         # Save locally if requested
         if save_local:
             local_path = "data/outputs/capitan_checkins.csv"
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            combined_df.to_csv(local_path, index=False)
+            store.read_all().to_csv(local_path, index=False)
             print(f"✓ Saved locally: {local_path}")
 
-        # Monthly snapshots (save the full combined dataset)
+        # Monthly snapshots (partitions are content-addressed, so this only writes a manifest)
         today = datetime.datetime.now()
         if today.day == config.snapshot_day_of_month:
             print("\nCreating monthly check-in snapshot (1st of month)...")
-            uploader.upload_to_s3(
-                combined_df,
-                config.aws_bucket_name,
-                config.s3_path_capitan_checkins_snapshot + f'_{today.strftime("%Y-%m-%d")}'
-            )
-            print("✓ Monthly snapshot saved")
+            try:
+                snapshot_store.SnapshotStore(uploader).snapshot_store_manifest(
+                    config.s3_path_capitan_checkins, manifest)
+            except Exception as e:
+                print(f"⚠️  Could not snapshot check-ins: {e}")
 
         print("✓ Capitan check-in data upload complete!")
 
@@ -1290,6 +1272,7 @@ def upload_new_capitan_checkins(save_local=False, days_back=7):
         raise
 
 
+@track_step
 def upload_at_risk_members(save_local=False):
     """
     Identifies at-risk members across different categories and uploads to S3.
@@ -1369,6 +1352,7 @@ def upload_at_risk_members(save_local=False):
         raise
 
 
+@track_step
 def upload_new_members_report(save_local=False, days_back=28):
     """
     Generates new members report (members who joined in last N days) and uploads to S3.
@@ -1443,6 +1427,7 @@ def upload_new_members_report(save_local=False, days_back=28):
         raise
 
 
+@track_step
 def upload_new_mailchimp_data(save_local=False, enable_content_analysis=True, days_to_fetch=90):
     """
     Fetches Mailchimp campaign, automation, landing page, and audience data,
@@ -1683,6 +1668,7 @@ def upload_new_mailchimp_data(save_local=False, enable_content_analysis=True, da
     print(f"Campaigns: {len(combined_campaigns_df)} | Automations: {len(automations_df)} | Landing Pages: {len(landing_pages_df)} | Subscribers: {len(subscribers_df) if 'subscribers_df' in dir() else 0}")
 
 
+@track_step
 def upload_new_capitan_associations_events(save_local=False, events_days_back=None, fetch_activity_log=False):
     """
     Fetches Capitan associations, association-members, and events data and uploads to S3.
@@ -1797,6 +1783,7 @@ def upload_new_capitan_associations_events(save_local=False, events_days_back=No
     print(f"Associations: {associations_count} | Members: {members_count} | Events: {events_count}")
 
 
+@track_step
 def upload_new_pass_transfers(save_local=False, days_back=7):
     """
     Parse and upload pass transfers from recent check-ins.
@@ -1823,6 +1810,7 @@ def upload_new_pass_transfers(save_local=False, days_back=7):
     return transfers_df
 
 
+@track_step
 def upload_new_customer_interactions(save_local=False, days_back=7):
     """
     Build and upload customer interactions from recent data.
@@ -1845,6 +1833,7 @@ def upload_new_customer_interactions(save_local=False, days_back=7):
     print(f"=== Customer Interactions Upload Complete ===\n")
 
 
+@track_step
 def upload_new_customer_connections(save_local=False):
     """
     Rebuild and upload customer connections summary.
@@ -1865,6 +1854,7 @@ def upload_new_customer_connections(save_local=False):
     print(f"=== Customer Connections Upload Complete ===\n")
 
 
+@track_step
 def upload_new_ga4_data(save_local=False, days_back=7):
     """
     Fetches GA4 (Google Analytics 4) page view and event data.
@@ -2011,6 +2001,7 @@ def upload_new_ga4_data(save_local=False, days_back=7):
     print(f"\n=== GA4 Data Upload Complete ===\n")
 
 
+@track_step
 def upload_new_shopify_data(save_local=False, days_back=7):
     """
     Fetch Shopify orders and upload to S3.
@@ -2031,6 +2022,7 @@ def upload_new_shopify_data(save_local=False, days_back=7):
     return orders
 
 
+@track_step
 def sync_shopify_customer_flags(dry_run=False):
     """
     Sync customer flags from S3 to Shopify customer tags.
@@ -2056,6 +2048,7 @@ def sync_shopify_customer_flags(dry_run=False):
     print(f"\n=== Shopify Flag Sync Complete ===\n")
 
 
+@track_step
 def upload_new_sendgrid_data(save_local=False, days_back=7):
     """
     Fetch SendGrid email activity data and upload to S3.
@@ -2135,6 +2128,7 @@ def upload_new_sendgrid_data(save_local=False, days_back=7):
         print("   (Skipping SendGrid - may be authentication issue or API limit)")
 
 
+@track_step
 def upload_new_mailchimp_member_tags(save_local=False):
     """
     Fetch Mailchimp audience members with their tags and upload to S3.
@@ -0,0 +1,368 @@
+"""
+Pipeline Step Scheduler
+
+Runs a declared graph of pipeline steps with a small worker pool:
+- Steps whose dependencies have all succeeded run concurrently
+- A step that fails or times out causes its downstream steps to be skipped
+- Each step can have its own timeout
+- Partial reruns via `only` (just these steps) or `start_from` (this step
+  and every step declared after it)
+- Upstream fetches wrapped in `@run_once` run at most once inside a
+  `run_once_scope()`, however many steps call them
+
+Most daily steps are network-bound API fetches, so threads are enough to
+overlap them.
+
+Usage:
+    steps = [
+        PipelineStep('checkins', 'Capitan check-ins', fetch_checkins),
+        PipelineStep('pass_transfers', 'Pass transfers', build_transfers,
+                     depends_on=['checkins']),
+    ]
+    with run_once_scope() as scope:
+        results = run_steps(steps, max_workers=4)
+
+    @run_once
+    def sync_capitan_customers(full=False):
+        ...
+"""
+
+import contextlib
+import contextvars
+import functools
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from data_pipeline import pipeline_telemetry
+
+
+@dataclass
+class PipelineStep:
+    """One unit of work in the daily pipeline."""
+    name: str
+    label: str
+    func: Callable[[], Any]
+    depends_on: List[str] = field(default_factory=list)
+    timeout: Optional[float] = None  # seconds, None = no limit
+
+
+@dataclass
+class StepResult:
+    """Outcome of a single step."""
+    name: str
+    status: str  # 'success', 'failed', 'timeout', 'skipped'
+    duration_seconds: float = 0.0
+    summary: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class _OnceCall:
+    """A memoized call: in flight until `done` is set."""
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    error: Optional[BaseException] = None
+    seconds: float = 0.0
+
+
+@dataclass
+class RunOnceScope:
+    """The @run_once calls made during one pipeline invocation."""
+    calls: Dict[Hashable, _OnceCall] = field(default_factory=dict)
+    hits: int = 0
+    seconds_saved: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Number of repeated calls served from memory and the time they saved."""
+        with self.lock:
+            return {'hits': self.hits, 'seconds_saved': self.seconds_saved}
+
+
+_current_scope: contextvars.ContextVar = contextvars.ContextVar('run_once_scope', default=None)
+
+
+@contextlib.contextmanager
+def run_once_scope() -> Iterator[RunOnceScope]:
+    """
+    Memoize @run_once calls made inside the block.
+
+    Steps started by run_steps inside the block share the scope; calls made
+    outside any scope are not memoized.
+
+    Yields:
+        RunOnceScope with the hit counts for the run summary
+    """
+    scope = RunOnceScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def run_once(func):
+    """
+    Memoize a pipeline fetch for the current run_once_scope().
+
+    The first call with a given set of arguments runs the function; later
+    calls (from any thread) get its return value, and calls made while it is
+    still running wait for it. A call that raises is not memoized, so a later
+    step can retry it. Every caller gets the same object back, so callers
+    must treat the result as read-only.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        scope = _current_scope.get()
+        if scope is None:
+            return func(*args, **kwargs)
+
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        with scope.lock:
+            call = scope.calls.get(key)
+            owner = call is None
+            if owner:
+                call = scope.calls[key] = _OnceCall()
+
+        if not owner:
+            call.done.wait()
+            if call.error is None:
+                with scope.lock:
+                    scope.hits += 1
+                    scope.seconds_saved += call.seconds
+                print(f"♻️  {func.__name__} already ran this pipeline run, "
+                      f"reusing result (saved {call.seconds:.1f}s)")
+                return call.value
+            raise call.error
+
+        start = time.monotonic()
+        try:
+            call.value = func(*args, **kwargs)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            with scope.lock:
+                scope.calls.pop(key, None)
+            raise
+        finally:
+            call.seconds = time.monotonic() - start
+            call.done.set()
+
+    return wrapper
+
+
+def validate_steps(steps: List[PipelineStep]):
+    """
+    Check step names are unique, dependencies exist, and there are no cycles.
+
+    Raises:
+        ValueError: If the graph is invalid
+    """
+    names = [s.name for s in steps]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate step names: {sorted(duplicates)}")
+
+    known = set(names)
+    for step in steps:
+        missing = [d for d in step.depends_on if d not in known]
+        if missing:
+            raise ValueError(f"Step '{step.name}' depends on unknown steps: {missing}")
+
+    # Kahn's algorithm - anything left over is part of a cycle
+    remaining = {s.name: set(s.depends_on) for s in steps}
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between steps: {sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def select_steps(
+    steps: List[PipelineStep],
+    only: Optional[List[str]] = None,
+    start_from: Optional[str] = None,
+) -> List[PipelineStep]:
+    """
+    Pick the steps to run for a partial rerun.
+
+    Dependencies on steps that are not selected are treated as already
+    satisfied (their outputs from the previous run are in S3).
+
+    Args:
+        steps: All declared steps, in declaration order
+        only: Run exactly these step names
+        start_from: Run this step and every step declared after it
+
+    Returns:
+        Selected steps, in declaration order
+    """
+    names = [s.name for s in steps]
+
+    if only:
+        unknown = [n for n in only if n not in names]
+        if unknown:
+            raise ValueError(f"Unknown steps: {unknown}. Available: {names}")
+        return [s for s in steps if s.name in only]
+
+    if start_from:
+        if start_from not in names:
+            raise ValueError(f"Unknown step: {start_from}. Available: {names}")
+        return steps[names.index(start_from):]
+
+    return list(steps)
+
+
+def _run_in_thread(step: PipelineStep, results: "queue.Queue"):
+    start = time.monotonic()
+    try:
+        with pipeline_telemetry.step(step.name):
+            summary = step.func()
+        results.put((step.name, 'success', time.monotonic() - start, summary, None))
+    except Exception as e:
+        results.put((step.name, 'failed', time.monotonic() - start, None, str(e)))
+
+
+def _warm_up_boto3():
+    # The default boto3 session is not safe to initialise from several
+    # threads at once; create one client up front so workers reuse it.
+    try:
+        import boto3
+        boto3.client('s3')
+    except Exception:
+        pass
+
+
+def run_steps(
+    steps: List[PipelineStep],
+    max_workers: int = 4,
+    only: Optional[List[str]] = None,
+    start_from: Optional[str] = None,
+    poll_interval: float = 1.0,
+) -> Dict[str, StepResult]:
+    """
+    Run pipeline steps, overlapping independent ones.
+
+    A step starts once every selected dependency has succeeded. Steps run in
+    daemon threads, so a step that exceeds its timeout is reported and its
+    dependents are skipped, but the stuck call itself cannot be interrupted.
+
+    Args:
+        steps: All declared steps, in declaration order
+        max_workers: Maximum number of steps running at once
+        only: Run exactly these step names
+        start_from: Run this step and every step declared after it
+        poll_interval: Seconds between timeout checks
+
+    Returns:
+        Dict of step name -> StepResult, in declaration order
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+    validate_steps(steps)
+    selected = select_steps(steps, only=only, start_from=start_from)
+    selected_names = {s.name for s in selected}
+
+    pending = {s.name: s for s in selected}
+    deps = {
+        s.name: [d for d in s.depends_on if d in selected_names]
+        for s in selected
+    }
+    running = {}  # name -> (start time, deadline)
+    results: Dict[str, StepResult] = {}
+    finished: "queue.Queue" = queue.Queue()
+    labels = {s.name: s.label for s in selected}
+
+    _warm_up_boto3()
+
+    def record(result: StepResult):
+        results[result.name] = result
+        label = labels[result.name]
+        if result.status == 'success':
+            extra = f" ({result.summary})" if result.summary else ""
+            print(f"✅ [{result.name}] {label} done in {result.duration_seconds:.1f}s{extra}\n")
+        elif result.status == 'skipped':
+            print(f"⏭️  [{result.name}] {label} skipped: {result.error}\n")
+        else:
+            print(f"❌ [{result.name}] {label} {result.status} after "
+                  f"{result.duration_seconds:.1f}s: {result.error}\n")
+
+    while pending or running:
+        # Skip anything downstream of a failure
+        for name in list(pending):
+            failed = [d for d in deps[name] if d in results and results[d].status != 'success']
+            if failed:
+                del pending[name]
+                record(StepResult(name, 'skipped', error=f"upstream failed: {', '.join(failed)}"))
+
+        # Start every ready step while there is capacity
+        for name in list(pending):
+            if len(running) >= max_workers:
+                break
+            if all(d in results for d in deps[name]):
+                step = pending.pop(name)
+                print(f"▶️  [{name}] {step.label}...")
+                start = time.monotonic()
+                deadline = start + step.timeout if step.timeout else None
+                running[name] = (start, deadline)
+                # Run in a copy of this context so the step sees the caller's run_once_scope
+                threading.Thread(
+                    target=contextvars.copy_context().run, args=(_run_in_thread, step, finished),
+                    daemon=True, name=f"pipeline-{name}",
+                ).start()
+
+        if not running:
+            continue
+
+        try:
+            name, status, duration, summary, error = finished.get(timeout=poll_interval)
+            if name in running:
+                del running[name]
+                record(StepResult(name, status, duration, summary, error))
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for name, (start, deadline) in list(running.items()):
+            if deadline is not None and now > deadline:
+                del running[name]
+                record(StepResult(name, 'timeout', now - start,
+                                  error=f"exceeded {deadline - start:.0f}s timeout"))
+
+    return {s.name: results[s.name] for s in selected}
+
+
+def print_run_summary(
+    results: Dict[str, StepResult],
+    wall_seconds: float,
+    run_once_stats: Optional[Dict[str, float]] = None,
+):
+    """Print a per-step status table, total wall-clock time and (if given) RunOnceScope.stats()."""
+    icons = {'success': '✅', 'failed': '❌', 'timeout': '⏱️ ', 'skipped': '⏭️ '}
+
+    print(f"\n{'='*80}")
+    print("STEP SUMMARY")
+    print(f"{'='*80}")
+    for result in results.values():
+        icon = icons.get(result.status, '?')
+        print(f"{icon} {result.name:<32} {result.status:<8} {result.duration_seconds:>8.1f}s")
+
+    step_seconds = sum(r.duration_seconds for r in results.values())
+    counts = {}
+    for result in results.values():
+        counts[result.status] = counts.get(result.status, 0) + 1
+
+    print("\nSteps: " + ", ".join(f"{counts[s]} {s}" for s in sorted(counts)))
+    print(f"Total wall-clock time: {wall_seconds/60:.1f} min ({wall_seconds:.0f}s), "
+          f"sum of step times: {step_seconds/60:.1f} min ({step_seconds:.0f}s)")
+
+    once = run_once_stats or {'hits': 0}
+    if once['hits']:
+        print(f"Repeated fetches skipped: {once['hits']}, "
+              f"time saved: {once['seconds_saved']/60:.1f} min ({once['seconds_saved']:.0f}s)")
@@ -0,0 +1,315 @@
+"""
+Pipeline Run Telemetry
+
+Records per-step timing and resource usage for pipeline runs and writes a
+run log to S3 so the System Health tab can chart step durations over time.
+
+For each step it records:
+- Wall time and CPU time (the step's own thread plus work it hands to
+  helper thread pools through `in_current_context`)
+- Peak RSS of the whole process when the step finished (a process figure
+  shared by concurrent steps, not the step's own memory)
+- Rows read/written and bytes read/written through DataUploader
+- External HTTP API call counts and total latency per host (requests-based
+  clients: Capitan, Stripe, Square, Twilio, Shopify, ...)
+
+Steps nest: counters are attributed to every step active in the current
+context, so a step that calls another instrumented function includes the
+inner step's work and the inner step gets its own record with `parent` set.
+The active steps live in a ContextVar; code that fans work out to a thread
+pool wraps the task with `in_current_context` so the pool's S3 and API
+calls still count towards the step:
+
+    executor.map(pipeline_telemetry.in_current_context(read_file), keys)
+
+Run logs are stored as JSONL at:
+    telemetry/pipeline_runs/date=YYYY-MM-DD/run_<run_id>.jsonl
+
+Usage:
+    @track_step
+    def upload_new_capitan_checkins(...):
+        ...
+
+    with step('fetch_referrals'):
+        ...
+
+    upload_run_log()
+"""
+
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from data_pipeline import config
+
+RUN_ID = datetime.now().strftime('%Y%m%dT%H%M%S')
+
+_records: List[Dict] = []
+_records_lock = threading.Lock()
+_counters_lock = threading.Lock()
+_active: contextvars.ContextVar = contextvars.ContextVar('pipeline_telemetry_steps', default=())
+_running: Dict[str, Dict] = {}  # top-level step name -> its in-progress record
+_http_hooks_installed = False
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _active_steps() -> Tuple[Dict, ...]:
+    return _active.get()
+
+
+def _new_record(name: str) -> Dict:
+    stack = _active_steps()
+    return {
+        'run_id': RUN_ID,
+        'name': name,
+        'parent': stack[-1]['name'] if stack else None,
+        'status': 'running',
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'wall_seconds': 0.0,
+        'cpu_seconds': 0.0,
+        'process_peak_rss_mb': None,
+        'rows_in': 0,
+        'rows_out': 0,
+        's3_reads': 0,
+        's3_writes': 0,
+        's3_bytes_read': 0,
+        's3_bytes_written': 0,
+        'api_calls': {},
+        'api_seconds': {},
+        'error': None,
+    }
+
+
+@contextmanager
+def step(name: str):
+    """Record telemetry for the enclosed block as one pipeline step."""
+    install_http_hooks()
+
+    record = _new_record(name)
+    top_level = not _active_steps()
+    token = _active.set(_active_steps() + (record,))
+    if top_level:
+        with _records_lock:
+            _running[name] = record
+
+    wall_start = time.monotonic()
+    cpu_start = time.thread_time()
+    error = None
+    try:
+        yield record
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _active.reset(token)
+        _add_cpu_seconds((record,), time.thread_time() - cpu_start)
+        with _records_lock:
+            if _running.get(name) is record:
+                del _running[name]
+            # A step reported as timed out was already recorded; its late finish is not a second run
+            if record['status'] == 'running':
+                record['status'] = 'success' if error is None else 'failed'
+                record['error'] = None if error is None else str(error)[:500]
+                record['wall_seconds'] = round(time.monotonic() - wall_start, 3)
+                record['process_peak_rss_mb'] = _peak_rss_mb()
+                _records.append(record)
+
+
+def track_step(func):
+    """Decorator form of `step`, using the function name as the step name."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with step(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def record_outcome(name: str, status: str, wall_seconds: float = 0.0, error: Optional[str] = None):
+    """
+    Record a step that never ran to completion (skipped or timed out).
+
+    A timed-out step that is still running keeps its one record: it is
+    closed here with the timeout status, and the stuck call finishing later
+    doesn't add another.
+    """
+    with _records_lock:
+        record = _running.pop(name, None) or _new_record(name)
+        record.update(status=status, wall_seconds=round(wall_seconds, 3), error=error)
+        record['process_peak_rss_mb'] = _peak_rss_mb()
+        _records.append(record)
+
+
+def in_current_context(func: Callable) -> Callable:
+    """
+    Wrap a task for a helper thread pool so it counts towards the active steps.
+
+    Each call runs in a copy of the context the wrapper was made in, and the
+    CPU time it uses on the worker thread is added to those steps.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cpu_start = time.thread_time()
+        try:
+            return context.copy().run(func, *args, **kwargs)
+        finally:
+            _add_cpu_seconds(context.get(_active, ()), time.thread_time() - cpu_start)
+    return wrapper
+
+
+def _add_cpu_seconds(steps: Tuple[Dict, ...], seconds: float):
+    with _counters_lock:
+        for record in steps:
+            record['cpu_seconds'] = round(record['cpu_seconds'] + seconds, 3)
+
+
+def record_s3_read(nbytes: int):
+    with _counters_lock:
+        for record in _active_steps():
+            record['s3_reads'] += 1
+            record['s3_bytes_read'] += nbytes
+
+
+def record_s3_write(nbytes: int, rows: int = 0):
+    with _counters_lock:
+        for record in _active_steps():
+            record['s3_writes'] += 1
+            record['s3_bytes_written'] += nbytes
+            record['rows_out'] += rows
+
+
+def record_rows_in(rows: int):
+    with _counters_lock:
+        for record in _active_steps():
+            record['rows_in'] += rows
+
+
+def record_api_call(host: str, seconds: float):
+    with _counters_lock:
+        for record in _active_steps():
+            record['api_calls'][host] = record['api_calls'].get(host, 0) + 1
+            record['api_seconds'][host] = round(record['api_seconds'].get(host, 0.0) + seconds, 3)
+
+
+def install_http_hooks():
+    """Count calls made through `requests` (and clients built on it) per host."""
+    global _http_hooks_installed
+    if _http_hooks_installed:
+        return
+
+    try:
+        import requests
+    except ImportError:
+        return
+
+    original_request = requests.Session.request
+
+    @functools.wraps(original_request)
+    def timed_request(self, method, url, *args, **kwargs):
+        if not _active_steps():
+            return original_request(self, method, url, *args, **kwargs)
+        start = time.monotonic()
+        try:
+            return original_request(self, method, url, *args, **kwargs)
+        finally:
+            record_api_call(urlparse(str(url)).netloc, time.monotonic() - start)
+
+    requests.Session.request = timed_request
+    _http_hooks_installed = True
+
+
+def get_run_records() -> List[Dict]:
+    """Return a copy of every step record collected in this process."""
+    with _records_lock:
+        return [dict(r) for r in _records]
+
+
+def run_log_key(run_date: Optional[datetime] = None) -> str:
+    run_date = run_date or datetime.now()
+    return (f"{config.s3_path_pipeline_run_logs}/date={run_date.strftime('%Y-%m-%d')}"
+            f"/run_{RUN_ID}.jsonl")
+
+
+def upload_run_log(save_local: bool = False) -> Optional[str]:
+    """
+    Write this process's step records to S3 as JSONL.
+
+    Args:
+        save_local: Also write a copy to data/outputs/
+
+    Returns:
+        S3 key written, or None if there was nothing to write
+    """
+    from data_pipeline import upload_data
+
+    records = get_run_records()
+    if not records:
+        return None
+
+    body = "\n".join(json.dumps(r, default=str) for r in records) + "\n"
+    key = run_log_key()
+
+    if save_local:
+        import os
+        os.makedirs("data/outputs", exist_ok=True)
+        with open(f"data/outputs/pipeline_run_{RUN_ID}.jsonl", "w") as f:
+            f.write(body)
+
+    uploader = upload_data.DataUploader()
+    uploader.s3.put_object(Bucket=config.aws_bucket_name, Key=key, Body=body)
+    print(f"📊 Uploaded run telemetry ({len(records)} steps) to s3://{config.aws_bucket_name}/{key}")
+    return key
+
+
+def load_run_logs(days: int = 30) -> pd.DataFrame:
+    """
+    Load step records from the last N days of run logs.
+
+    Returns:
+        DataFrame with one row per step per run (empty if no logs yet)
+    """
+    from data_pipeline import upload_data
+
+    uploader = upload_data.DataUploader()
+    cutoff = (datetime.now() - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+
+    rows = []
+    for key in uploader.list_keys(config.aws_bucket_name, config.s3_path_pipeline_run_logs + '/'):
+        date_part = key.split('date=')[-1].split('/')[0]
+        if date_part < cutoff:
+            continue
+        content = uploader.download_from_s3(config.aws_bucket_name, key)
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        rows.extend(json.loads(line) for line in content.splitlines() if line.strip())
+
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df['started_at'] = pd.to_datetime(df['started_at'], errors='coerce')
+        # Logs written before the rename call the process figure peak_rss_mb
+        if 'peak_rss_mb' in df.columns:
+            legacy = df.pop('peak_rss_mb')
+            df['process_peak_rss_mb'] = df.get('process_peak_rss_mb', legacy).fillna(legacy)
+    return df
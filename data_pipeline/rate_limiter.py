@@ -0,0 +1,25 @@
+"""
+Shared request pacing for API clients that fan out over a thread pool.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Spaces calls from all threads at most `per_second` apart (0 = no limit)."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
@@ -313,6 +313,23 @@ class SMSConsentTracker:
         print(f"Found {len(active)} active consents")
         return active
 
+    def get_active_phone_numbers(self) -> set:
+        """
+        Phone numbers whose most recent consent is active, loaded once.
+
+        Same answer as get_consent_status(phone)['status'] == 'active' for
+        every number, without re-reading the consent file per number.
+
+        Returns:
+            Set of E.164 phone numbers
+        """
+        consents = self._load_consents()
+        if consents.empty:
+            return set()
+
+        latest = consents.sort_values('timestamp', kind='stable').drop_duplicates('phone_number', keep='last')
+        return set(latest.loc[latest['status'] == 'active', 'phone_number'])
+
     def export_consent_audit(self, output_path: str = 'data/sms_consent_audit.csv'):
         """
         Export full consent audit trail to CSV.
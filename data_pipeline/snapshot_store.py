@@ -0,0 +1,396 @@
+"""
+Content-Addressed Monthly Snapshots
+
+Replaces the monthly full-copy snapshot uploads (`<artifact>_YYYY-MM-DD`) with
+a manifest per snapshot that points at immutable, content-hashed partition
+files. Artifacts are split into partitions (by month of a date column, or by
+a hash bucket of an ID column); a partition whose contents have not changed
+since an earlier snapshot is already stored and is not uploaded again, so a
+snapshot mostly costs a small manifest write. Transaction and check-in
+snapshots reuse their partitioned store's own content-addressed files and
+upload nothing but the manifest.
+
+The saving depends on how the artifact changes between snapshots. Month
+partitions of event-like tables (transactions, check-ins, customer events)
+are mostly historical and stay identical. The customer tables
+(capitan_customers, customers_master, customer_identifiers, customer_flags)
+have no such key: they are hash-bucketed by customer_id, and a month of
+activity touches rows in nearly every bucket, so their monthly snapshots
+still upload close to a full copy. For those tables this store mainly buys
+point-in-time reads and identical snapshots that cost nothing, not storage.
+
+Layout:
+    snapshots/objects/<artifact>/<sha256>.csv
+    snapshots/manifests/<artifact>/YYYY-MM-DD.json
+
+Point-in-time reads:
+    df = load_as_of(config.s3_path_customers_master, "2025-09-15")
+    df = load_as_of(config.s3_path_combined, "2025-11-01",
+                    start_date="2025-01-01", end_date="2025-02-28")
+
+Snapshots taken before this change (full copies) are still found by
+`load_as_of` through each artifact's legacy snapshot path.
+"""
+
+import datetime
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline import pipeline_telemetry
+from data_pipeline import upload_data
+from data_pipeline.partitioned_store import _checksum, row_days
+
+# Artifact key -> how to snapshot it
+#   name: folder name under snapshots/
+#   partition_by: ("month", date column) or ("hash", id column)
+#   legacy_snapshot: prefix of the old full-copy snapshots (<prefix>_YYYY-MM-DD)
+SNAPSHOT_ARTIFACTS = {
+    config.s3_path_combined: {
+        "name": "transactions",
+        "partition_by": ("month", "Date"),
+        "legacy_snapshot": config.s3_path_combined_snapshot,
+    },
+    config.s3_path_capitan_checkins: {
+        "name": "capitan_checkins",
+        "partition_by": ("month", "checkin_datetime"),
+        "legacy_snapshot": config.s3_path_capitan_checkins_snapshot,
+    },
+    config.s3_path_capitan_customers: {
+        "name": "capitan_customers",
+        "partition_by": ("hash", "customer_id"),
+        "legacy_snapshot": config.s3_path_capitan_customers_snapshot,
+    },
+    config.s3_path_customers_master: {
+        "name": "customers_master",
+        "partition_by": ("hash", "customer_id"),
+        "legacy_snapshot": config.s3_path_customers_master_snapshot,
+    },
+    config.s3_path_customer_identifiers: {
+        "name": "customer_identifiers",
+        "partition_by": ("hash", "customer_id"),
+        "legacy_snapshot": config.s3_path_customer_identifiers_snapshot,
+    },
+    config.s3_path_customer_events: {
+        "name": "customer_events",
+        "partition_by": ("month", "event_date"),
+        "legacy_snapshot": config.s3_path_customer_events_snapshot,
+    },
+    config.s3_path_customer_flags: {
+        "name": "customer_flags",
+        "partition_by": ("hash", "customer_id"),
+        "legacy_snapshot": config.s3_path_customer_flags_snapshot,
+    },
+}
+
+# Buckets for ("hash", column) artifacts. Any changed row rewrites its whole
+# bucket, so between monthly snapshots nearly all buckets are re-uploaded.
+HASH_BUCKETS = 32
+
+
+def _date_str(value) -> str:
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def partition_names(df: pd.DataFrame, partition_by) -> pd.Series:
+    """
+    Partition name for every row: "month=YYYY-MM" or "bucket=NN".
+
+    Rows whose partition column is missing or unparseable go to
+    "month=none" / "bucket=none". Hash buckets spread new and edited customers
+    over every bucket, so they only dedupe snapshots of unchanged tables.
+    """
+    kind, column = partition_by
+    if column not in df.columns:
+        return pd.Series(f"{kind if kind == 'month' else 'bucket'}=none", index=df.index)
+
+    if kind == "month":
+        return ("month=" + row_days(df[column]).str[:7]).fillna("month=none")
+
+    values = df[column]
+    hashes = pd.util.hash_pandas_object(values.astype(str), index=False) % HASH_BUCKETS
+    names = "bucket=" + hashes.map(lambda h: f"{h:02d}")
+    return names.where(values.notna(), "bucket=none")
+
+
+class SnapshotStore:
+    """Writes and reads manifest-based snapshots of pipeline artifacts."""
+
+    def __init__(
+        self,
+        uploader: upload_data.DataUploader = None,
+        bucket: str = None,
+        prefix: str = None,
+        max_workers: int = 8,
+    ):
+        """
+        Args:
+            uploader: DataUploader to use (a new one by default)
+            bucket: S3 bucket (config.aws_bucket_name by default)
+            prefix: S3 prefix for snapshot objects and manifests
+            max_workers: Concurrent partition reads/writes
+        """
+        self.uploader = uploader or upload_data.DataUploader()
+        self.bucket = bucket or config.aws_bucket_name
+        self.prefix = prefix or config.s3_path_snapshots
+        self.max_workers = max_workers
+        self._stored_objects = {}  # artifact name -> set of object keys already in S3
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def artifact(key: str) -> Dict:
+        if key not in SNAPSHOT_ARTIFACTS:
+            raise ValueError(f"No snapshot settings for {key}. Known: {sorted(SNAPSHOT_ARTIFACTS)}")
+        return SNAPSHOT_ARTIFACTS[key]
+
+    def _manifest_prefix(self, name: str) -> str:
+        return f"{self.prefix}/manifests/{name}/"
+
+    def _stored(self, name: str) -> set:
+        if name not in self._stored_objects:
+            self._stored_objects[name] = set(
+                self.uploader.list_keys(self.bucket, f"{self.prefix}/objects/{name}/"))
+        return self._stored_objects[name]
+
+    def _map(self, func, items) -> List:
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(pipeline_telemetry.in_current_context(func), items))
+
+    def _put_manifest(self, name: str, snapshot_date: str, manifest: Dict) -> str:
+        key = f"{self._manifest_prefix(name)}{snapshot_date}.json"
+        body = json.dumps(manifest, indent=2).encode("utf-8")
+        self.uploader.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+        pipeline_telemetry.record_s3_write(len(body))
+        return key
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def snapshot(self, key: str, df: pd.DataFrame, snapshot_date=None) -> Dict:
+        """
+        Snapshot an artifact, uploading only partitions not already stored.
+
+        Args:
+            key: Artifact S3 key (must be in SNAPSHOT_ARTIFACTS)
+            df: Artifact contents
+            snapshot_date: Date to file the snapshot under (today by default)
+
+        Returns:
+            The snapshot manifest
+        """
+        artifact = self.artifact(key)
+        name = artifact["name"]
+        snapshot_date = _date_str(snapshot_date or datetime.date.today())
+        stored = self._stored(name)
+
+        names = partition_names(df, artifact["partition_by"])
+
+        def store_partition(item):
+            partition, rows = item
+            buffer = io.StringIO()
+            rows.to_csv(buffer, index=False)
+            body = buffer.getvalue().encode("utf-8")
+            sha256 = _checksum(body)
+            object_key = f"{self.prefix}/objects/{name}/{sha256}.csv"
+            uploaded = object_key not in stored
+            if uploaded:
+                self.uploader.s3.put_object(Bucket=self.bucket, Key=object_key, Body=body)
+                pipeline_telemetry.record_s3_write(len(body), rows=len(rows))
+            entry = {"name": partition, "object": object_key, "rows": len(rows), "sha256": sha256}
+            return entry, uploaded, len(body)
+
+        results = self._map(store_partition, sorted(df.groupby(names, sort=False), key=lambda g: g[0]))
+        stored.update(entry["object"] for entry, _, _ in results)
+
+        manifest = {
+            "artifact": key,
+            "snapshot_date": snapshot_date,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "rows": len(df),
+            "columns": list(df.columns),
+            "partitions": [entry for entry, _, _ in results],
+        }
+        self._put_manifest(name, snapshot_date, manifest)
+
+        new_bytes = sum(size for _, uploaded, size in results if uploaded)
+        total_bytes = sum(size for _, _, size in results)
+        print(f"📸 Snapshot {name} {snapshot_date}: {len(df):,} rows, "
+              f"{sum(u for _, u, _ in results)} of {len(results)} partitions uploaded "
+              f"({new_bytes / 1e6:.1f} of {total_bytes / 1e6:.1f} MB)")
+        return manifest
+
+    def snapshot_store_manifest(self, key: str, store_manifest: Dict, snapshot_date=None) -> Dict:
+        """
+        Snapshot a partitioned store (transactions, check-ins) by recording its manifest.
+
+        Its partition files are content-addressed and kept while any snapshot
+        references them (see PartitionedStore.delete_unreferenced), so nothing
+        is copied.
+
+        Args:
+            key: Artifact S3 key the store holds (must be in SNAPSHOT_ARTIFACTS)
+            store_manifest: Current store manifest
+            snapshot_date: Date to file the snapshot under (today by default)
+
+        Returns:
+            The snapshot manifest
+        """
+        name = self.artifact(key)["name"]
+        snapshot_date = _date_str(snapshot_date or datetime.date.today())
+        partitions = [
+            {"name": partition, "object": entry["key"], "rows": entry["rows"], "sha256": entry["sha256"]}
+            for partition, entry in store_manifest["partitions"].items()
+        ]
+        manifest = {
+            "artifact": key,
+            "snapshot_date": snapshot_date,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "rows": sum(p["rows"] for p in partitions),
+            "columns": None,
+            "partitions": partitions,
+        }
+        self._put_manifest(name, snapshot_date, manifest)
+        print(f"📸 Snapshot {name} {snapshot_date}: {manifest['rows']:,} rows "
+              f"in {len(partitions)} partitions (manifest only)")
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def list_snapshots(self, key: str) -> List[str]:
+        """Dates (YYYY-MM-DD) of manifest snapshots for an artifact, oldest first."""
+        name = self.artifact(key)["name"]
+        prefix = self._manifest_prefix(name)
+        return sorted(k[len(prefix):-len(".json")] for k in self.uploader.list_keys(self.bucket, prefix)
+                      if k.endswith(".json"))
+
+    def load_manifest(self, key: str, snapshot_date: str) -> Dict:
+        name = self.artifact(key)["name"]
+        content = self.uploader.download_from_s3(
+            self.bucket, f"{self._manifest_prefix(name)}{snapshot_date}.json")
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        return json.loads(content)
+
+    def referenced_objects(self, key: str) -> set:
+        """Every object key referenced by any snapshot of an artifact."""
+        referenced = set()
+        for snapshot_date in self.list_snapshots(key):
+            manifest = self.load_manifest(key, snapshot_date)
+            referenced.update(p["object"] for p in manifest["partitions"])
+        return referenced
+
+    def _read_object(self, partition: Dict) -> pd.DataFrame:
+        content = self.uploader.download_from_s3(self.bucket, partition["object"])
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        if _checksum(content) != partition["sha256"]:
+            raise ValueError(f"Checksum mismatch for {partition['object']}")
+        return self.uploader.convert_csv_to_df(content)
+
+    def _legacy_snapshots(self, key: str) -> Dict[str, str]:
+        legacy = self.artifact(key).get("legacy_snapshot")
+        if not legacy:
+            return {}
+        keys = self.uploader.list_keys(self.bucket, legacy + "_")
+        return {k[len(legacy) + 1:][:10]: k for k in keys}
+
+    def load_as_of(self, key: str, as_of, start_date=None, end_date=None) -> pd.DataFrame:
+        """
+        Load an artifact as it was in the latest snapshot taken on or before as_of.
+
+        For month-partitioned artifacts, start_date/end_date limit the read to
+        partitions (and rows) in that range, so only those files are downloaded.
+
+        Args:
+            key: Artifact S3 key (must be in SNAPSHOT_ARTIFACTS)
+            as_of: Point in time to read
+            start_date: Earliest row date to include (month-partitioned artifacts)
+            end_date: Latest row date to include (month-partitioned artifacts)
+
+        Returns:
+            DataFrame of the artifact at that snapshot
+
+        Raises:
+            LookupError: If there is no snapshot on or before as_of
+        """
+        artifact = self.artifact(key)
+        as_of = _date_str(as_of)
+
+        snapshot_date = max((d for d in self.list_snapshots(key) if d <= as_of), default=None)
+        legacy = {d: k for d, k in self._legacy_snapshots(key).items() if d <= as_of}
+        legacy_date = max(legacy, default=None)
+
+        if snapshot_date is None and legacy_date is None:
+            raise LookupError(f"No snapshot of {key} on or before {as_of}")
+
+        kind, column = artifact["partition_by"]
+        if snapshot_date is None or (legacy_date is not None and legacy_date > snapshot_date):
+            print(f"Loading full-copy snapshot {legacy[legacy_date]}")
+            content = self.uploader.download_from_s3(self.bucket, legacy[legacy_date])
+            df = self.uploader.convert_csv_to_df(content)
+        else:
+            manifest = self.load_manifest(key, snapshot_date)
+            partitions = manifest["partitions"]
+            if kind == "month" and (start_date is not None or end_date is not None):
+                partitions = [p for p in partitions if self._partition_overlaps(p["name"], start_date, end_date)]
+            print(f"Loading {key} as of {snapshot_date} ({len(partitions)} of "
+                  f"{len(manifest['partitions'])} partitions)")
+            frames = self._map(self._read_object, partitions)
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=manifest["columns"])
+            if manifest.get("columns"):
+                df = df.reindex(columns=manifest["columns"])
+
+        if kind == "month" and column in df.columns and (start_date is not None or end_date is not None):
+            dates = row_days(df[column])
+            in_range = dates.notna()
+            if start_date is not None:
+                in_range &= dates >= _date_str(start_date)
+            if end_date is not None:
+                in_range &= dates <= _date_str(end_date)
+            df = df[in_range].reset_index(drop=True)
+        return df
+
+    @staticmethod
+    def _partition_overlaps(name: str, start_date, end_date) -> bool:
+        kind, value = name.split("=", 1)
+        if value == "none":
+            return False
+        if kind == "date":
+            first = last = value
+        else:
+            month = pd.Period(value, freq="M")
+            first, last = month.start_time.strftime("%Y-%m-%d"), month.end_time.strftime("%Y-%m-%d")
+        return ((start_date is None or last >= _date_str(start_date))
+                and (end_date is None or first <= _date_str(end_date)))
+
+
+def take_snapshot(key: str, df: pd.DataFrame, uploader: upload_data.DataUploader = None) -> Optional[Dict]:
+    """
+    Snapshot an artifact, logging instead of failing the pipeline step.
+
+    Returns:
+        The snapshot manifest, or None if the snapshot failed
+    """
+    try:
+        return SnapshotStore(uploader).snapshot(key, df)
+    except Exception as e:
+        print(f"⚠️  Could not snapshot {key}: {e}")
+        return None
+
+
+def load_as_of(key: str, as_of, start_date=None, end_date=None) -> pd.DataFrame:
+    """Load an artifact as of a date; see SnapshotStore.load_as_of."""
+    return SnapshotStore().load_as_of(key, as_of, start_date=start_date, end_date=end_date)
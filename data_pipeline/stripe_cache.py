@@ -0,0 +1,297 @@
+"""
+Incremental Stripe Object Cache
+
+Keeps a local/S3 copy of recent Stripe PaymentIntents and Refunds so that
+revenue, refund and failed-payment reporting all read the same data instead
+of each listing every object in overlapping windows.
+
+Sync strategy:
+- First run (or cache older than Stripe's 30-day event retention): backfill
+  by listing PaymentIntents and Refunds for the last `retention_days`
+- Every later run: list only Stripe Events created after the cursor and
+  upsert the object snapshot each event carries (latest event wins), so
+  status changes on older PaymentIntents (e.g. a failed renewal that later
+  succeeds) are picked up too
+- Objects older than `retention_days` are dropped on save
+
+Stored in S3 (objects sorted by created timestamp, trimmed to the fields the
+pipeline uses):
+    stripe/cache/payment_intents.jsonl
+    stripe/cache/refunds.jsonl
+    stripe/cache/state.json   (cursor, covered_from)
+
+Usage:
+    cache = StripeObjectCache(config.stripe_key)
+    cache.load()
+    cache.sync()
+    cache.save()
+    fetcher = StripeFetcher(config.stripe_key, cache=cache)
+"""
+
+import datetime
+import json
+import time
+from typing import Dict, List, Optional
+
+import stripe
+
+from data_pipeline import config
+from data_pipeline import upload_data
+
+# Stripe only keeps events for 30 days; past that the cursor can't be trusted
+EVENT_RETENTION_SECONDS = 29 * 24 * 3600
+
+# Long enough to serve the 90-day failed-payment report
+DEFAULT_RETENTION_DAYS = 120
+
+PAYMENT_INTENT_FIELDS = [
+    "id", "object", "created", "amount", "amount_received", "currency", "status",
+    "livemode", "description", "customer", "latest_charge", "last_payment_error",
+]
+REFUND_FIELDS = [
+    "id", "object", "created", "amount", "charge", "payment_intent", "status",
+    "reason", "currency",
+]
+REFUND_EVENT_TYPES = ["refund.created", "refund.updated", "charge.refund.updated"]
+
+
+def _slim_charge(charge) -> Optional[object]:
+    if not charge or isinstance(charge, str):
+        return charge
+    billing_details = charge.get("billing_details") or {}
+    return {
+        "id": charge.get("id"),
+        "object": "charge",
+        "receipt_email": charge.get("receipt_email"),
+        "billing_details": {
+            "name": billing_details.get("name"),
+            "email": billing_details.get("email"),
+        },
+    }
+
+
+def slim_payment_intent(pi) -> Dict:
+    """Keep only the PaymentIntent fields the pipeline reads."""
+    record = {field: pi.get(field) for field in PAYMENT_INTENT_FIELDS}
+    record["latest_charge"] = _slim_charge(record["latest_charge"])
+    error = record["last_payment_error"]
+    if error:
+        record["last_payment_error"] = {
+            "decline_code": error.get("decline_code"),
+            "message": error.get("message"),
+        }
+    return json.loads(json.dumps(record, default=str))
+
+
+def slim_refund(refund) -> Dict:
+    """Keep only the Refund fields the pipeline reads."""
+    return json.loads(json.dumps({field: refund.get(field) for field in REFUND_FIELDS}, default=str))
+
+
+class StripeObjectCache:
+    """Cursor-based cache of Stripe PaymentIntents and Refunds."""
+
+    def __init__(
+        self,
+        stripe_key: str,
+        retention_days: int = DEFAULT_RETENTION_DAYS,
+        prefix: str = None,
+    ):
+        """
+        Args:
+            stripe_key: Stripe API key
+            retention_days: How many days of objects to keep (and backfill)
+            prefix: S3 prefix for the cache files
+        """
+        self.stripe_key = stripe_key
+        self.retention_days = retention_days
+        self.prefix = prefix or config.s3_path_stripe_cache
+        self.payment_intents: Dict[str, Dict] = {}
+        self.refunds: Dict[str, Dict] = {}
+        self.cursor: Optional[int] = None  # created timestamp of the last applied event
+        self.covered_from: Optional[int] = None  # objects before this were never loaded
+        self.api_pages = 0
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}"
+
+    def load(self, uploader: upload_data.DataUploader = None):
+        """Load the cache from S3 (leaves it empty if nothing is stored yet)."""
+        uploader = uploader or upload_data.DataUploader()
+        try:
+            state = json.loads(uploader.download_from_s3(
+                config.aws_bucket_name, self._key("state.json")))
+        except uploader.s3.exceptions.NoSuchKey:
+            print("No Stripe cache in S3 yet - will backfill")
+            return
+        except Exception as e:
+            print(f"⚠️  Error loading Stripe cache state, will backfill: {e}")
+            return
+
+        try:
+            self.payment_intents = self._load_jsonl(uploader, "payment_intents.jsonl")
+            self.refunds = self._load_jsonl(uploader, "refunds.jsonl")
+        except Exception as e:
+            print(f"⚠️  Error loading Stripe cache objects, will backfill: {e}")
+            self.payment_intents, self.refunds = {}, {}
+            return
+
+        self.cursor = state.get("cursor")
+        self.covered_from = state.get("covered_from")
+        print(f"Loaded Stripe cache: {len(self.payment_intents)} payment intents, "
+              f"{len(self.refunds)} refunds (cursor {self._fmt(self.cursor)})")
+
+    def _load_jsonl(self, uploader, name: str) -> Dict[str, Dict]:
+        content = uploader.download_from_s3(config.aws_bucket_name, self._key(name))
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        records = (json.loads(line) for line in content.splitlines() if line.strip())
+        return {r["id"]: r for r in records}
+
+    def save(self, uploader: upload_data.DataUploader = None, save_local: bool = False):
+        """Trim to the retention window and write the cache to S3."""
+        uploader = uploader or upload_data.DataUploader()
+        self.trim()
+
+        files = {
+            "payment_intents.jsonl": self._to_jsonl(self.payment_intents),
+            "refunds.jsonl": self._to_jsonl(self.refunds),
+            "state.json": json.dumps({
+                "cursor": self.cursor,
+                "covered_from": self.covered_from,
+                "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }),
+        }
+        for name, body in files.items():
+            uploader.s3.put_object(Bucket=config.aws_bucket_name, Key=self._key(name), Body=body)
+            if save_local:
+                with open(f"data/outputs/stripe_cache_{name}", "w") as f:
+                    f.write(body)
+
+        print(f"✅ Saved Stripe cache: {len(self.payment_intents)} payment intents, "
+              f"{len(self.refunds)} refunds to s3://{config.aws_bucket_name}/{self.prefix}/")
+
+    @staticmethod
+    def _to_jsonl(objects: Dict[str, Dict]) -> str:
+        ordered = sorted(objects.values(), key=lambda o: (o["created"], o["id"]))
+        return "".join(json.dumps(o) + "\n" for o in ordered)
+
+    def trim(self, now: float = None):
+        """Drop objects created before the retention window."""
+        cutoff = int((now or time.time()) - self.retention_days * 24 * 3600)
+        self.payment_intents = {k: v for k, v in self.payment_intents.items() if v["created"] >= cutoff}
+        self.refunds = {k: v for k, v in self.refunds.items() if v["created"] >= cutoff}
+        if self.covered_from is not None:
+            self.covered_from = max(self.covered_from, cutoff)
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _list(self, resource, **params) -> List:
+        page = resource.list(limit=100, **params)
+        items = []
+        while True:
+            self.api_pages += 1
+            items.extend(page.data)
+            if not page.has_more:
+                return items
+            page = resource.list(limit=100, starting_after=page.data[-1].id, **params)
+
+    def backfill(self, now: float = None):
+        """Rebuild the cache by listing objects for the whole retention window."""
+        now = int(now or time.time())
+        start = now - self.retention_days * 24 * 3600
+        print(f"Backfilling Stripe cache from {self._fmt(start)} ({self.retention_days} days)")
+
+        pis = self._list(stripe.PaymentIntent, created={"gte": start},
+                         expand=["data.latest_charge"])
+        refunds = self._list(stripe.Refund, created={"gte": start})
+
+        self.payment_intents = {pi.id: slim_payment_intent(pi) for pi in pis}
+        self.refunds = {r.id: slim_refund(r) for r in refunds}
+        # Anything that changes after the listing started arrives as an event
+        self.cursor = now - 60
+        self.covered_from = start
+
+    def apply_events(self, events: List):
+        """Upsert the objects carried by events, oldest first, and advance the cursor."""
+        for event in sorted(events, key=lambda e: (e.created, e.id)):
+            obj = event.data.object
+            if obj.get("object") == "payment_intent":
+                record = slim_payment_intent(obj)
+                # Events carry latest_charge as an ID; keep the expanded copy we have
+                cached_charge = self.payment_intents.get(obj["id"], {}).get("latest_charge")
+                if isinstance(cached_charge, dict) and cached_charge.get("id") == record["latest_charge"]:
+                    record["latest_charge"] = cached_charge
+                self.payment_intents[obj["id"]] = record
+            elif obj.get("object") == "refund":
+                self.refunds[obj["id"]] = slim_refund(obj)
+            self.cursor = max(self.cursor or 0, event.created)
+
+    def sync(self, now: float = None) -> int:
+        """
+        Bring the cache up to date.
+
+        Returns:
+            Number of Stripe API pages requested
+        """
+        stripe.api_key = self.stripe_key
+        now = now or time.time()
+        self.api_pages = 0
+
+        if self.cursor is None or now - self.cursor > EVENT_RETENTION_SECONDS:
+            self.backfill(now)
+        else:
+            # gte, not gt: re-applying events from the cursor's own second is harmless
+            events = self._list(stripe.Event, type="payment_intent.*", created={"gte": self.cursor})
+            events += self._list(stripe.Event, types=REFUND_EVENT_TYPES, created={"gte": self.cursor})
+            self.apply_events(events)
+            print(f"Applied {len(events)} Stripe events since {self._fmt(self.cursor)}")
+
+        print(f"Stripe cache synced with {self.api_pages} API pages")
+        return self.api_pages
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def covers(self, start_date: datetime.datetime) -> bool:
+        """True if the cache holds every object created since start_date."""
+        return self.covered_from is not None and int(start_date.timestamp()) >= self.covered_from
+
+    def _select(self, objects: Dict[str, Dict], start_date, end_date) -> List:
+        gte, lte = int(start_date.timestamp()), int(end_date.timestamp())
+        selected = [o for o in objects.values() if gte <= o["created"] <= lte]
+        # Newest first, like Stripe list endpoints
+        selected.sort(key=lambda o: (o["created"], o["id"]), reverse=True)
+        return [stripe.StripeObject.construct_from(o, self.stripe_key) for o in selected]
+
+    def get_payment_intents(self, start_date: datetime.datetime, end_date: datetime.datetime) -> List:
+        """Cached PaymentIntents created in [start_date, end_date], as Stripe objects."""
+        return self._select(self.payment_intents, start_date, end_date)
+
+    def get_refunds(self, start_date: datetime.datetime, end_date: datetime.datetime) -> List:
+        """Cached Refunds created in [start_date, end_date], as Stripe objects."""
+        return self._select(self.refunds, start_date, end_date)
+
+    @staticmethod
+    def _fmt(timestamp: Optional[int]) -> str:
+        if timestamp is None:
+            return "never"
+        return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def load_synced_cache(stripe_key: str = None, save: bool = True) -> StripeObjectCache:
+    """Load the Stripe cache from S3, sync it, and (by default) save it back."""
+    cache = StripeObjectCache(stripe_key or config.stripe_key)
+    uploader = upload_data.DataUploader()
+    cache.load(uploader)
+    cache.sync()
+    if save:
+        cache.save(uploader)
+    return cache
@@ -22,6 +22,8 @@ from io import StringIO
 from typing import Dict, List, Optional
 import hashlib
 
+from data_pipeline import customer_contacts
+
 
 class MailchimpFlagSyncer:
     """
@@ -108,11 +110,20 @@ class MailchimpFlagSyncer:
         """
         Load customer data from S3.
 
+        Reads the resolved customer_contacts table (kids without their own
+        email carry a parent's), falling back to capitan/customers.csv.
+
         Returns:
-            DataFrame of customers
+            DataFrame with customer_id, email, first_name, last_name
         """
+        columns = ['customer_id', 'email', 'first_name', 'last_name']
+        try:
+            return customer_contacts.load_customer_contacts(self.s3_client, self.bucket_name, columns=columns)
+        except Exception as e:
+            print(f"⚠️  Could not load customer contacts, using Capitan customers: {e}")
+
         obj = self.s3_client.get_object(Bucket=self.bucket_name, Key='capitan/customers.csv')
-        df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+        df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')), usecols=columns, dtype={'customer_id': str})
         return df
 
     def check_subscriber_exists(self, email: str) -> bool:
@@ -217,7 +228,8 @@ class MailchimpFlagSyncer:
             print("   No flags to sync")
             return
 
-        # Merge with customer data to get email addresses
+        # Merge with customer data to get email addresses (IDs as strings on both sides)
+        flags_to_sync = flags_to_sync.assign(customer_id=flags_to_sync['customer_id'].astype(str))
         flags_with_customers = flags_to_sync.merge(
             customers_df[['customer_id', 'email', 'first_name', 'last_name']],
             on='customer_id',
@@ -39,6 +39,8 @@ from io import StringIO
 from typing import Dict, List, Optional
 from datetime import datetime
 from data_pipeline import config
+from data_pipeline import customer_contacts
+from data_pipeline import customer_event_store
 
 
 class ShopifyFlagSyncer:
@@ -284,17 +286,28 @@ class ShopifyFlagSyncer:
         """
         Load customer data from S3 to get email/phone for matching.
 
+        Reads the resolved customer_contacts table (kids without their own
+        contact info carry a parent's), falling back to capitan/customers.csv.
+
         Returns:
-            DataFrame with customer_id, email, phone
+            DataFrame with customer_id, email, phone, first_name, last_name
         """
+        columns = ['customer_id', 'email', 'phone', 'first_name', 'last_name']
+        try:
+            df = customer_contacts.load_customer_contacts(self.s3_client, self.bucket_name, columns=columns)
+            print(f"✅ Loaded {len(df)} customer contacts from S3")
+            return df
+        except Exception as e:
+            print(f"⚠️  Could not load customer contacts, using Capitan customers: {e}")
+
         try:
             obj = self.s3_client.get_object(
                 Bucket=self.bucket_name,
                 Key="capitan/customers.csv"
             )
-            df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')), usecols=columns)
             print(f"✅ Loaded {len(df)} customers from S3")
-            return df[['customer_id', 'email', 'phone', 'first_name', 'last_name']]
+            return df[columns]
         except Exception as e:
             print(f"⚠️  Error loading customers: {e}")
             return pd.DataFrame()
@@ -390,7 +403,7 @@ class ShopifyFlagSyncer:
                 Bucket=self.bucket_name,
                 Key='customers/customer_events.csv'
             )
-            df_existing = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            df_existing = customer_event_store.read_events(obj['Body'].read())
 
             # Create DataFrame from new sync events
             df_new_events = pd.DataFrame(self.synced_events)
@@ -406,6 +419,7 @@ class ShopifyFlagSyncer:
                 keep='last'
             )
             df_all = df_all.drop('event_date_minute', axis=1)
+            df_all = customer_event_store.normalize_events(df_all)
 
             # Save back to S3
             csv_buffer = StringIO()
@@ -5,6 +5,9 @@ Fetches Twilio message history and tracks:
 1. All opt-in/opt-out actions (history table)
 2. Current opt-in status per phone number (status table)
 
+Each run reads only messages sent since the last run (see twilio_message_sync)
+and folds the new keyword actions into the stored status table.
+
 Storage:
 - s3://basin-climbing-data-prod/twilio/sms_opt_in_history.csv (all actions)
 - s3://basin-climbing-data-prod/twilio/sms_opt_in_status.csv (current status)
@@ -17,6 +20,14 @@ from twilio.rest import Client
 import boto3
 from io import StringIO
 
+from data_pipeline import config
+from data_pipeline.twilio_message_sync import IncrementalMessageReader
+
+STATUS_COLUMNS = [
+    'phone_number', 'current_status', 'last_action_timestamp',
+    'last_action', 'last_method', 'total_opt_ins', 'total_opt_outs'
+]
+
 
 class TwilioOptInTracker:
     """
@@ -46,22 +57,21 @@ class TwilioOptInTracker:
             aws_secret_access_key=self.aws_secret_access_key
         )
 
+        self.reader = IncrementalMessageReader(
+            self.twilio_client, self.s3_client, self.bucket_name, config.s3_path_twilio_opt_ins_sync_state
+        )
+
         print("✅ Twilio Opt-In Tracker initialized")
 
-    def fetch_messages(self, limit=1000):
+    def fetch_messages(self):
         """
-        Fetch recent Twilio messages.
-
-        Args:
-            limit: Number of messages to fetch (default 1000)
+        Stream Twilio messages sent since the last sync.
 
         Returns:
-            List of message objects
+            Iterator of message objects (full history on the first run)
         """
-        print(f"\nFetching last {limit} Twilio messages...")
-        messages = self.twilio_client.messages.list(limit=limit)
-        print(f"✅ Fetched {len(messages)} messages")
-        return messages
+        print("\nFetching new Twilio messages...")
+        return self.reader.messages()
 
     def extract_opt_in_actions(self, messages):
         """
@@ -75,7 +85,7 @@ class TwilioOptInTracker:
         - Customer texts STOP (any capitalization)
 
         Args:
-            messages: List of Twilio message objects
+            messages: Iterable of Twilio message objects
 
         Returns:
             DataFrame with opt-in/opt-out actions
@@ -155,7 +165,8 @@ class TwilioOptInTracker:
         """
         try:
             obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.history_key)
-            df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')))
+            # Keep phone numbers as text so they merge with newly extracted actions
+            df = pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')), dtype={'phone_number': str})
             print(f"✅ Loaded {len(df)} existing history records from S3")
             return df
         except self.s3_client.exceptions.NoSuchKey:
@@ -171,28 +182,29 @@ class TwilioOptInTracker:
 
         Args:
             new_actions: DataFrame with new opt-in/opt-out actions
+
+        Returns:
+            Tuple of (full history, actions that weren't already recorded)
         """
         print("\n📝 Updating opt-in history...")
 
         # Load existing history
         existing_history = self.load_existing_history()
 
-        # Combine with new actions
+        # Reads overlap the previous sync a little; drop actions already recorded
         if len(new_actions) > 0:
-            all_history = pd.concat([existing_history, new_actions], ignore_index=True)
+            new_actions = new_actions.drop_duplicates(subset=['message_sid'], keep='last')
+            recorded = new_actions['message_sid'].isin(existing_history['message_sid'])
+            if recorded.any():
+                print(f"   Skipped {int(recorded.sum())} actions already in history")
+            new_actions = new_actions[~recorded]
 
-            # Deduplicate by message_sid (same action shouldn't be recorded twice)
-            before_count = len(all_history)
-            all_history = all_history.drop_duplicates(subset=['message_sid'], keep='last')
-            after_count = len(all_history)
+        if len(new_actions) == 0:
+            print("   No new actions")
+            return existing_history, new_actions
 
-            if before_count > after_count:
-                print(f"   Removed {before_count - after_count} duplicate actions")
-
-            # Sort by timestamp
-            all_history = all_history.sort_values('timestamp', ascending=False)
-        else:
-            all_history = existing_history
+        all_history = pd.concat([existing_history, new_actions], ignore_index=True)
+        all_history = all_history.sort_values('timestamp', ascending=False)
 
         # Upload to S3
         csv_buffer = StringIO()
@@ -206,7 +218,20 @@ class TwilioOptInTracker:
         print(f"✅ Saved {len(all_history)} total history records to S3")
         print(f"   Location: s3://{self.bucket_name}/{self.history_key}")
 
-        return all_history
+        return all_history, new_actions
+
+    def load_existing_status(self):
+        """
+        Load the current status table from S3.
+
+        Returns:
+            DataFrame with current status, or None if it hasn't been built yet
+        """
+        try:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.status_key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return pd.read_csv(StringIO(obj['Body'].read().decode('utf-8')), dtype={'phone_number': str})
 
     def calculate_current_status(self, history):
         """
@@ -222,11 +247,54 @@ class TwilioOptInTracker:
 
         if len(history) == 0:
             print("   No history to process")
-            return pd.DataFrame(columns=[
-                'phone_number', 'current_status', 'last_action_timestamp',
-                'last_action', 'last_method', 'total_opt_ins', 'total_opt_outs'
-            ])
+            return pd.DataFrame(columns=STATUS_COLUMNS)
 
+        status_df = self._summarize_actions(history)
+        self._print_status_counts(status_df)
+        return status_df
+
+    def apply_new_actions(self, status_df, new_actions):
+        """
+        Fold new opt-in/opt-out actions into the current status table.
+
+        Gives the same table as calculate_current_status over the full
+        history, without re-reading it: totals are added, and a number's last
+        action is replaced when the new one is at least as recent.
+
+        Args:
+            status_df: Current status per phone number
+            new_actions: Actions not yet reflected in status_df
+
+        Returns:
+            Updated status DataFrame
+        """
+        print("\n📊 Updating opt-in status with new actions...")
+
+        if len(new_actions) == 0:
+            print("   No new actions")
+            return status_df
+
+        current = status_df.set_index('phone_number')
+        changes = self._summarize_actions(new_actions).set_index('phone_number')
+        seen = changes.index.intersection(current.index)
+
+        totals = ['total_opt_ins', 'total_opt_outs']
+        changes.loc[seen, totals] += current.loc[seen, totals].fillna(0).astype(int).values
+
+        last_action = ['current_status', 'last_action_timestamp', 'last_action', 'last_method']
+        stale = seen[
+            current.loc[seen, 'last_action_timestamp'].astype(str).values
+            > changes.loc[seen, 'last_action_timestamp'].astype(str).values
+        ]
+        changes.loc[stale, last_action] = current.loc[stale, last_action].values
+
+        status_df = pd.concat([current.drop(index=seen), changes]).reset_index()[STATUS_COLUMNS]
+        print(f"   {len(changes)} phone numbers updated ({len(changes) - len(seen)} new)")
+        self._print_status_counts(status_df)
+        return status_df
+
+    def _summarize_actions(self, history):
+        """Latest action and opt-in/opt-out totals per phone number."""
         # Sort by timestamp (most recent first)
         history_sorted = history.sort_values('timestamp', ascending=False)
 
@@ -272,6 +340,9 @@ class TwilioOptInTracker:
             'method': 'last_method'
         })
 
+        return status_df
+
+    def _print_status_counts(self, status_df):
         # Count statuses
         opted_in_count = len(status_df[status_df['current_status'] == 'opted_in'])
         opted_out_count = len(status_df[status_df['current_status'] == 'opted_out'])
@@ -280,8 +351,6 @@ class TwilioOptInTracker:
         print(f"   ✅ Currently opted in: {opted_in_count}")
         print(f"   ❌ Currently opted out: {opted_out_count}")
 
-        return status_df
-
     def save_current_status(self, status_df):
         """
         Save current opt-in status to S3.
@@ -302,31 +371,35 @@ class TwilioOptInTracker:
         print(f"✅ Saved current status to S3")
         print(f"   Location: s3://{self.bucket_name}/{self.status_key}")
 
-    def sync(self, message_limit=1000):
+    def sync(self):
         """
-        Full sync: Fetch messages, update history, calculate status.
+        Incremental sync: fetch new messages, record their actions, update status.
 
-        Args:
-            message_limit: Number of Twilio messages to fetch
+        The status table is rebuilt from the full history only when it doesn't
+        exist yet; otherwise just the new actions are applied.
         """
         print("="*80)
         print("TWILIO OPT-IN SYNC")
         print("="*80)
 
-        # 1. Fetch messages from Twilio
-        messages = self.fetch_messages(limit=message_limit)
-
-        # 2. Extract opt-in/opt-out actions
-        new_actions = self.extract_opt_in_actions(messages)
+        # 1. Stream new messages from Twilio and extract opt-in/opt-out actions
+        new_actions = self.extract_opt_in_actions(self.fetch_messages())
+        print(f"   Read {self.reader.fetched} messages")
 
-        # 3. Update history table
-        full_history = self.update_history(new_actions)
+        # 2. Update history table
+        full_history, new_actions = self.update_history(new_actions)
 
-        # 4. Calculate current status
-        current_status = self.calculate_current_status(full_history)
+        # 3. Update current status
+        current_status = self.load_existing_status()
+        if current_status is None:
+            current_status = self.calculate_current_status(full_history)
+            self.save_current_status(current_status)
+        elif len(new_actions) > 0:
+            current_status = self.apply_new_actions(current_status, new_actions)
+            self.save_current_status(current_status)
 
-        # 5. Save current status
-        self.save_current_status(current_status)
+        # 4. Advance the cursor now that everything is stored
+        self.reader.commit()
 
         print("\n" + "="*80)
         print("✅ SYNC COMPLETE")
@@ -334,7 +407,8 @@ class TwilioOptInTracker:
 
         return {
             'history': full_history,
-            'status': current_status
+            'status': current_status,
+            'new_actions': new_actions
         }
 
     def get_opted_in_numbers(self):
@@ -382,7 +456,7 @@ def main():
         pass
 
     tracker = TwilioOptInTracker()
-    results = tracker.sync(message_limit=1000)
+    results = tracker.sync()
 
     # Show sample of results
     print("\n" + "="*80)
@@ -0,0 +1,231 @@
+"""
+Partitioned Transaction Store
+
+Stores the combined Stripe + Square transaction history as date partitions
+in S3 so a daily refresh only rewrites the days it touched, instead of
+downloading, re-parsing and re-uploading the whole history.
+
+Layout:
+    transactions/partitions/manifest.json
+    transactions/partitions/date=2025-06-14/<sha256[:16]>.csv   (current month, one per day)
+    transactions/partitions/month=2025-05/<sha256[:16]>.csv     (closed months, after compaction)
+
+Partition files are content-addressed and swapped in through the manifest
+(see partitioned_store).
+
+Usage:
+    store = TransactionStore()
+    store.write(df_today, replace_from=start_date)   # refresh the last 2 days
+    store.compact()                                  # fold closed months together
+    df = load_transactions()                         # full history, one call
+"""
+
+import datetime
+from typing import Dict
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline.partitioned_store import PartitionedStore
+
+DEDUP_COLUMNS = ["transaction_id", "Date"]
+
+
+class TransactionStore(PartitionedStore):
+    """Day/month partitioned transaction history with a manifest."""
+
+    date_column = "Date"
+    default_prefix = config.s3_path_transaction_partitions
+    snapshot_key = config.s3_path_combined
+    label = "transaction"
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _partition_for_day(self, day: str, partitions: Dict[str, Dict]) -> str:
+        month_name = f"month={day[:7]}"
+        return month_name if month_name in partitions else f"date={day}"
+
+    def write(
+        self,
+        df_new: pd.DataFrame,
+        replace_from=None,
+        replace_to=None,
+        replace_all: bool = False,
+    ) -> Dict:
+        """
+        Merge new transactions into the store, rewriting only touched partitions.
+
+        Existing rows for days in [replace_from, replace_to] are dropped
+        (open-ended if replace_to is None); other existing rows in touched
+        partitions are kept, and duplicates on (transaction_id, Date) keep the
+        existing row, as the old full-file concat + drop_duplicates did.
+
+        Args:
+            df_new: Transactions with a Date column
+            replace_from: Replace existing rows from this datetime (None = append only)
+            replace_to: Replace existing rows up to this datetime
+            replace_all: Replace the whole history with df_new
+
+        Returns:
+            The new manifest
+        """
+        manifest = self.load_manifest()
+        if manifest is None:
+            manifest = self.migrate_from_combined()
+        partitions = dict(manifest["partitions"])
+
+        df_new = df_new.copy()
+        dates = pd.to_datetime(df_new["Date"], errors="coerce")
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        dropped = dates.isna().sum()
+        if dropped:
+            print(f"⚠️  Skipping {dropped} transactions without a valid Date")
+        df_new = df_new[dates.notna()]
+        df_new["Date"] = dates[dates.notna()].dt.strftime("%Y-%m-%d")
+
+        # Day strings whose midnight falls in [replace_from, replace_to]
+        first_day = pd.Timestamp(replace_from).ceil("D").strftime("%Y-%m-%d") if replace_from is not None else None
+        last_day = pd.Timestamp(replace_to).floor("D").strftime("%Y-%m-%d") if replace_to is not None else "9999-12-31"
+        if replace_all:
+            first_day, last_day = "0000-01-01", "9999-12-31"
+
+        # Partitions receiving new rows, plus existing ones that overlap the replaced range
+        new_by_partition = dict(tuple(df_new.groupby(
+            df_new["Date"].map(lambda day: self._partition_for_day(day, partitions)), sort=False)))
+        touched = set(new_by_partition)
+        if first_day is not None:
+            touched.update(name for name, entry in partitions.items()
+                           if entry["end"] >= first_day and entry["start"] <= last_day)
+
+        def rebuild(name: str):
+            existing = self._read_partition(partitions[name]) if name in partitions else pd.DataFrame()
+            if not existing.empty and first_day is not None:
+                days = existing["Date"].astype(str)
+                existing = existing[~((days >= first_day) & (days <= last_day))]
+            merged = pd.concat([existing, new_by_partition.get(name, pd.DataFrame())], ignore_index=True)
+            if merged.empty:
+                return name, None
+            merged = merged.drop_duplicates(subset=DEDUP_COLUMNS).sort_values("Date", kind="stable")
+            return name, self._write_partition(name, merged)
+
+        for name, entry in self._map(rebuild, sorted(touched)):
+            if entry is None:
+                partitions.pop(name, None)
+            else:
+                partitions[name] = entry
+
+        manifest = self._save_manifest(partitions, previous=manifest)
+        print(f"✅ Rewrote {len(touched)} of {len(partitions)} transaction partitions "
+              f"({manifest['total_rows']:,} rows total)")
+        return manifest
+
+    def migrate_from_combined(self, today: datetime.date = None) -> Dict:
+        """
+        One-off bootstrap: split the legacy single-file history into partitions.
+
+        Args:
+            today: Months before this date's month become month partitions
+
+        Returns:
+            The new manifest
+        """
+        print(f"Creating transaction partitions from {config.s3_path_combined}")
+        try:
+            content = self.uploader.download_from_s3(self.bucket, config.s3_path_combined)
+            df = self.uploader.convert_csv_to_df(content)
+        except self.uploader.s3.exceptions.NoSuchKey:
+            df = pd.DataFrame(columns=DEDUP_COLUMNS)
+
+        dates = pd.to_datetime(df["Date"], errors="coerce")
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        df = df[dates.notna()].copy()
+        df["Date"] = dates[dates.notna()].dt.strftime("%Y-%m-%d")
+        df = df.drop_duplicates(subset=DEDUP_COLUMNS)
+
+        current_month = (today or datetime.date.today()).strftime("%Y-%m")
+        names = df["Date"].map(
+            lambda day: f"date={day}" if day[:7] >= current_month else f"month={day[:7]}")
+        groups = list(df.groupby(names, sort=False))
+        entries = self._map(lambda group: (group[0], self._write_partition(*group)), groups)
+        return self._save_manifest(dict(entries))
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self, today: datetime.date = None, delete_unreferenced: bool = True) -> Dict:
+        """
+        Fold the day partitions of closed months into one partition per month
+        and delete partition files that have been unreferenced for longer
+        than the grace period (see PartitionedStore.delete_unreferenced).
+
+        Args:
+            today: Months before this date's month are closed (today by default)
+            delete_unreferenced: Remove expired superseded partition files from S3
+
+        Returns:
+            The new manifest (unchanged if there was nothing to compact)
+        """
+        manifest = self.load_manifest()
+        if manifest is None:
+            print("No transaction partitions yet - nothing to compact")
+            return {}
+        partitions = dict(manifest["partitions"])
+
+        current_month = (today or datetime.date.today()).strftime("%Y-%m")
+        closed = {}
+        for name in partitions:
+            if name.startswith("date=") and name[5:12] < current_month:
+                closed.setdefault(f"month={name[5:12]}", []).append(name)
+
+        def fold(item):
+            month_name, day_names = item
+            names = ([month_name] if month_name in partitions else []) + sorted(day_names)
+            df = pd.concat([self._read_partition(partitions[n]) for n in names], ignore_index=True)
+            df["Date"] = df["Date"].astype(str)
+            df = df.drop_duplicates(subset=DEDUP_COLUMNS).sort_values("Date", kind="stable")
+            return month_name, day_names, self._write_partition(month_name, df)
+
+        for month_name, day_names, entry in self._map(fold, sorted(closed.items())):
+            for name in day_names:
+                del partitions[name]
+            partitions[month_name] = entry
+            print(f"Compacted {len(day_names)} day partitions into {month_name} ({entry['rows']:,} rows)")
+
+        if closed:
+            manifest = self._save_manifest(partitions, previous=manifest)
+        else:
+            print("Transaction partitions already compacted")
+
+        if delete_unreferenced:
+            self.delete_unreferenced(manifest)
+        return manifest
+
+
+def load_transactions(start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Load transactions (Stripe + Square combined) from the partitioned store.
+
+    Falls back to the legacy single-file history if the store has not been
+    created yet.
+
+    Args:
+        start_date: Earliest day to include (None = full history)
+        end_date: Latest day to include (None = up to the latest)
+
+    Returns:
+        DataFrame of transactions
+    """
+    store = TransactionStore()
+    manifest = store.load_manifest()
+    if manifest is None:
+        uploader = store.uploader
+        df = uploader.convert_csv_to_df(
+            uploader.download_from_s3(config.aws_bucket_name, config.s3_path_combined)
+        )
+        return df
+    return store.read(start_date, end_date, manifest=manifest)
@@ -0,0 +1,337 @@
+"""
+Bulk SMS send engine.
+
+Consent is loaded once into a set, recipient numbers are normalized as a
+whole column, messages are de-duplicated by message ID, and they go out from
+a small worker pool paced to the Messaging Service's throughput. Every
+outcome is appended to a per-campaign ledger as it happens (and mirrored to
+S3 every few messages and when the send stops), so a campaign that dies
+halfway can be re-run with the same campaign ID and only sends the messages
+it missed.
+"""
+
+import csv
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+from data_pipeline import config
+from data_pipeline import pipeline_telemetry
+from data_pipeline.customer_matching import normalize_phones
+from data_pipeline.rate_limiter import RateLimiter
+
+LEDGER_DIR = "data/outputs/sms_ledgers"
+LEDGER_COLUMNS = ["campaign_id", "phone_number", "message_id", "status", "twilio_status", "sid", "error", "sent_at"]
+
+
+class BulkSMSSender:
+    """
+    Send many SMS messages through Twilio with consent filtering, pacing and
+    a resumable per-campaign ledger.
+    """
+
+    def __init__(
+        self,
+        client,
+        from_number: Optional[str] = None,
+        messaging_service_sid: Optional[str] = None,
+        messages_per_second: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        ledger_dir: str = LEDGER_DIR,
+        uploader=None,
+    ):
+        """
+        Args:
+            client: twilio.rest.Client (or anything with messages.create)
+            from_number: Sending number, used when no Messaging Service is set
+            messaging_service_sid: Messaging Service to send through
+                (default TWILIO_MESSAGING_SERVICE_SID); Twilio then queues and
+                spreads messages across the service's sender pool
+            messages_per_second: Dispatch rate across all workers
+                (default config.twilio_messages_per_second, 0 = unpaced)
+            max_workers: Concurrent requests to Twilio (default config.twilio_send_workers)
+            ledger_dir: Local directory for campaign ledgers
+            uploader: Optional DataUploader; ledgers are mirrored to S3 so a
+                re-run on a fresh machine still resumes
+        """
+        self.client = client
+        self.from_number = from_number
+        self.messaging_service_sid = messaging_service_sid or os.getenv("TWILIO_MESSAGING_SERVICE_SID")
+        if not (self.from_number or self.messaging_service_sid):
+            raise ValueError("Set a from number or TWILIO_MESSAGING_SERVICE_SID to send SMS.")
+
+        if messages_per_second is None:
+            messages_per_second = config.twilio_messages_per_second
+        self.rate_limiter = RateLimiter(messages_per_second)
+        self.max_workers = max_workers or config.twilio_send_workers
+        self.ledger_dir = ledger_dir
+        self.uploader = uploader
+
+    def send(
+        self,
+        recipients: pd.DataFrame,
+        campaign_id: str,
+        consented: Optional[set] = None,
+        dry_run: bool = False,
+    ) -> Dict:
+        """
+        Send one message per recipient row.
+
+        Each message is identified by its message_id (e.g. an RSVP ID), or by
+        its number and text when there is no message_id column. Rows with the
+        same ID are duplicates; different messages to one number all go out.
+
+        Args:
+            recipients: DataFrame with phone_number and message columns, and
+                optionally message_id
+            campaign_id: Ledger key; re-running a campaign skips messages it
+                already sent
+            consented: Set of E.164 numbers with active consent, or None to
+                skip the consent check
+            dry_run: If True, don't send or touch the ledger
+
+        Returns:
+            Dict with total, sent, failed, no_consent, invalid, duplicates,
+            skipped counts and one detail per message ID (skipped messages
+            have status 'already_sent')
+        """
+        results = {
+            'total': len(recipients),
+            'sent': 0,
+            'failed': 0,
+            'no_consent': 0,
+            'invalid': 0,
+            'duplicates': 0,
+            'skipped': 0,
+            'details': []
+        }
+        if recipients.empty:
+            return results
+
+        df = recipients.reindex(columns=["phone_number", "message", "message_id"])
+        phones = normalize_phones(df["phone_number"], strict=True)
+
+        invalid = phones.isna()
+        results['invalid'] = int(invalid.sum())
+        for phone, message, message_id in df[invalid].itertuples(index=False):
+            results['details'].append({
+                'success': False,
+                'to': phone,
+                'message_id': None if pd.isna(message_id) else str(message_id),
+                'error': 'Invalid phone number',
+                'message': message
+            })
+        df = df[~invalid].assign(phone_number=phones[~invalid])
+        df["message_id"] = [
+            _message_id(phone, message) if pd.isna(message_id) else str(message_id)
+            for phone, message, message_id in df.itertuples(index=False)
+        ]
+
+        duplicated = df["message_id"].duplicated()
+        results['duplicates'] = int(duplicated.sum())
+        df = df[~duplicated]
+
+        if consented is not None:
+            has_consent = df["phone_number"].isin(consented)
+            for phone, message, message_id in df[~has_consent].itertuples(index=False):
+                results['details'].append({
+                    'success': False,
+                    'to': phone,
+                    'message_id': message_id,
+                    'error': 'No active consent',
+                    'message': message
+                })
+            results['no_consent'] = int((~has_consent).sum())
+            df = df[has_consent]
+
+        if dry_run:
+            for phone, message, message_id in df.itertuples(index=False):
+                results['details'].append({
+                    'success': True,
+                    'to': phone,
+                    'message_id': message_id,
+                    'message': message,
+                    'sid': 'DRY_RUN',
+                    'status': 'dry_run'
+                })
+            results['sent'] = len(df)
+            return results
+
+        sent_sids = self._load_sent_messages(campaign_id)
+        skip = df["message_id"].isin(sent_sids)
+        for phone, message, message_id in df[skip].itertuples(index=False):
+            results['details'].append({
+                'success': True,
+                'to': phone,
+                'message_id': message_id,
+                'message': message,
+                'sid': sent_sids[message_id],
+                'status': 'already_sent'
+            })
+        results['skipped'] = int(skip.sum())
+        df = df[~skip]
+        if results['skipped']:
+            print(f"   ↩️  Resuming {campaign_id}: {results['skipped']} messages already sent")
+
+        print(f"📤 Sending {len(df)} messages ({self.max_workers} workers, "
+              f"{1 / self.rate_limiter.interval if self.rate_limiter.interval else 'unlimited'} msg/s)")
+
+        with self._open_ledger(campaign_id) as ledger:
+            try:
+                send_one = pipeline_telemetry.in_current_context(self._send_one)
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    for n, result in enumerate(pool.map(lambda row: send_one(row, campaign_id, ledger),
+                                                        df.itertuples(index=False)), start=1):
+                        results['details'].append(result)
+                        if result['success']:
+                            results['sent'] += 1
+                        else:
+                            results['failed'] += 1
+                        if n % config.twilio_ledger_upload_every == 0:
+                            self._upload_ledger(campaign_id, ledger)
+            finally:
+                # Also runs when the send is interrupted, so a re-run elsewhere resumes
+                self._upload_ledger(campaign_id, ledger)
+
+        return results
+
+    def _send_one(self, row, campaign_id: str, ledger) -> Dict:
+        """Send a single message and record the outcome in the ledger."""
+        params = {'body': row.message, 'to': row.phone_number}
+        if self.messaging_service_sid:
+            params['messaging_service_sid'] = self.messaging_service_sid
+        else:
+            params['from_'] = self.from_number
+
+        self.rate_limiter.wait()
+        try:
+            twilio_message = self.client.messages.create(**params)
+            result = {
+                'success': True,
+                'to': row.phone_number,
+                'message_id': row.message_id,
+                'message': row.message,
+                'sid': twilio_message.sid,
+                'status': twilio_message.status
+            }
+        except Exception as e:
+            result = {
+                'success': False,
+                'to': row.phone_number,
+                'message_id': row.message_id,
+                'message': row.message,
+                'error': str(e)
+            }
+
+        ledger.write({
+            'campaign_id': campaign_id,
+            'phone_number': row.phone_number,
+            'message_id': row.message_id,
+            'status': 'sent' if result['success'] else 'failed',
+            'twilio_status': result.get('status', ''),
+            'sid': result.get('sid', ''),
+            'error': result.get('error', ''),
+            'sent_at': datetime.now().isoformat(),
+        })
+        return result
+
+    # ------------------------------------------------------------------
+    # Ledger
+    # ------------------------------------------------------------------
+
+    def _ledger_path(self, campaign_id: str) -> str:
+        return os.path.join(self.ledger_dir, f"{campaign_id}.csv")
+
+    def _ledger_key(self, campaign_id: str) -> str:
+        return f"{config.s3_path_twilio_sms_ledgers}/{campaign_id}.csv"
+
+    def load_ledger(self, campaign_id: str) -> pd.DataFrame:
+        """
+        Load a campaign's ledger, pulling it from S3 if it isn't on disk.
+
+        A ledger written before message IDs were recorded is rewritten with
+        the current columns, so rows appended to it line up.
+
+        Args:
+            campaign_id: Campaign to load
+
+        Returns:
+            DataFrame with LEDGER_COLUMNS (empty if the campaign never ran)
+        """
+        path = self._ledger_path(campaign_id)
+        if not os.path.exists(path) and self.uploader is not None:
+            try:
+                body = self.uploader.download_from_s3(config.aws_bucket_name, self._ledger_key(campaign_id))
+                os.makedirs(self.ledger_dir, exist_ok=True)
+                with open(path, 'w', newline='') as f:
+                    f.write(body.decode('utf-8') if isinstance(body, bytes) else body)
+            except Exception:
+                pass  # New campaign
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=LEDGER_COLUMNS)
+        ledger = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if list(ledger.columns) != LEDGER_COLUMNS:
+            ledger = ledger.reindex(columns=LEDGER_COLUMNS, fill_value='')
+            ledger.to_csv(path, index=False)
+        return ledger
+
+    def _load_sent_messages(self, campaign_id: str) -> Dict[str, str]:
+        """Message ID -> Twilio SID of every message the campaign already sent."""
+        ledger = self.load_ledger(campaign_id)
+        sent = ledger[ledger['status'] == 'sent']
+        return dict(zip(sent['message_id'], sent['sid']))
+
+    def _open_ledger(self, campaign_id: str) -> "_LedgerWriter":
+        os.makedirs(self.ledger_dir, exist_ok=True)
+        return _LedgerWriter(self._ledger_path(campaign_id))
+
+    def _upload_ledger(self, campaign_id: str, ledger: "_LedgerWriter"):
+        if self.uploader is None:
+            return
+        try:
+            self.uploader.s3.put_object(
+                Bucket=config.aws_bucket_name, Key=self._ledger_key(campaign_id), Body=ledger.read()
+            )
+        except Exception as e:
+            print(f"   ⚠️  Could not upload SMS ledger for {campaign_id}: {e}")
+
+
+def _message_id(phone_number: str, message: str) -> str:
+    """Message ID for a recipient row without one: its number and text."""
+    return hashlib.sha1(f"{phone_number}\n{message}".encode('utf-8')).hexdigest()[:16]
+
+
+class _LedgerWriter:
+    """Appends ledger rows to a CSV file, flushing each one, from any thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=LEDGER_COLUMNS)
+        if is_new:
+            self._writer.writeheader()
+            self._file.flush()
+        return self
+
+    def write(self, row: Dict):
+        with self._lock:
+            self._writer.writerow(row)
+            self._file.flush()
+
+    def read(self) -> bytes:
+        """Return the ledger so far, without a row being written halfway."""
+        with self._lock:
+            with open(self.path, 'rb') as f:
+                return f.read()
+
+    def __exit__(self, *exc):
+        self._file.close()
@@ -5,10 +5,16 @@ Sends SMS messages via Twilio with built-in consent verification.
 Credentials loaded from environment variables only (never hardcoded).
 """
 
+import hashlib
 import os
-from twilio.rest import Client
+from datetime import datetime
 from typing import List, Dict, Optional
+
+import pandas as pd
+from twilio.rest import Client
+
 from data_pipeline.sms_consent_tracker import SMSConsentTracker
+from data_pipeline.twilio_bulk_sender import BulkSMSSender
 
 
 class TwilioSMSSender:
@@ -16,7 +22,12 @@ class TwilioSMSSender:
     Send SMS messages via Twilio with consent checking.
     """
 
-    def __init__(self):
+    def __init__(self, messages_per_second: Optional[float] = None, uploader=None):
+        """
+        Args:
+            messages_per_second: Bulk send rate (default config.twilio_messages_per_second)
+            uploader: Optional DataUploader for mirroring bulk send ledgers to S3
+        """
         # Load credentials from environment variables
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
@@ -34,6 +45,14 @@ class TwilioSMSSender:
         # Initialize consent tracker
         self.consent_tracker = SMSConsentTracker()
 
+        # Bulk sends go through the Messaging Service when one is configured
+        self.bulk_sender = BulkSMSSender(
+            self.client,
+            from_number=self.from_number,
+            messages_per_second=messages_per_second,
+            uploader=uploader
+        )
+
         print(f"✅ Twilio SMS Sender initialized")
         print(f"   From: {self.from_number}")
 
@@ -109,56 +128,53 @@ class TwilioSMSSender:
         phone_numbers: List[str],
         message: str,
         check_consent: bool = True,
-        dry_run: bool = False
+        dry_run: bool = False,
+        campaign_id: Optional[str] = None
     ) -> Dict:
         """
         Send SMS to multiple numbers.
 
+        Consent is loaded once for the whole list, numbers are normalized and
+        de-duplicated, and sends go through BulkSMSSender's paced worker pool.
+
         Args:
             phone_numbers: List of phone numbers
             message: Message text (same for all)
             check_consent: Whether to verify consent (default True)
             dry_run: If True, don't actually send (for testing)
+            campaign_id: Ledger key for resuming an interrupted send
+                (default: one per day and message text)
 
         Returns:
             Dict with summary stats and results
         """
-        results = {
-            'total': len(phone_numbers),
-            'sent': 0,
-            'failed': 0,
-            'no_consent': 0,
-            'details': []
-        }
+        campaign_id = campaign_id or self.default_campaign_id(message)
 
         print(f"\nSending SMS to {len(phone_numbers)} recipients...")
         print(f"Message: {message[:50]}..." if len(message) > 50 else f"Message: {message}")
+        print(f"Campaign: {campaign_id}")
         print(f"Dry run: {dry_run}")
         print()
 
-        for phone in phone_numbers:
-            result = self.send_sms(
-                to_number=phone,
-                message=message,
-                check_consent=check_consent,
-                dry_run=dry_run
-            )
+        recipients = pd.DataFrame({'phone_number': phone_numbers, 'message': message})
+        consented = self.consent_tracker.get_active_phone_numbers() if check_consent else None
+        results = self.bulk_sender.send(recipients, campaign_id, consented=consented, dry_run=dry_run)
 
-            results['details'].append(result)
-
-            if result['success']:
-                results['sent'] += 1
+        for result in results['details']:
+            if result.get('status') == 'already_sent':
+                print(f"  ↩️  {result['to']} - already sent")
+            elif result['success']:
                 print(f"  ✅ {result['to']}")
             elif 'No active consent' in result.get('error', ''):
-                results['no_consent'] += 1
                 print(f"  ⚠️  {result['to']} - No consent")
             else:
-                results['failed'] += 1
                 print(f"  ❌ {result['to']} - {result.get('error', 'Unknown error')}")
 
         print(f"\n📊 Summary:")
         print(f"   Sent: {results['sent']}/{results['total']}")
+        print(f"   Already sent (resumed): {results['skipped']}")
         print(f"   No consent: {results['no_consent']}")
+        print(f"   Invalid/duplicate numbers: {results['invalid'] + results['duplicates']}")
         print(f"   Failed: {results['failed']}")
 
         return results
@@ -166,7 +182,8 @@ class TwilioSMSSender:
     def send_to_all_consented(
         self,
         message: str,
-        dry_run: bool = False
+        dry_run: bool = False,
+        campaign_id: Optional[str] = None
     ) -> Dict:
         """
         Send SMS to all customers with active consent.
@@ -174,32 +191,30 @@ class TwilioSMSSender:
         Args:
             message: Message text
             dry_run: If True, don't actually send (for testing)
+            campaign_id: Ledger key for resuming an interrupted send
 
         Returns:
             Dict with summary stats
         """
         # Get all active consents
-        active_consents = self.consent_tracker.get_all_active_consents()
-        phone_numbers = active_consents['phone_number'].tolist()
+        phone_numbers = sorted(self.consent_tracker.get_active_phone_numbers())
 
         print(f"Found {len(phone_numbers)} customers with active consent")
 
-        if len(phone_numbers) == 0:
-            return {
-                'total': 0,
-                'sent': 0,
-                'failed': 0,
-                'no_consent': 0,
-                'details': []
-            }
-
         return self.send_bulk_sms(
             phone_numbers=phone_numbers,
             message=message,
             check_consent=False,  # Already filtered to consented
-            dry_run=dry_run
+            dry_run=dry_run,
+            campaign_id=campaign_id
         )
 
+    @staticmethod
+    def default_campaign_id(message: str) -> str:
+        """Campaign ID for today's send of this message text."""
+        digest = hashlib.sha1(message.encode('utf-8')).hexdigest()[:8]
+        return f"{datetime.now().strftime('%Y%m%d')}_{digest}"
+
     def test_connection(self) -> bool:
         """
         Test Twilio connection without sending messages.
@@ -9,6 +9,7 @@ import pandas as pd
 import boto3
 import os
 from io import StringIO
+from data_pipeline import checkin_store
 from data_pipeline.build_customer_interactions import build_customer_interactions
 
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -47,9 +48,9 @@ def upload_customer_interactions_to_s3(days_back=7, save_local=False):
     transfers_df = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')))
     print(f"   ✓ Loaded {len(transfers_df)} pass transfers")
 
-    # Load check-ins
-    response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="capitan/checkins.csv")
-    checkins_df = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')))
+    # Load check-ins (only the months covering the window are read)
+    since = pd.Timestamp.now() - pd.Timedelta(days=days_back + 1) if days_back else None
+    checkins_df = checkin_store.load_checkins(since=since)
     print(f"   ✓ Loaded {len(checkins_df)} check-ins")
 
     # Load customers
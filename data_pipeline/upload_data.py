@@ -1,6 +1,7 @@
 import boto3
 import os
 from . import config
+from . import pipeline_telemetry
 import pandas as pd
 import io
 import json
@@ -18,13 +19,16 @@ class DataUploader:
         self, df_location: str, bucket_name: str, file_name: str
     ) -> None:
         self.s3.upload_file(df_location, bucket_name, file_name)
+        pipeline_telemetry.record_s3_write(os.path.getsize(df_location))
 
     def upload_to_s3(self, df: pd.DataFrame, bucket_name: str, file_name: str) -> None:
         csv_buffer = io.StringIO()
         df.to_csv(csv_buffer, index=False)
+        body = csv_buffer.getvalue().encode("utf-8")
         self.s3.put_object(
-            Bucket=bucket_name, Key=file_name, Body=csv_buffer.getvalue()
+            Bucket=bucket_name, Key=file_name, Body=body
         )
+        pipeline_telemetry.record_s3_write(len(body), rows=len(df))
 
     def list_keys(self, bucket: str, prefix: str = "") -> list[str]:
         """
@@ -49,17 +53,23 @@ class DataUploader:
             response_string = response["Body"].read().decode("utf-8")
         else:
             response_string = response["Body"].read()
+        pipeline_telemetry.record_s3_read(
+            len(response_string.encode("utf-8")) if isinstance(response_string, str) else len(response_string)
+        )
         return response_string
 
     def convert_csv_to_df(self, csv_content: str) -> pd.DataFrame:
         if isinstance(csv_content, bytes):
             csv_content = csv_content.decode("utf-8")
-        return pd.read_csv(io.StringIO(csv_content))
+        df = pd.read_csv(io.StringIO(csv_content))
+        pipeline_telemetry.record_rows_in(len(df))
+        return df
 
 
 if __name__ == "__main__":
-    uploader = DataUploader()
-    df = uploader.download_from_s3(config.aws_bucket_name, config.s3_path_combined)
+    from data_pipeline.transaction_store import load_transactions
+
+    df = load_transactions()
     print(df.columns)
     df.to_csv("data/outputs/temp_combined.csv", index=False)
     print(df.head())
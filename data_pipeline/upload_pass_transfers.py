@@ -12,6 +12,7 @@ import pandas as pd
 import boto3
 import os
 from io import StringIO
+from data_pipeline import checkin_store
 from data_pipeline.parse_pass_transfers import parse_pass_transfers, get_transfer_summary
 
 
@@ -43,12 +44,11 @@ def upload_pass_transfers_to_s3(days_back=7, save_local=False, local_dir='data')
     print(f"Processing last {days_back} days of check-ins")
     print(f"{'='*80}\n")
 
-    # 1. Load recent check-ins
+    # 1. Load recent check-ins (only the months covering the window are read)
     print("1. Loading check-ins from S3...")
+    cutoff_date = pd.Timestamp.now() - pd.Timedelta(days=days_back)
     try:
-        response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="capitan/checkins.csv")
-        csv_content = response['Body'].read().decode('utf-8')
-        checkins_df = pd.read_csv(StringIO(csv_content))
+        checkins_df = checkin_store.load_checkins(since=cutoff_date - pd.Timedelta(days=1))
         print(f"   ✓ Loaded {len(checkins_df)} check-ins")
     except Exception as e:
         print(f"   ✗ Error loading check-ins: {e}")
@@ -56,7 +56,6 @@ def upload_pass_transfers_to_s3(days_back=7, save_local=False, local_dir='data')
 
     # Filter to recent check-ins
     checkins_df['checkin_datetime'] = pd.to_datetime(checkins_df['checkin_datetime'])
-    cutoff_date = pd.Timestamp.now() - pd.Timedelta(days=days_back)
     recent_checkins = checkins_df[checkins_df['checkin_datetime'] >= cutoff_date]
     print(f"   ✓ Filtered to {len(recent_checkins)} check-ins in last {days_back} days")
 
@@ -182,9 +181,7 @@ def backfill_all_transfers(save_local=False, local_dir='data'):
     # 1. Load ALL check-ins
     print("1. Loading ALL check-ins from S3...")
     try:
-        response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="capitan/checkins.csv")
-        csv_content = response['Body'].read().decode('utf-8')
-        checkins_df = pd.read_csv(StringIO(csv_content))
+        checkins_df = checkin_store.load_checkins()
         print(f"   ✓ Loaded {len(checkins_df)} check-ins")
     except Exception as e:
         print(f"   ✗ Error loading check-ins: {e}")
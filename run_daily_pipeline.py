@@ -3,7 +3,9 @@ Daily Data Pipeline Runner
 
 Runs all daily data fetching tasks:
 - Stripe & Square transactions (last 2 days)
+- Stripe failed membership payments (last 90 days, from the Stripe cache)
 - Capitan memberships
+- Capitan customers (only those updated since the last sync; full sync weekly)
 - Capitan check-ins (last 7 days)
 - Instagram posts (last 30 days with AI vision analysis)
 - Mailchimp campaigns (last 90 days with AI content analysis)
@@ -11,8 +13,17 @@ Runs all daily data fetching tasks:
 - SendGrid email activity (last 7 days for AB test tracking)
 - Birthday party RSVPs from Firebase
 
+Steps are declared in PIPELINE_STEPS with their dependencies. Independent
+network-bound fetches run concurrently; steps that build on earlier outputs
+(customer master, engagement tables, conversion metrics, ...) wait for their
+inputs and are skipped if an input failed.
+
 Usage:
     python run_daily_pipeline.py
+    python run_daily_pipeline.py --list
+    python run_daily_pipeline.py --only checkins pass_transfers
+    python run_daily_pipeline.py --from customer_master
+    python run_daily_pipeline.py --workers 2
 
 Or set up as cron job:
     0 6 * * * cd /path/to/project && source venv/bin/activate && python run_daily_pipeline.py
@@ -34,327 +45,379 @@ from data_pipeline.pipeline_handler import (
     upload_at_risk_members,
     upload_new_members_report,
     upload_new_sendgrid_data,
-    update_customer_master
+    upload_failed_membership_payments,
+    update_customer_master,
+    update_customer_contacts
 )
+from data_pipeline.pipeline_scheduler import PipelineStep, run_steps, print_run_summary, run_once_scope
+from data_pipeline import pipeline_telemetry
+import argparse
 import datetime
+import time
 
-def run_daily_pipeline():
-    """Run all daily data fetch tasks."""
-    print(f"\n{'='*80}")
-    print(f"DAILY DATA PIPELINE - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*80}\n")
+MINUTES = 60
 
-    # 1. Update Stripe & Square transactions (last 2 days)
-    print("1. Fetching Stripe & Square transactions (last 2 days)...")
-    try:
-        replace_days_in_transaction_df_in_s3(days=2)
-        print("✅ Transactions updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating transactions: {e}\n")
 
-    # 2. Update Shopify orders
-    print("2. Fetching Shopify orders (last 7 days)...")
-    try:
-        upload_new_shopify_data(save_local=False, days_back=7)
-        print("✅ Shopify orders updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating Shopify orders: {e}\n")
+def fetch_transactions():
+    replace_days_in_transaction_df_in_s3(days=2)
 
-    # 3. Update Capitan membership data
-    print("3. Fetching Capitan membership data...")
-    try:
-        upload_new_capitan_membership_data(save_local=False)
-        print("✅ Capitan data updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating Capitan data: {e}\n")
 
-    # 3a. Update Capitan relations and family graph
-    print("3a. Fetching Capitan relations & building family graph...")
-    print("    (This takes ~21 minutes to fetch all customer relations)")
-    try:
-        upload_capitan_relations_and_family_graph(save_local=False)
-        print("✅ Relations & family graph updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating relations & family graph: {e}\n")
+def compact_transactions():
+    from data_pipeline.transaction_store import TransactionStore
+    manifest = TransactionStore().compact()
+    return f"{len(manifest.get('partitions', {}))} partitions"
 
-    # 4. Update Google Analytics 4 data
-    print("4. Fetching Google Analytics 4 data (last 30 days)...")
-    try:
-        upload_new_ga4_data(save_local=False, days_back=30)
-        print("✅ GA4 data updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating GA4 data: {e}\n")
 
-    # 5. Update Capitan check-ins (last 7 days)
-    print("5. Fetching Capitan check-ins (last 7 days)...")
-    try:
-        upload_new_capitan_checkins(save_local=False, days_back=7)
-        print("✅ Check-ins updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating check-ins: {e}\n")
+def fetch_failed_payments():
+    df_failed = upload_failed_membership_payments(save_local=False, days_back=90)
+    return f"{len(df_failed)} failed payments"
 
-    # 4. Update Instagram data (last 30 days with AI vision)
-    print("6. Fetching Instagram posts (last 30 days with AI vision)...")
-    try:
-        upload_new_instagram_data(
-            save_local=False,
-            enable_vision_analysis=True,  # Enable AI vision for new posts
-            days_to_fetch=30
-        )
-        print("✅ Instagram data updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating Instagram data: {e}\n")
 
-    # 5. Update Mailchimp data (last 90 days with AI content analysis)
-    print("7. Fetching Mailchimp campaigns (last 90 days with AI content analysis)...")
-    try:
-        upload_new_mailchimp_data(
-            save_local=False,
-            enable_content_analysis=True,  # Enable AI content analysis for new campaigns
-            days_to_fetch=90
-        )
-        print("✅ Mailchimp data updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating Mailchimp data: {e}\n")
+def fetch_shopify_orders():
+    upload_new_shopify_data(save_local=False, days_back=7)
 
-    # 5a. Fetch Mailchimp recipient activity
-    print("7a. Fetching Mailchimp recipient activity (last 30 days)...")
-    try:
-        from data_pipeline.fetch_mailchimp_recipient_activity import MailchimpRecipientActivityFetcher
-        recipient_fetcher = MailchimpRecipientActivityFetcher()
-        recipient_fetcher.fetch_and_save(days_back=30, save_local=False)
-        print("✅ Mailchimp recipient activity updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error fetching Mailchimp recipient activity: {e}\n")
 
-    # 5b. Process SendGrid webhook events (from S3)
-    print("7b. Processing SendGrid webhook events (last 7 days)...")
-    try:
-        from data_pipeline.fetch_sendgrid_webhook_events import SendGridWebhookProcessor
-        webhook_processor = SendGridWebhookProcessor()
-        webhook_processor.fetch_and_save(days_back=7, save_local=False)
-        print("✅ SendGrid webhook events processed successfully\n")
-    except Exception as e:
-        print(f"❌ Error processing SendGrid webhook events: {e}\n")
+def fetch_capitan_memberships():
+    upload_new_capitan_membership_data(save_local=False)
 
-    # 6. Update Capitan associations & events (all events)
-    print("8. Fetching Capitan associations, members, and events...")
-    try:
-        upload_new_capitan_associations_events(
-            save_local=False,
-            events_days_back=None,  # Fetch all events (they don't create new ones frequently)
-            fetch_activity_log=False  # Skip activity log for daily runs (can be large)
-        )
-        print("✅ Capitan associations & events updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating Capitan associations & events: {e}\n")
 
-    # 6b. Fetch membership referrals
-    print("8b. Fetching membership referrals from Capitan...")
-    try:
-        from data_pipeline.fetch_capitan_referrals import fetch_capitan_referrals
-        df_referrals, df_leaderboard = fetch_capitan_referrals(save_local=False)
-        print(f"✅ Referrals updated: {len(df_referrals)} referrals, {len(df_leaderboard)} referrers\n")
-    except Exception as e:
-        print(f"❌ Error fetching referrals: {e}\n")
+def fetch_capitan_customers():
+    from data_pipeline.capitan_customer_sync import sync_capitan_customers
+    sync = sync_capitan_customers()
+    return (f"{sync['mode']}: {len(sync['changed_customer_ids'])} new/changed, "
+            f"{len(sync['deleted_customer_ids'])} deleted, {len(sync['customers'])} total")
 
-    # 7. Parse and upload pass transfers (last 7 days)
-    print("9. Parsing pass transfers from check-ins (last 7 days)...")
-    try:
-        upload_new_pass_transfers(
-            save_local=False,
-            days_back=7
-        )
-        print("✅ Pass transfers updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating pass transfers: {e}\n")
 
-    # 8. Build and upload customer interactions (last 7 days)
-    print("10. Building customer interactions (last 7 days)...")
-    try:
-        upload_new_customer_interactions(
-            save_local=False,
-            days_back=7
-        )
-        print("✅ Customer interactions updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating customer interactions: {e}\n")
+def fetch_relations_and_family_graph():
+    upload_capitan_relations_and_family_graph(save_local=False)
 
-    # 9. Rebuild and upload customer connections summary
-    print("11. Rebuilding customer connections summary...")
-    try:
-        upload_new_customer_connections(
-            save_local=False
-        )
-        print("✅ Customer connections updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error updating customer connections: {e}\n")
 
-    # 9a. Update customer master and rebuild customer events
-    print("11a. Updating customer master and rebuilding customer events...")
-    print("    (This includes identity resolution and event aggregation)")
-    try:
-        df_master, df_identifiers, df_events = update_customer_master(save_local=False)
-        print(f"✅ Customer master updated: {len(df_master)} customers, {len(df_events)} events\n")
-    except Exception as e:
-        print(f"❌ Error updating customer master: {e}\n")
+def fetch_ga4():
+    upload_new_ga4_data(save_local=False, days_back=30)
 
-    # 9b. Build day pass engagement table
-    print("11b. Building day pass engagement table...")
-    try:
-        from data_pipeline.build_day_pass_engagement_table import upload_day_pass_engagement_table
-        upload_day_pass_engagement_table(save_local=False)
-        print("✅ Day pass engagement table updated\n")
-    except Exception as e:
-        print(f"❌ Error building day pass engagement table: {e}\n")
 
-    # 9b2. Build day pass check-in recency table (pre-computed for dashboard performance)
-    print("11b2. Building day pass check-in recency table...")
-    try:
-        from data_pipeline.build_day_pass_engagement_table import upload_day_pass_checkin_recency_table
-        upload_day_pass_checkin_recency_table(save_local=False)
-        print("✅ Day pass check-in recency table updated\n")
-    except Exception as e:
-        print(f"❌ Error building day pass check-in recency table: {e}\n")
+def fetch_checkins():
+    upload_new_capitan_checkins(save_local=False, days_back=7)
 
-    # 9c. Build membership conversion metrics
-    print("11c. Building membership conversion metrics...")
-    try:
-        from data_pipeline.build_membership_conversion_metrics import upload_membership_conversion_metrics
-        upload_membership_conversion_metrics(save_local=False)
-        print("✅ Membership conversion metrics updated\n")
-    except Exception as e:
-        print(f"❌ Error building membership conversion metrics: {e}\n")
 
-    # 9d. Build flag-email verification report
-    print("11d. Building flag-email verification report...")
-    try:
-        from data_pipeline.build_flag_email_verification import upload_flag_email_verification
-        upload_flag_email_verification(save_local=False)
-        print("✅ Flag-email verification report updated\n")
-    except Exception as e:
-        print(f"❌ Error building flag-email verification report: {e}\n")
+def fetch_instagram():
+    upload_new_instagram_data(
+        save_local=False,
+        enable_vision_analysis=True,  # Enable AI vision for new posts
+        days_to_fetch=30
+    )
 
-    # 9e. Send Mailchimp import CSV for 2-week pass journey
-    print("11e. Sending Mailchimp import CSV for 2-week pass journey...")
-    print("    (Emails CSV to vicky@basinclimbing.com for daily import)")
-    try:
-        from data_pipeline.send_mailchimp_import_csv import run_mailchimp_csv_email
-        run_mailchimp_csv_email()
-        print("✅ Mailchimp import CSV sent successfully\n")
-    except Exception as e:
-        print(f"❌ Error sending Mailchimp import CSV: {e}\n")
 
-    # 10. Generate team membership reconciliation report
-    print("12. Generating team membership reconciliation report...")
-    try:
-        from data_pipeline.fix_team_member_matching import find_team_member_memberships
-        team_df = find_team_member_memberships()
-        team_df.to_csv('data/outputs/team_membership_report.csv', index=False)
-        print(f"✅ Team report updated: {len(team_df)} team members tracked\n")
-    except Exception as e:
-        print(f"❌ Error generating team report: {e}\n")
+def fetch_mailchimp():
+    upload_new_mailchimp_data(
+        save_local=False,
+        enable_content_analysis=True,  # Enable AI content analysis for new campaigns
+        days_to_fetch=90
+    )
 
-    # 11. Fetch Twilio messages
-    print("13. Fetching Twilio SMS messages...")
-    try:
-        from data_pipeline.fetch_twilio_messages import TwilioMessageFetcher
-        twilio_fetcher = TwilioMessageFetcher()
-        twilio_fetcher.fetch_and_save(days_back=7, save_local=False)
-        print("✅ Twilio messages updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error fetching Twilio messages: {e}\n")
 
-    # 11a. Sync Twilio opt-in/opt-out status
-    print("13a. Syncing Twilio opt-in/opt-out status...")
-    try:
-        from data_pipeline.sync_twilio_opt_ins import TwilioOptInTracker
-        opt_in_tracker = TwilioOptInTracker()
-        opt_in_tracker.sync(message_limit=1000)
-        print("✅ Twilio opt-in status synced successfully\n")
-    except Exception as e:
-        print(f"❌ Error syncing Twilio opt-ins: {e}\n")
+def fetch_mailchimp_recipient_activity():
+    from data_pipeline.fetch_mailchimp_recipient_activity import MailchimpRecipientActivityFetcher
+    recipient_fetcher = MailchimpRecipientActivityFetcher()
+    recipient_fetcher.fetch_and_save(days_back=30, save_local=False)
 
-    # 11b. Build unified contact preferences (email + SMS opt-in from all sources)
-    print("13b. Building contact preferences (Capitan + Mailchimp + Twilio)...")
-    try:
-        from data_pipeline.build_contact_preferences import build_contact_preferences
-        preferences, events = build_contact_preferences(save_to_s3=True)
-        print(f"✅ Contact preferences updated: {len(preferences)} records\n")
-    except Exception as e:
-        print(f"❌ Error building contact preferences: {e}\n")
 
-    # 12. Fetch SendGrid email activity
-    print("14. Fetching SendGrid email activity (last 7 days)...")
-    try:
-        upload_new_sendgrid_data(save_local=False, days_back=7)
-        print("✅ SendGrid email activity updated successfully\n")
-    except Exception as e:
-        print(f"❌ Error fetching SendGrid data: {e}\n")
+def process_sendgrid_webhooks():
+    from data_pipeline.fetch_sendgrid_webhook_events import SendGridWebhookProcessor
+    webhook_processor = SendGridWebhookProcessor()
+    webhook_processor.fetch_and_save(days_back=7, save_local=False)
 
-    # NOTE: Flag evaluation and Shopify sync moved to separate workflow
-    # See: .github/workflows/flag_sync.yml (runs at 8 AM, 2 PM, 8 PM CT)
-    # This prevents sending customer messages in the middle of the night
 
-    # 13. Generate at-risk members report
-    print("15. Generating at-risk members report...")
-    try:
-        upload_at_risk_members(save_local=False)
-        print("✅ At-risk members report generated successfully\n")
-    except Exception as e:
-        print(f"❌ Error generating at-risk members report: {e}\n")
+def fetch_capitan_associations_events():
+    upload_new_capitan_associations_events(
+        save_local=False,
+        events_days_back=None,  # Fetch all events (they don't create new ones frequently)
+        fetch_activity_log=False  # Skip activity log for daily runs (can be large)
+    )
 
-    # 14. Generate new members report (last 28 days)
-    print("16. Generating new members report (last 28 days)...")
-    try:
-        upload_new_members_report(save_local=False, days_back=28)
-        print("✅ New members report generated successfully\n")
-    except Exception as e:
-        print(f"❌ Error generating new members report: {e}\n")
 
-    # 15. Fetch birthday party RSVPs (via Cloud Functions API)
-    print("17. Fetching birthday party RSVPs from Firebase...")
-    try:
-        from data_pipeline.fetch_birthday_parties import fetch_and_save_birthday_parties
-        parties_df, rsvps_df = fetch_and_save_birthday_parties(save_to_s3=True, save_local=False)
-        print(f"✅ Synced {len(parties_df)} parties and {len(rsvps_df)} RSVPs to S3\n")
-    except Exception as e:
-        print(f"❌ Error fetching birthday party data: {e}\n")
+def fetch_referrals():
+    from data_pipeline.fetch_capitan_referrals import fetch_capitan_referrals
+    df_referrals, df_leaderboard = fetch_capitan_referrals(save_local=False)
+    return f"{len(df_referrals)} referrals, {len(df_leaderboard)} referrers"
 
-    # 15a. Send birthday party reminders (email 7 days, text 1 day before)
-    print("17a. Sending birthday party reminders...")
-    print("     - Email: 7 days before party")
-    print("     - Text: 1 day before party")
-    try:
-        from send_birthday_reminders import run_birthday_reminders
-        run_birthday_reminders(dry_run=False)
-        print("✅ Birthday reminders processed\n")
-    except Exception as e:
-        print(f"❌ Error sending birthday reminders: {e}\n")
 
-    # 17. Sync customer data TO Klaviyo
-    print("19. Syncing customer profiles to Klaviyo...")
-    print("    (Pushes all customers with flags and membership data)")
-    try:
-        from data_pipeline.sync_to_klaviyo import sync_to_klaviyo
-        results = sync_to_klaviyo(profile_limit=None, event_days=7)
-        print(f"✅ Synced {results.get('profiles_created', 0)} profiles to Klaviyo\n")
-    except Exception as e:
-        print(f"❌ Error syncing to Klaviyo: {e}\n")
+def build_pass_transfers():
+    upload_new_pass_transfers(save_local=False, days_back=7)
+
+
+def build_customer_interactions():
+    upload_new_customer_interactions(save_local=False, days_back=7)
+
+
+def build_customer_connections():
+    upload_new_customer_connections(save_local=False)
+
+
+def build_customer_master():
+    df_master, df_identifiers, df_events = update_customer_master(save_local=False)
+    return f"{len(df_master)} customers, {len(df_events)} events"
+
+
+def build_customer_contacts():
+    df_contacts = update_customer_contacts(save_local=False)
+    return f"{len(df_contacts)} customers"
+
+
+def build_day_pass_engagement():
+    from data_pipeline.build_day_pass_engagement_table import upload_day_pass_engagement_table
+    upload_day_pass_engagement_table(save_local=False)
+
+
+def build_day_pass_checkin_recency():
+    from data_pipeline.build_day_pass_engagement_table import upload_day_pass_checkin_recency_table
+    upload_day_pass_checkin_recency_table(save_local=False)
+
+
+def build_membership_conversion_metrics():
+    from data_pipeline.build_membership_conversion_metrics import upload_membership_conversion_metrics
+    upload_membership_conversion_metrics(save_local=False)
+
+
+def build_flag_email_verification():
+    from data_pipeline.build_flag_email_verification import upload_flag_email_verification
+    upload_flag_email_verification(save_local=False)
+
+
+def send_mailchimp_import_csv():
+    from data_pipeline.send_mailchimp_import_csv import run_mailchimp_csv_email
+    run_mailchimp_csv_email()
+
+
+def build_team_report():
+    from data_pipeline.fix_team_member_matching import find_team_member_memberships
+    team_df = find_team_member_memberships()
+    team_df.to_csv('data/outputs/team_membership_report.csv', index=False)
+    return f"{len(team_df)} team members tracked"
+
+
+def fetch_twilio_messages():
+    from data_pipeline.fetch_twilio_messages import TwilioMessageFetcher
+    twilio_fetcher = TwilioMessageFetcher()
+    twilio_fetcher.fetch_and_save(days_back=7, save_local=False)
+
+
+def sync_twilio_opt_ins():
+    from data_pipeline.sync_twilio_opt_ins import TwilioOptInTracker
+    opt_in_tracker = TwilioOptInTracker()
+    opt_in_tracker.sync()
+
+
+def build_contact_preferences():
+    from data_pipeline.build_contact_preferences import build_contact_preferences
+    preferences, events = build_contact_preferences(save_to_s3=True)
+    return f"{len(preferences)} records"
+
+
+def fetch_sendgrid_activity():
+    upload_new_sendgrid_data(save_local=False, days_back=7)
+
+
+def build_at_risk_members():
+    upload_at_risk_members(save_local=False)
+
+
+def build_new_members_report():
+    upload_new_members_report(save_local=False, days_back=28)
+
+
+def fetch_birthday_parties():
+    from data_pipeline.fetch_birthday_parties import fetch_and_save_birthday_parties
+    parties_df, rsvps_df = fetch_and_save_birthday_parties(save_to_s3=True, save_local=False)
+    return f"{len(parties_df)} parties, {len(rsvps_df)} RSVPs"
+
+
+def send_birthday_party_reminders():
+    # Email 7 days before the party, text 1 day before
+    from send_birthday_reminders import run_birthday_reminders
+    run_birthday_reminders(dry_run=False)
+
+
+def sync_klaviyo_profiles():
+    from data_pipeline.sync_to_klaviyo import sync_to_klaviyo
+    results = sync_to_klaviyo(profile_limit=None, event_days=7)
+    return f"{results.get('profiles_created', 0)} profiles"
+
+
+def fetch_klaviyo_engagement():
+    from data_pipeline.fetch_klaviyo_data import fetch_klaviyo_data
+    klaviyo_data = fetch_klaviyo_data(save_local=False, days_back=30)
+    return (f"{len(klaviyo_data.get('campaigns', []))} campaigns, "
+            f"{len(klaviyo_data.get('events', []))} events")
+
+
+# NOTE: Flag evaluation and Shopify sync moved to separate workflow
+# See: .github/workflows/flag_sync.yml (runs at 8 AM, 2 PM, 8 PM CT)
+# This prevents sending customer messages in the middle of the night
+PIPELINE_STEPS = [
+    # Independent source fetches
+    PipelineStep('transactions', 'Stripe & Square transactions (last 2 days)', fetch_transactions,
+                 timeout=30 * MINUTES),
+    # Shares the run's Stripe cache with transactions (load_stripe_cache syncs it once)
+    PipelineStep('failed_payments', 'Stripe failed membership payments', fetch_failed_payments,
+                 timeout=15 * MINUTES),
+    PipelineStep('transaction_compaction', 'Compact closed months of transaction partitions',
+                 compact_transactions, depends_on=['transactions'], timeout=15 * MINUTES),
+    PipelineStep('shopify', 'Shopify orders (last 7 days)', fetch_shopify_orders,
+                 timeout=15 * MINUTES),
+    PipelineStep('capitan_memberships', 'Capitan membership data', fetch_capitan_memberships,
+                 timeout=15 * MINUTES),
+    PipelineStep('capitan_customers', 'Capitan customers (updated since last sync)',
+                 fetch_capitan_customers, timeout=15 * MINUTES),
+    PipelineStep('ga4', 'Google Analytics 4 data (last 30 days)', fetch_ga4,
+                 timeout=15 * MINUTES),
+    PipelineStep('checkins', 'Capitan check-ins (last 7 days)', fetch_checkins,
+                 timeout=15 * MINUTES),
+    PipelineStep('instagram', 'Instagram posts (last 30 days with AI vision)', fetch_instagram,
+                 timeout=30 * MINUTES),
+    PipelineStep('mailchimp', 'Mailchimp campaigns (last 90 days with AI content analysis)',
+                 fetch_mailchimp, timeout=30 * MINUTES),
+    PipelineStep('mailchimp_recipients', 'Mailchimp recipient activity (last 30 days)',
+                 fetch_mailchimp_recipient_activity, timeout=30 * MINUTES),
+    PipelineStep('sendgrid_webhooks', 'SendGrid webhook events (last 7 days)',
+                 process_sendgrid_webhooks, timeout=15 * MINUTES),
+    PipelineStep('capitan_associations', 'Capitan associations, members, and events',
+                 fetch_capitan_associations_events, timeout=20 * MINUTES),
+    PipelineStep('referrals', 'Membership referrals from Capitan', fetch_referrals,
+                 timeout=15 * MINUTES),
+    PipelineStep('twilio_messages', 'Twilio SMS messages', fetch_twilio_messages,
+                 timeout=15 * MINUTES),
+    PipelineStep('twilio_opt_ins', 'Twilio opt-in/opt-out status', sync_twilio_opt_ins,
+                 timeout=15 * MINUTES),
+    PipelineStep('sendgrid_activity', 'SendGrid email activity (last 7 days)',
+                 fetch_sendgrid_activity, timeout=15 * MINUTES),
+    PipelineStep('birthday_parties', 'Birthday party RSVPs from Firebase', fetch_birthday_parties,
+                 timeout=15 * MINUTES),
+
+    # Steps that build on earlier outputs
+    PipelineStep('relations_family_graph', 'Capitan relations & family graph (~21 min)',
+                 fetch_relations_and_family_graph,
+                 depends_on=['capitan_memberships', 'capitan_customers'], timeout=45 * MINUTES),
+    PipelineStep('pass_transfers', 'Pass transfers from check-ins (last 7 days)',
+                 build_pass_transfers, depends_on=['checkins'], timeout=15 * MINUTES),
+    PipelineStep('customer_interactions', 'Customer interactions (last 7 days)',
+                 build_customer_interactions,
+                 depends_on=['checkins', 'capitan_memberships', 'pass_transfers'],
+                 timeout=15 * MINUTES),
+    PipelineStep('customer_connections', 'Customer connections summary',
+                 build_customer_connections, depends_on=['customer_interactions'],
+                 timeout=15 * MINUTES),
+    PipelineStep('customer_master', 'Customer master & customer events (identity resolution)',
+                 build_customer_master,
+                 depends_on=['transactions', 'checkins', 'capitan_memberships', 'capitan_customers',
+                             'mailchimp', 'shopify'],
+                 timeout=45 * MINUTES),
+    PipelineStep('customer_contacts', 'Resolved customer contacts & household hashes',
+                 build_customer_contacts, depends_on=['customer_master', 'relations_family_graph'],
+                 timeout=15 * MINUTES),
+    PipelineStep('day_pass_engagement', 'Day pass engagement table', build_day_pass_engagement,
+                 depends_on=['checkins', 'capitan_memberships'], timeout=15 * MINUTES),
+    PipelineStep('day_pass_checkin_recency', 'Day pass check-in recency table',
+                 build_day_pass_checkin_recency,
+                 depends_on=['checkins', 'capitan_memberships'], timeout=15 * MINUTES),
+    PipelineStep('membership_conversion_metrics', 'Membership conversion metrics',
+                 build_membership_conversion_metrics,
+                 depends_on=['checkins', 'capitan_memberships'], timeout=15 * MINUTES),
+    PipelineStep('flag_email_verification', 'Flag-email verification report',
+                 build_flag_email_verification,
+                 depends_on=['customer_master', 'mailchimp', 'mailchimp_recipients',
+                             'sendgrid_webhooks'],
+                 timeout=15 * MINUTES),
+    PipelineStep('mailchimp_import_csv', 'Mailchimp import CSV for 2-week pass journey',
+                 send_mailchimp_import_csv, depends_on=['customer_master'],
+                 timeout=15 * MINUTES),
+    PipelineStep('team_report', 'Team membership reconciliation report', build_team_report,
+                 depends_on=['capitan_memberships'], timeout=15 * MINUTES),
+    PipelineStep('contact_preferences', 'Contact preferences (Capitan + Mailchimp + Twilio)',
+                 build_contact_preferences,
+                 depends_on=['customer_master', 'mailchimp', 'twilio_messages', 'twilio_opt_ins'],
+                 timeout=15 * MINUTES),
+    PipelineStep('at_risk_members', 'At-risk members report', build_at_risk_members,
+                 depends_on=['checkins', 'capitan_memberships'], timeout=15 * MINUTES),
+    PipelineStep('new_members', 'New members report (last 28 days)', build_new_members_report,
+                 depends_on=['checkins', 'capitan_memberships'], timeout=15 * MINUTES),
+    PipelineStep('birthday_reminders', 'Birthday party reminders (email 7d, text 1d)',
+                 send_birthday_party_reminders, depends_on=['birthday_parties'],
+                 timeout=15 * MINUTES),
+    PipelineStep('klaviyo_sync', 'Customer profiles to Klaviyo', sync_klaviyo_profiles,
+                 depends_on=['customer_master', 'capitan_memberships'], timeout=60 * MINUTES),
+    PipelineStep('klaviyo_fetch', 'Engagement data from Klaviyo', fetch_klaviyo_engagement,
+                 timeout=20 * MINUTES),
+]
+
+
+def run_daily_pipeline(only=None, start_from=None, max_workers=4):
+    """
+    Run all daily data fetch tasks.
+
+    Args:
+        only: Run exactly these step names
+        start_from: Run this step and every step declared after it
+        max_workers: Maximum number of steps running at once
+    """
+    started = time.monotonic()
+    print(f"\n{'='*80}")
+    print(f"DAILY DATA PIPELINE - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*80}\n")
+
+    with run_once_scope() as once:
+        results = run_steps(
+            PIPELINE_STEPS,
+            max_workers=max_workers,
+            only=only,
+            start_from=start_from,
+        )
+
+    print_run_summary(results, time.monotonic() - started, once.stats())
+
+    # Close the records of timed-out steps and add ones for steps that never started
+    for result in results.values():
+        if result.status in ('timeout', 'skipped'):
+            pipeline_telemetry.record_outcome(
+                result.name, result.status, result.duration_seconds, result.error
+            )
 
-    # 18. Fetch engagement data FROM Klaviyo
-    print("20. Fetching engagement data from Klaviyo...")
     try:
-        from data_pipeline.fetch_klaviyo_data import fetch_klaviyo_data
-        klaviyo_data = fetch_klaviyo_data(save_local=False, days_back=30)
-        print(f"✅ Fetched Klaviyo data: {len(klaviyo_data.get('campaigns', []))} campaigns, {len(klaviyo_data.get('events', []))} events\n")
+        pipeline_telemetry.upload_run_log()
     except Exception as e:
-        print(f"❌ Error fetching from Klaviyo: {e}\n")
+        print(f"⚠️  Could not upload run telemetry: {e}")
 
     print(f"{'='*80}")
     print(f"PIPELINE COMPLETE - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*80}\n")
 
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the daily data pipeline')
+    parser.add_argument('--only', nargs='+', metavar='STEP', help='Run only these steps')
+    parser.add_argument('--from', dest='start_from', metavar='STEP',
+                        help='Run this step and every step declared after it')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Maximum number of steps running at once (default: 4)')
+    parser.add_argument('--list', action='store_true', help='List steps and exit')
+
+    args = parser.parse_args()
+
+    if args.only and args.start_from:
+        parser.error('--only and --from cannot be combined')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    if args.list:
+        for step in PIPELINE_STEPS:
+            deps = f" (after: {', '.join(step.depends_on)})" if step.depends_on else ""
+            print(f"{step.name:<32} {step.label}{deps}")
+        return
+
+    run_daily_pipeline(only=args.only, start_from=args.start_from, max_workers=args.workers)
+
 
 if __name__ == "__main__":
-    run_daily_pipeline()
+    main()
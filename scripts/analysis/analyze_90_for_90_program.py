@@ -4,6 +4,7 @@ This appears to be a major source of the revenue drop
 """
 
 import pandas as pd
+from data_pipeline.transaction_store import load_transactions
 import boto3
 from datetime import datetime
 import os
@@ -36,7 +37,7 @@ def main():
     print("="*80)
 
     df_memberships = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/memberships.csv")
-    df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+    df_transactions = load_transactions()
 
     if df_memberships is None or df_transactions is None:
         print("Could not load data")
@@ -4,6 +4,7 @@ to understand pass sharing patterns
 """
 
 import pandas as pd
+from data_pipeline.checkin_store import load_checkins
 import boto3
 import os
 from io import StringIO
@@ -27,7 +28,7 @@ print("\n" + "="*80)
 print("ANALYZING GUEST ENTRIES AND PASS SHARING")
 print("="*80)
 
-df_checkins = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/checkins.csv")
+df_checkins = load_checkins()
 
 print(f"\nTotal check-ins: {len(df_checkins)}")
 
@@ -3,7 +3,10 @@ Compare Jan-Feb 2025 to Sep-Oct 2025
 Removes the $90 for 90 effect - comparing similar "normal" periods
 """
 
+import datetime
 import pandas as pd
+from data_pipeline import config
+from data_pipeline.snapshot_store import load_as_of
 import boto3
 import os
 from io import StringIO
@@ -31,7 +34,9 @@ print("(Removing $90 for 90 effect - both periods without that promo)")
 print("="*80)
 
 # Load data
-df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+# Latest monthly snapshot, reading only the 2025 partitions
+df_transactions = load_as_of(config.s3_path_combined, datetime.date.today(),
+                             start_date="2025-01-01", end_date="2025-12-31")
 df_memberships = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/memberships.csv")
 
 df_transactions['Date'] = pd.to_datetime(df_transactions['Date'])
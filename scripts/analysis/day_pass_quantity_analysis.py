@@ -3,6 +3,7 @@ Analyze day pass quantity field to understand group sizes
 """
 
 import pandas as pd
+from data_pipeline.transaction_store import load_transactions
 import boto3
 import os
 from io import StringIO
@@ -27,7 +28,7 @@ print("DAY PASS GROUP SIZE DISTRIBUTION")
 print("Using the 'quantity' field from transaction data")
 print("="*80)
 
-df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+df_transactions = load_transactions()
 
 df_transactions['Date'] = pd.to_datetime(df_transactions['Date'])
 df_2025 = df_transactions[df_transactions['Date'].dt.year == 2025].copy()
@@ -4,6 +4,7 @@ Analyzing which specific memberships stopped being charged
 """
 
 import pandas as pd
+from data_pipeline.transaction_store import load_transactions
 import numpy as np
 import boto3
 from datetime import datetime
@@ -304,7 +305,7 @@ def main():
     # Load data
     print("\nLoading data from S3...")
 
-    df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+    df_transactions = load_transactions()
     df_memberships = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/memberships.csv")
     df_failed = load_csv_from_s3(AWS_BUCKET_NAME, "stripe/failed_membership_payments.csv")
 
@@ -4,6 +4,7 @@ Investigating revenue drop from ~$70K/month to ~$50-55K/month starting September
 """
 
 import pandas as pd
+from data_pipeline.transaction_store import load_transactions
 import numpy as np
 import boto3
 from datetime import datetime, timedelta
@@ -259,7 +260,7 @@ def main():
 
     # Load combined transaction data
     print("\n\nStep 1: Loading Data from S3...")
-    df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+    df_transactions = load_transactions()
 
     if df_transactions is None:
         print("ERROR: Could not load transaction data. Exiting.")
@@ -9,7 +9,7 @@ Usage:
 
 This will:
 1. Fetch 365 days of check-in history
-2. Upload to S3 at capitan/checkins.csv
+2. Merge into the month-partitioned check-in store (capitan/checkins/)
 3. Create a snapshot
 """
 
@@ -31,7 +31,7 @@ def backfill_checkin_history():
             days_back=365  # Full year
         )
         print("\n✅ Historical check-in data backfill complete!")
-        print("   - Data uploaded to S3: capitan/checkins.csv")
+        print("   - Data merged into S3: capitan/checkins/")
         print("   - Local copy saved to: data/outputs/capitan_checkins.csv")
         print("   - Snapshot created")
         print("\nThe daily pipeline will now keep this data updated with the last 7 days.")
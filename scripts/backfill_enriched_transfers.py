@@ -3,6 +3,8 @@ Backfill pass_transfers.csv with purchaser_customer_id enrichment
 """
 
 import pandas as pd
+from data_pipeline.checkin_store import load_checkins
+from data_pipeline.transaction_store import load_transactions
 import boto3
 import os
 from io import StringIO
@@ -26,8 +28,7 @@ print("="*80)
 print("\n1. Loading data from S3...")
 
 # Load check-ins
-response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="capitan/checkins.csv")
-checkins_df = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')))
+checkins_df = load_checkins()
 print(f"   ✓ Loaded {len(checkins_df)} check-ins")
 
 # Load customers
@@ -37,8 +38,7 @@ print(f"   ✓ Loaded {len(customers_df)} customers")
 
 # Load transactions
 try:
-    response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="transactions/combined_transaction_data.csv")
-    transactions_df = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')))
+    transactions_df = load_transactions()
     print(f"   ✓ Loaded {len(transactions_df)} transactions")
 except Exception as e:
     print(f"   ⚠ Could not load transactions: {e}")
@@ -0,0 +1,81 @@
+"""
+Benchmark the compiled transaction categorizer against the old row-by-row
+transform_payments_data.
+
+Uses the full combined transaction history from S3 when AWS credentials are
+available (re-running categorization on the stored Description/Name columns),
+otherwise a synthetic set built from the config keyword dictionaries.
+
+Fails if the two implementations disagree on any label.
+
+Usage:
+    python scripts/benchmark_transaction_categorizer.py
+    python scripts/benchmark_transaction_categorizer.py --synthetic 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_pipeline import config
+from data_pipeline.transaction_store import load_transactions
+from tests.test_transaction_categorizer import legacy_transform_payments_data, make_transactions
+from utils.stripe_and_square_helpers import transform_payments_data
+
+LABEL_COLUMNS = [
+    "revenue_category", "membership_size", "membership_freq", "is_founder",
+    "is_free_membership", "sub_category", "sub_category_detail", "Day Pass Count",
+]
+
+
+def load_history():
+    df = load_transactions()
+    print(f"Loaded {len(df):,} transactions from s3://{config.aws_bucket_name}/{config.s3_path_transaction_partitions}")
+    keep = [c for c in ["transaction_id", "Description", "Name", "Date", "Tax Amount",
+                        "Pre-Tax Amount", "Total Amount", "quantity"] if c in df.columns]
+    df = df[keep]
+    df["Description"] = df["Description"].fillna("").astype(str)
+    return df
+
+
+def time_it(func, df):
+    start = time.perf_counter()
+    result = func(df.copy())
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=None,
+                        help="Use N synthetic transactions instead of the S3 history")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        df = make_transactions(n=args.synthetic)
+    else:
+        try:
+            df = load_history()
+        except Exception as e:
+            print(f"Could not load transaction history ({e}); using 20,000 synthetic rows")
+            df = make_transactions(n=20000)
+
+    legacy, legacy_seconds = time_it(legacy_transform_payments_data, df)
+    compiled, compiled_seconds = time_it(transform_payments_data, df)
+
+    print(f"\n{'Implementation':<16} {'Seconds':>9} {'Rows/s':>12}")
+    print(f"{'row-by-row':<16} {legacy_seconds:>9.2f} {len(df) / legacy_seconds:>12,.0f}")
+    print(f"{'compiled':<16} {compiled_seconds:>9.2f} {len(df) / compiled_seconds:>12,.0f}")
+    print(f"Speedup: {legacy_seconds / compiled_seconds:.1f}x on {len(df):,} rows "
+          f"({df['Description'].nunique():,} distinct descriptions)")
+
+    pd.testing.assert_frame_equal(compiled[LABEL_COLUMNS], legacy[LABEL_COLUMNS])
+    print("✅ Labels identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from presentation_builder import PresentationBuilder
 from presentation_builder.chart_generator import ChartGenerator, COLORS
 from data_pipeline import config
 from data_pipeline.upload_data import DataUploader
+from data_pipeline.transaction_store import load_transactions
 
 # Initialize
 uploader = DataUploader()
@@ -18,11 +19,7 @@ chart_gen = ChartGenerator()
 print("Loading data from S3...")
 
 # Load transaction data (operational period only)
-transactions_csv = uploader.download_from_s3(
-    config.aws_bucket_name,
-    config.s3_path_combined
-)
-transactions_df = uploader.convert_csv_to_df(transactions_csv)
+transactions_df = load_transactions()
 transactions_df['Date'] = pd.to_datetime(transactions_df['Date'])
 
 # Load membership data
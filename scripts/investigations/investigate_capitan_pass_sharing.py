@@ -4,6 +4,7 @@ Looking for guest/buddy pass features, shared entries, or relationship data
 """
 
 import pandas as pd
+from data_pipeline.checkin_store import load_checkins
 import boto3
 import os
 from io import StringIO
@@ -39,7 +40,7 @@ print("="*80)
 
 df_memberships = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/memberships.csv")
 df_members = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/members.csv")
-df_checkins = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/checkins.csv")
+df_checkins = load_checkins()
 df_customers = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/customers.csv")
 
 print("\n✓ Data loaded")
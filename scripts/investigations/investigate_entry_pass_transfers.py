@@ -5,6 +5,7 @@ are transferred or used by different people?
 """
 
 import pandas as pd
+from data_pipeline.checkin_store import load_checkins
 import boto3
 import os
 from io import StringIO
@@ -34,7 +35,7 @@ print("Can we see who entry passes are transferred to?")
 print("="*80)
 
 # Load check-ins
-df_checkins = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/checkins.csv")
+df_checkins = load_checkins()
 
 print(f"\nTotal check-ins: {len(df_checkins)}")
 
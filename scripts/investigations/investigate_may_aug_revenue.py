@@ -4,6 +4,7 @@ What was different then vs now?
 """
 
 import pandas as pd
+from data_pipeline.transaction_store import load_transactions
 import boto3
 import os
 from io import StringIO
@@ -30,7 +31,7 @@ print("WHAT WAS DIFFERENT IN MAY-AUGUST VS NOW?")
 print("="*80)
 
 # Load data
-df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+df_transactions = load_transactions()
 df_memberships = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/memberships.csv")
 
 df_transactions['Date'] = pd.to_datetime(df_transactions['Date'])
@@ -4,6 +4,7 @@ Using Capitan data to see if different people check in on the same membership
 """
 
 import pandas as pd
+from data_pipeline.checkin_store import load_checkins
 import boto3
 import os
 from io import StringIO
@@ -35,7 +36,7 @@ print("="*80)
 # Load relevant data
 df_memberships = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/memberships.csv")
 df_members = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/members.csv")
-df_checkins = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/checkins.csv")
+df_checkins = load_checkins()
 df_customers = load_csv_from_s3(AWS_BUCKET_NAME, "capitan/customers.csv")
 
 print("\n" + "="*80)
@@ -4,6 +4,7 @@ Does it include activation fees?
 """
 
 import pandas as pd
+from data_pipeline.transaction_store import load_transactions
 import boto3
 import os
 from io import StringIO
@@ -28,7 +29,7 @@ print("ANALYZING NEW MEMBERSHIP REVENUE")
 print("Does it include activation fees?")
 print("="*80)
 
-df_transactions = load_csv_from_s3(AWS_BUCKET_NAME, "transactions/combined_transaction_data.csv")
+df_transactions = load_transactions()
 
 df_transactions['Date'] = pd.to_datetime(df_transactions['Date'])
 df_2025 = df_transactions[df_transactions['Date'].dt.year == 2025].copy()
@@ -3,6 +3,7 @@ Test building customer_interactions.csv
 """
 
 import pandas as pd
+from data_pipeline.checkin_store import load_checkins
 import boto3
 import os
 from io import StringIO
@@ -31,8 +32,7 @@ transfers_df = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')))
 print(f"   ✓ Loaded {len(transfers_df)} pass transfers")
 
 # Load check-ins
-response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="capitan/checkins.csv")
-checkins_df = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')))
+checkins_df = load_checkins()
 print(f"   ✓ Loaded {len(checkins_df)} check-ins")
 
 # Load customers
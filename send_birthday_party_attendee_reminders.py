@@ -24,6 +24,7 @@ from twilio.rest import Client
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from data_pipeline import config, upload_data
+from data_pipeline.twilio_bulk_sender import BulkSMSSender
 
 
 WAIVER_URL = "https://climber.hellocapitan.com/basin/documents/fill/init/273/"
@@ -262,35 +263,34 @@ def send_sms_reminders(df_attendees, dry_run=True):
         return
 
     client = Client(twilio_account_sid, twilio_auth_token)
-
-    sent_count = 0
-    failed_count = 0
-
-    for _, row in df_attendees.iterrows():
-        message_text = create_attendee_message(
-            row['name'],
-            row['child_name'],
-            row['party_date'],
-            row.get('days_until')
-        )
-
-        try:
-            message = client.messages.create(
-                body=message_text,
-                from_=twilio_from_number,
-                to=row['phone']
-            )
-
-            if message.sid:
-                sent_count += 1
-                print(f"✅ Sent to {row['name']} ({row['phone']})")
-            else:
-                failed_count += 1
-                print(f"❌ Failed to {row['name']} ({row['phone']})")
-
-        except Exception as e:
-            failed_count += 1
-            print(f"❌ Failed to {row['name']} ({row['phone']}): {str(e)[:50]}")
+    sender = BulkSMSSender(client, from_number=twilio_from_number, uploader=upload_data.DataUploader())
+
+    # One text per attendee per party, so a guest at two parties gets both
+    message_ids = df_attendees['party_id'].astype(str) + ':' + df_attendees['phone'].astype(str)
+    recipients = pd.DataFrame({
+        'phone_number': df_attendees['phone'],
+        'message_id': message_ids,
+        'message': [
+            create_attendee_message(row['name'], row['child_name'], row['party_date'], row.get('days_until'))
+            for _, row in df_attendees.iterrows()
+        ],
+    })
+    # One ledger per day: re-running (or a --party run after the flagged run) won't double-text
+    campaign_id = f"birthday_attendee_reminders_{datetime.now().strftime('%Y%m%d')}"
+    results = sender.send(recipients, campaign_id)
+
+    names = dict(zip(message_ids, df_attendees['name']))
+    for result in results['details']:
+        name = names.get(result['message_id'], '')
+        if result.get('status') == 'already_sent':
+            print(f"↩️  Already sent to {name} ({result['to']})")
+        elif result['success']:
+            print(f"✅ Sent to {name} ({result['to']})")
+        else:
+            print(f"❌ Failed to {name} ({result['to']}): {result.get('error', '')[:50]}")
+
+    sent_count = results['sent']
+    failed_count = results['failed']
 
     # Summary
     print(f"\n" + "=" * 70)
@@ -298,6 +298,8 @@ def send_sms_reminders(df_attendees, dry_run=True):
     print(f"=" * 70)
     print(f"   ✅ Sent successfully: {sent_count}")
     print(f"   ❌ Failed: {failed_count}")
+    if results['skipped']:
+        print(f"   ↩️  Already sent earlier: {results['skipped']}")
 
 
 def main():
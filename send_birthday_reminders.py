@@ -144,10 +144,8 @@ def send_email(to_email, guest_name, child_name, party_date, days_until):
     return response.status_code in [200, 201, 202]
 
 
-def send_text(to_phone, guest_name, child_name, party_date, days_until):
-    """Send reminder text via Twilio."""
-    from twilio.rest import Client
-
+def create_text_message(guest_name, child_name, party_date, days_until):
+    """Build the reminder text for one guest."""
     first_name = guest_name.split()[0] if guest_name else "there"
 
     # Customize timing language
@@ -158,19 +156,35 @@ def send_text(to_phone, guest_name, child_name, party_date, days_until):
     else:
         timing = f"in {days_until} days ({party_date})"
 
-    message_text = f"""Hi {first_name}! Reminder: {child_name}'s birthday party at Basin Climbing is {timing}! 🎉
+    return f"""Hi {first_name}! Reminder: {child_name}'s birthday party at Basin Climbing is {timing}! 🎉
 
 Please fill out your waiver before the party: {WAIVER_URL}
 
 See you there!"""
 
+
+def send_texts(texts_to_send, uploader, campaign_id):
+    """
+    Send reminder texts through the bulk sender.
+
+    Args:
+        texts_to_send: List of reminder dicts with rsvp_id, phone and message fields
+        uploader: DataUploader for the campaign ledger
+        campaign_id: Ledger key, so a re-run the same day doesn't double-text
+
+    Returns:
+        Dict of rsvp_id -> bulk sender result (one text per RSVP, so a guest
+        going to two parties gets both reminders)
+    """
+    from twilio.rest import Client
+    from data_pipeline.twilio_bulk_sender import BulkSMSSender
+
     client = Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
-    message = client.messages.create(
-        body=message_text,
-        from_=os.getenv('TWILIO_PHONE_NUMBER'),
-        to=to_phone
-    )
-    return bool(message.sid)
+    sender = BulkSMSSender(client, from_number=os.getenv('TWILIO_PHONE_NUMBER'), uploader=uploader)
+    recipients = pd.DataFrame(texts_to_send, columns=['rsvp_id', 'phone', 'message']).rename(
+        columns={'rsvp_id': 'message_id', 'phone': 'phone_number'})
+    results = sender.send(recipients, campaign_id)
+    return {r['message_id']: r for r in results['details']}
 
 
 def run_birthday_reminders(dry_run=True):
@@ -254,6 +268,7 @@ def run_birthday_reminders(dry_run=True):
                     'child_name': child_name,
                     'party_date': party_date,
                     'days_until': days_until,
+                    'message': create_text_message(guest_name, child_name, party_date, days_until),
                 })
 
     # Summary
@@ -320,37 +335,36 @@ def run_birthday_reminders(dry_run=True):
 
     # Send texts
     print(f"\n📱 Sending texts...")
+    try:
+        text_results = send_texts(texts_to_send, uploader, f"birthday_text_reminders_{today.isoformat()}") if texts_to_send else {}
+    except Exception as e:
+        print(f"   ❌ Error sending texts: {e}")
+        text_results = {}
+
     for r in texts_to_send:
-        try:
-            success = send_text(r['phone'], r['guest_name'], r['child_name'], r['party_date'], r['days_until'])
-            status = 'sent' if success else 'failed'
-            print(f"   {'✅' if success else '❌'} {r['guest_name']} ({r['phone']}) - {r['days_until']} days out")
-            new_sent.append({
-                'rsvp_id': r['rsvp_id'],
-                'party_id': r.get('party_id', ''),
-                'reminder_type': 'text_reminder',
-                'channel': 'sms',
-                'recipient': r['phone'],
-                'guest_name': r['guest_name'],
-                'child_name': r['child_name'],
-                'party_date': r['party_date'],
-                'sent_at': datetime.now().isoformat(),
-                'status': status,
-            })
-        except Exception as e:
-            print(f"   ❌ {r['guest_name']}: {e}")
-            new_sent.append({
-                'rsvp_id': r['rsvp_id'],
-                'party_id': r.get('party_id', ''),
-                'reminder_type': 'text_reminder',
-                'channel': 'sms',
-                'recipient': r['phone'],
-                'guest_name': r['guest_name'],
-                'child_name': r['child_name'],
-                'party_date': r['party_date'],
-                'sent_at': datetime.now().isoformat(),
-                'status': 'failed',
-            })
+        # No result means the send didn't get to this RSVP; leave it for the next run
+        result = text_results.get(str(r['rsvp_id']))
+        success = bool(result and result['success'])
+        if result is None:
+            print(f"   ❌ {r['guest_name']} ({r['phone']}): not sent")
+        elif result.get('status') == 'already_sent':
+            print(f"   ↩️  {r['guest_name']} ({r['phone']}) - already texted today")
+        elif success:
+            print(f"   ✅ {r['guest_name']} ({r['phone']}) - {r['days_until']} days out")
+        else:
+            print(f"   ❌ {r['guest_name']} ({r['phone']}): {result.get('error', 'Unknown error')}")
+        new_sent.append({
+            'rsvp_id': r['rsvp_id'],
+            'party_id': r.get('party_id', ''),
+            'reminder_type': 'text_reminder',
+            'channel': 'sms',
+            'recipient': r['phone'],
+            'guest_name': r['guest_name'],
+            'child_name': r['child_name'],
+            'party_date': r['party_date'],
+            'sent_at': datetime.now().isoformat(),
+            'status': 'sent' if success else 'failed',
+        })
 
     # Save sent records
     if new_sent:
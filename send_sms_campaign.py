@@ -4,7 +4,7 @@ Send SMS Campaign
 Simple script to send SMS marketing messages to consented customers.
 
 Usage:
-    python send_sms_campaign.py --message "Your message here" [--dry-run]
+    python send_sms_campaign.py --message "Your message here" [--dry-run] [--campaign-id ID] [--rate N]
 
 Examples:
     # Dry run (don't actually send)
@@ -12,6 +12,9 @@ Examples:
 
     # Actually send
     python send_sms_campaign.py --message "50% off day passes this Friday!"
+
+    # Resume an interrupted send (numbers already texted are skipped)
+    python send_sms_campaign.py --message "50% off day passes this Friday!" --campaign-id 20251017_friday_promo
 """
 
 import argparse
@@ -23,6 +26,8 @@ def main():
     parser = argparse.ArgumentParser(description='Send SMS campaign to all consented customers')
     parser.add_argument('--message', required=True, help='Message to send')
     parser.add_argument('--dry-run', action='store_true', help='Test without actually sending')
+    parser.add_argument('--campaign-id', help='Ledger ID for resuming a send (default: today + message hash)')
+    parser.add_argument('--rate', type=float, help='Messages per second (default: TWILIO_MESSAGES_PER_SECOND)')
 
     args = parser.parse_args()
 
@@ -39,8 +44,15 @@ def main():
         print("   Make sure .env file exists or export the variable")
         return
 
+    # Ledgers are mirrored to S3 when AWS credentials are available
+    uploader = None
+    if os.getenv('AWS_ACCESS_KEY_ID'):
+        from data_pipeline.upload_data import DataUploader
+        uploader = DataUploader()
+
     # Initialize sender
-    sender = TwilioSMSSender()
+    sender = TwilioSMSSender(messages_per_second=args.rate, uploader=uploader)
+    campaign_id = args.campaign_id or sender.default_campaign_id(args.message)
 
     # Show message preview
     print("\n" + "="*80)
@@ -48,7 +60,8 @@ def main():
     print("="*80)
     print(f"\nMessage:")
     print(f"  {args.message}")
-    print(f"\nDry run: {args.dry_run}")
+    print(f"\nCampaign: {campaign_id}")
+    print(f"Dry run: {args.dry_run}")
 
     # Confirm if not dry run
     if not args.dry_run:
@@ -60,7 +73,8 @@ def main():
     # Send to all consented customers
     results = sender.send_to_all_consented(
         message=args.message,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        campaign_id=campaign_id
     )
 
     # Show results
@@ -71,6 +85,7 @@ def main():
     print(f"✅ Sent: {results['sent']}")
     print(f"❌ Failed: {results['failed']}")
     print(f"⚠️  No consent: {results['no_consent']}")
+    print(f"↩️  Already sent (resumed): {results['skipped']}")
 
     if args.dry_run:
         print("\n(DRY RUN - No actual messages sent)")
@@ -49,12 +49,8 @@ def load_members() -> pd.DataFrame:
 @st.cache_data(ttl=300)
 def load_checkins() -> pd.DataFrame:
     """Load Capitan check-in data from S3."""
-    uploader = DataUploader()
-    csv_content = uploader.download_from_s3(
-        config.aws_bucket_name,
-        config.s3_path_capitan_checkins
-    )
-    df = pd.read_csv(io.StringIO(csv_content.decode("utf-8")))
+    from data_pipeline.checkin_store import load_checkins as load_checkin_store
+    df = load_checkin_store()
 
     # Parse dates (handle timezone-aware datetimes)
     if 'checkin_datetime' in df.columns:
@@ -146,12 +142,8 @@ def load_transactions() -> pd.DataFrame:
 
     **NOTE**: This includes revenue data. Use only in owner dashboard.
     """
-    uploader = DataUploader()
-    csv_content = uploader.download_from_s3(
-        config.aws_bucket_name,
-        config.s3_path_combined
-    )
-    df = pd.read_csv(io.StringIO(csv_content.decode("utf-8")))
+    from data_pipeline.transaction_store import load_transactions as load_transaction_store
+    df = load_transaction_store()
 
     # Parse dates (handle timezone-aware datetimes)
     if 'date' in df.columns:
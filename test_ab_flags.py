@@ -7,7 +7,7 @@ sys.path.append('.')
 
 from datetime import datetime, timedelta
 from data_pipeline.customer_flags_config import (
-    get_customer_ab_group,
+    get_customer_ab_groups,
     FirstTimeDayPass2WeekOfferFlag,
     SecondVisitOfferEligibleFlag,
     SecondVisit2WeekOfferFlag
@@ -150,8 +150,8 @@ def test_ab_group_assignment():
     ]
 
     all_passed = True
-    for customer_id, expected_group in test_cases:
-        actual_group = get_customer_ab_group(customer_id)
+    actual_groups = get_customer_ab_groups([customer_id for customer_id, _ in test_cases])
+    for (customer_id, expected_group), actual_group in zip(test_cases, actual_groups):
         passed = actual_group == expected_group
         all_passed = all_passed and passed
 
@@ -42,6 +42,7 @@ def test_mailchimp_sync(dry_run=True, max_customers=2):
     customers_df = syncer.load_customers_from_s3()
 
     # Merge to get emails
+    flags_to_sync = flags_to_sync.assign(customer_id=flags_to_sync['customer_id'].astype(str))
     flags_with_customers = flags_to_sync.merge(
         customers_df[['customer_id', 'email', 'first_name', 'last_name']],
         on='customer_id',
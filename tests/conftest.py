@@ -0,0 +1,101 @@
+"""
+Shared S3 fakes for the pipeline tests.
+
+FakeS3 stands in for a boto3 S3 client and FakeUploader for DataUploader
+(backed by a FakeS3 as its `s3`). Import the classes where a test builds
+its own, or use the `fake_s3` / `uploader` fixtures.
+"""
+import io
+
+import boto3
+import pandas as pd
+import pytest
+
+
+class FakeBody(io.BytesIO):
+    """StreamingBody stand-in."""
+
+    def __init__(self, data):
+        super().__init__(data if isinstance(data, bytes) else data.encode('utf-8'))
+
+    def iter_lines(self):
+        return iter(self.getvalue().splitlines())
+
+
+class FakeS3:
+    """In-memory boto3 S3 client: objects by key, plus every put and read."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.puts = []  # keys, in write order
+        self.put_bodies = []
+        self.reads = []
+        self.unreadable = set()  # keys whose get_object fails
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = Body
+        self.puts.append(Key)
+        self.put_bodies.append(Body)
+
+    def get_object(self, Bucket, Key):
+        self.reads.append(Key)
+        if Key in self.unreadable:
+            raise IOError("connection reset")
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': FakeBody(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        if Delimiter:
+            prefixes = sorted({Prefix + k[len(Prefix):].split(Delimiter)[0] + Delimiter for k in keys})
+            return [{'CommonPrefixes': [{'Prefix': p} for p in prefixes]}]
+        return [{'Contents': [{'Key': k} for k in keys]}]
+
+
+class FakeUploader:
+    """DataUploader over a FakeS3; `reads` lists every key downloaded."""
+
+    def __init__(self, s3=None):
+        self.s3 = s3 or FakeS3()
+        self.reads = []
+
+    def upload_to_s3(self, df, bucket_name, file_name):
+        self.s3.put_object(Bucket=bucket_name, Key=file_name, Body=df.to_csv(index=False))
+
+    def download_from_s3(self, bucket_name, key):
+        if key not in self.s3.objects:
+            raise FakeS3.exceptions.NoSuchKey(key)
+        self.reads.append(key)
+        return self.s3.objects[key]
+
+    def convert_csv_to_df(self, content):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return pd.read_csv(io.StringIO(content))
+
+    def list_keys(self, bucket, prefix=""):
+        return sorted(k for k in self.s3.objects if k.startswith(prefix))
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    """A FakeS3 handed out by every boto3.client() call."""
+    s3 = FakeS3()
+    monkeypatch.setattr(boto3, 'client', lambda *args, **kwargs: s3)
+    return s3
+
+
+@pytest.fixture
+def uploader():
+    return FakeUploader()
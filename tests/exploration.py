@@ -1,7 +1,7 @@
 import datetime
 import os
 import pandas as pd
-from data_pipeline import upload_data, config
+from data_pipeline import upload_data, config, transaction_store
 from data_pipeline.fetch_square_data import SquareFetcher
 import json
 
@@ -85,16 +85,13 @@ import json
 # exploded_df = explode_memberships_by_bill_date(df_memberships)
 # exploded_df.to_csv('data/outputs/capitan_memberships_exploded.csv', index=False)
 def see_transactions_by_date():
-    from data_pipeline import upload_data, config
+    from data_pipeline import upload_data
 
     # Instantiate the uploader
     uploader = upload_data.DataUploader()
 
     # Download the DataFrame from S3
-    df_combined_csv = uploader.download_from_s3(
-        config.aws_bucket_name, config.s3_path_combined
-    )
-    df_combined = uploader.convert_csv_to_df(df_combined_csv)
+    df_combined = transaction_store.TransactionStore(uploader).read_all()
     print(df_combined.columns)
     # convert Date to datetime
     df_combined["Date"] = pd.to_datetime(df_combined["Date"], errors="coerce")
@@ -115,23 +112,18 @@ def download_fix_upload_combined_data(column_name: str, old_value: str, new_valu
     uploader = upload_data.DataUploader()
 
     # Download the DataFrame from S3
-    df_combined_csv = uploader.download_from_s3(
-        config.aws_bucket_name, config.s3_path_combined
-    )
-    df_combined = uploader.convert_csv_to_df(df_combined_csv)
+    store = transaction_store.TransactionStore(uploader)
+    df_combined = store.read_all()
     df_combined[column_name] = df_combined[column_name].replace(old_value, new_value)
-    uploader.upload_to_s3(df_combined, config.aws_bucket_name, config.s3_path_combined)
+    store.write(df_combined, replace_all=True)
     print(
-        f"Uploaded {config.s3_path_combined} and changed {column_name} from {old_value} to {new_value}"
+        f"Rewrote {config.s3_path_transaction_partitions} and changed {column_name} from {old_value} to {new_value}"
     )
 
 
 def download_and_convert_for_visual_inspection():
     uploader = upload_data.DataUploader()
-    df_combined_csv = uploader.download_from_s3(
-        config.aws_bucket_name, config.s3_path_combined
-    )
-    df_combined = uploader.convert_csv_to_df(df_combined_csv)
+    df_combined = transaction_store.TransactionStore(uploader).read_all()
     df_combined["Date"] = pd.to_datetime(df_combined["Date"], errors="coerce")
     df_combined.to_csv(
         "data/outputs/transactions_for_visual_inspection.csv", index=False
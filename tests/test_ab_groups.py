@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the batch AB group API: for randomly generated customers - messy
+emails and phones, missing values, numeric IDs and overrides - the whole-frame
+hashes and groups match calling the single-customer functions row by row.
+"""
+import random
+import string
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_pipeline.customer_flags_config import (
+    AB_GROUP_OVERRIDES,
+    get_customer_ab_group,
+    get_customer_ab_groups,
+    get_household_hash,
+    get_household_hashes,
+)
+
+MISSING = [None, float('nan'), np.nan, '', '   ', 'nan', 'NaN', 'None', 'none', 0]
+
+
+def random_text(rng, alphabet, max_length=12):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+
+def random_customer_id(rng):
+    return rng.choice([
+        lambda: str(rng.randint(0, 10 ** 7)),
+        lambda: rng.randint(0, 10 ** 7),
+        lambda: f"{rng.getrandbits(64):016x}-uuid",
+        lambda: rng.choice(list(AB_GROUP_OVERRIDES)),
+        lambda: int(rng.choice(list(AB_GROUP_OVERRIDES))),
+    ])()
+
+
+def random_email(rng):
+    return rng.choice([
+        lambda: rng.choice(MISSING),
+        lambda: f"{random_text(rng, string.ascii_letters + '._+')}@Example.COM",
+        lambda: f"  {random_text(rng, string.ascii_letters)}@x.org \t",
+        lambda: random_text(rng, string.printable),
+        lambda: random_text(rng, 'ÄéßİΣ😀 '),
+    ])()
+
+
+def random_phone(rng):
+    return rng.choice([
+        lambda: rng.choice(MISSING),
+        lambda: f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+        lambda: float(rng.randint(10 ** 9, 10 ** 10)),
+        lambda: rng.randint(10 ** 9, 10 ** 10),
+        lambda: random_text(rng, string.punctuation + ' '),  # no digits at all
+        lambda: random_text(rng, '0123456789٣²+- '),  # non-ASCII digits
+    ])()
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_batch_groups_match_single_customer_groups(seed):
+    rng = random.Random(seed)
+    n = 400
+    customers = pd.DataFrame({
+        'customer_id': [random_customer_id(rng) for _ in range(n)],
+        'email': [random_email(rng) for _ in range(n)],
+        'phone': [random_phone(rng) for _ in range(n)],
+    }, index=[rng.randint(0, 50) for _ in range(n)])  # non-unique index
+
+    hashes = get_household_hashes(customers['customer_id'], customers['email'], customers['phone'])
+    groups = get_customer_ab_groups(customers['customer_id'], customers['email'], customers['phone'])
+
+    rows = list(zip(customers['customer_id'], customers['email'], customers['phone']))
+    assert hashes.tolist() == [get_household_hash(*row) for row in rows]
+    assert groups.tolist() == [get_customer_ab_group(*row) for row in rows]
+    assert groups.index.equals(customers.index)
+    # The cached column gives the same groups without rehashing
+    assert get_customer_ab_groups(customers['customer_id'], household_hashes=hashes).tolist() == groups.tolist()
+
+
+def test_missing_contacts_and_empty_frames():
+    ids = pd.Series(['2466865', '1378427'])
+
+    assert get_customer_ab_groups(ids).tolist() == [get_customer_ab_group('2466865'), 'B']
+    assert get_household_hashes(['7'], emails=[None], phones=['(no phone)']).tolist() == [get_household_hash('7')]
+    assert get_customer_ab_groups(pd.Series([], dtype=object)).empty
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the contact preferences build: the three sources are read into opt-in
+records and events, and the pivot keeps the most recent status per
+identifier and channel.
+"""
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from data_pipeline import build_contact_preferences as bcp
+from data_pipeline.customer_matching import normalize_phone, normalize_phones
+
+
+def csv(rows):
+    return pd.DataFrame(rows).to_csv(index=False)
+
+
+@pytest.fixture
+def s3(fake_s3):
+    fake_s3.objects.update({
+        'capitan/customers.csv': csv([
+            {'customer_id': 1, 'email': 'Ada@Example.com ', 'phone': 5125550001,
+             'has_opted_in_to_marketing': True, 'created_at': '2024-01-01T10:00:00'},
+            {'customer_id': 2, 'email': 'ben@example.com', 'phone': None,
+             'has_opted_in_to_marketing': True, 'created_at': '2024-02-01T10:00:00'},
+            {'customer_id': 3, 'email': 'cy@example.com', 'phone': '(512) 555-0003',
+             'has_opted_in_to_marketing': False, 'created_at': '2024-03-01T10:00:00'},
+        ]),
+        'mailchimp/subscribers.csv': csv([
+            {'email_address': 'ada@example.com', 'status': 'unsubscribed', 'timestamp_opt_in': '2024-06-01T10:00:00'},
+            {'email_address': 'ben@example.com', 'status': 'subscribed', 'timestamp_opt_in': '2023-06-01T10:00:00'},
+            {'email_address': 'dee@example.com', 'status': 'transactional', 'timestamp_opt_in': '2024-06-01T10:00:00'},
+            {'email_address': None, 'status': 'subscribed', 'timestamp_opt_in': '2024-06-01T10:00:00'},
+        ]),
+        'twilio/sms_consents.csv': csv([
+            {'phone_number': '+15125550001', 'status': 'active', 'timestamp': '2024-03-01T10:00:00',
+             'opt_in_method': 'waiver', 'customer_id': 1},
+            {'phone_number': '512-555-0009', 'status': 'revoked', 'timestamp': '2024-03-01T10:00:00',
+             'opt_in_method': 'sms_keyword', 'customer_id': None},
+        ]),
+        'twilio/messages.csv': csv([
+            {'direction': 'inbound', 'from_number': '+15125550001', 'date_sent': '2024-07-01T10:00:00',
+             'is_opt_in': False, 'is_opt_out': True},
+            {'direction': 'inbound', 'from_number': '+15125550009', 'date_sent': '2024-08-01T10:00:00',
+             'is_opt_in': True, 'is_opt_out': False},
+            {'direction': 'outbound-api', 'from_number': '+15125550000', 'date_sent': '2024-08-01T10:00:00',
+             'is_opt_in': True, 'is_opt_out': False},
+        ]),
+    })
+    return fake_s3
+
+
+def test_vectorized_phone_normalization_matches_scalar():
+    phones = pd.Series(['555-123-4567', '(555) 123-4567', '+1-555-123-4567', 5125551234.0, 15125551234,
+                        '+44 20 7946 0958', '1234', '', 'n/a', None, float('nan')], dtype=object)
+
+    assert normalize_phones(phones).tolist() == [normalize_phone(phone) for phone in phones]
+
+
+def test_preferences_take_latest_status_per_channel(s3):
+    preferences, events = bcp.ContactPreferencesBuilder().run(save_to_s3=True)
+
+    prefs = preferences.set_index('identifier')
+    assert sorted(prefs.index) == ['+15125550001', '+15125550009', 'ada@example.com', 'ben@example.com']
+    # Mailchimp unsubscribe is newer than the Capitan opt-in
+    assert prefs.loc['ada@example.com', ['email_opt_in', 'email_source']].tolist() == [False, 'mailchimp']
+    # Capitan opt-in is newer than the Mailchimp subscription
+    assert prefs.loc['ben@example.com', ['email_opt_in', 'email_source', 'customer_id']].tolist() == [
+        True, 'capitan', '2']
+    # STOP keyword after consent; keyword opt-in after a revoked consent
+    assert prefs.loc['+15125550001', ['sms_opt_in', 'sms_source']].tolist() == [False, 'twilio_keyword']
+    assert prefs.loc['+15125550009', ['sms_opt_in', 'sms_opt_in_date']].tolist() == [
+        True, pd.Timestamp('2024-08-01T10:00:00')]
+    assert pd.isna(prefs.loc['ada@example.com', 'sms_opt_in'])
+    assert list(preferences.columns[:3]) == ['identifier', 'identifier_type', 'customer_id']
+
+    assert events['event_source'].tolist() == ['capitan'] * 3 + ['mailchimp'] * 2 + ['twilio'] * 2
+    assert json.loads(events['event_details'].iloc[1]) == {
+        'channel': 'sms', 'method': 'capitan_marketing_opt_in', 'phone': '+15125550001'}
+    assert events.loc[events['event_source'] == 'twilio', 'event_type'].tolist() == ['sms_opt_in', 'sms_opt_out']
+
+    saved = pd.read_csv(io.StringIO(s3.objects['customers/opt_in_records.csv']))
+    assert len(saved) == 3 + 2 + 2 + 2
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the family graph builder: relations API links, adult/minor pairing on
+shared memberships, youth memberships matched to a parent by email, and
+de-duplication by confidence.
+"""
+import pandas as pd
+
+from data_pipeline.build_family_relationships import build_family_relationships, calculate_age
+
+TODAY = pd.Timestamp('2025-06-01')
+
+
+def birthday(age):
+    return f"{TODAY.year - age}-01-15"
+
+
+def test_calculate_age_is_vectorized():
+    ages = calculate_age(pd.Series(['2015-06-02', '2015-05-31', None, 'not a date', '1990-01-15T00:00:00-06:00']),
+                         today=TODAY)
+
+    assert ages.iloc[:2].tolist() == [9, 10]
+    assert ages.iloc[2:4].isna().all()
+    assert ages.iloc[4] == 35
+
+
+def test_family_links_from_all_sources():
+    customers = pd.DataFrame({
+        'customer_id': [1, 2, 3, 4, 5, 6, 7, 8],
+        'birthday': [birthday(45), birthday(12), birthday(9), birthday(40), birthday(15),
+                     birthday(42), None, birthday(38)],
+        'email': ['pat@example.com', None, None, 'sam@example.com', 'sam@example.com',
+                  'lee@example.com', None, 'pat@example.com'],
+    })
+    relations = pd.DataFrame({
+        'customer_id': [1, 3, 2],
+        'related_customer_id': [2, 6, 4],
+        'relationship': ['CHI', 'PRE', 'SIB'],
+    })
+    memberships = [
+        # Two adults and two kids: the first adult in customer order is the parent
+        {'id': 100, 'name': 'Family', 'all_customers': [{'id': 8}, {'id': 3}, {'id': 1}, {'id': 2}]},
+        {'id': 101, 'name': 'Duo', 'all_customers': [{'id': 4}, {'id': 6}]},  # no minors
+        {'id': 102, 'name': 'Solo', 'all_customers': [{'id': 5}]},
+        {'id': 103, 'name': 'Family', 'all_customers': [{'id': 7}, {'id': 6}, {'id': 99}]},  # unknown age
+        # Kid owns the membership, billed to a parent's email
+        {'id': 200, 'name': 'Youth Team Dues', 'owner_id': 5, 'owner_email': 'sam@example.com', 'all_customers': []},
+        {'id': 201, 'name': 'Adult Monthly', 'owner_id': 3, 'owner_email': 'lee@example.com', 'all_customers': []},
+    ]
+
+    family = build_family_relationships(relations, memberships, customers)
+
+    links = {(row.parent_customer_id, row.child_customer_id): (row.confidence, row.source)
+             for row in family.itertuples()}
+    assert links == {
+        (1, 2): ('high', 'relations_api_CHI'),  # also on membership 100, high confidence wins
+        (6, 3): ('high', 'relations_api_PRE'),
+        (1, 3): ('medium', 'shared_membership_100'),
+        (4, 5): ('medium', 'youth_membership_email_200'),
+    }
+    assert list(family.columns) == ['parent_customer_id', 'child_customer_id', 'relationship_type',
+                                    'confidence', 'source']
+    assert (family['relationship_type'] == 'parent_child').all()
+
+
+def test_no_links():
+    customers = pd.DataFrame({'customer_id': [1], 'birthday': [birthday(30)], 'email': ['a@example.com']})
+
+    family = build_family_relationships(pd.DataFrame(), [], customers)
+
+    assert family.empty
+    assert 'source' in family.columns
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test the Capitan client against a local fake Capitan server that injects 502s
+and slow pages: pages come back complete and in order, are fetched
+concurrently, transient failures are retried, and per-customer relation
+lookups go through the same rate-limited, retrying client.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from data_pipeline.capitan_client import CapitanAPIError, CapitanClient
+from data_pipeline.fetch_capitan_checkin_data import CapitanCheckinFetcher
+from data_pipeline.fetch_capitan_membership_data import CapitanDataFetcher
+
+
+class FakeCapitan:
+    """Paged DRF-style listings with scripted failures and delays."""
+
+    def __init__(self, records, failures=None, delays=None):
+        self.records = records          # path -> list of records
+        self.failures = failures or {}  # (path, page) -> number of 502s before succeeding
+        self.delays = delays or {}      # (path, page) -> seconds
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def handle(self, handler):
+        url = urlparse(handler.path)
+        path = url.path.strip("/").split("/", 1)[1]  # drop the "api" prefix
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        page, page_size = int(query.get("page", 1)), int(query.get("page_size", 100))
+
+        with self.lock:
+            self.requests.append((path, page, handler.headers.get("Authorization")))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            remaining_failures = self.failures.get((path, page), 0)
+            if remaining_failures:
+                self.failures[(path, page)] = remaining_failures - 1
+        try:
+            time.sleep(self.delays.get((path, page), 0.02))
+            if remaining_failures:
+                return 502, {"detail": "Bad Gateway"}
+            if path not in self.records:
+                return 404, {"detail": "Not found."}
+            records = self.records[path]
+            chunk = records[(page - 1) * page_size: page * page_size]
+            more = page * page_size < len(records)
+            return 200, {
+                "count": len(records),
+                "next": f"http://capitan.test/api/{path}/?page={page + 1}" if more else None,
+                "results": chunk,
+            }
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def server():
+    fake = FakeCapitan({
+        "check-ins": [{"id": i, "check_in_datetime": f"2025-06-01T10:{i % 60:02d}:00-05:00"}
+                      for i in range(2350)],
+        "customers": [{"id": i, "email": f"c{i}@example.com"} for i in range(250)],
+    })
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = fake.handle(self)
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    fake.base_url = f"http://127.0.0.1:{httpd.server_address[1]}/api/"
+    yield fake
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_client(server, **kwargs):
+    options = dict(max_workers=4, requests_per_second=0, backoff_seconds=0.01)
+    options.update(kwargs)
+    return CapitanClient("test-token", base_url=server.base_url, **options)
+
+
+def test_pages_fetched_concurrently_and_in_order(server):
+    server.failures = {("check-ins", 3): 2, ("check-ins", 7): 1}
+    server.delays = {("check-ins", 2): 0.4, ("check-ins", 5): 0.3}
+
+    results = make_client(server).paginate("check-ins", {"ordering": "-check_in_datetime"}, page_size=100)
+
+    assert [r["id"] for r in results] == list(range(2350))
+    assert server.max_in_flight > 1
+    assert all(auth == "token test-token" for _, _, auth in server.requests)
+    # 24 pages, plus one retry per injected 502
+    assert len(server.requests) == 24 + 3
+
+
+def test_persistent_failure_returns_pages_before_it(server):
+    server.failures = {("check-ins", 4): 99}
+
+    with pytest.raises(CapitanAPIError) as excinfo:
+        make_client(server, max_retries=2).paginate("check-ins", page_size=100)
+
+    assert [r["id"] for r in excinfo.value.partial_results] == list(range(300))
+    assert sum(1 for path, page, _ in server.requests if page == 4) == 3
+
+
+def test_rate_limit_spaces_requests(server):
+    start = time.monotonic()
+    make_client(server, requests_per_second=20).paginate("customers", page_size=25)  # 10 pages
+    assert time.monotonic() - start >= 9 / 20
+
+
+def test_fetchers_use_client(server):
+    server.failures = {("customers", 2): 1}
+
+    fetcher = CapitanDataFetcher("test-token")
+    fetcher.client = make_client(server)
+    response = fetcher.get_results_from_api("customers")
+    assert [r["id"] for r in response["results"]] == list(range(250))
+    assert response["count"] == 250
+
+    checkin_fetcher = CapitanCheckinFetcher("test-token")
+    checkin_fetcher.client = make_client(server)
+    assert len(checkin_fetcher.get_all_checkins(days_back=7)) == 2350
+
+
+def test_relations_go_through_the_client(server):
+    server.records["customers/1/relations"] = [
+        {"related_customer_id": 2, "relation": "CHI", "related_customer_first_name": "Kit"},
+        {"related_customer_id": 3, "relation": "CHI", "related_customer_first_name": "Ash"},
+    ]
+    server.failures = {("customers/1/relations", 1): 1}
+    customers = pd.DataFrame({
+        "customer_id": [1, 4, 5],
+        "relations_url": [f"{server.base_url}customers/1/relations/", f"{server.base_url}customers/4/relations/", None],
+    })
+
+    fetcher = CapitanDataFetcher("test-token")
+    fetcher.client = make_client(server)
+    relations = fetcher.fetch_all_relations(customers)
+
+    assert relations["related_customer_id"].tolist() == [2, 3]
+    assert set(relations["customer_id"]) == {1}
+    # The 502 was retried, the 404 (no relations) was not, and every call carried the token
+    relation_requests = [r for r in server.requests if r[0].endswith("/relations")]
+    assert [path for path, _, _ in relation_requests] == [
+        "customers/1/relations", "customers/1/relations", "customers/4/relations"]
+    assert all(auth == "token test-token" for _, _, auth in relation_requests)
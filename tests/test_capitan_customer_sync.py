@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test the incremental Capitan customer sync: daily runs only pull customers
+updated since the cursor and publish exactly what changed, the weekly full
+sync catches deletions, and identity resolution seeded from the previous run
+gives the same clusters as matching everyone again.
+"""
+import datetime
+import hashlib
+import io
+
+import pandas as pd
+import pytest
+
+from data_pipeline import config
+from data_pipeline.capitan_customer_sync import CURSOR_CLOCK_SKEW, CapitanCustomerSync
+from data_pipeline.customer_matching import CustomerMatcher
+from data_pipeline.fetch_capitan_membership_data import CapitanDataFetcher
+
+DAY = datetime.date(2025, 6, 2)
+
+
+class FakeCapitanClient:
+    """customers listing that honors (or ignores) updated_at__gte."""
+
+    def __init__(self, customers, honor_filter=True):
+        self.customers = customers  # customer_id -> record
+        self.honor_filter = honor_filter
+        self.calls = []
+
+    def paginate(self, path, params=None, page_size=100):
+        params = params or {}
+        self.calls.append(params)
+        records = sorted(self.customers.values(), key=lambda c: c["updated_at"] or "")
+        cursor = params.get("updated_at__gte")
+        if cursor and self.honor_filter:
+            records = [c for c in records if pd.Timestamp(c["updated_at"]) >= pd.Timestamp(cursor)]
+        return [dict(c) for c in records]
+
+
+def customer(customer_id, updated_at, email=None, phone=None, first_name="Alex"):
+    return {
+        "id": customer_id,
+        # Distinct enough that fuzzy email matching leaves them apart
+        "email": email if email is not None else f"{hashlib.sha1(str(customer_id).encode()).hexdigest()[:10]}@example.com",
+        "telephone": phone if phone is not None else f"512555{customer_id:04d}",
+        "first_name": first_name,
+        "last_name": f"Climber{customer_id}",
+        "birthday": "1990-01-01",
+        "created_at": "2025-01-01T09:00:00-06:00",
+        "updated_at": updated_at,
+    }
+
+
+@pytest.fixture
+def sync(uploader):
+    customers = {i: customer(i, f"2025-05-{1 + i % 20:02d}T10:00:00Z") for i in range(1, 41)}
+    fetcher = CapitanDataFetcher("test-token")
+    fetcher.client = FakeCapitanClient(customers)
+    return CapitanCustomerSync(fetcher=fetcher, uploader=uploader, bucket="test-bucket")
+
+
+def stored(sync):
+    return pd.read_csv(io.StringIO(sync.uploader.s3.objects[config.s3_path_capitan_customers]))
+
+
+def test_incremental_sync_fetches_and_publishes_only_changes(sync):
+    first = sync.sync(today=DAY)
+    assert first["mode"] == "full"
+    assert len(first["changed_customer_ids"]) == 40
+
+    customers = sync.fetcher.client.customers
+    customers[7] = customer(7, "2025-06-02T08:00:00Z", email="new7@example.com")
+    customers[41] = customer(41, "2025-06-02T09:00:00Z")
+    result = sync.sync(today=DAY + datetime.timedelta(days=1))
+
+    assert result["mode"] == "incremental"
+    assert sync.fetcher.client.calls[-1]["updated_at__gte"] == "2025-05-20T10:00:00+00:00"
+    # Customers updated exactly at the cursor come back again but are unchanged
+    assert result["changed_customer_ids"] == [7, 41]
+    assert result["deleted_customer_ids"] == []
+
+    df = stored(sync)
+    assert sorted(df["customer_id"]) == list(range(1, 42))
+    assert df.loc[df["customer_id"] == 7, "email"].item() == "new7@example.com"
+    assert df["phone"].astype(str).str.len().eq(10).all()  # no float phone numbers
+    assert sync.load_state()["cursor"] == "2025-06-02T09:00:00+00:00"
+
+
+def test_full_sync_catches_deletions_and_pending_changes_accumulate(sync):
+    sync.sync(today=DAY)
+    sync.acknowledge("customer_master")
+    sync.acknowledge("relations")
+
+    customers = sync.fetcher.client.customers
+    customers[3] = customer(3, "2025-06-02T08:00:00Z", first_name="Sam")
+    day_two = sync.sync(today=DAY + datetime.timedelta(days=1))
+    sync.acknowledge("customer_master")  # relations failed that day
+
+    del customers[5]  # deletions don't show up in updated_at listings
+    customers[8] = customer(8, "2025-06-03T08:00:00Z", first_name="Kai")
+    day_three = sync.sync(today=DAY + datetime.timedelta(days=2))
+    assert day_three["mode"] == "incremental"
+    assert day_three["deleted_customer_ids"] == []
+    assert 5 in set(stored(sync)["customer_id"])
+    assert day_two["pending"]["relations"]["changed_customer_ids"] == [3]
+    assert day_three["pending"]["customer_master"]["changed_customer_ids"] == [8]
+    assert day_three["pending"]["relations"]["changed_customer_ids"] == [3, 8]
+
+    reconciled = sync.sync(today=DAY + datetime.timedelta(days=config.capitan_customers_full_sync_days))
+    assert reconciled["mode"] == "full"
+    assert reconciled["deleted_customer_ids"] == [5]
+    assert reconciled["changed_customer_ids"] == []
+    assert 5 not in set(stored(sync)["customer_id"])
+    assert reconciled["pending"]["relations"]["mode"] == "full"
+
+
+def test_ignored_filter_is_treated_as_full_sync(sync):
+    sync.sync(today=DAY)
+    sync.fetcher.client.honor_filter = False
+    del sync.fetcher.client.customers[9]
+
+    result = sync.sync(today=DAY + datetime.timedelta(days=1))
+
+    assert result["mode"] == "full"
+    assert result["deleted_customer_ids"] == [9]
+    # The full listing is requested again rather than trusting the filtered response
+    assert [call.get("updated_at__gte") is None for call in sync.fetcher.client.calls[-2:]] == [False, True]
+    assert all(call["ordering"] == "id" for call in sync.fetcher.client.calls)
+
+
+def test_customer_without_updated_at_refetches_full_listing(sync):
+    sync.sync(today=DAY)
+    customers = sync.fetcher.client.customers
+    customers[4] = customer(4, None, first_name="Noor")
+    # Capitan sends the undated customer even with the filter on
+    sync.fetcher.client.honor_filter = False
+    del customers[6]
+
+    result = sync.sync(today=DAY + datetime.timedelta(days=1))
+
+    assert result["mode"] == "full"
+    assert result["changed_customer_ids"] == [4]
+    assert result["deleted_customer_ids"] == [6]
+    assert "updated_at__gte" not in sync.fetcher.client.calls[-1]
+
+
+def test_customers_updated_during_the_fetch_are_read_next_time(sync):
+    sync.sync(today=DAY)
+    customers = sync.fetcher.client.customers
+    now = pd.Timestamp.now(tz="UTC")
+    customers[50] = customer(50, (now + datetime.timedelta(seconds=1)).isoformat())
+    first = sync.sync(today=DAY + datetime.timedelta(days=1))
+    assert first["changed_customer_ids"] == [50]
+    assert pd.Timestamp(sync.load_state()["cursor"]) < now - CURSOR_CLOCK_SKEW + datetime.timedelta(seconds=1)
+
+    # Saved a moment before customer 50, but only visible after that fetch had read its page
+    customers[51] = customer(51, now.isoformat())
+
+    second = sync.sync(today=DAY + datetime.timedelta(days=1))
+    assert second["mode"] == "incremental"
+    assert 51 in second["changed_customer_ids"]
+
+
+def clusters(df_identifiers):
+    """Capitan source IDs grouped by resolved customer, independent of the UUIDs."""
+    return sorted(sorted(group) for group in df_identifiers.groupby("customer_id")["source_id"].apply(set))
+
+
+def test_seeded_match_equals_full_match(sync):
+    customers = sync.fetcher.client.customers
+    # Two customers sharing a phone number resolve to one person
+    customers[12] = customer(12, "2025-05-13T10:00:00Z", phone="5125550011")
+    first = sync.sync(today=DAY)
+    df_master, df_identifiers = CustomerMatcher().match_customers(first["customers"], pd.DataFrame())
+    sync.acknowledge("customer_master")
+
+    customers[30] = customer(30, "2025-06-02T08:00:00Z", phone="5125550031", email="thirty@example.com")
+    customers[42] = customer(42, "2025-06-02T09:00:00Z", phone="5125550011")
+    result = sync.sync(today=DAY + datetime.timedelta(days=1))
+    changes = result["pending"]["customer_master"]
+
+    previous_master = pd.read_csv(io.StringIO(df_master.to_csv(index=False)),
+                                  dtype={"primary_email": str, "primary_phone": str, "primary_name": str})
+    previous_identifiers = pd.read_csv(io.StringIO(df_identifiers.to_csv(index=False)),
+                                       dtype={"normalized_value": str, "source_id": str})
+    matcher = CustomerMatcher()
+    reprocess = matcher.seed(previous_master, previous_identifiers,
+                             {f"customer:{cid}" for cid in changes["changed_customer_ids"]})
+    df = result["customers"]
+    delta = df[("customer:" + df["customer_id"].astype(str)).isin(reprocess)]
+    assert len(delta) < len(df) / 2
+    seeded_master, seeded_identifiers = matcher.match_customers(delta, pd.DataFrame())
+
+    full_master, full_identifiers = CustomerMatcher().match_customers(df, pd.DataFrame())
+    assert clusters(seeded_identifiers) == clusters(full_identifiers)
+    assert len(seeded_master) == len(full_master)
+    # Customers that didn't change keep their resolved ID
+    unchanged = df_identifiers[df_identifiers["source_id"] == "customer:20"]["customer_id"].iloc[0]
+    assert unchanged in set(seeded_master["customer_id"])
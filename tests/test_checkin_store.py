@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the month-partitioned check-in store: the daily merge only rewrites the
+months it touches and matches the old full-file merge, and "since" reads only
+download the months they need.
+"""
+import datetime
+import random
+
+import pandas as pd
+import pytest
+
+from data_pipeline import config
+from data_pipeline.checkin_store import CheckinStore
+from data_pipeline.snapshot_store import SnapshotStore
+
+
+def make_checkins(start, end, per_day=4, first_id=0, seed=38, tag="v1"):
+    rng = random.Random(seed)
+    rows = []
+    for i, day in enumerate(pd.date_range(start, end).repeat(per_day)):
+        rows.append({
+            "checkin_id": first_id + i,
+            "customer_id": rng.randint(1, 40),
+            # Evening check-ins carry the local offset and fall on the next UTC day
+            "checkin_datetime": f"{day:%Y-%m-%d} {rng.choice(['09:15', '21:30'])}:00-05:00",
+            "entry_method_description": rng.choice(["Day Pass", "Membership", "Guest"]),
+            "tag": tag,
+        })
+    return pd.DataFrame(rows)
+
+
+def legacy_merge(existing, new):
+    """upload_new_capitan_checkins's full-file merge, for comparison."""
+    return pd.concat([existing, new], ignore_index=True).drop_duplicates(subset=["checkin_id"], keep="last")
+
+
+def normalized(df):
+    return df.sort_values("checkin_id").reset_index(drop=True)
+
+
+@pytest.fixture
+def store(uploader):
+    history = make_checkins("2025-03-01", "2025-06-10")
+    uploader.s3.objects[config.s3_path_capitan_checkins] = history.to_csv(index=False)
+    return CheckinStore(uploader, bucket="test-bucket")
+
+
+def test_merge_rewrites_only_touched_months(store):
+    history = store.uploader.convert_csv_to_df(store.uploader.s3.objects[config.s3_path_capitan_checkins])
+    store.migrate_from_legacy()
+    previous = store.load_manifest()
+    store.uploader.s3.puts.clear()
+    store.uploader.reads.clear()
+
+    # Last 7 days again: an updated row for known check-ins plus new ones
+    refetch = make_checkins("2025-05-29", "2025-06-12", first_id=len(history) - 13 * 4, seed=9, tag="v2")
+    store.merge(refetch)
+
+    written = [k for k in store.uploader.s3.puts if "/month=" in k]
+    assert sorted(k.split("/")[2] for k in written) == ["month=2025-05", "month=2025-06"]
+    assert not any("month=2025-03" in k or "month=2025-04" in k for k in store.uploader.reads)
+
+    pd.testing.assert_frame_equal(normalized(store.read_all()), normalized(legacy_merge(history, refetch)))
+    # Superseded May/June files outlive the merge so readers of the previous
+    # manifest can finish, then go once the grace period is over
+    pd.testing.assert_frame_equal(normalized(store.read(manifest=previous)), normalized(history))
+    manifest = store.load_manifest()
+    live = store.referenced_keys(manifest) | {store.manifest_key, store.latest_key}
+    assert len(manifest["superseded"]) == 2
+    assert set(store.uploader.list_keys("test-bucket", store.prefix + "/")) == live | set(manifest["superseded"])
+    later = datetime.datetime.now() + datetime.timedelta(hours=config.partition_delete_grace_hours, minutes=1)
+    store.delete_unreferenced(manifest, now=later)
+    assert set(store.uploader.list_keys("test-bucket", store.prefix + "/")) == live
+
+
+def test_read_since_prunes_months_and_keeps_last_visits(store):
+    history = store.uploader.convert_csv_to_df(store.uploader.s3.objects[config.s3_path_capitan_checkins])
+    store.merge(make_checkins("2025-06-11", "2025-06-12", first_id=len(history), seed=4, tag="new"))
+    everything = store.read_all()
+    store.uploader.reads.clear()
+
+    recent = store.read_since("2025-06-05")
+    partition_reads = [k.split("/")[2] for k in store.uploader.reads if "/month=" in k]
+    assert partition_reads == ["month=2025-06"]
+    assert recent["checkin_datetime"].str[:10].min() == "2025-06-05"
+    assert len(recent) == (everything["checkin_datetime"].str[:10] >= "2025-06-05").sum()
+
+    with_latest = store.read_since("2025-06-05", with_latest_per_customer=True)
+    order = pd.to_datetime(everything["checkin_datetime"], utc=True)
+    expected_last = everything.assign(_order=order).groupby("customer_id")["_order"].max()
+    actual_last = pd.to_datetime(with_latest["checkin_datetime"], utc=True).groupby(with_latest["customer_id"]).max()
+    pd.testing.assert_series_equal(actual_last.sort_index(), expected_last.sort_index(), check_names=False)
+    assert with_latest["checkin_id"].is_unique
+
+
+def test_snapshot_keeps_referenced_partitions(store):
+    manifest = store.migrate_from_legacy()
+    SnapshotStore(store.uploader).snapshot_store_manifest(
+        config.s3_path_capitan_checkins, manifest, snapshot_date="2025-06-01")
+    june_key = manifest["partitions"]["month=2025-06"]["key"]
+
+    store.merge(make_checkins("2025-06-10", "2025-06-12", first_id=10_000, seed=2, tag="new"))
+
+    assert june_key in store.uploader.s3.objects  # still needed by the snapshot
+    as_of = SnapshotStore(store.uploader).load_as_of(
+        config.s3_path_capitan_checkins, "2025-06-05", start_date="2025-06-01")
+    assert len(as_of) == manifest["partitions"]["month=2025-06"]["rows"]
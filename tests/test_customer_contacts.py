@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the customer contacts table: customers_master takes precedence over
+Capitan customers, kids borrow a parent's email/phone from the family graph,
+and the household hash read back from S3 gives the same AB groups as hashing
+the contacts directly.
+"""
+import pandas as pd
+
+from data_pipeline import config, customer_flags_engine
+from data_pipeline.customer_contacts import build_customer_contacts, load_customer_contacts
+from data_pipeline.customer_flags_config import get_customer_ab_group, get_household_hash
+
+
+def sources():
+    master = pd.DataFrame({
+        'customer_id': ['u-1', 'u-2', '10'],
+        'primary_email': ['pat@example.com', None, 'master@example.com'],
+        'primary_phone': ['+15125550001', None, None],
+        'primary_name': ['Pat Smith Jr', None, 'Mo'],
+    })
+    capitan = pd.DataFrame({
+        'customer_id': [10, 11, 12, 13, 14],
+        'email': ['capitan@example.com', 'lee@example.com', None, None, ''],
+        'phone': [None, 5125550011.0, 5125550012.0, None, None],
+        'first_name': ['Mo', 'Lee', 'Kit', 'Ash', 'Bo'],
+        'last_name': ['Ray', 'Ng', 'Ng', 'Ng', 'Ng'],
+    })
+    family = pd.DataFrame({
+        'parent_customer_id': [11, 11, 13, 12, 99],
+        'child_customer_id': [12, 13, 14, 14, 98],
+    })
+    return master, capitan, family
+
+
+def test_contacts_resolve_parent_contact():
+    contacts = build_customer_contacts(*sources()).set_index('customer_id')
+
+    assert list(contacts.index) == ['u-1', 'u-2', '10', '11', '12', '13', '14', '98']
+    assert contacts.loc['u-1', ['first_name', 'last_name']].tolist() == ['Pat', 'Smith Jr']
+    # customers_master wins over Capitan for the same ID
+    assert contacts.loc['10', 'email'] == 'master@example.com'
+    # Kit has a phone, borrows the email; Ash borrows both
+    assert contacts.loc['12', ['email', 'phone', 'is_using_parent_contact']].tolist() == [
+        'lee@example.com', 5125550012.0, True]
+    assert contacts.loc['13', ['email', 'phone']].tolist() == ['lee@example.com', 5125550011.0]
+    # Bo's first parent (Ash) only has Lee's contact through their own parent
+    assert contacts.loc['14', ['email', 'phone']].tolist() == ['lee@example.com', 5125550011.0]
+    assert not contacts.loc[['u-1', '10', '11'], 'is_using_parent_contact'].any()
+    # A child whose parent we know nothing about
+    assert contacts.loc['98', ['email', 'phone']].isna().all()
+
+    for customer_id, row in contacts.iterrows():
+        assert row['household_hash'] == get_household_hash(customer_id, row['email'], row['phone'])
+    # Siblings share a household
+    assert contacts.loc['12', 'household_hash'] == contacts.loc['11', 'household_hash']
+
+
+def test_flag_engine_reads_projected_table(monkeypatch, fake_s3):
+    contacts = build_customer_contacts(*sources())
+    fake_s3.objects[config.s3_path_customer_contacts] = contacts.to_csv(index=False)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+
+    engine = customer_flags_engine.CustomerFlagsEngine(rules=[])
+    engine.load_customer_contact_info()
+
+    assert engine.customer_emails['13'] == 'lee@example.com'
+    assert engine.is_using_parent_contact == dict(zip(contacts['customer_id'], contacts['is_using_parent_contact']))
+    stored = load_customer_contacts(fake_s3, config.aws_bucket_name, columns=['customer_id', 'household_hash'])
+    assert list(stored.columns) == ['customer_id', 'household_hash']
+    for customer_id, household_hash in zip(stored['customer_id'], stored['household_hash']):
+        # Groups from the round-tripped contacts match the stored hash
+        group = get_customer_ab_group(customer_id, engine.customer_emails[customer_id],
+                                      engine.customer_phones[customer_id])
+        expected = 'A' if int(household_hash[-1], 16) % 10 <= 4 else 'B'
+        assert group == expected == engine.customer_ab_groups[customer_id]
+
+
+def test_engine_builds_contacts_when_table_is_missing(monkeypatch, fake_s3):
+    master, capitan, family = sources()
+    fake_s3.objects['customers/customers_master.csv'] = master.to_csv(index=False)
+    fake_s3.objects['capitan/customers.csv'] = capitan.to_csv(index=False)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+
+    engine = customer_flags_engine.CustomerFlagsEngine(rules=[])
+    engine.load_customer_contact_info()
+
+    # No family graph either: nobody borrows a parent's contact
+    assert engine.customer_emails['u-1'] == 'pat@example.com'
+    assert pd.isna(engine.customer_emails['13'])
+    assert not any(engine.is_using_parent_contact.values())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the customer event details columns: legacy Python-repr blobs are
+rewritten as JSON once, the typed detail columns come back from a plain CSV
+read, and rules see the same details through the columns as through the
+parsed event_data dicts.
+"""
+import json
+
+import pandas as pd
+
+from data_pipeline import customer_event_store as store
+from data_pipeline.customer_flags_config import event_detail
+
+
+def legacy_events():
+    return pd.DataFrame({
+        'customer_id': ['c1', 'c1', 'c2', 'c3', 'c4'],
+        'event_type': ['day_pass_purchase', 'flag_set', 'email_sent', 'checkin', 'checkin'],
+        'event_date': ['2025-05-01', '2025-05-02', '2025-05-03', '2025-05-04', '2025-05-05'],
+        'event_details': [
+            json.dumps({'description': 'Day Pass', 'amount': 25.0}),
+            None,
+            json.dumps({'campaign_id': 'abc123', 'offer_amount': '50%'}),
+            "{'entry_method_description': 'Day Pass Entry', 'checkin_id': 7}",  # str(dict)
+            'not a dict at all',
+        ],
+        'event_data': [
+            None,
+            "{'flag_type': 'second_visit_offer_eligible', 'priority': 'high'}",  # str(dict)
+            '{}',
+            None,
+            None,
+        ],
+    })
+
+
+def test_legacy_rows_are_normalized_once():
+    events = store.normalize_events(legacy_events())
+
+    assert events['details_version'].eq(store.DETAILS_VERSION).all()
+    assert json.loads(events.loc[1, 'event_data']) == {'flag_type': 'second_visit_offer_eligible', 'priority': 'high'}
+    assert json.loads(events.loc[3, 'event_details'])['entry_method_description'] == 'Day Pass Entry'
+    assert events.loc[4, 'event_details'] == 'not a dict at all'
+    assert events['flag_type'].tolist()[:2] == [None, 'second_visit_offer_eligible']
+    assert events.loc[0, 'amount'] == 25.0 and pd.isna(events.loc[1, 'amount'])
+    assert events.loc[2, 'campaign_id'] == 'abc123'
+    assert events.loc[3, 'entry_method_description'] == 'Day Pass Entry'
+
+    # Rows at the current version aren't parsed again; new rows are
+    events.loc[0, 'amount'] = 99.0
+    new_row = pd.DataFrame({'customer_id': ['c5'], 'event_type': ['flag_synced_to_shopify'],
+                            'event_date': ['2025-05-06'], 'event_data': [json.dumps({'flag_type': 'x'})]})
+    again = store.normalize_events(pd.concat([events, new_row], ignore_index=True))
+    assert again.loc[0, 'amount'] == 99.0
+    assert again.loc[5, 'flag_type'] == 'x'
+
+
+def test_typed_read_matches_parsed_details():
+    legacy = legacy_events()
+    csv_content = store.normalize_events(legacy).to_csv(index=False)
+
+    events = store.read_events(csv_content)
+
+    assert events['amount'].dtype == float
+    assert events['flag_type'].dtype == object
+    details = store.event_data_dicts(events)
+    # Same precedence as before: event_data when it has anything, else event_details
+    assert details == [store.parse_details(data) or store.parse_details(event_details)
+                       for data, event_details in zip(legacy['event_data'], legacy['event_details'])]
+
+    records = events.assign(event_data=details).to_dict('records')
+    for record, parsed in zip(records, details):
+        for key in ['flag_type', 'entry_method_description', 'campaign_id']:
+            assert event_detail(record, key) == parsed.get(key)
+        # Hand-built events with only an event_data dict read the same way
+        assert event_detail({'event_data': parsed}, 'flag_type') == parsed.get('flag_type')
+
+
+def test_unmigrated_table_is_parsed_on_read():
+    events = store.read_events(legacy_events().to_csv(index=False).encode('utf-8'))
+
+    assert events.loc[1, 'flag_type'] == 'second_visit_offer_eligible'
+    assert event_detail(events.iloc[4].to_dict(), 'entry_method_description', '') == ''
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test rule pre-filtering in the flag engine: narrowing each rule to the
+customers with its required event types (and through its prefilter) flags
+exactly the customers evaluating every rule for every customer would, the
+per-rule counters add up, and sharding customers across worker processes
+gives the same flags in the same order as evaluating in-process.
+"""
+import json
+import random
+import sys
+import types
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from data_pipeline import customer_flags_config as rules_config
+from data_pipeline import customer_flags_engine
+
+TODAY = datetime(2026, 3, 15, 12, 0)
+
+EVENT_RULES = [
+    rules_config.ReadyForMembershipFlag(),
+    rules_config.FirstTimeDayPass2WeekOfferFlag(),
+    rules_config.SecondVisitOfferEligibleFlag(),
+    rules_config.SecondVisit2WeekOfferFlag(),
+    rules_config.TwoWeekPassUserFlag(),
+    rules_config.FiftyPercentOfferSentFlag(),
+    rules_config.MembershipCancelledWinbackFlag(),
+]
+
+
+class FakeRow:
+    def __init__(self, email):
+        self.email = email
+
+
+class FakeBigQueryClient:
+    emails = []
+
+    def query(self, query, job_config=None):
+        return types.SimpleNamespace(result=lambda: [FakeRow(email) for email in self.emails])
+
+
+def random_event(rng, customer_id):
+    event_type = rng.choice([
+        'day_pass_purchase', 'checkin', 'checkin', 'flag_set', 'flag_synced_to_shopify',
+        'membership_purchase', 'membership_renewal', 'membership_cancelled', 'membership_started',
+        'email_sent',
+    ])
+    event = {
+        'customer_id': customer_id,
+        'event_type': event_type,
+        'event_date': TODAY - timedelta(days=rng.randint(-1, 90), hours=rng.randint(0, 23)),
+        'event_data': {},
+    }
+    if event_type == 'checkin':
+        event['entry_method_description'] = rng.choice(['Day Pass Entry', 'day pass', 'Member Entry', None])
+    elif event_type in ('flag_set', 'flag_synced_to_shopify'):
+        flag_type = rng.choice([rule.flag_type for rule in EVENT_RULES] + ['second_visit_offer_eligible'] * 3)
+        # Some flags only carry their flag_type in the event_data dict
+        if rng.random() < 0.5:
+            event['flag_type'] = flag_type
+        else:
+            event['event_data'] = {'flag_type': flag_type}
+    elif event_type == 'membership_started':
+        event['event_data'] = {'membership_name': rng.choice(['2-Week Climbing Pass', 'Monthly', 'Two Week Fitness'])}
+    elif event_type == 'email_sent':
+        event['event_details'] = json.dumps({'offer_amount': rng.choice(['50%', '25%', ''])})
+    return event
+
+
+def random_events(seed):
+    rng = random.Random(seed)
+    events = []
+    for n in range(150):
+        customer_id = f"c-{n}" if rng.random() < 0.7 else n
+        events.extend(random_event(rng, customer_id) for _ in range(rng.randint(1, 12)))
+    return pd.DataFrame(events)
+
+
+def make_engine(monkeypatch, rules):
+    monkeypatch.setattr(customer_flags_engine.experiment_tracking, 'log_experiment_entry', lambda **kwargs: None)
+    engine = customer_flags_engine.CustomerFlagsEngine(rules=rules)
+    monkeypatch.setattr(engine, 'load_customer_contact_info', lambda: None)
+    return engine
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_prefiltered_flags_match_evaluating_every_rule(monkeypatch, seed):
+    df_events = random_events(seed)
+    engine = make_engine(monkeypatch, EVENT_RULES)
+
+    df_flags = engine.evaluate_all_customers(df_events.copy(), TODAY)
+
+    expected = []
+    for customer_id, customer_events in df_events.groupby('customer_id'):
+        flags = engine.evaluate_customer(customer_id, customer_events.to_dict('records'), TODAY)
+        expected.extend((flag['customer_id'], flag['flag_type']) for flag in flags)
+    assert sorted(zip(df_flags['customer_id'].astype(str), df_flags['flag_type'])) == sorted(
+        (str(customer_id), flag_type) for customer_id, flag_type in expected)
+
+
+def test_rule_stats_and_failed_prefilter(monkeypatch):
+    class NeedsCheckin(rules_config.FlagRule):
+        required_event_types = ['checkin']
+
+        def __init__(self):
+            super().__init__('needs_checkin', 'Has a checkin')
+
+        def evaluate(self, customer_id, events, today):
+            return {'customer_id': customer_id, 'flag_type': self.flag_type, 'triggered_date': today,
+                    'flag_data': {}, 'priority': self.priority}
+
+    class BrokenPrefilter(NeedsCheckin):
+        def __init__(self):
+            rules_config.FlagRule.__init__(self, 'broken_prefilter', 'Prefilter raises')
+
+        def prefilter(self, events, today, customer_emails=None):
+            raise RuntimeError('boom')
+
+    df_events = pd.DataFrame({
+        'customer_id': ['a', 'a', 'b', 'c'],
+        'event_type': ['checkin', 'email_sent', 'email_sent', 'checkin'],
+        'event_date': [TODAY] * 4,
+    })
+    engine = make_engine(monkeypatch, [NeedsCheckin(), BrokenPrefilter()])
+
+    df_flags = engine.evaluate_all_customers(df_events, TODAY)
+
+    assert sorted(df_flags['customer_id']) == ['a', 'a', 'c', 'c']
+    for flag_type in ['needs_checkin', 'broken_prefilter']:
+        stats = engine.rule_stats[flag_type]
+        assert (stats['candidates'], stats['evaluated'], stats['flagged']) == (2, 2, 2)
+        assert stats['seconds'] >= 0
+
+
+def test_birthday_prefilter_matches_emails_in_one_query(monkeypatch):
+    bigquery = types.SimpleNamespace(
+        Client=FakeBigQueryClient,
+        QueryJobConfig=lambda query_parameters: None,
+        ScalarQueryParameter=lambda *args: None,
+    )
+    monkeypatch.setitem(sys.modules, 'google.cloud.bigquery', bigquery)
+    monkeypatch.setitem(sys.modules, 'google.cloud', types.SimpleNamespace(bigquery=bigquery))
+    monkeypatch.setattr(FakeBigQueryClient, 'emails', ['Host@Example.com', None])
+    events = pd.DataFrame({'customer_id': ['a', 'b', 'c', 'a'], 'event_type': ['checkin'] * 4})
+    emails = {'a': 'host@example.COM', 'b': 'guest@example.com', 'c': float('nan')}
+
+    rule = rules_config.BirthdayPartyHostOneWeekOutFlag()
+
+    assert rule.prefilter(events, TODAY, customer_emails=emails) == ['a']
+
+
+def test_sharded_evaluation_matches_in_process(monkeypatch, capsys):
+    df_events = random_events(seed=7)
+    customer_ids = df_events['customer_id'].unique()
+
+    def load_contacts(engine):
+        # Contacts have to reach the workers: some kids flagged as "_child", fixed AB groups
+        engine.is_using_parent_contact = {customer_id: n % 4 == 0 for n, customer_id in enumerate(customer_ids)}
+        engine.customer_ab_groups = {customer_id: 'AB'[n % 2] for n, customer_id in enumerate(customer_ids)}
+
+    runs = []
+    for workers in [1, 3]:
+        engine = make_engine(monkeypatch, EVENT_RULES)
+        engine.workers = workers
+        monkeypatch.setattr(engine, 'load_customer_contact_info', lambda engine=engine: load_contacts(engine))
+        runs.append((engine.evaluate_all_customers(df_events.copy(), TODAY), engine.rule_stats))
+
+    output = capsys.readouterr().out
+    assert 'across 3 worker processes' in output and 'Parallel evaluation failed' not in output
+
+    (serial_flags, serial_stats), (sharded_flags, sharded_stats) = runs
+    assert not serial_flags.empty and serial_flags['flag_type'].str.endswith('_child').any()
+    pd.testing.assert_frame_equal(sharded_flags, serial_flags)
+    for flag_type, stats in serial_stats.items():
+        assert {k: v for k, v in sharded_stats[flag_type].items() if k != 'seconds'} == {
+            k: v for k, v in stats.items() if k != 'seconds'}
+
+    shards = customer_flags_engine.shard_customers(df_events['customer_id'], 3)
+    assert shards.between(0, 2).all()
+    assert shards.equals(customer_flags_engine.shard_customers(df_events['customer_id'], 3))
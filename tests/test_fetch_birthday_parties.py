@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Test the Firestore birthday party reader and enrichment writes.
+
+Runs against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set
+(e.g. `firebase emulators:exec --only firestore "pytest tests/test_fetch_birthday_parties.py"`),
+otherwise against a small in-memory stand-in for the parts of the client API
+the pipeline uses.
+"""
+import datetime
+import io
+import json
+import os
+import uuid
+
+import pandas as pd
+import pytest
+import requests
+
+from data_pipeline import fetch_birthday_parties as bp
+from tests.conftest import FakeUploader
+
+UTC = datetime.timezone.utc
+TODAY = datetime.date(2025, 6, 10)
+
+
+# ----------------------------------------------------------------------
+# In-memory Firestore
+# ----------------------------------------------------------------------
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db, self.path, self.id = db, path, path[-1]
+
+    @property
+    def parent(self):
+        return FakeCollection(self.db, self.path[:-1])
+
+    def collection(self, name):
+        return FakeCollection(self.db, self.path + (name,))
+
+    def set(self, data):
+        self.db.docs[self.path] = dict(data)
+
+    def update(self, fields):
+        if self.path not in self.db.docs:
+            raise KeyError(f"No document to update: {'/'.join(self.path)}")
+        self.db.docs[self.path].update(fields)
+
+    def delete(self):
+        self.db.docs.pop(self.path, None)
+
+    def get(self):
+        return FakeSnapshot(self, self.db.docs.get(self.path))
+
+
+class FakeQuery:
+    OPS = {">=": lambda a, b: a >= b, "==": lambda a, b: a == b}
+
+    def __init__(self, db, matches, filters=(), fields=None):
+        self.db, self.matches, self.filters, self.fields = db, matches, filters, fields
+
+    def where(self, filter):
+        return FakeQuery(self.db, self.matches, self.filters + (filter,), self.fields)
+
+    def select(self, fields):
+        return FakeQuery(self.db, self.matches, self.filters, list(fields))
+
+    def stream(self):
+        self.db.queries += 1
+        for path, data in sorted(self.db.docs.items()):
+            if not self.matches(path):
+                continue
+            if not all(f.field_path in data and type(data[f.field_path]) is type(f.value)
+                       and self.OPS[f.op_string](data[f.field_path], f.value) for f in self.filters):
+                continue
+            if self.fields is not None:
+                data = {k: v for k, v in data.items() if k in self.fields}
+            yield FakeSnapshot(FakeDocument(self.db, path), data)
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, path):
+        super().__init__(db, lambda p: p[:-1] == path)
+        self.path, self.id = path, path[-1]
+
+    @property
+    def parent(self):
+        return FakeDocument(self.db, self.path[:-1]) if len(self.path) > 1 else None
+
+    def document(self, doc_id):
+        return FakeDocument(self.db, self.path + (doc_id,))
+
+
+class FakeFailure:
+    code = 5  # NOT_FOUND
+
+    def __init__(self, operation, message):
+        self.operation, self.message = operation, message
+
+    @property
+    def attempts(self):
+        return self.operation.attempts
+
+
+class FakeOperation:
+    def __init__(self, reference, fields):
+        self.reference, self.fields, self.attempts = reference, fields, 0
+
+
+class FakeBulkWriter:
+    def __init__(self, db):
+        self.db, self.operations = db, []
+        self.on_result = lambda reference, result, writer: None
+        self.on_error = lambda error, writer: False
+
+    def on_write_result(self, callback):
+        self.on_result = callback
+
+    def on_write_error(self, callback):
+        self.on_error = callback
+
+    def update(self, reference, fields):
+        self.operations.append(FakeOperation(reference, fields))
+
+    def close(self):
+        self.db.bulk_batches += 1
+        for operation in self.operations:
+            while True:
+                operation.attempts += 1
+                try:
+                    operation.reference.update(operation.fields)
+                except KeyError as e:
+                    if self.on_error(FakeFailure(operation, str(e)), self):
+                        continue
+                    break
+                self.on_result(operation.reference, None, self)
+                break
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+        self.queries = 0
+        self.bulk_batches = 0
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
+
+    def collection_group(self, name):
+        return FakeQuery(self, lambda p: len(p) >= 2 and p[-2] == name)
+
+    def bulk_writer(self):
+        return FakeBulkWriter(self)
+
+
+@pytest.fixture
+def db():
+    host = os.getenv("FIRESTORE_EMULATOR_HOST")
+    if not host:
+        yield FakeFirestore()
+        return
+    from google.cloud import firestore
+    project = f"demo-birthday-{uuid.uuid4().hex[:8]}"
+    yield firestore.Client(project=project)
+    requests.delete(f"http://{host}/emulator/v1/projects/{project}/databases/(default)/documents")
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+def at(day, hour=12):
+    return datetime.datetime(2025, 6, day, hour, tzinfo=UTC)
+
+
+def seed_parties(db):
+    parties = {
+        "p-old": {"childName": "Ada", "partyDate": "March 1, 2025", "hostEmail": "ada.parent@example.com"},
+        "p-soon": {"childName": "Ben", "partyDate": "Saturday, June 14, 2025 at 2:00 PM",
+                   "hostEmail": "ben.parent@example.com", "waiverStats": {"details": ["big"] * 50}},
+        "p-next": {"childName": "Cy", "partyDate": "2025-07-01", "hostEmail": "cy.parent@example.com"},
+    }
+    for party_id, party in parties.items():
+        db.collection("parties").document(party_id).set({**party, "createdAt": at(1)})
+
+    rsvps = [
+        ("p-old", "r1", "yes", 2, 1, "dana@example.com", at(1)),
+        ("p-old", "r2", "no", 0, 0, "eli@example.com", at(1)),
+        ("p-soon", "r3", "yes", 1, 2, "FAY@example.com ", at(2)),
+        ("p-soon", "r4", "maybe", 1, 1, "gus@example.com", at(3)),
+        ("p-next", "r5", "yes", 1, 1, "hal@example.com", at(4)),
+    ]
+    for party_id, rsvp_id, attending, adults, kids, email, updated_at in rsvps:
+        db.collection("parties").document(party_id).collection("rsvps").document(rsvp_id).set({
+            "guestName": rsvp_id.upper(), "attending": attending, "numAdults": adults,
+            "numKids": kids, "email": email, "updatedAt": updated_at,
+        })
+    # An unrelated "rsvps" collection that the collection-group query also sees
+    db.collection("events").document("e1").collection("rsvps").document("x1").set(
+        {"attending": "yes", "numAdults": 9, "numKids": 9, "updatedAt": at(5)})
+
+
+def normalized(df):
+    return df.sort_values(list(df.columns[:2])).reset_index(drop=True).astype(str)
+
+
+# ----------------------------------------------------------------------
+# Tests
+# ----------------------------------------------------------------------
+
+def test_incremental_sync_matches_full_fetch(db, uploader):
+    seed_parties(db)
+
+    parties_df, rsvps_df = bp.sync_birthday_parties_from_firestore(uploader, db, today=TODAY)
+    if isinstance(db, FakeFirestore):
+        assert db.queries == 2  # parties + one collection-group query, not one per party
+    assert sorted(rsvps_df["rsvp_id"]) == ["r1", "r2", "r3", "r4", "r5"]
+    totals = parties_df.set_index("party_id")
+    assert totals.loc["p-soon", ["total_yes", "total_maybe", "total_guests"]].tolist() == [1, 1, 3]
+    assert "waiverStats" not in parties_df.columns
+
+    # A guest changes their answer, another RSVPs, and one party is cancelled
+    party = db.collection("parties").document("p-next")
+    party.collection("rsvps").document("r5").set({
+        "guestName": "R5", "attending": "no", "numAdults": 1, "numKids": 1,
+        "email": "hal@example.com", "updatedAt": at(6)})
+    db.collection("parties").document("p-soon").collection("rsvps").document("r6").set({
+        "guestName": "R6", "attending": "yes", "numAdults": 2, "numKids": 3,
+        "email": "ivy@example.com", "updatedAt": at(7)})
+    db.collection("parties").document("p-old").delete()
+
+    parties_df, rsvps_df = bp.sync_birthday_parties_from_firestore(
+        uploader, db, today=TODAY + datetime.timedelta(days=1))
+
+    state = json.loads(uploader.s3.objects[bp.SYNC_STATE_KEY])
+    assert state["mode"] == "incremental"
+    assert state["rsvps_fetched"] == 2
+    assert datetime.datetime.fromisoformat(state["rsvp_cursors"]["timestamp"]) == at(7)
+
+    full_parties, full_rsvps = bp.sync_birthday_parties_from_firestore(FakeUploader(), db, full=True)
+    stored_rsvps = pd.read_csv(io.StringIO(uploader.s3.objects[bp.RSVPS_KEY]))
+    assert len(stored_rsvps) == len(full_rsvps) == 4
+    pd.testing.assert_frame_equal(normalized(parties_df), normalized(full_parties))
+    pd.testing.assert_frame_equal(
+        normalized(stored_rsvps.drop(columns="updated_at")),
+        normalized(pd.read_csv(io.StringIO(full_rsvps.to_csv(index=False))).drop(columns="updated_at")))
+
+
+def test_incremental_sync_sees_every_updated_at_type_and_deletions(db, uploader):
+    seed_parties(db)
+    # Written by an older client: no updatedAt, and an ISO string instead of a timestamp
+    rsvps = db.collection("parties").document("p-next").collection("rsvps")
+    rsvps.document("r7").set({"guestName": "R7", "attending": "yes", "numAdults": 1, "numKids": 0})
+    rsvps.document("r8").set({"guestName": "R8", "attending": "yes", "numAdults": 1, "numKids": 1,
+                              "updatedAt": "2025-06-05T09:00:00"})
+    bp.sync_birthday_parties_from_firestore(uploader, db, today=TODAY)
+    state = json.loads(uploader.s3.objects[bp.SYNC_STATE_KEY])
+    assert state["rsvp_cursors"]["string"] == "2025-06-05T09:00:00"
+
+    # New RSVPs of both types and one without updatedAt, and a guest removed
+    rsvps.document("r9").set({"guestName": "R9", "attending": "no", "numAdults": 0, "numKids": 0})
+    rsvps.document("r10").set({"guestName": "R10", "attending": "yes", "numAdults": 2, "numKids": 0,
+                               "updatedAt": "2025-06-10T09:00:00"})
+    rsvps.document("r11").set({"guestName": "R11", "attending": "maybe", "numAdults": 1, "numKids": 0,
+                               "updatedAt": at(9)})
+    rsvps.document("r5").delete()
+
+    parties_df, rsvps_df = bp.sync_birthday_parties_from_firestore(
+        uploader, db, today=TODAY + datetime.timedelta(days=1))
+
+    state = json.loads(uploader.s3.objects[bp.SYNC_STATE_KEY])
+    assert state["mode"] == "incremental"
+    assert state["rsvps_fetched"] == 4  # r9, r10, r11 and r8 again (the string cursor is inclusive)
+    assert state["rsvp_cursors"]["string"] == "2025-06-10T09:00:00"
+    assert datetime.datetime.fromisoformat(state["rsvp_cursors"]["timestamp"]) == at(9)
+    full_parties, full_rsvps = bp.sync_birthday_parties_from_firestore(FakeUploader(), db, full=True)
+    assert sorted(rsvps_df["rsvp_id"]) == sorted(full_rsvps["rsvp_id"])
+    assert "r5" not in set(rsvps_df["rsvp_id"])
+    pd.testing.assert_frame_equal(normalized(parties_df), normalized(full_parties))
+
+
+def test_waiver_enrichment_bulk_updates_upcoming_parties(db):
+    seed_parties(db)
+    customers = pd.DataFrame({
+        "customer_id": [1, 2, 3],
+        "email": ["fay@example.com", "hal@example.com", None],
+        "active_waiver_exists": [True, False, True],
+        "latest_waiver_expiration_date": ["2026-01-01", None, "2026-01-01"],
+    })
+
+    results = bp.enrich_parties_with_waiver_status(db=db, customers_df=customers, today=TODAY)
+
+    assert results == {"parties_processed": 2, "parties_updated": 2, "rsvps_matched": 2, "waivers_found": 1}
+    soon = db.collection("parties").document("p-soon").get().to_dict()["waiverStats"]
+    assert (soon["signed"], soon["needed"]) == (1, 3)
+    assert soon["details"][0]["email"] == "fay@example.com"
+    nxt = db.collection("parties").document("p-next").get().to_dict()["waiverStats"]
+    assert (nxt["signed"], nxt["needed"], nxt["details"][0]["has_waiver"]) == (0, 2, False)
+    assert "waiverStats" not in db.collection("parties").document("p-old").get().to_dict()
+    if isinstance(db, FakeFirestore):
+        assert db.bulk_batches == 1
+
+
+def test_communication_history_skips_missing_parties(db):
+    seed_parties(db)
+    reminders = pd.DataFrame({
+        "party_id": ["p-soon", "p-soon", "p-gone"],
+        "guest_name": ["R3", "R4", "Z"],
+        "recipient": ["fay@example.com", "gus@example.com", "z@example.com"],
+        "sent_at": ["2025-06-07T10:00:00", "2025-06-08T10:00:00", "2025-06-08T10:00:00"],
+        "status": ["sent", "sent", "sent"],
+    })
+
+    assert bp.enrich_parties_with_communication_history(db=db, reminders_df=reminders) == {"parties_updated": 1}
+    history = db.collection("parties").document("p-soon").get().to_dict()["communicationHistory"]
+    assert (history["count"], history["lastSent"]) == (2, "2025-06-08T10:00:00")
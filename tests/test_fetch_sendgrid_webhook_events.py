@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test SendGrid webhook processing: the crosstab aggregation matches the
+per-group loop it replaced, merging activity across runs OR-s the flags so
+events split over several files give the same table as reading them all at
+once, and every file that was read (even an empty one) is recorded as
+processed while unreadable files are retried a limited number of times.
+"""
+import io
+import json
+import random
+
+import pandas as pd
+import pytest
+
+from data_pipeline.fetch_sendgrid_webhook_events import (
+    ACTIVITY_FLAG_COLUMNS,
+    MAX_READ_ATTEMPTS,
+    SendGridWebhookProcessor,
+)
+
+DATE = pd.Timestamp.now().strftime('%Y-%m-%d')
+PREFIX = f"sendgrid/events/date={DATE}/"
+
+
+@pytest.fixture
+def processor(monkeypatch, fake_s3):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    return SendGridWebhookProcessor(max_workers=4)
+
+
+def random_events(seed, n=400):
+    rng = random.Random(seed)
+    event_types = list(ACTIVITY_FLAG_COLUMNS) + ['processed', None]
+    return [
+        {
+            'received_at': '2025-06-01T12:00:00',
+            'raw_event': {
+                'event': rng.choice(event_types),
+                'email': rng.choice(['a@example.com', ' B@example.com', 'c@example.com']),
+                'timestamp': 1748779200 + rng.randint(0, 86400),
+                'sg_message_id': f"msg-{rng.randint(0, 15)}",
+            },
+        }
+        for _ in range(n)
+    ]
+
+
+def loop_aggregate(df_events):
+    """The per-group loop the crosstab aggregation replaced."""
+    activity = []
+    for (msg_id, email), group in df_events.groupby(['sg_message_id', 'email']):
+        event_types = set(group['event_type'].dropna())
+        activity.append({
+            'sg_message_id': msg_id,
+            'email': email,
+            'sent_datetime': group['event_datetime'].min(),
+            **{column: event_type in event_types for event_type, column in ACTIVITY_FLAG_COLUMNS.items()},
+        })
+    return pd.DataFrame(activity)
+
+
+def normalized(df):
+    return df.sort_values(['sg_message_id', 'email']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_crosstab_aggregation_matches_loop(processor, seed):
+    df_events = processor.process_events_to_dataframe(random_events(seed))
+
+    pd.testing.assert_frame_equal(
+        normalized(processor.aggregate_recipient_activity(df_events)),
+        normalized(loop_aggregate(df_events)),
+    )
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_merging_runs_matches_aggregating_everything(processor, seed):
+    events = random_events(seed)
+    split = len(events) // 3
+    first = processor.aggregate_recipient_activity(processor.process_events_to_dataframe(events[:split]))
+    second = processor.aggregate_recipient_activity(processor.process_events_to_dataframe(events[split:]))
+
+    # The existing table comes back from CSV between runs
+    existing = pd.read_csv(io.StringIO(first.to_csv(index=False)))
+    existing['sent_datetime'] = pd.to_datetime(existing['sent_datetime'])
+    merged = processor.merge_recipient_activity(existing, second)
+
+    everything = loop_aggregate(processor.process_events_to_dataframe(events))
+    pd.testing.assert_frame_equal(normalized(merged), normalized(everything))
+
+
+def test_empty_and_unreadable_files_are_tracked(processor):
+    s3 = processor.s3_client
+    events = random_events(seed=1, n=20)
+    s3.objects[PREFIX + '001.jsonl'] = '\n'.join(json.dumps(e) for e in events)
+    s3.objects[PREFIX + '002.jsonl'] = ''
+    s3.objects[PREFIX + '003.jsonl'] = 'not json'
+    s3.objects[PREFIX + '004.jsonl'] = '{}'
+    s3.unreadable.add(PREFIX + '004.jsonl')
+
+    processor.fetch_and_save(days_back=1, save_local=False)
+
+    assert processor.load_processed_keys() == {
+        PREFIX + '001.jsonl': 0, PREFIX + '002.jsonl': 0, PREFIX + '003.jsonl': 1, PREFIX + '004.jsonl': 1,
+    }
+
+    # Only the failed files are read again, until they're given up on
+    s3.unreadable.clear()
+    s3.reads.clear()
+    processor.fetch_and_save(days_back=1, save_local=False)
+    assert sorted(k for k in s3.reads if k.startswith(PREFIX)) == [PREFIX + '003.jsonl', PREFIX + '004.jsonl']
+    assert processor.load_processed_keys()[PREFIX + '004.jsonl'] == 0
+
+    for _ in range(MAX_READ_ATTEMPTS):
+        processor.fetch_and_save(days_back=1, save_local=False)
+    assert processor.load_processed_keys()[PREFIX + '003.jsonl'] == MAX_READ_ATTEMPTS
+    s3.reads.clear()
+    processor.fetch_and_save(days_back=1, save_local=False)
+    assert not [k for k in s3.reads if k.startswith(PREFIX)]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test that @run_once fetches run at most once per run_once_scope(), even when
+several steps call them concurrently, that time saved is reported, and that
+calls outside a scope (or in a later scope) fetch again.
+"""
+import time
+
+import pytest
+
+from data_pipeline.pipeline_scheduler import PipelineStep, run_once, run_once_scope, run_steps
+
+calls = []
+
+
+@run_once
+def fetch_memberships(save_local=False):
+    calls.append(("memberships", save_local))
+    time.sleep(0.2)
+    return "memberships"
+
+
+@pytest.fixture(autouse=True)
+def fresh_calls():
+    calls.clear()
+
+
+def test_concurrent_callers_share_one_fetch():
+    steps = [
+        PipelineStep(f"consumer_{i}", f"Consumer {i}", lambda: fetch_memberships(save_local=False))
+        for i in range(4)
+    ]
+    with run_once_scope() as scope:
+        results = run_steps(steps, max_workers=4, poll_interval=0.05)
+
+    assert all(r.status == "success" for r in results.values())
+    assert calls == [("memberships", False)]
+    stats = scope.stats()
+    assert stats["hits"] == 3
+    assert stats["seconds_saved"] >= 0.5
+
+
+def test_different_arguments_and_new_runs_fetch_again():
+    with run_once_scope():
+        fetch_memberships(save_local=False)
+        fetch_memberships(save_local=True)
+        fetch_memberships(save_local=False)
+    assert len(calls) == 2
+
+    with run_once_scope() as scope:
+        fetch_memberships(save_local=False)
+    assert len(calls) == 3
+    assert scope.stats()["hits"] == 0
+
+    # No scope, no memo: scripts calling a fetch directly always get fresh data
+    fetch_memberships(save_local=False)
+    fetch_memberships(save_local=False)
+    assert len(calls) == 5
+
+
+def test_failures_are_not_memoized():
+    attempts = []
+
+    @run_once
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("capitan timeout")
+        return "ok"
+
+    with run_once_scope():
+        with pytest.raises(RuntimeError):
+            flaky()
+        assert flaky() == "ok"
+        assert flaky() == "ok"
+    assert len(attempts) == 2
+
+
+def test_transaction_step_no_longer_refreshes_other_sources():
+    import inspect
+    from data_pipeline import pipeline_handler
+
+    source = inspect.getsource(pipeline_handler.replace_days_in_transaction_df_in_s3)
+    assert "upload_new_capitan_membership_data(" not in source
+    assert "upload_new_instagram_data(" not in source
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the pipeline step scheduler: a failed or timed-out step skips everything
+downstream of it, independent steps still run, partial reruns with `only` /
+`start_from` pick the right steps, and invalid graphs are rejected.
+"""
+import threading
+import time
+
+import pytest
+
+from data_pipeline.pipeline_scheduler import PipelineStep, run_steps, select_steps, validate_steps
+
+
+def ok(summary=None):
+    return lambda: summary
+
+
+def fail():
+    raise RuntimeError("API returned 500")
+
+
+def statuses(results):
+    return {name: result.status for name, result in results.items()}
+
+
+def test_failed_step_skips_its_dependents():
+    steps = [
+        PipelineStep('fetch', 'Fetch', fail),
+        PipelineStep('other', 'Independent', ok('12 rows')),
+        PipelineStep('build', 'Build', ok(), depends_on=['fetch']),
+        PipelineStep('report', 'Report', ok(), depends_on=['build', 'other']),
+    ]
+
+    results = run_steps(steps, max_workers=2, poll_interval=0.01)
+
+    assert list(results) == ['fetch', 'other', 'build', 'report']
+    assert statuses(results) == {'fetch': 'failed', 'other': 'success', 'build': 'skipped', 'report': 'skipped'}
+    assert results['fetch'].error == "API returned 500"
+    assert results['other'].summary == '12 rows'
+    assert results['build'].error == "upstream failed: fetch"
+    assert results['report'].error == "upstream failed: build"
+
+
+def test_timeout_marks_step_failed_and_skips_dependents():
+    release = threading.Event()
+    steps = [
+        PipelineStep('stuck', 'Stuck fetch', lambda: release.wait(5), timeout=0.1),
+        PipelineStep('after', 'Needs stuck', ok(), depends_on=['stuck']),
+        PipelineStep('fast', 'Fast', ok()),
+    ]
+
+    started = time.monotonic()
+    results = run_steps(steps, max_workers=2, poll_interval=0.01)
+    release.set()
+
+    assert time.monotonic() - started < 2
+    assert statuses(results) == {'stuck': 'timeout', 'after': 'skipped', 'fast': 'success'}
+    assert "timeout" in results['stuck'].error
+    assert results['stuck'].duration_seconds >= 0.1
+
+
+def test_dependencies_run_first_and_respect_max_workers():
+    order = []
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def step(name):
+        def run():
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+                order.append(name)
+        return run
+
+    steps = [PipelineStep(f's{i}', f'Step {i}', step(f's{i}')) for i in range(4)]
+    steps.append(PipelineStep('last', 'Last', step('last'), depends_on=['s0', 's3']))
+
+    results = run_steps(steps, max_workers=2, poll_interval=0.01)
+
+    assert all(status == 'success' for status in statuses(results).values())
+    assert active[1] == 2
+    assert order[-1] == 'last'
+
+
+STEPS = [
+    PipelineStep('checkins', 'Check-ins', ok()),
+    PipelineStep('memberships', 'Memberships', ok()),
+    PipelineStep('transfers', 'Transfers', ok(), depends_on=['checkins']),
+    PipelineStep('report', 'Report', ok(), depends_on=['memberships', 'transfers']),
+]
+
+
+def test_only_and_start_from_selection():
+    assert [s.name for s in select_steps(STEPS, only=['report', 'checkins'])] == ['checkins', 'report']
+    assert [s.name for s in select_steps(STEPS, start_from='transfers')] == ['transfers', 'report']
+    assert [s.name for s in select_steps(STEPS)] == [s.name for s in STEPS]
+
+    with pytest.raises(ValueError, match="Unknown steps"):
+        select_steps(STEPS, only=['nope'])
+    with pytest.raises(ValueError, match="Unknown step"):
+        select_steps(STEPS, start_from='nope')
+
+    # Unselected dependencies count as satisfied
+    results = run_steps(STEPS, only=['report'], poll_interval=0.01)
+    assert statuses(results) == {'report': 'success'}
+    results = run_steps(STEPS, start_from='transfers', poll_interval=0.01)
+    assert statuses(results) == {'transfers': 'success', 'report': 'success'}
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown steps: \\['missing'\\]"):
+        validate_steps([PipelineStep('a', 'A', ok(), depends_on=['missing'])])
+
+    with pytest.raises(ValueError, match="Dependency cycle between steps: \\['a', 'b'\\]"):
+        validate_steps([
+            PipelineStep('a', 'A', ok(), depends_on=['b']),
+            PipelineStep('b', 'B', ok(), depends_on=['a']),
+            PipelineStep('c', 'C', ok()),
+        ])
+
+    with pytest.raises(ValueError, match="Duplicate step names"):
+        validate_steps([PipelineStep('a', 'A', ok()), PipelineStep('a', 'A again', ok())])
+
+    # run_steps validates before starting anything
+    ran = []
+    with pytest.raises(ValueError):
+        run_steps([
+            PipelineStep('a', 'A', lambda: ran.append('a')),
+            PipelineStep('b', 'B', ok(), depends_on=['b']),
+        ], poll_interval=0.01)
+    assert not ran
+
+    # No workers would never start a step
+    with pytest.raises(ValueError, match="max_workers must be at least 1"):
+        run_steps([PipelineStep('a', 'A', lambda: ran.append('a'))], max_workers=0, poll_interval=0.01)
+    assert not ran
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test step telemetry: S3 writes and API calls made from helper thread pools
+are attributed to the step that started them, CPU used by those helpers is
+counted, S3 traffic is measured in bytes, a step that times out leaves one
+record rather than two, and the RSS figure is labelled as a whole-process
+number.
+"""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from data_pipeline import pipeline_telemetry, upload_data
+from data_pipeline.partitioned_store import PartitionedStore
+
+
+@pytest.fixture(autouse=True)
+def clean_records(monkeypatch):
+    monkeypatch.setattr(pipeline_telemetry, '_records', [])
+    monkeypatch.setattr(pipeline_telemetry, '_running', {})
+
+
+def records_by_name():
+    return {r['name']: r for r in pipeline_telemetry.get_run_records()}
+
+
+def write_partition(n):
+    pipeline_telemetry.record_s3_write(100, rows=n)
+    pipeline_telemetry.record_api_call('api.example.com', 0.5)
+    return n
+
+
+def burn_cpu(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_helper_pool_work_counts_towards_the_step():
+    store = PartitionedStore(uploader=object(), bucket='bucket', prefix='prefix', max_workers=4)
+
+    with pipeline_telemetry.step('outer'):
+        with pipeline_telemetry.step('sync'):
+            assert store._map(write_partition, range(1, 9)) == list(range(1, 9))
+
+    # Outside any step nothing is counted
+    store._map(write_partition, range(3))
+
+    records = records_by_name()
+    for name in ['outer', 'sync']:
+        assert records[name]['status'] == 'success'
+        assert records[name]['s3_writes'] == 8
+        assert records[name]['s3_bytes_written'] == 800
+        assert records[name]['rows_out'] == 36
+        assert records[name]['api_calls'] == {'api.example.com': 8}
+        assert records[name]['api_seconds'] == {'api.example.com': 4.0}
+    assert records['sync']['parent'] == 'outer'
+    assert len(pipeline_telemetry.get_run_records()) == 2
+
+
+def test_helper_pool_cpu_is_counted():
+    with pipeline_telemetry.step('parallel'):
+        workers = [threading.Thread(target=pipeline_telemetry.in_current_context(burn_cpu), args=(0.1,))
+                   for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    assert records_by_name()['parallel']['cpu_seconds'] >= 0.3
+
+
+def test_timed_out_step_keeps_one_record():
+    release = threading.Event()
+
+    def stuck():
+        with pipeline_telemetry.step('stuck'):
+            pipeline_telemetry.record_s3_write(10)
+            release.wait(5)
+
+    worker = threading.Thread(target=stuck)
+    worker.start()
+    time.sleep(0.05)
+    pipeline_telemetry.record_outcome('stuck', 'timeout', 0.05, 'step timeout after 0.05s')
+    pipeline_telemetry.record_outcome('never_ran', 'skipped', error='upstream failed: stuck')
+    release.set()
+    worker.join()
+
+    records = pipeline_telemetry.get_run_records()
+    assert [r['name'] for r in records] == ['stuck', 'never_ran']
+    assert records[0]['status'] == 'timeout'
+    assert records[0]['error'] == 'step timeout after 0.05s'
+    assert records[0]['wall_seconds'] == 0.05
+    assert records[0]['s3_writes'] == 1
+    assert records[1]['status'] == 'skipped'
+
+
+def test_failed_step_and_process_rss():
+    with pytest.raises(RuntimeError):
+        with pipeline_telemetry.step('broken'):
+            raise RuntimeError('boom')
+
+    record = records_by_name()['broken']
+    assert (record['status'], record['error']) == ('failed', 'boom')
+    assert 'peak_rss_mb' not in record
+    assert 'process_peak_rss_mb' in record
+
+
+def test_s3_traffic_is_counted_in_bytes(fake_s3):
+    uploader = upload_data.DataUploader()
+    df = pd.DataFrame({'name': ['Zoë', 'José', 'Ana'], 'message': ['🎉 Party!', 'Olá', 'Hi']})
+
+    with pipeline_telemetry.step('upload'):
+        uploader.upload_to_s3(df, 'bucket', 'customers.csv')
+        content = uploader.download_from_s3('bucket', 'customers.csv')
+
+    record = records_by_name()['upload']
+    size = len(fake_s3.objects['customers.csv'])
+    assert size > len(df.to_csv(index=False))
+    assert record['s3_bytes_written'] == record['s3_bytes_read'] == size
+    assert record['rows_out'] == 3
+    assert uploader.convert_csv_to_df(content)['name'].tolist() == ['Zoë', 'José', 'Ana']
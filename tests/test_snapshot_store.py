@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test content-addressed monthly snapshots: unchanged partitions are not
+re-uploaded, load_as_of returns the right point in time, reads are pruned to
+the requested months, and old full-copy snapshots are still readable.
+"""
+import datetime
+
+import pandas as pd
+import pytest
+
+from data_pipeline import config
+from data_pipeline.snapshot_store import SnapshotStore
+from data_pipeline.transaction_store import TransactionStore
+
+
+def make_customers(n=500, version=1):
+    return pd.DataFrame({
+        "customer_id": [f"cus_{i}" for i in range(n)],
+        "email": [f"c{i}@example.com" for i in range(n)],
+        "version": version,
+    })
+
+
+def make_checkins(months):
+    rows = []
+    for month in months:
+        for day in (3, 17):
+            rows.append({"checkin_id": f"{month}-{day}", "customer_id": "cus_1",
+                         "checkin_datetime": f"{month}-{day:02d}T18:00:00-05:00"})
+    return pd.DataFrame(rows)
+
+
+def sort(df, by):
+    return df.sort_values(by).reset_index(drop=True)
+
+
+def test_unchanged_partitions_are_not_reuploaded(uploader):
+    snapshots = SnapshotStore(uploader, bucket="test-bucket")
+    customers = make_customers()
+    first = snapshots.snapshot(config.s3_path_customers_master, customers, snapshot_date="2025-09-01")
+    uploads_first = len(uploader.s3.puts)
+
+    changed = customers.copy()
+    changed.loc[changed["customer_id"] == "cus_7", "email"] = "new@example.com"
+    second = snapshots.snapshot(config.s3_path_customers_master, changed, snapshot_date="2025-10-01")
+
+    assert uploads_first == len(first["partitions"]) + 1
+    # One changed bucket plus the manifest
+    assert len(uploader.s3.puts) - uploads_first == 2
+    assert second["rows"] == len(customers)
+
+    # A fresh store (new process) also sees what is already stored
+    third = SnapshotStore(uploader, bucket="test-bucket").snapshot(
+        config.s3_path_customers_master, changed, snapshot_date="2025-11-01")
+    assert len(uploader.s3.puts) - uploads_first == 3
+    assert [p["object"] for p in third["partitions"]] == [p["object"] for p in second["partitions"]]
+
+
+def test_load_as_of_picks_latest_snapshot_on_or_before(uploader):
+    snapshots = SnapshotStore(uploader, bucket="test-bucket")
+    v1, v2 = make_customers(version=1), make_customers(n=520, version=2)
+    snapshots.snapshot(config.s3_path_customers_master, v1, snapshot_date="2025-09-01")
+    snapshots.snapshot(config.s3_path_customers_master, v2, snapshot_date="2025-10-01")
+
+    as_of_sep = snapshots.load_as_of(config.s3_path_customers_master, "2025-09-20")
+    as_of_oct = snapshots.load_as_of(config.s3_path_customers_master, datetime.date(2025, 10, 1))
+
+    pd.testing.assert_frame_equal(sort(as_of_sep, "customer_id"), sort(v1, "customer_id"))
+    pd.testing.assert_frame_equal(sort(as_of_oct, "customer_id"), sort(v2, "customer_id"))
+    with pytest.raises(LookupError):
+        snapshots.load_as_of(config.s3_path_customers_master, "2025-08-31")
+
+
+def test_month_range_reads_only_matching_partitions(uploader):
+    snapshots = SnapshotStore(uploader, bucket="test-bucket")
+    checkins = make_checkins(["2025-01", "2025-02", "2025-09", "2025-10"])
+    snapshots.snapshot(config.s3_path_capitan_checkins, checkins, snapshot_date="2025-11-01")
+    uploader.reads.clear()
+
+    df = snapshots.load_as_of(config.s3_path_capitan_checkins, "2025-11-15",
+                              start_date="2025-01-01", end_date="2025-02-10")
+
+    objects_read = [k for k in uploader.reads if "/objects/" in k]
+    assert len(objects_read) == 2
+    assert df["checkin_id"].tolist() == ["2025-01-3", "2025-01-17", "2025-02-3"]
+
+
+def test_legacy_full_copy_snapshots_still_load(uploader):
+    legacy = make_customers(n=10)
+    key = config.s3_path_customer_flags_snapshot + "_2025-06-01"
+    uploader.s3.objects[key] = legacy.to_csv(index=False)
+    snapshots = SnapshotStore(uploader, bucket="test-bucket")
+    snapshots.snapshot(config.s3_path_customer_flags, make_customers(n=12), snapshot_date="2025-08-01")
+
+    pd.testing.assert_frame_equal(snapshots.load_as_of(config.s3_path_customer_flags, "2025-07-01"), legacy)
+    assert len(snapshots.load_as_of(config.s3_path_customer_flags, "2025-08-01")) == 12
+
+
+def test_transaction_snapshot_survives_compaction(uploader):
+    def transactions(days, tag):
+        return pd.DataFrame({"transaction_id": [f"t-{d}" for d in days], "Date": days,
+                             "Total Amount": 22.0, "tag": tag})
+
+    store = TransactionStore(uploader, bucket="test-bucket", prefix="transactions/partitions")
+    uploader.s3.objects[config.s3_path_combined] = transactions(["2025-05-30"], "old").to_csv(index=False)
+    store.migrate_from_combined(today=datetime.date(2025, 6, 15))
+    store.write(transactions(["2025-06-01", "2025-06-02"], "v1"))
+
+    snapshots = SnapshotStore(uploader, bucket="test-bucket")
+    puts_before = len(uploader.s3.puts)
+    snapshots.snapshot_store_manifest(config.s3_path_combined, store.load_manifest(), snapshot_date="2025-06-02")
+    assert len(uploader.s3.puts) - puts_before == 1  # manifest only
+
+    store.write(transactions(["2025-06-02"], "v2"), replace_from=datetime.datetime(2025, 6, 2))
+    store.compact(today=datetime.date(2025, 7, 1))
+
+    as_of = snapshots.load_as_of(config.s3_path_combined, "2025-06-30", start_date="2025-06-01")
+    assert sort(as_of, "Date")["tag"].tolist() == ["v1", "v1"]
+    current = store.read(start_date="2025-06-01")
+    assert sort(current, "Date")["tag"].tolist() == ["v1", "v2"]
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test the windowed/concurrent Square strict fetch against recorded responses.
+
+The fake client serves tests/fixtures/square_strict_responses.json the way the
+Square API does (paged list_payments, batch_retrieve_orders), so the
+concurrent path can be checked against the sequential one without a token.
+"""
+import datetime
+import json
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from data_pipeline.fetch_square_data import SquareFetcher, SQUARE_BATCH_RETRIEVE_LIMIT
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "square_strict_responses.json")
+START = datetime.datetime(2025, 6, 1)
+END = datetime.datetime(2025, 6, 15)
+
+
+class FakeResult:
+    def __init__(self, body, errors=None):
+        self.body = body
+        self.errors = errors
+
+    def is_success(self):
+        return self.errors is None
+
+    def is_error(self):
+        return self.errors is not None
+
+
+class FakeSquareServer:
+    """In-memory Square API backed by recorded payments and orders."""
+
+    def __init__(self, fixture, page_size=25):
+        self.payments = fixture["payments"]
+        self.orders = {o["id"]: o for o in fixture["orders"]}
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.payment_pages = 0
+        self.batch_calls = []
+        self.fail_windows_from = None  # begin_time from which list_payments errors
+        self.fail_order_batches = False
+
+    def list_payments(self, begin_time, end_time, sort_order="DESC", limit=100, cursor=None):
+        if self.fail_windows_from and begin_time >= self.fail_windows_from:
+            return FakeResult({}, errors=[{"code": "RATE_LIMITED"}])
+        matching = [p for p in self.payments if begin_time <= p["created_at"] < end_time]
+        matching.sort(key=lambda p: p["created_at"], reverse=(sort_order == "DESC"))
+        offset = int(cursor or 0)
+        page_size = min(limit, self.page_size)
+        body = {"payments": matching[offset:offset + page_size]}
+        if offset + page_size < len(matching):
+            body["cursor"] = str(offset + page_size)
+        with self.lock:
+            self.payment_pages += 1
+        return FakeResult(body)
+
+    def batch_retrieve_orders(self, body):
+        with self.lock:
+            self.batch_calls.append(list(body["order_ids"]))
+        if self.fail_order_batches:
+            return FakeResult({}, errors=[{"code": "INTERNAL_SERVER_ERROR"}])
+        return FakeResult({"orders": [self.orders[i] for i in body["order_ids"] if i in self.orders]})
+
+
+class FakeClient:
+    def __init__(self, server):
+        self.payments = server
+        self.orders = server
+
+
+class FakeSquareFetcher(SquareFetcher):
+    def __init__(self, server):
+        super().__init__("test-token")
+        self.server = server
+
+    def _create_client(self):
+        return FakeClient(self.server)
+
+
+def load_fixture():
+    with open(FIXTURE_PATH) as f:
+        return json.load(f)
+
+
+def expected_validated_payment_ids(fixture):
+    orders = {o["id"]: o for o in fixture["orders"]}
+    return sorted(
+        p["id"] for p in fixture["payments"]
+        if p["status"] == "COMPLETED"
+        and p.get("order_id") in orders
+        and orders[p["order_id"]]["state"] == "COMPLETED"
+    )
+
+
+def test_concurrent_fetch_matches_sequential():
+    fixture = load_fixture()
+
+    sequential_server = FakeSquareServer(fixture)
+    df_sequential = FakeSquareFetcher(sequential_server).pull_and_transform_square_payment_data_strict(
+        START, END, window_days=None, max_workers=1
+    )
+
+    concurrent_server = FakeSquareServer(fixture)
+    df_concurrent = FakeSquareFetcher(concurrent_server).pull_and_transform_square_payment_data_strict(
+        START, END, window_days=2, max_workers=4
+    )
+
+    pd.testing.assert_frame_equal(df_sequential, df_concurrent)
+    assert sorted(df_concurrent["payment_id"].unique()) == expected_validated_payment_ids(fixture)
+    assert df_concurrent["Date"].is_monotonic_decreasing
+
+
+def test_orders_fetched_once_in_batches_of_100():
+    fixture = load_fixture()
+    server = FakeSquareServer(fixture)
+    FakeSquareFetcher(server).pull_and_transform_square_payment_data_strict(
+        START, END, window_days=None, max_workers=4
+    )
+
+    requested = [order_id for call in server.batch_calls for order_id in call]
+    payment_order_ids = {
+        p["order_id"] for p in fixture["payments"]
+        if p["status"] == "COMPLETED" and p.get("order_id")
+    }
+    assert len(requested) == len(set(requested))
+    assert set(requested) == payment_order_ids
+    assert all(len(call) <= SQUARE_BATCH_RETRIEVE_LIMIT for call in server.batch_calls)
+    assert len(server.batch_calls) == -(-len(payment_order_ids) // SQUARE_BATCH_RETRIEVE_LIMIT)
+
+
+def test_split_date_range_covers_range():
+    windows = SquareFetcher.split_date_range(START, END, 4)
+    assert windows[0][0] == START
+    assert windows[-1][1] == END
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    assert SquareFetcher.split_date_range(START, END, None) == [(START, END)]
+
+
+def test_failed_windows_and_order_batches_raise():
+    fixture = load_fixture()
+    server = FakeSquareServer(fixture)
+    server.fail_windows_from = "2025-06-11"
+    with pytest.raises(RuntimeError, match="failed for 2 of 7 windows"):
+        FakeSquareFetcher(server).pull_and_transform_square_payment_data_strict(
+            START, END, window_days=2, max_workers=4
+        )
+
+    server = FakeSquareServer(fixture)
+    server.fail_order_batches = True
+    with pytest.raises(RuntimeError, match="order lookup failed"):
+        FakeSquareFetcher(server).pull_and_transform_square_payment_data_strict(
+            START, END, window_days=2, max_workers=4
+        )
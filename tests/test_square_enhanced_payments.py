@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Check the vectorized create_enhanced_payments_dataframe against the
+per-payment loop it replaced, frame for frame (columns, order and dtypes),
+using the recorded Square fixture and a few edge cases.
+"""
+import copy
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from data_pipeline.fetch_square_data import SquareFetcher
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "square_strict_responses.json")
+
+
+@pytest.fixture
+def fixture_data():
+    with open(FIXTURE_PATH) as f:
+        data = json.load(f)
+    payments = [p for p in data["payments"] if p["status"] == "COMPLETED"]
+    return payments, data["orders"]
+
+
+def loop_enhanced_payments(fetcher, payments_list, orders_list):
+    """The per-payment loop create_enhanced_payments_dataframe replaced (dict payloads)."""
+    orders_lookup = {order.get('id'): order for order in orders_list}
+
+    data = []
+    for payment in payments_list:
+        payment_id = payment.get('id')
+        order_id = payment.get('order_id')
+        created_at = payment.get('created_at')
+        amount_money = payment.get('amount_money', {})
+        payment_amount = amount_money.get('amount', 0) / 100 if amount_money else 0
+        payment_status = payment.get('status')
+        payment_type = payment.get('source_type')
+
+        order = orders_lookup.get(order_id) if order_id else None
+        line_items = order.get('line_items', []) if order else []
+        order_state = order.get('state') if order else None
+
+        if line_items:
+            split_amounts = fetcher.split_payment_amount_dict(payment_amount, line_items)
+            for i, (item, split_amount) in enumerate(zip(line_items, split_amounts)):
+                item_pre_tax_money = item.get('base_price_money', {}).get('amount', 0) / 100
+                data.append({
+                    "transaction_id": f"{payment_id}_item_{i+1}",
+                    "Description": item.get('variation_name', 'No Description'),
+                    "Pre-Tax Amount": item_pre_tax_money,
+                    "Tax Amount": item.get('total_tax_money', {}).get('amount', 0) / 100,
+                    "Discount Amount": item.get('total_discount_money', {}).get('amount', 0) / 100,
+                    "Name": item.get('name', 'No Name'),
+                    "Total Amount": split_amount,
+                    "Date": created_at,
+                    "base_price_amount": item_pre_tax_money,
+                    "status": order_state,
+                    "payment_id": payment_id,
+                    "order_id": order_id,
+                    "payment_status": payment_status,
+                    "payment_type": payment_type,
+                    "quantity": int(item.get('quantity', '1')),
+                })
+        else:
+            data.append({
+                "transaction_id": payment_id,
+                "Description": "Payment without order details",
+                "Pre-Tax Amount": payment_amount / 1.0825,
+                "Tax Amount": payment_amount - (payment_amount / 1.0825),
+                "Discount Amount": 0,
+                "Name": "Payment",
+                "Total Amount": payment_amount,
+                "Date": created_at,
+                "base_price_amount": payment_amount / 1.0825,
+                "status": "PAID",
+                "payment_id": payment_id,
+                "order_id": order_id,
+                "payment_status": payment_status,
+                "payment_type": payment_type,
+            })
+
+    df = pd.DataFrame(data)
+    expected_cols = [
+        "transaction_id", "Description", "Pre-Tax Amount", "Tax Amount",
+        "Discount Amount", "Name", "Total Amount", "Date", "base_price_amount",
+        "revenue_category", "membership_size", "membership_freq", "is_founder",
+        "is_free_membership", "sub_category", "sub_category_detail", "date_",
+        "Data Source", "Day Pass Count"
+    ]
+    for col in expected_cols:
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+
+def edge_case_orders(orders):
+    """Fixture orders plus an emptied order and a zero-total order."""
+    orders = copy.deepcopy(orders)
+    paid_orders = [o for o in orders if o.get("line_items")]
+    paid_orders[0]["line_items"] = []
+    multi_item = next(o for o in paid_orders if len(o["line_items"]) > 1)
+    for item in multi_item["line_items"]:
+        item["total_money"] = {"amount": 0, "currency": "USD"}
+    return orders
+
+
+@pytest.mark.parametrize("case", ["fixture", "no_orders", "edge_orders", "only_orders"])
+def test_frame_matches_per_payment_loop(fixture_data, case):
+    payments, orders = fixture_data
+    if case == "no_orders":
+        orders = []
+    elif case == "edge_orders":
+        orders = edge_case_orders(orders)
+    elif case == "only_orders":
+        payments = [p for p in payments if p.get("order_id")]
+    fetcher = SquareFetcher("test-token")
+
+    df = fetcher.create_enhanced_payments_dataframe(payments, orders)
+
+    pd.testing.assert_frame_equal(df, loop_enhanced_payments(fetcher, payments, orders))
+
+
+def test_payment_without_order_is_estimated(fixture_data):
+    payments, _ = fixture_data
+    payment = next(p for p in payments if not p.get("order_id"))
+    df = SquareFetcher("test-token").create_enhanced_payments_dataframe([payment], [])
+
+    amount = payment["amount_money"]["amount"] / 100
+    row = df.iloc[0]
+    assert len(df) == 1
+    assert row["Description"] == "Payment without order details"
+    assert row["Total Amount"] == amount
+    assert row["Pre-Tax Amount"] == pytest.approx(amount / 1.0825)
+    assert "quantity" not in df.columns
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test the incremental Stripe object cache: one backfill, then event-only syncs
+that serve revenue, refund and failed-payment reads without re-listing.
+"""
+import datetime
+import time
+
+import pytest
+import stripe
+
+from data_pipeline import stripe_cache
+from data_pipeline.fetch_stripe_data import StripeFetcher
+
+NOW = int(time.time())
+DAY = 24 * 3600
+
+
+def to_obj(values):
+    return stripe.StripeObject.construct_from(values, "sk_test_fake")
+
+
+def make_pi(i, created, status="succeeded", description="Day Pass"):
+    return {
+        "id": f"pi_{i:05d}", "object": "payment_intent", "created": created,
+        "amount": 5000, "amount_received": 5000 if status == "succeeded" else 0,
+        "currency": "usd", "status": status, "livemode": True,
+        "description": description, "customer": f"cus_{i}",
+        "latest_charge": {"id": f"ch_{i:05d}", "receipt_email": f"r{i}@example.com",
+                          "billing_details": {"name": f"Climber {i}", "email": f"b{i}@example.com"}},
+        "last_payment_error": (
+            {"decline_code": "insufficient_funds", "message": "Your card has insufficient funds."}
+            if status == "requires_payment_method" else None
+        ),
+    }
+
+
+def make_refund(i, created):
+    return {"id": f"re_{i:05d}", "object": "refund", "created": created, "amount": 1000,
+            "charge": f"ch_{i:05d}", "payment_intent": f"pi_{i:05d}", "status": "succeeded",
+            "reason": None, "currency": "usd"}
+
+
+class FakeList:
+    """Stand-in for a Stripe resource's paged list endpoint."""
+
+    def __init__(self, objects, page_size=100):
+        self.objects = objects
+        self.page_size = page_size
+        self.calls = 0
+
+    def list(self, limit=100, starting_after=None, created=None, **params):
+        self.calls += 1
+        objects = sorted(self.objects, key=lambda o: o["created"], reverse=True)
+        created = created or {}
+        objects = [o for o in objects
+                   if o["created"] >= created.get("gte", o["created"])
+                   and o["created"] > created.get("gt", o["created"] - 1)]
+        if starting_after:
+            ids = [o["id"] for o in objects]
+            objects = objects[ids.index(starting_after) + 1:]
+        size = min(limit, self.page_size)
+        return to_obj({"object": "list", "data": objects[:size], "has_more": len(objects) > size})
+
+
+class FakeEvents(FakeList):
+    def list(self, type=None, types=None, **params):
+        matches = self.objects
+        if type:
+            matches = [e for e in matches if e["type"].startswith(type.rstrip("*"))]
+        if types:
+            matches = [e for e in matches if e["type"] in types]
+        return FakeList(matches, self.page_size).list(**params)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    pis = [make_pi(i, NOW - (i % 100) * DAY - i) for i in range(250)]
+    pis[3] = make_pi(3, NOW - 10 * DAY, status="requires_payment_method",
+                     description="Capitan membership #180227 renewal payment")
+    refunds = [make_refund(i, NOW - i * DAY) for i in range(20)]
+    api = {
+        "payment_intents": FakeList(pis),
+        "refunds": FakeList(refunds),
+        "events": FakeEvents([]),
+    }
+    monkeypatch.setattr(stripe.PaymentIntent, "list", api["payment_intents"].list)
+    monkeypatch.setattr(stripe.Refund, "list", api["refunds"].list)
+
+    def list_events(**params):
+        api["events"].calls += 1
+        return FakeEvents(api["events"].objects).list(**params)
+
+    monkeypatch.setattr(stripe.Event, "list", list_events)
+    return api
+
+
+def test_backfill_then_incremental_sync(fake_api):
+    cache = stripe_cache.StripeObjectCache("sk_test_fake")
+    pages = cache.sync(now=NOW)
+    assert pages == 3 + 1  # 250 payment intents + 20 refunds
+    assert len(cache.payment_intents) == 250
+    assert len(cache.refunds) == 20
+
+    # A failed renewal gets paid, a new payment and a refund arrive
+    paid = make_pi(3, NOW - 10 * DAY, description="Capitan membership #180227 renewal payment")
+    paid["latest_charge"] = "ch_00003"
+    fake_api["events"].objects = [
+        {"id": "evt_1", "type": "payment_intent.succeeded", "created": NOW + 10,
+         "data": {"object": paid}},
+        {"id": "evt_2", "type": "payment_intent.created", "created": NOW + 20,
+         "data": {"object": make_pi(999, NOW + 20)}},
+        {"id": "evt_3", "type": "refund.created", "created": NOW + 30,
+         "data": {"object": make_refund(999, NOW + 30)}},
+    ]
+    fake_api["payment_intents"].calls = 0
+    pages = cache.sync(now=NOW + DAY)
+
+    assert pages == 2  # one event page per event listing, no re-listing
+    assert fake_api["payment_intents"].calls == 0
+    assert cache.payment_intents["pi_00003"]["status"] == "succeeded"
+    # Event copies carry latest_charge as an ID; the expanded copy is kept
+    assert cache.payment_intents["pi_00003"]["latest_charge"]["billing_details"]["name"] == "Climber 3"
+    assert "pi_00999" in cache.payment_intents
+    assert "re_00999" in cache.refunds
+    assert cache.cursor == NOW + 30
+
+
+def test_fetcher_reads_all_consumers_from_cache(fake_api):
+    cache = stripe_cache.StripeObjectCache("sk_test_fake")
+    cache.sync(now=NOW)
+    fake_api["payment_intents"].calls = 0
+    fake_api["refunds"].calls = 0
+
+    fetcher = StripeFetcher("sk_test_fake", cache=cache)
+    end = datetime.datetime.fromtimestamp(NOW)
+    start = end - datetime.timedelta(days=90)
+
+    failed = fetcher.pull_failed_membership_payments("sk_test_fake", start, end)
+    succeeded = fetcher.pull_stripe_payment_intents_data_raw("sk_test_fake", start, end)
+    refunds = fetcher.get_refunds_for_period("sk_test_fake", start, end)
+    df = fetcher.create_stripe_payment_intents_df(succeeded)
+
+    assert fake_api["payment_intents"].calls == 0
+    assert fake_api["refunds"].calls == 0
+    assert failed["membership_id"].tolist() == [180227]
+    assert failed["decline_code"].tolist() == ["insufficient_funds"]
+    assert len(succeeded) == sum(1 for pi in cache.payment_intents.values()
+                                 if pi["status"] == "succeeded" and pi["created"] >= start.timestamp())
+    assert len(refunds) == 20
+    assert df.set_index("transaction_id").loc["pi_00007", "Name"] == "Climber 7"
+
+
+def test_save_and_load_round_trip(fake_api, uploader):
+    cache = stripe_cache.StripeObjectCache("sk_test_fake")
+    cache.load(uploader)  # nothing stored yet
+    cache.sync(now=NOW)
+    cache.save(uploader)
+
+    reloaded = stripe_cache.StripeObjectCache("sk_test_fake")
+    reloaded.load(uploader)
+    assert reloaded.payment_intents == cache.payment_intents
+    assert reloaded.refunds == cache.refunds
+    assert reloaded.cursor == cache.cursor
+    assert reloaded.covers(datetime.datetime.fromtimestamp(NOW - 30 * DAY))
+    assert not reloaded.covers(datetime.datetime.fromtimestamp(NOW - 365 * DAY))
+
+
+def test_cache_is_synced_once_per_pipeline_run(monkeypatch):
+    from data_pipeline import pipeline_handler
+    from data_pipeline.pipeline_scheduler import PipelineStep, run_once_scope, run_steps
+
+    syncs = []
+
+    def load_synced_cache(stripe_key=None, save=True):
+        syncs.append(stripe_key)
+        time.sleep(0.1)
+        return stripe_cache.StripeObjectCache("sk_test_fake")
+
+    monkeypatch.setattr(stripe_cache, "load_synced_cache", load_synced_cache)
+    start = datetime.datetime.now() - datetime.timedelta(days=2)
+    fetchers = []
+    steps = [
+        PipelineStep(name, name, lambda: fetchers.append(pipeline_handler.get_stripe_fetcher(start)))
+        for name in ["transactions", "failed_payments"]
+    ]
+
+    with run_once_scope():
+        run_steps(steps, poll_interval=0.01)
+    assert len(syncs) == 1
+    assert fetchers[0].cache is fetchers[1].cache
+
+    with run_once_scope():
+        pipeline_handler.get_stripe_fetcher(start)
+    assert len(syncs) == 2
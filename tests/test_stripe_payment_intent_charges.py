@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Check that building the Payment Intents frame makes O(pages) Stripe calls,
+not one Charge.retrieve per Payment Intent.
+
+Runs the real stripe SDK against a small local fake Stripe server that serves
+paged /v1/payment_intents and /v1/charges listings and counts requests.
+"""
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import stripe
+
+from data_pipeline.fetch_stripe_data import StripeFetcher
+
+START = datetime.datetime(2025, 6, 1)
+END = datetime.datetime(2025, 6, 30)
+N_PAYMENT_INTENTS = 250
+PAGE_LIMIT = 100
+
+
+def make_objects():
+    base = int(START.timestamp())
+    charges = {}
+    payment_intents = []
+    for i in range(N_PAYMENT_INTENTS):
+        created = base + i * 600
+        charge_id = f"ch_{i:05d}"
+        charges[charge_id] = {
+            "id": charge_id, "object": "charge", "created": created + 1,
+            "receipt_email": f"receipt{i}@example.com",
+            "billing_details": {"name": f"Climber {i}", "email": f"billing{i}@example.com"},
+        }
+        payment_intents.append({
+            "id": f"pi_{i:05d}", "object": "payment_intent", "created": created,
+            "amount_received": 2500, "currency": "usd", "status": "succeeded",
+            "livemode": True, "description": "Day Pass", "customer": None,
+            "latest_charge": charge_id,
+        })
+    # Stripe lists newest first
+    payment_intents.sort(key=lambda pi: pi["created"], reverse=True)
+    return payment_intents, charges
+
+
+class FakeStripeServer:
+    def __init__(self, honor_expand=True):
+        self.payment_intents, self.charges = make_objects()
+        self.honor_expand = honor_expand
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def list_page(self, objects, params, url):
+        limit = min(int(params.get("limit", ["10"])[0]), PAGE_LIMIT)
+        gte = int(params.get("created[gte]", ["0"])[0])
+        lte = int(params.get("created[lte]", [str(2**40)])[0])
+        objects = [o for o in objects if gte <= o["created"] <= lte]
+        if "starting_after" in params:
+            ids = [o["id"] for o in objects]
+            objects = objects[ids.index(params["starting_after"][0]) + 1:]
+        return {"object": "list", "url": url, "data": objects[:limit],
+                "has_more": len(objects) > limit}
+
+    def handle(self, path, params):
+        with self.lock:
+            self.requests.append(path)
+        if path == "/v1/payment_intents":
+            page = self.list_page(self.payment_intents, params, path)
+            expand = [v for k, vs in params.items() if k.startswith("expand") for v in vs]
+            if self.honor_expand and "data.latest_charge" in expand:
+                page["data"] = [dict(pi, latest_charge=self.charges[pi["latest_charge"]])
+                                for pi in page["data"]]
+            return 200, page
+        if path == "/v1/charges":
+            charges = sorted(self.charges.values(), key=lambda c: c["created"], reverse=True)
+            return 200, self.list_page(charges, params, path)
+        if path.startswith("/v1/charges/"):
+            return 200, self.charges[path.rsplit("/", 1)[-1]]
+        return 404, {"error": {"message": f"unknown path {path}"}}
+
+
+@pytest.fixture
+def fake_stripe(request):
+    server_state = FakeStripeServer(honor_expand=getattr(request, "param", True))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            status, body = server_state.handle(parsed.path, parse_qs(parsed.query))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    original_base = stripe.api_base
+    stripe.api_base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        yield server_state
+    finally:
+        stripe.api_base = original_base
+        httpd.shutdown()
+
+
+def build_frame():
+    fetcher = StripeFetcher("sk_test_fake")
+    payment_intents = fetcher.pull_stripe_payment_intents_data_raw("sk_test_fake", START, END)
+    return fetcher.create_stripe_payment_intents_df(payment_intents)
+
+
+def check_billing_details(df):
+    assert len(df) == N_PAYMENT_INTENTS
+    row = df.set_index("transaction_id").loc["pi_00007"]
+    assert row["Name"] == "Climber 7"
+    assert row["receipt_email"] == "receipt7@example.com"
+    assert row["billing_email"] == "billing7@example.com"
+
+
+def test_expanded_latest_charge_needs_no_charge_calls(fake_stripe):
+    df = build_frame()
+
+    check_billing_details(df)
+    pages = -(-N_PAYMENT_INTENTS // PAGE_LIMIT)
+    assert fake_stripe.requests.count("/v1/payment_intents") == pages
+    assert not [p for p in fake_stripe.requests if p.startswith("/v1/charges")]
+
+
+@pytest.mark.parametrize("fake_stripe", [False], indirect=True)
+def test_unexpanded_charges_fetched_with_one_listing(fake_stripe):
+    df = build_frame()
+
+    check_billing_details(df)
+    pages = -(-N_PAYMENT_INTENTS // PAGE_LIMIT)
+    assert fake_stripe.requests.count("/v1/payment_intents") == pages
+    assert fake_stripe.requests.count("/v1/charges") == pages
+    assert not [p for p in fake_stripe.requests if p.startswith("/v1/charges/")]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Check that the compiled TransactionCategorizer used by transform_payments_data
+gives exactly the labels of the original row-by-row implementation, which is
+kept here as legacy_transform_payments_data for comparison and benchmarking
+(scripts/benchmark_transaction_categorizer.py).
+"""
+import random
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_pipeline import config
+from utils.stripe_and_square_helpers import (
+    KeywordMatcher,
+    categorize_day_pass_sub_category,
+    categorize_transaction,
+    extract_event_and_programming_subcategory,
+    get_unique_event_and_programming_subcategories,
+    transform_payments_data,
+)
+
+
+def legacy_transform_payments_data(df, data_source_name=None):
+    """transform_payments_data as it was before the compiled categorizer."""
+    df[
+        ["revenue_category", "membership_size", "membership_freq", "is_founder", "is_free_membership"]
+    ] = df["Description"].apply(
+        lambda x: pd.Series(
+            categorize_transaction(
+                x,
+                config.revenue_category_keywords,
+                config.membership_size_keywords,
+                config.membership_frequency_keywords,
+                config.founder_keywords,
+                config.bcf_fam_friend_keywords,
+            )
+        )
+    )
+    df["sub_category"] = ""
+    df["sub_category_detail"] = ""
+    df.loc[df["Description"].str.contains("Summer Camp", case=False, na=False), "sub_category"] = "camps"
+    df.loc[
+        df["Description"].str.contains("Summer Camp", case=False, na=False), "sub_category_detail"
+    ] = df["Description"].str.extract(r"(Summer Camp (?:Session \d+|BONUS WEEK))", expand=False, flags=re.IGNORECASE)
+    for pattern, detail in config.birthday_sub_category_patterns.items():
+        mask = df["Description"].str.contains(pattern, case=False, na=False)
+        df.loc[mask, "sub_category"] = "birthday"
+        df.loc[mask, "sub_category_detail"] = detail
+    for pattern, detail in config.fitness_patterns.items():
+        mask = df["Description"].str.contains(pattern, case=False, na=False)
+        df.loc[mask, "sub_category"] = "fitness"
+        df.loc[mask, "sub_category_detail"] = detail
+    mask = df["revenue_category"].str.contains("Day Pass", case=False, na=False)
+    df.loc[mask, "sub_category"] = df.loc[mask, "Description"].apply(
+        lambda desc: categorize_day_pass_sub_category(
+            desc, config.day_pass_sub_category_age_keywords, config.day_pass_sub_category_gear_keywords,
+        )
+    )
+    for patern in get_unique_event_and_programming_subcategories(df):
+        mask = (
+            df["revenue_category"].str.lower().isin(["event booking", "programming"])
+            & (df["sub_category"] != "birthday")
+            & (df["sub_category"] == "")
+            & (df["Description"].apply(extract_event_and_programming_subcategory)
+               .str.contains(patern, case=False, na=False))
+        )
+        df.loc[mask, "sub_category"] = patern
+    df.loc[(df["revenue_category"] == "Retail") & (df["sub_category"] == ""), "sub_category"] = (
+        df["Name"].apply(lambda x: " ".join(x.split()[:4]) if isinstance(x, str) else "")
+    )
+    df["date_"] = pd.to_datetime(df["Date"], errors="coerce", utc=True)
+    df["Date"] = df["date_"].dt.strftime("%Y-%m-%d")
+    if "Tax Amount" in df.columns:
+        df["Tax Amount"] = pd.to_numeric(df["Tax Amount"], errors="coerce")
+    if "Pre-Tax Amount" in df.columns:
+        df["Pre-Tax Amount"] = pd.to_numeric(df["Pre-Tax Amount"], errors="coerce")
+    if data_source_name:
+        df["Data Source"] = data_source_name
+    df["Day Pass Count"] = df.apply(
+        lambda row: int(row.get("quantity", 1)) if row["revenue_category"] == "Day Pass" else 0,
+        axis=1,
+    )
+    return df
+
+
+DESCRIPTION_PARTS = (
+    list(config.revenue_category_keywords)
+    + list(config.membership_size_keywords)
+    + list(config.membership_frequency_keywords)
+    + list(config.day_pass_sub_category_age_keywords)
+    + list(config.day_pass_sub_category_gear_keywords)
+    + list(config.birthday_sub_category_patterns)
+    + list(config.fitness_patterns)
+    + [
+        "Summer Camp Session 3", "SUMMER CAMP bonus week", "summer camp deposit",
+        "Founder", "BCF Staff", "Chalk Bag", "Youth Climbing Team: Spring",
+        "Intro to Bouldering: Saturday 10am", "Yoga Class: Flow", "Ladies Night: Oct 3",
+        "Comp Prep: Finals", "Event: Halloween Bash!", "Booking: 2025-06-01",
+        "Adult", "Day Pass (Adult 14 and up)", "Basin 2 Hour Birthday Party Rental",
+        "XBasin 2 Hour Birthday", "6 Week Transformation", "Gift Card", ":",
+    ]
+)
+NAMES = ["Day Pass", "Chalk Bag Large Blue Edition", "Shoe Rental", "  Clif   Bar ", None, np.nan, ""]
+
+
+def make_transactions(n=1500, seed=33, with_quantity=True):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        parts = rng.sample(DESCRIPTION_PARTS, rng.randint(1, 3))
+        description = rng.choice([" - ", " ", ": "]).join(parts)
+        if rng.random() < 0.3:
+            description = description.upper() if rng.random() < 0.5 else description.title()
+        row = {
+            "transaction_id": f"t{i}",
+            "Description": description,
+            "Name": rng.choice(NAMES),
+            "Date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00Z",
+            "Total Amount": rng.choice([5.0, 22.0, 65.0, 130.0]),
+            "Tax Amount": 1.0,
+            "Pre-Tax Amount": 10.0,
+        }
+        if with_quantity:
+            row["quantity"] = rng.randint(1, 4)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_labels_match_legacy_implementation():
+    for with_quantity in (True, False):
+        df = make_transactions(with_quantity=with_quantity)
+        expected = legacy_transform_payments_data(df.copy(), data_source_name="Square")
+        actual = transform_payments_data(df.copy(), data_source_name="Square")
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_keyword_matcher_first_and_last():
+    keywords = {"comp": "Programming", "competition quality": "Retail", "pass": "Day Pass"}
+    first = KeywordMatcher(keywords)
+    last = KeywordMatcher(keywords, prefer="last")
+
+    assert first.match("competition quality chalk") == "Programming"
+    assert last.match("competition quality chalk") == "Retail"
+    assert last.match("competition quality day pass") == "Day Pass"
+    assert first.match("gift card", "Retail") == "Retail"
+    assert first.any("day pass") and not first.any("gift card")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the day-partitioned transaction store: a refresh rewrites only touched
+partitions, gives the same history as the old full-file rewrite, and
+compaction folds closed months without changing the data.
+"""
+import datetime
+import random
+
+import pandas as pd
+import pytest
+
+from data_pipeline import config
+from data_pipeline.transaction_store import TransactionStore
+
+
+def make_transactions(days, per_day=5, seed=36, tag="v1"):
+    rng = random.Random(seed)
+    rows = []
+    for day in days:
+        for i in range(per_day):
+            rows.append({
+                "transaction_id": f"{day}-{i}",
+                "Date": day,
+                "Total Amount": rng.choice([22.0, 65.0, -10.0]),
+                "revenue_category": rng.choice(["Day Pass", "Retail"]),
+                "tag": tag,
+            })
+    return pd.DataFrame(rows)
+
+
+def day_range(start, end):
+    return [d.strftime("%Y-%m-%d") for d in pd.date_range(start, end)]
+
+
+def legacy_replace_days(df_existing, df_today, start_date):
+    """replace_days_in_transaction_df_in_s3's full-file merge, for comparison."""
+    df_existing = df_existing.copy()
+    df_existing["Date"] = pd.to_datetime(df_existing["Date"], errors="coerce")
+    df_existing = df_existing[df_existing["Date"] < start_date]
+    df_existing["Date"] = df_existing["Date"].dt.strftime("%Y-%m-%d")
+    return pd.concat([df_existing, df_today], ignore_index=True).drop_duplicates(
+        subset=["transaction_id", "Date"])
+
+
+def normalized(df):
+    return df.sort_values(["Date", "transaction_id"]).reset_index(drop=True)
+
+
+@pytest.fixture
+def store(uploader):
+    history = make_transactions(day_range("2025-04-20", "2025-06-14"))
+    uploader.s3.objects[config.s3_path_combined] = history.to_csv(index=False)
+    return TransactionStore(uploader, bucket="test-bucket", prefix="transactions/partitions")
+
+
+def test_migrates_legacy_history(store):
+    manifest = store.write(pd.DataFrame(columns=["transaction_id", "Date"]))  # first write migrates
+    history = store.uploader.convert_csv_to_df(store.uploader.s3.objects[config.s3_path_combined])
+
+    assert manifest["total_rows"] == len(history)
+    assert set(manifest["partitions"]) >= {"month=2025-04", "month=2025-05"}
+    pd.testing.assert_frame_equal(normalized(store.read_all()), normalized(history))
+
+
+def test_refresh_rewrites_only_touched_days(store):
+    store.migrate_from_combined(today=datetime.date(2025, 6, 15))
+    before = store.read_all()
+    store.uploader.s3.puts.clear()
+    store.uploader.reads.clear()
+
+    end_date = datetime.datetime(2025, 6, 14, 9, 30)
+    start_date = end_date - datetime.timedelta(days=2)
+    df_today = make_transactions(day_range("2025-06-12", "2025-06-15"), per_day=3, seed=7, tag="v2")
+    store.write(df_today, replace_from=start_date)
+
+    written = [k for k in store.uploader.s3.puts if not k.endswith("manifest.json")]
+    assert sorted(k.split("/")[2] for k in written) == [
+        "date=2025-06-12", "date=2025-06-13", "date=2025-06-14", "date=2025-06-15"]
+    assert not any("month=" in k for k in store.uploader.reads)
+
+    expected = legacy_replace_days(before, df_today, start_date)
+    pd.testing.assert_frame_equal(normalized(store.read_all()), normalized(expected))
+
+
+def test_range_replace_into_compacted_month(store):
+    store.migrate_from_combined(today=datetime.date(2025, 6, 15))
+    df_new = make_transactions(["2025-05-10"], per_day=2, seed=1, tag="fixed")
+
+    store.write(df_new, replace_from=datetime.datetime(2025, 5, 10), replace_to=datetime.datetime(2025, 5, 11))
+
+    may = store.read("2025-05-01", "2025-05-31")
+    assert may.loc[may["Date"] == "2025-05-10", "tag"].tolist() == ["fixed", "fixed"]
+    assert may[may["Date"] == "2025-05-11"].empty
+    assert len(may[may["Date"] == "2025-05-12"]) == 5
+
+
+def test_compaction_keeps_data_and_drops_superseded_files_after_grace(store):
+    store.migrate_from_combined(today=datetime.date(2025, 6, 15))
+    store.write(make_transactions(day_range("2025-06-10", "2025-06-20"), seed=3, tag="new"))
+    previous = store.load_manifest()
+    before = store.read_all()
+
+    manifest = store.compact(today=datetime.date(2025, 7, 2))
+
+    assert not any(name.startswith("date=2025-06") for name in manifest["partitions"])
+    assert manifest["partitions"]["month=2025-06"]["rows"] == len(before[before["Date"] >= "2025-06-01"])
+    pd.testing.assert_frame_equal(normalized(store.read_all()), normalized(before))
+
+    # A reader still holding the previous manifest can finish its read
+    pd.testing.assert_frame_equal(normalized(store.read(manifest=previous)), normalized(before))
+    manifest = store.load_manifest()
+    live = store.referenced_keys(manifest) | {store.manifest_key}
+    superseded = set(manifest["superseded"])
+    assert superseded == store.referenced_keys(previous) - live
+    assert set(store.uploader.list_keys("test-bucket", "transactions/partitions/")) == live | superseded
+
+    # Still within the grace period: nothing goes
+    assert store.delete_unreferenced(manifest) == 0
+    later = datetime.datetime.now() + datetime.timedelta(hours=config.partition_delete_grace_hours, minutes=1)
+    assert store.delete_unreferenced(store.load_manifest(), now=later) == len(superseded)
+    assert set(store.uploader.list_keys("test-bucket", "transactions/partitions/")) == live
+    assert store.load_manifest()["superseded"] == {}
+
+
+def test_checksum_mismatch_is_detected(store):
+    manifest = store.write(pd.DataFrame(columns=["transaction_id", "Date"]))
+    key = next(iter(manifest["partitions"].values()))["key"]
+    store.uploader.s3.objects[key] += b"tampered,row\n"
+    with pytest.raises(ValueError):
+        store.read_all()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test the bulk SMS engine: consent filtering against a preloaded set, phone
+normalization, de-duplication by message ID (so one number can get several
+different messages), pacing, and resuming an interrupted campaign from its
+ledger without sending any message twice.
+"""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from data_pipeline import config
+from data_pipeline.customer_matching import normalize_phones
+from data_pipeline.twilio_bulk_sender import BulkSMSSender
+
+
+class FakeMessage:
+    def __init__(self, sid):
+        self.sid = sid
+        self.status = "accepted"
+
+
+class FakeMessages:
+    def __init__(self, fail_after=None, fail_numbers=()):
+        self.sent = []
+        self.params = []
+        self.fail_after = fail_after
+        self.fail_numbers = set(fail_numbers)
+        self._lock = threading.Lock()
+
+    def create(self, **params):
+        with self._lock:
+            if self.fail_after is not None and len(self.sent) >= self.fail_after:
+                raise KeyboardInterrupt("process killed")
+            if params["to"] in self.fail_numbers:
+                raise RuntimeError("Unreachable number")
+            self.sent.append((time.monotonic(), params["to"]))
+            self.params.append(params)
+            return FakeMessage(f"SM{len(self.sent):04d}")
+
+
+class FakeTwilioClient:
+    def __init__(self, **kwargs):
+        self.messages = FakeMessages(**kwargs)
+
+
+def recipients(phones, message="New routes this weekend!"):
+    return pd.DataFrame({"phone_number": phones, "message": message})
+
+
+def test_strict_phone_normalization_drops_undeliverable_numbers():
+    phones = pd.Series(["(512) 555-1234", 15125551235.0, " 1-512-555-1236 ", "+447911123456", "555-1234", None])
+
+    normalized = normalize_phones(phones, strict=True)
+    assert normalized.tolist()[:4] == ["+15125551234", "+15125551235", "+15125551236", "+447911123456"]
+    assert normalized.iloc[4:].isna().all()
+    # Without strict, short numbers still get a + like normalize_phone
+    assert normalize_phones(phones).iloc[4] == "+5551234"
+
+
+def test_consent_dedup_and_invalid_numbers(tmp_path):
+    client = FakeTwilioClient(fail_numbers={"+15125550003"})
+    sender = BulkSMSSender(client, from_number="+15125550000", messages_per_second=0, ledger_dir=str(tmp_path))
+
+    results = sender.send(
+        recipients(["512-555-0001", "+1 (512) 555-0001", "5125550002", "5125550003", "5125550004", "12"]),
+        campaign_id="promo",
+        consented={"+15125550001", "+15125550003", "+15125550004"},
+    )
+
+    assert (results["total"], results["duplicates"], results["invalid"], results["no_consent"]) == (6, 1, 1, 1)
+    assert (results["sent"], results["failed"]) == (2, 1)
+    assert sorted(to for _, to in client.messages.sent) == ["+15125550001", "+15125550004"]
+    assert client.messages.params[0]["from_"] == "+15125550000"
+
+
+def test_messaging_service_and_pacing(tmp_path):
+    client = FakeTwilioClient()
+    sender = BulkSMSSender(client, messaging_service_sid="MG123", messages_per_second=50,
+                           max_workers=4, ledger_dir=str(tmp_path))
+
+    sender.send(recipients([f"51255501{i:02d}" for i in range(10)]), campaign_id="paced")
+
+    assert all(p["messaging_service_sid"] == "MG123" and "from_" not in p for p in client.messages.params)
+    times = sorted(t for t, _ in client.messages.sent)
+    assert times[-1] - times[0] >= 9 / 50 * 0.9
+
+
+def test_resume_skips_numbers_already_sent(tmp_path):
+    phones = [f"51255502{i:02d}" for i in range(12)]
+    crashed = FakeTwilioClient(fail_after=5)
+    sender = BulkSMSSender(crashed, from_number="+15125550000", messages_per_second=0,
+                           max_workers=1, ledger_dir=str(tmp_path))
+    with pytest.raises(KeyboardInterrupt):
+        sender.send(recipients(phones), campaign_id="crash")
+
+    ledger = sender.load_ledger("crash")
+    assert len(ledger) == 5 and (ledger["status"] == "sent").all()
+
+    client = FakeTwilioClient()
+    resumed = BulkSMSSender(client, from_number="+15125550000", messages_per_second=0, ledger_dir=str(tmp_path))
+    results = resumed.send(recipients(phones), campaign_id="crash")
+
+    assert (results["skipped"], results["sent"]) == (5, 7)
+    first_run = {to for _, to in crashed.messages.sent}
+    second_run = {to for _, to in client.messages.sent}
+    assert not first_run & second_run
+    assert len(first_run | second_run) == 12
+    assert len(resumed.load_ledger("crash")) == 12
+
+    # Dry runs never touch the ledger
+    resumed.send(recipients(["5125559999"]), campaign_id="crash", dry_run=True)
+    assert len(resumed.load_ledger("crash")) == 12
+
+
+def ledger_rows_uploaded(uploader):
+    return [body.count(b"\n") - 1 for body in uploader.s3.put_bodies]
+
+
+def test_ledger_reaches_s3_during_and_after_an_interrupted_send(tmp_path, monkeypatch, uploader):
+    monkeypatch.setattr(config, "twilio_ledger_upload_every", 2)
+    phones = [f"51255503{i:02d}" for i in range(8)]
+    crashed = BulkSMSSender(FakeTwilioClient(fail_after=5), from_number="+15125550000", messages_per_second=0,
+                            max_workers=1, ledger_dir=str(tmp_path / "first"), uploader=uploader)
+    with pytest.raises(KeyboardInterrupt):
+        crashed.send(recipients(phones), campaign_id="mirrored")
+
+    # Uploaded after the 2nd and 4th results, then again when the send died
+    uploads = ledger_rows_uploaded(uploader)
+    assert len(uploads) == 3
+    assert uploads[0] >= 2 and uploads[1] >= 4 and uploads[2] == 5
+
+    # A fresh machine resumes from the S3 copy
+    client = FakeTwilioClient()
+    resumed = BulkSMSSender(client, from_number="+15125550000", messages_per_second=0,
+                            ledger_dir=str(tmp_path / "second"), uploader=uploader)
+    results = resumed.send(recipients(phones), campaign_id="mirrored")
+
+    assert (results["skipped"], results["sent"]) == (5, 3)
+    assert ledger_rows_uploaded(uploader)[-1] == 8
+
+
+def test_one_message_per_id_not_per_number(tmp_path):
+    # A guest going to two parties gets one reminder for each RSVP
+    texts = pd.DataFrame({
+        "message_id": ["rsvp-a", "rsvp-b", "rsvp-a", "rsvp-c"],
+        "phone_number": ["5125550401", "+1 512 555 0401", "5125550401", "5125550402"],
+        "message": ["Party A tomorrow", "Party B in 3 days", "Party A tomorrow", "Party A tomorrow"],
+    })
+    crashed = FakeTwilioClient(fail_after=1)
+    sender = BulkSMSSender(crashed, from_number="+15125550000", messages_per_second=0,
+                           max_workers=1, ledger_dir=str(tmp_path))
+    with pytest.raises(KeyboardInterrupt):
+        sender.send(texts, campaign_id="birthday")
+
+    client = FakeTwilioClient()
+    resumed = BulkSMSSender(client, from_number="+15125550000", messages_per_second=0, ledger_dir=str(tmp_path))
+    results = resumed.send(texts, campaign_id="birthday")
+
+    assert (results["duplicates"], results["skipped"], results["sent"]) == (1, 1, 2)
+    details = {d["message_id"]: d for d in results["details"]}
+    assert details["rsvp-a"]["status"] == "already_sent" and details["rsvp-a"]["sid"] == "SM0001"
+    assert details["rsvp-b"]["success"] and details["rsvp-c"]["success"]
+    assert sorted(p["body"] for p in crashed.messages.params + client.messages.params) == [
+        "Party A tomorrow", "Party A tomorrow", "Party B in 3 days"]
+    assert sorted(resumed.load_ledger("birthday")["message_id"]) == ["rsvp-a", "rsvp-b", "rsvp-c"]
+
+
+def test_rows_without_ids_are_keyed_by_number_and_text(tmp_path):
+    client = FakeTwilioClient()
+    sender = BulkSMSSender(client, from_number="+15125550000", messages_per_second=0, ledger_dir=str(tmp_path))
+    texts = pd.DataFrame({
+        "phone_number": ["5125550501", "5125550501", "5125550501", "99"],
+        "message": ["First", "Second", "First", "First"],
+    })
+
+    results = sender.send(texts, campaign_id="mixed")
+
+    assert (results["duplicates"], results["invalid"], results["sent"]) == (1, 1, 2)
+    assert [d["error"] for d in results["details"] if not d["success"]] == ["Invalid phone number"]
+    assert sender.send(texts, campaign_id="mixed")["skipped"] == 2
+    assert len(client.messages.sent) == 2
+
+
+def test_ledger_without_message_ids_is_upgraded(tmp_path):
+    (tmp_path / "old.csv").write_text(
+        "campaign_id,phone_number,status,twilio_status,sid,error,sent_at\n"
+        "old,+15125550601,sent,accepted,SM1,,2026-01-01T00:00:00\n")
+    sender = BulkSMSSender(FakeTwilioClient(), from_number="+15125550000", messages_per_second=0,
+                           ledger_dir=str(tmp_path))
+
+    sender.send(recipients(["5125550602"]), campaign_id="old")
+
+    ledger = sender.load_ledger("old")
+    assert list(ledger.columns)[:3] == ["campaign_id", "phone_number", "message_id"]
+    assert ledger["phone_number"].tolist() == ["+15125550601", "+15125550602"]
+    assert ledger["message_id"].iloc[0] == "" and ledger["message_id"].iloc[1] != ""
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the cursor-based Twilio message sync: each run only reads messages sent
+after the stored date_sent cursor (nothing is capped by a list limit), and the
+opt-in status folded forward from new actions matches recomputing it from the
+full history.
+"""
+import datetime
+import io
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from data_pipeline import config
+from data_pipeline import fetch_twilio_messages
+from data_pipeline import sync_twilio_opt_ins
+from data_pipeline.twilio_message_sync import CURSOR_OVERLAP
+
+UTC = datetime.timezone.utc
+START = datetime.datetime(2025, 6, 1, 9, tzinfo=UTC)
+
+
+class FakeMessages:
+    def __init__(self):
+        self.all = []
+        self.calls = []
+
+    def stream(self, date_sent_after=None, page_size=None, limit=None):
+        self.calls.append({'date_sent_after': date_sent_after, 'page_size': page_size, 'limit': limit})
+        for msg in sorted(self.all, key=lambda m: m.date_sent, reverse=True):
+            if date_sent_after is None or msg.date_sent >= date_sent_after:
+                yield msg
+
+
+class FakeTwilioClient:
+    def __init__(self):
+        self.messages = FakeMessages()
+
+    def text(self, minutes, phone, body, direction='inbound'):
+        sent = START + datetime.timedelta(minutes=minutes)
+        self.messages.all.append(SimpleNamespace(
+            sid=f"SM{len(self.messages.all):05d}", date_sent=sent, date_created=sent,
+            direction=direction, body=body,
+            from_=phone if direction == 'inbound' else '+15125550000',
+            to='+15125550000' if direction == 'inbound' else phone,
+            status='received', error_code=None, error_message=None,
+            num_segments='1', price=None, price_unit='USD',
+        ))
+
+
+@pytest.fixture
+def twilio(monkeypatch, fake_s3):
+    client = FakeTwilioClient()
+    for module in (sync_twilio_opt_ins, fetch_twilio_messages):
+        monkeypatch.setattr(module, 'Client', lambda *args: client)
+    client.s3 = fake_s3
+    return client
+
+
+def test_opt_in_status_is_updated_incrementally(twilio):
+    tracker = sync_twilio_opt_ins.TwilioOptInTracker()
+    phones = [f"+1512555{i:04d}" for i in range(8)]
+    for i, phone in enumerate(phones):
+        twilio.text(i, phone, 'BASIN')
+    twilio.text(10, phones[0], 'STOP')
+    # More history than the old 1,000-message list limit
+    for i in range(1200):
+        twilio.text(20 + i % 30, phones[1], 'Your code is 1234', direction='outbound-api')
+
+    first = tracker.sync()
+    assert twilio.messages.calls[-1]['date_sent_after'] is None
+    assert twilio.messages.calls[-1]['limit'] is None
+    assert len(first['history']) == 9
+
+    twilio.text(60, phones[0], 'start')
+    twilio.text(61, phones[2], 'stop')
+    twilio.text(62, '+15125559999', 'yes')
+    second = tracker.sync()
+
+    cursor = START + datetime.timedelta(minutes=49)
+    assert twilio.messages.calls[-1]['date_sent_after'] == cursor - CURSOR_OVERLAP
+    # Overlapping messages come back again but are only recorded once
+    assert len(second['new_actions']) == 3
+    assert len(second['history']) == 12
+
+    stored = pd.read_csv(io.StringIO(twilio.s3.objects[tracker.status_key]), dtype={'phone_number': str})
+    recomputed = tracker.calculate_current_status(second['history'])
+    key = lambda df: df.sort_values('phone_number').reset_index(drop=True).astype(str)
+    pd.testing.assert_frame_equal(key(stored), key(recomputed))
+    status = stored.set_index('phone_number')
+    assert status.loc[phones[0], ['current_status', 'total_opt_ins', 'total_opt_outs']].tolist() == ['opted_in', 2, 1]
+    assert status.loc[phones[2], 'current_status'] == 'opted_out'
+
+    state = json.loads(twilio.s3.objects[config.s3_path_twilio_opt_ins_sync_state])
+    assert state['date_sent_cursor'] == (START + datetime.timedelta(minutes=62)).isoformat()
+
+
+def test_message_archive_reads_only_new_messages(twilio):
+    fetcher = fetch_twilio_messages.TwilioMessageFetcher()
+    for i in range(6000):
+        twilio.text(i, f"+1512555{i % 50:04d}", 'hi', direction='outbound-api')
+
+    assert len(fetcher.fetch_and_save()) == 6000
+
+    twilio.text(7000, '+15125550001', 'WAIVER')
+    all_messages = fetcher.fetch_and_save(days_back=7)
+
+    refresh_window = datetime.timedelta(days=config.twilio_message_refresh_days)
+    assert twilio.messages.calls[-1]['date_sent_after'] == START + datetime.timedelta(minutes=5999) - refresh_window
+    assert len(all_messages) == 6001
+    assert all_messages['message_sid'].is_unique
+    assert all_messages['is_waiver_request'].sum() == 1
+
+    # Status, error code and price set after sending replace the stored values on the next run
+    delivered, failed = twilio.messages.all[5990], twilio.messages.all[5991]
+    delivered.status, delivered.price = 'delivered', '-0.0079'
+    failed.status, failed.error_code = 'undelivered', 30007
+    all_messages = fetcher.fetch_and_save().set_index('message_sid')
+
+    assert len(all_messages) == 6001
+    assert all_messages.loc[delivered.sid, ['status', 'price']].tolist() == ['delivered', '-0.0079']
+    assert all_messages.loc[failed.sid, ['status', 'error_code']].tolist() == ['undelivered', 30007]
+    stored = pd.read_csv(io.StringIO(twilio.s3.objects[fetcher.s3_key])).set_index('message_sid')
+    assert stored.loc[failed.sid, 'status'] == 'undelivered'
@@ -1,4 +1,5 @@
 import re
+import numpy as np
 import pandas as pd
 from data_pipeline import config
 
@@ -92,6 +93,172 @@ def categorize_transaction(
     )
 
 
+class KeywordMatcher:
+    """
+    Substring matcher for an ordered keyword -> value dict, compiled into a
+    single regex so each description is scanned once instead of once per
+    keyword.
+
+    The regex is an alternation inside a lookahead, so it reports a match at
+    every position. With prefer="first" the alternatives are in dict order and
+    the lowest dict index found wins (like a loop that breaks on the first
+    matching keyword); with prefer="last" they are reversed and the highest
+    index wins (like a loop where later matches overwrite earlier ones).
+    """
+
+    def __init__(self, keywords, prefer="first", regex=False, flags=0):
+        self.values = list(keywords.values())
+        self.prefer = prefer
+        patterns = list(keywords) if regex else [re.escape(k) for k in keywords]
+        order = range(len(patterns)) if prefer == "first" else reversed(range(len(patterns)))
+        alternation = "|".join(f"(?P<k{i}>{patterns[i]})" for i in order)
+        self.pattern = re.compile(f"(?=(?:{alternation}))", flags) if patterns else None
+
+    def match(self, text, default=None):
+        if self.pattern is None:
+            return default
+        indexes = [int(m.lastgroup[1:]) for m in self.pattern.finditer(text)]
+        if not indexes:
+            return default
+        return self.values[min(indexes) if self.prefer == "first" else max(indexes)]
+
+    def any(self, text):
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+
+class TransactionCategorizer:
+    """
+    Assigns revenue category, membership size/frequency, founder/BCF flags
+    and sub-categories for transform_payments_data.
+
+    All keyword dicts from config are compiled once. Each distinct
+    Description is categorized once and the results are broadcast back to
+    rows, so a full transaction history (many repeats of the same few
+    thousand descriptions) takes a handful of vectorized passes.
+    """
+
+    EVENT_CATEGORIES = ("event booking", "programming")
+
+    def __init__(self):
+        self.revenue_category = KeywordMatcher(config.revenue_category_keywords)
+        self.membership_size = KeywordMatcher(config.membership_size_keywords)
+        self.membership_freq = KeywordMatcher(config.membership_frequency_keywords)
+        self.founder = KeywordMatcher(config.founder_keywords)
+        self.bcf_fam_friend = KeywordMatcher(config.bcf_fam_friend_keywords)
+        self.day_pass_age = KeywordMatcher(config.day_pass_sub_category_age_keywords, prefer="last")
+        self.day_pass_gear = KeywordMatcher(config.day_pass_sub_category_gear_keywords, prefer="last")
+        self.birthday = KeywordMatcher(config.birthday_sub_category_patterns, prefer="last",
+                                       regex=True, flags=re.IGNORECASE)
+        self.fitness = KeywordMatcher(config.fitness_patterns, prefer="last",
+                                      regex=True, flags=re.IGNORECASE)
+        self.camp = re.compile("Summer Camp", re.IGNORECASE)
+        self.camp_detail = re.compile(r"(Summer Camp (?:Session \d+|BONUS WEEK))", re.IGNORECASE)
+
+    def categorize_description(self, description):
+        """Everything that depends only on the Description, for one description."""
+        text = description.lower()
+        category = self.revenue_category.match(text, "Retail")
+        camp_match = self.camp_detail.search(description)
+        return {
+            "revenue_category": category,
+            "membership_size": self.membership_size.match(text),
+            "membership_freq": self.membership_freq.match(text),
+            "is_founder": self.founder.any(text),
+            "is_free_membership": self.bcf_fam_friend.any(text),
+            "is_camp": self.camp.search(description) is not None,
+            "camp_detail": camp_match.group(1) if camp_match else np.nan,
+            "birthday_detail": self.birthday.match(description),
+            "fitness_detail": self.fitness.match(description),
+            "is_day_pass": "day pass" in category.lower(),
+            "day_pass_sub_category": (
+                self.day_pass_age.match(text, "") + " " + self.day_pass_gear.match(text, "")
+            ).strip(),
+            "is_event_category": category.lower() in self.EVENT_CATEGORIES,
+            "event_sub_category": extract_event_and_programming_subcategory(description),
+        }
+
+    @staticmethod
+    def first_event_pattern(text, patterns):
+        """
+        Alphabetically first non-empty pattern contained in text - the pattern
+        the old sorted "for pattern in patterns" loop would have assigned.
+        """
+        return min((pattern for pattern in patterns if pattern in text), default="")
+
+    def categorize(self, descriptions, names):
+        """
+        Categorize a column of descriptions.
+
+        Returns:
+            DataFrame (same index) with revenue_category, membership_size,
+            membership_freq, is_founder, is_free_membership, sub_category and
+            sub_category_detail
+        """
+        codes, uniques = pd.factorize(descriptions.fillna(""), sort=False)
+        per_description = pd.DataFrame(
+            [self.categorize_description(d) for d in uniques],
+            columns=list(self.categorize_description("")),
+        )
+        rows = per_description.take(codes).reset_index(drop=True)
+        rows.index = descriptions.index
+
+        sub_category = np.full(len(rows), "", dtype=object)
+        detail = np.full(len(rows), "", dtype=object)
+
+        is_camp = rows["is_camp"].to_numpy(dtype=bool)
+        sub_category[is_camp] = "camps"
+        detail[is_camp] = rows["camp_detail"].to_numpy()[is_camp]
+
+        for column, label in (("birthday_detail", "birthday"), ("fitness_detail", "fitness")):
+            matched = rows[column].notna().to_numpy()
+            sub_category[matched] = label
+            detail[matched] = rows[column].to_numpy()[matched]
+
+        is_day_pass = rows["is_day_pass"].to_numpy(dtype=bool)
+        sub_category[is_day_pass] = rows["day_pass_sub_category"].to_numpy()[is_day_pass]
+
+        # Event/Programming: patterns come from every eligible row in this frame
+        eligible = rows["is_event_category"].to_numpy(dtype=bool) & (sub_category != "birthday")
+        extracted = rows["event_sub_category"].to_numpy()
+        patterns = set(extracted[eligible]) - {""}
+        needs_pattern = eligible & (sub_category == "")
+        if needs_pattern.any():
+            resolved = {
+                text: self.first_event_pattern(text, patterns)
+                for text in set(extracted[needs_pattern])
+            }
+            sub_category[needs_pattern] = [resolved[t] for t in extracted[needs_pattern]]
+
+        # Retail fallback: first four words of the item name
+        retail = (rows["revenue_category"].to_numpy() == "Retail") & (sub_category == "")
+        if retail.any():
+            name_words = (
+                names.astype(object).str.split().str[:4].str.join(" ").fillna("")
+            ).to_numpy()
+            sub_category[retail] = name_words[retail]
+
+        return pd.DataFrame({
+            "revenue_category": rows["revenue_category"],
+            "membership_size": rows["membership_size"].astype(object),
+            "membership_freq": rows["membership_freq"].astype(object),
+            "is_founder": rows["is_founder"].astype(bool),
+            "is_free_membership": rows["is_free_membership"].astype(bool),
+            "sub_category": pd.Series(sub_category, index=rows.index, dtype=object),
+            "sub_category_detail": pd.Series(detail, index=rows.index, dtype=object),
+        })
+
+
+_categorizer = None
+
+
+def get_transaction_categorizer():
+    """Shared TransactionCategorizer, compiled from config on first use."""
+    global _categorizer
+    if _categorizer is None:
+        _categorizer = TransactionCategorizer()
+    return _categorizer
+
+
 def transform_payments_data(
     df,
     assign_extra_subcategories=None,  # Optional callback for pipeline-specific logic
@@ -101,86 +268,12 @@ def transform_payments_data(
     """
     Shared transformation logic for Stripe and Square payments data.
     """
-    # Categorize transactions
-    df[
-        [
-            "revenue_category",
-            "membership_size",
-            "membership_freq",
-            "is_founder",
-            "is_free_membership",
-        ]
-    ] = df["Description"].apply(
-        lambda x: pd.Series(
-            categorize_transaction(
-                x,
-                config.revenue_category_keywords,
-                config.membership_size_keywords,
-                config.membership_frequency_keywords,
-                config.founder_keywords,
-                config.bcf_fam_friend_keywords,
-            )
-        )
-    )
-
-    # Add sub-category columns
-    df["sub_category"] = ""
-    df["sub_category_detail"] = ""
-
-    # Camps
-    df.loc[
-        df["Description"].str.contains("Summer Camp", case=False, na=False),
-        "sub_category",
-    ] = "camps"
-    # Extract session number OR "BONUS WEEK"
-    df.loc[
-        df["Description"].str.contains("Summer Camp", case=False, na=False),
-        "sub_category_detail",
-    ] = df["Description"].str.extract(r"(Summer Camp (?:Session \d+|BONUS WEEK))", expand=False, flags=re.IGNORECASE)
-
-    # Birthday
-    for pattern, detail in config.birthday_sub_category_patterns.items():
-        mask = df["Description"].str.contains(pattern, case=False, na=False)
-        df.loc[mask, "sub_category"] = "birthday"
-        df.loc[mask, "sub_category_detail"] = detail
-
-    # Fitness
-    for pattern, detail in config.fitness_patterns.items():
-        mask = df["Description"].str.contains(pattern, case=False, na=False)
-        df.loc[mask, "sub_category"] = "fitness"
-        df.loc[mask, "sub_category_detail"] = detail
-
-    # Day Passes
-    mask = df["revenue_category"].str.contains("Day Pass", case=False, na=False)
-    df.loc[mask, "sub_category"] = df.loc[mask, "Description"].apply(
-        lambda desc: categorize_day_pass_sub_category(
-            desc,
-            config.day_pass_sub_category_age_keywords,
-            config.day_pass_sub_category_gear_keywords,
-        )
-    )
-
-    # Event/Programming subcategories
-    for patern in get_unique_event_and_programming_subcategories(df):
-        mask = (
-            df["revenue_category"].str.lower().isin(["event booking", "programming"])
-            & (df["sub_category"] != "birthday")
-            & (df["sub_category"] == "")
-            & (
-                df["Description"]
-                .apply(extract_event_and_programming_subcategory)
-                .str.contains(patern, case=False, na=False)
-            )
-        )
-        df.loc[mask, "sub_category"] = patern
-
-    # Retail fallback
-    df.loc[
-        (df["revenue_category"] == "Retail") & (df["sub_category"] == ""),
-        "sub_category",
-    ] = df["Name"].apply(
-        lambda x: " ".join(x.split()[:4]) if isinstance(x, str) else ""
-    )
+    # Categorize transactions and assign sub-categories (camps, birthday,
+    # fitness, day passes, event/programming, retail fallback)
+    names = df["Name"] if "Name" in df.columns else pd.Series(np.nan, index=df.index)
+    categories = get_transaction_categorizer().categorize(df["Description"], names)
+    for column in categories.columns:
+        df[column] = categories[column]
 
     # Pipeline-specific extra subcategories
     if assign_extra_subcategories:
@@ -203,12 +296,11 @@ def transform_payments_data(
         df["Day Pass Count"] = df.apply(day_pass_count_logic, axis=1)
     else:
         # Use quantity field if available (for Square), otherwise default to 1
-        df["Day Pass Count"] = df.apply(
-            lambda row: (
-                int(row.get("quantity", 1)) if row["revenue_category"] == "Day Pass" else 0
-            ),
-            axis=1
-        )
+        if "quantity" in df.columns:
+            quantity = pd.to_numeric(df["quantity"], errors="coerce").fillna(1)
+        else:
+            quantity = pd.Series(1, index=df.index)
+        df["Day Pass Count"] = quantity.where(df["revenue_category"] == "Day Pass", 0).astype(int)
 
     return df
 